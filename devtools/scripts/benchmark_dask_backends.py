@@ -0,0 +1,120 @@
+"""
+Compares the throughput of the thread and process based modes of the local
+dask backend when running an analysis heavy reweighting graph. Each property
+in the graph is estimated by reweighting the data of several reference states
+(whose bootstrapping is implemented in pure python, and so is serialized by the
+GIL when every worker shares a single process), and then gathering the results
+in a task which depends on the futures of each reweighting task, in the same way
+as the tasks of a `WorkflowGraph`.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from simtk import unit
+
+from propertyestimator.backends import ComputeResources, DaskLocalClusterBackend, TaskResourceRequirements
+from propertyestimator.protocols.reweighting import ReweightWithMBARProtocol
+
+
+def reweight_synthetic_data(task_index, number_of_frames, bootstrap_iterations, available_resources):
+    """Reweights a set of synthetic observables, bootstrapping the uncertainty."""
+
+    random_state = np.random.RandomState(task_index)
+
+    reference_potentials = random_state.standard_normal((1, number_of_frames))
+    target_potentials = reference_potentials + 0.1 * random_state.standard_normal((1, number_of_frames))
+
+    protocol = ReweightWithMBARProtocol(f'reweight_{task_index}')
+
+    protocol.reference_reduced_potentials = [reference_potentials[0]]
+    protocol.target_reduced_potentials = [target_potentials[0]]
+    protocol.reference_observables = [random_state.standard_normal(number_of_frames) * unit.kelvin]
+
+    protocol.bootstrap_uncertainties = True
+    protocol.bootstrap_iterations = bootstrap_iterations
+    protocol.required_effective_samples = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = protocol.execute(directory, available_resources)
+
+    if not isinstance(result, dict):
+        raise RuntimeError(f'The reweighting task failed: {result}')
+
+    return protocol.value.value
+
+
+def gather_reweighted_values(*reweighted_values, **_):
+    """Averages the values reweighted from each of the reference states of a property."""
+    return np.mean([value.value_in_unit(unit.kelvin) for value in reweighted_values]) * unit.kelvin
+
+
+def run_benchmark(backend, arguments):
+    """Returns the wall time taken to run the reweighting graph on a backend."""
+
+    backend.start()
+
+    try:
+
+        # Warm up the workers so that their start up time is not measured.
+        backend.submit_task(reweight_synthetic_data, 0, 10, 1,
+                            resource_requirements=TaskResourceRequirements(1)).result()
+
+        start_time = time.perf_counter()
+
+        gather_futures = []
+
+        for property_index in range(arguments.properties):
+
+            reweight_futures = [backend.submit_task(reweight_synthetic_data,
+                                                    property_index * arguments.states + state_index,
+                                                    arguments.frames,
+                                                    arguments.iterations,
+                                                    key=f'reweight_{property_index}_{state_index}',
+                                                    resource_requirements=TaskResourceRequirements(1))
+                                for state_index in range(arguments.states)]
+
+            gather_futures.append(backend.submit_task(gather_reweighted_values,
+                                                      *reweight_futures,
+                                                      key=f'gather_{property_index}',
+                                                      resource_requirements=TaskResourceRequirements(1)))
+
+        for future in gather_futures:
+            future.result()
+
+        return time.perf_counter() - start_time
+
+    finally:
+        backend.stop()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the local dask backend modes.')
+
+    parser.add_argument('--workers', type=int, default=4, help='The number of workers to use.')
+    parser.add_argument('--properties', type=int, default=8, help='The number of properties to estimate.')
+    parser.add_argument('--states', type=int, default=4,
+                        help='The number of reference states to reweight for each property.')
+    parser.add_argument('--frames', type=int, default=2000, help='The number of frames in each task.')
+    parser.add_argument('--iterations', type=int, default=200, help='The number of bootstrap iterations.')
+
+    arguments = parser.parse_args()
+
+    number_of_tasks = arguments.properties * (arguments.states + 1)
+
+    print(f'{"mode":>10} {"workers":>8} {"tasks":>8} {"time (s)":>10} {"tasks / s":>10}')
+
+    for processes in [False, True]:
+
+        backend = DaskLocalClusterBackend(arguments.workers, ComputeResources(1), processes=processes)
+        wall_time = run_benchmark(backend, arguments)
+
+        mode = 'processes' if processes else 'threads'
+        print(f'{mode:>10} {arguments.workers:>8} {number_of_tasks:>8} '
+              f'{wall_time:>10.2f} {number_of_tasks / wall_time:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
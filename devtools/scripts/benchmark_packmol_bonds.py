@@ -0,0 +1,154 @@
+"""
+Compares the time taken to reconcile the bonds of a packmol generated box with
+the bonds which mdtraj has already detected, using the original nested loop
+approach and the vectorised, set based approach now used by `pack_box`.
+
+No packmol binary is required, as synthetic topologies are used throughout.
+"""
+import argparse
+import time
+
+import mdtraj
+import numpy as np
+
+from propertyestimator.utils.packmol import _add_missing_bonds, _generate_bonds
+
+
+def create_molecule_topology(number_of_atoms):
+    """Creates the topology of a single, linear molecule."""
+
+    topology = mdtraj.Topology()
+    residue = topology.add_residue('MOL', topology.add_chain())
+
+    atoms = [topology.add_atom(f'C{index}', mdtraj.element.carbon, residue) for index in range(number_of_atoms)]
+
+    for atom_a, atom_b in zip(atoms[:-1], atoms[1:]):
+        topology.add_bond(atom_a, atom_b)
+
+    return topology
+
+
+def create_packed_topology(molecule_topology, number_of_copies, existing_bond_fraction):
+    """Creates a topology which mimics that loaded from a packmol output
+    file, in which some of the bonds have already been detected."""
+
+    topology = mdtraj.Topology()
+    chain = topology.add_chain()
+
+    for _ in range(number_of_copies):
+
+        residue = topology.add_residue('MOL', chain)
+        atoms = [topology.add_atom(atom.name, atom.element, residue) for atom in molecule_topology.atoms]
+
+        if np.random.random() >= existing_bond_fraction:
+            continue
+
+        for bond in molecule_topology.bonds:
+            topology.add_bond(atoms[bond.atom1.index], atoms[bond.atom2.index])
+
+    return topology
+
+
+def reconcile_bonds_legacy(topology, molecule_topology, number_of_copies):
+    """Reconciles the bonds using the original nested loop approach."""
+
+    all_bonds = []
+    offset = 0
+
+    _, molecule_bonds = molecule_topology.to_dataframe()
+
+    for _ in range(number_of_copies):
+
+        for bond in molecule_bonds:
+            all_bonds.append([int(bond[0].item()) + offset, int(bond[1].item()) + offset])
+
+        offset += molecule_topology.n_atoms
+
+    all_bonds = np.unique(all_bonds, axis=0).tolist()
+    existing_bonds = list(topology.bonds)
+
+    for bond in all_bonds:
+
+        atom_a = topology.atom(bond[0])
+        atom_b = topology.atom(bond[1])
+
+        bond_exists = False
+
+        for existing_bond in existing_bonds:
+
+            if ((existing_bond.atom1 == atom_a and existing_bond.atom2 == atom_b) or
+                (existing_bond.atom2 == atom_a and existing_bond.atom1 == atom_b)):
+
+                bond_exists = True
+                break
+
+        if bond_exists:
+            continue
+
+        topology.add_bond(atom_a, atom_b)
+
+
+def reconcile_bonds(topology, molecule_topology, number_of_copies):
+    """Reconciles the bonds using the vectorised, set based approach."""
+
+    bonds = _generate_bonds([molecule_topology], [number_of_copies])
+    _add_missing_bonds(topology, bonds)
+
+
+def time_function(function, *args):
+    """Returns the wall time taken to call a function."""
+
+    start_time = time.perf_counter()
+    function(*args)
+
+    return time.perf_counter() - start_time
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the reconciliation of packmol bonds.')
+
+    parser.add_argument('--copies', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='The numbers of molecules in the synthetic boxes.')
+    parser.add_argument('--atoms', type=int, default=9, help='The number of atoms in each molecule.')
+
+    parser.add_argument('--existing-fraction', type=float, default=0.1,
+                        help='The fraction of molecules whose bonds mdtraj has already detected.')
+
+    parser.add_argument('--max-legacy-copies', type=int, default=1000,
+                        help='The largest box to time the original, quadratic approach on.')
+
+    arguments = parser.parse_args()
+
+    np.random.seed(0)
+
+    molecule_topology = create_molecule_topology(arguments.atoms)
+
+    print(f'{"copies":>8} {"bonds":>10} {"legacy (s)":>12} {"current (s)":>12} {"speedup":>9}')
+
+    for number_of_copies in arguments.copies:
+
+        topology = create_packed_topology(molecule_topology, number_of_copies, arguments.existing_fraction)
+        current_time = time_function(reconcile_bonds, topology, molecule_topology, number_of_copies)
+
+        legacy_time = None
+
+        if number_of_copies <= arguments.max_legacy_copies:
+
+            legacy_topology = create_packed_topology(molecule_topology, number_of_copies,
+                                                     arguments.existing_fraction)
+
+            legacy_time = time_function(reconcile_bonds_legacy, legacy_topology,
+                                        molecule_topology, number_of_copies)
+
+            assert legacy_topology.n_bonds == topology.n_bonds
+
+        legacy_string = '-' if legacy_time is None else f'{legacy_time:.3f}'
+        speedup_string = '-' if legacy_time is None else f'{legacy_time / current_time:.1f}'
+
+        print(f'{number_of_copies:>8} {topology.n_bonds:>10} {legacy_string:>12} '
+              f'{current_time:>12.3f} {speedup_string:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Compares the time taken to write and read large statistics files using
+either the pandas csv format, or the binary statistics format.
+"""
+import argparse
+import os
+import time
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from simtk import unit
+
+from propertyestimator.utils.statistics import StatisticsArray
+
+
+def create_statistics_array(number_of_rows):
+    """Creates a statistics array filled with random data."""
+
+    random_state = np.random.RandomState(0)
+
+    def random_values(mean, array_unit):
+        return (mean + random_state.standard_normal(number_of_rows)) * array_unit
+
+    return StatisticsArray(random_values(-1.0e4, unit.kilojoule_per_mole),
+                           random_values(5.0e3, unit.kilojoule_per_mole),
+                           random_values(-5.0e3, unit.kilojoule_per_mole),
+                           random_values(298.0, unit.kelvin),
+                           random_values(50.0, unit.nanometer**3),
+                           random_values(1.0, unit.gram / unit.milliliter),
+                           random_values(-4.9e3, unit.kilojoule_per_mole))
+
+
+def time_function(function, *args):
+    """Returns the wall clock time taken to call a function."""
+
+    start_time = time.perf_counter()
+    function(*args)
+
+    return time.perf_counter() - start_time
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the statistics file formats.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 5000000],
+                        help='The number of rows of statistics to write and read.')
+
+    arguments = parser.parse_args()
+
+    print(f'{"rows":>10} {"format":>8} {"write (s)":>10} {"read (s)":>10} {"size (MB)":>10}')
+
+    for number_of_rows in arguments.rows:
+
+        statistics_array = create_statistics_array(number_of_rows)
+
+        with TemporaryDirectory() as directory:
+
+            csv_path = os.path.join(directory, 'statistics.csv')
+            binary_path = os.path.join(directory, 'statistics.bin')
+
+            formats = [
+                ('csv', csv_path, statistics_array.save_as_pandas_csv, StatisticsArray.from_pandas_csv),
+                ('binary', binary_path, statistics_array.save_as_binary, StatisticsArray.from_binary)
+            ]
+
+            for format_name, file_path, write_function, read_function in formats:
+
+                write_time = time_function(write_function, file_path)
+                read_time = time_function(read_function, file_path)
+
+                file_size = os.path.getsize(file_path) / 1.0e6
+
+                print(f'{number_of_rows:>10} {format_name:>8} {write_time:>10.3f} '
+                      f'{read_time:>10.3f} {file_size:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares the time taken to load a serialized OpenMM system when it is parsed
+from disk, when it is taken from the in-process cache of read only systems,
+and when a cached system is deep copied (the cost of the previous cache).
+"""
+import argparse
+import copy
+import os
+import time
+from tempfile import TemporaryDirectory
+
+from simtk import openmm, unit
+
+from propertyestimator.utils import openmm as openmm_utils
+from propertyestimator.utils.openmm import serialize_system, deserialize_system
+
+
+def create_system(number_of_particles):
+    """Creates a system of harmonically bonded, charged particles."""
+
+    system = openmm.System()
+
+    nonbonded_force = openmm.NonbondedForce()
+    nonbonded_force.setNonbondedMethod(openmm.NonbondedForce.PME)
+
+    bond_force = openmm.HarmonicBondForce()
+
+    for particle_index in range(number_of_particles):
+
+        system.addParticle(12.0)
+        nonbonded_force.addParticle(0.1 * (-1) ** particle_index, 0.3, 0.5)
+
+        if particle_index > 0:
+            bond_force.addBond(particle_index - 1, particle_index, 0.15, 1000.0)
+
+    system.addForce(nonbonded_force)
+    system.addForce(bond_force)
+
+    box_length = (number_of_particles / 100.0) ** (1.0 / 3.0) + 2.0
+
+    system.setDefaultPeriodicBoxVectors(openmm.Vec3(box_length, 0, 0) * unit.nanometer,
+                                        openmm.Vec3(0, box_length, 0) * unit.nanometer,
+                                        openmm.Vec3(0, 0, box_length) * unit.nanometer)
+
+    return system
+
+
+def time_function(function, repeats):
+    """Returns the average wall clock time taken to call a function."""
+
+    start_time = time.perf_counter()
+
+    for _ in range(repeats):
+        function()
+
+    return (time.perf_counter() - start_time) / repeats
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the in-process system cache.')
+    parser.add_argument('--particles', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='The number of particles in the benchmarked systems.')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='The number of times to repeat each measurement.')
+
+    arguments = parser.parse_args()
+
+    print(f'{"particles":>10} {"parse (s)":>10} {"hit (s)":>10} {"deepcopy (s)":>13}')
+
+    for number_of_particles in arguments.particles:
+
+        system = create_system(number_of_particles)
+
+        with TemporaryDirectory() as directory:
+
+            system_path = os.path.join(directory, 'system.xml.gz')
+            serialize_system(system, system_path)
+
+            parse_time = time_function(lambda: deserialize_system(system_path), arguments.repeats)
+
+            openmm_utils._cached_systems.clear()
+            cached_system = deserialize_system(system_path, read_only=True)
+
+            hit_time = time_function(lambda: deserialize_system(system_path, read_only=True), arguments.repeats)
+            copy_time = time_function(lambda: copy.deepcopy(cached_system), arguments.repeats)
+
+        print(f'{number_of_particles:>10} {parse_time:>10.4f} {hit_time:>10.4f} {copy_time:>13.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares the size of a stored trajectory in each of the supported file formats
+and precisions, against the error which the reduced precision introduces into the
+reduced potentials (and hence the reweighting weights) of its frames.
+"""
+import argparse
+import os
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from simtk import unit
+
+from propertyestimator.backends import ComputeResources
+from propertyestimator.protocols.reweighting import CalculateReducedPotentialOpenMM
+from propertyestimator.thermodynamics import ThermodynamicState
+from propertyestimator.utils.trajectories import TrajectoryFileFormat, VirtualTrajectory, iterate_trajectory, \
+    trajectory_file_extensions, write_trajectory_chunks
+
+
+def calculate_reduced_potentials(directory, trajectory_path, coordinate_path, system_path, thermodynamic_state):
+    """Calculates the reduced potential of each frame in a trajectory."""
+
+    protocol = CalculateReducedPotentialOpenMM('reduced_potentials')
+
+    protocol.thermodynamic_state = thermodynamic_state
+    protocol.system_path = system_path
+    protocol.trajectory = VirtualTrajectory.from_file(trajectory_path, coordinate_path)
+
+    result = protocol.execute(directory, ComputeResources())
+
+    if not isinstance(result, dict):
+        raise RuntimeError(f'The reduced potentials could not be calculated: {result}')
+
+    return protocol.reduced_potentials
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmarks the trajectory storage formats.')
+
+    parser.add_argument('--trajectory', required=True, help='The path to the DCD trajectory to store.')
+    parser.add_argument('--coordinates', required=True, help='The path to the PDB topology of the trajectory.')
+    parser.add_argument('--system', required=True, help='The path to the serialized OpenMM system.')
+
+    parser.add_argument('--temperature', type=float, default=298.15, help='The temperature in K.')
+    parser.add_argument('--pressure', type=float, default=1.0, help='The pressure in atm.')
+
+    parser.add_argument('--precisions', type=int, nargs='+', default=[3, 2],
+                        help='The numbers of decimal places (in nm) to store the coordinates to.')
+
+    arguments = parser.parse_args()
+
+    thermodynamic_state = ThermodynamicState(arguments.temperature * unit.kelvin,
+                                             arguments.pressure * unit.atmosphere)
+
+    with TemporaryDirectory() as directory:
+
+        reference_potentials = calculate_reduced_potentials(directory,
+                                                            arguments.trajectory,
+                                                            arguments.coordinates,
+                                                            arguments.system,
+                                                            thermodynamic_state)
+
+        reference_size = os.path.getsize(arguments.trajectory) / 1.0e6
+
+        print(f'{"format":>8} {"precision":>10} {"size (MB)":>10} {"ratio":>8} '
+              f'{"max |du| (kT)":>14} {"effective samples":>18}')
+
+        print(f'{"DCD":>8} {"full":>10} {reference_size:>10.2f} {1.0:>8.2f} '
+              f'{0.0:>14.2e} {len(reference_potentials):>18.1f}')
+
+        for file_format in [TrajectoryFileFormat.DCD, TrajectoryFileFormat.XTC, TrajectoryFileFormat.HDF5]:
+
+            for precision in arguments.precisions:
+
+                output_path = os.path.join(directory, f'stored{trajectory_file_extensions[file_format]}')
+
+                write_trajectory_chunks(iterate_trajectory(arguments.trajectory, arguments.coordinates),
+                                        output_path, file_format, precision)
+
+                stored_size = os.path.getsize(output_path) / 1.0e6
+
+                stored_potentials = calculate_reduced_potentials(directory,
+                                                                 output_path,
+                                                                 arguments.coordinates,
+                                                                 arguments.system,
+                                                                 thermodynamic_state)
+
+                # The error in the reduced potentials perturbs the reweighting
+                # weights of each frame, which reduces the effective number of samples.
+                potential_errors = stored_potentials - reference_potentials
+
+                log_weights = -(potential_errors - potential_errors.min())
+                weights = np.exp(log_weights) / np.exp(log_weights).sum()
+
+                effective_samples = 1.0 / (weights * weights).sum()
+
+                print(f'{file_format.value:>8} {precision:>10} {stored_size:>10.2f} '
+                      f'{reference_size / stored_size:>8.2f} {np.abs(potential_errors).max():>14.2e} '
+                      f'{effective_samples:>18.1f}')
+
+                os.unlink(output_path)
+
+
+if __name__ == '__main__':
+    main()
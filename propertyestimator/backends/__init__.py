@@ -1,2 +1,3 @@
-from .backends import PropertyEstimatorBackend, ComputeResources, QueueWorkerResources
+from .backends import PropertyEstimatorBackend, ComputeResources, QueueWorkerResources, TaskResourceRequirements
 from .dask import DaskLocalClusterBackend, DaskLSFBackend
+from .pool import ProcessPoolBackend
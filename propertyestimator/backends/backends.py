@@ -1,6 +1,8 @@
 """
 Defines the base API for the property estimator task calculation backend.
 """
+import copy
+import importlib
 import re
 from enum import Enum
 
@@ -175,6 +177,114 @@ class QueueWorkerResources(ComputeResources):
         return not self.__eq__(other)
 
 
+class TaskResourceRequirements:
+    """An object which describes the computational resources which a single
+    task (such as the execution of a protocol) is able to make use of. This
+    allows a backend to run tasks with small requirements (such as analysis)
+    alongside those with larger requirements (such as simulations) on the
+    same worker.
+    """
+
+    @property
+    def number_of_threads(self):
+        """int, optional: The number of threads the task can make use of. If `None`,
+        the task will be given all of the threads available to a worker, unless it
+        is also allotted a GPU in which case it will be given a single thread."""
+        return self._number_of_threads
+
+    @property
+    def number_of_gpus(self):
+        """int: The number of GPUs the task can make use of."""
+        return self._number_of_gpus
+
+    @property
+    def memory_limit(self):
+        """simtk.Quantity, optional: The maximum amount of memory the task is
+        expected to use."""
+        return self._memory_limit
+
+    def __init__(self, number_of_threads=1, number_of_gpus=0, memory_limit=None):
+        """Constructs a new TaskResourceRequirements object.
+
+        Parameters
+        ----------
+        number_of_threads: int, optional
+            The number of threads the task can make use of. If `None`, the task will
+            be given all of the threads available to a worker, unless it is also allotted
+            a GPU in which case it will be given a single thread.
+        number_of_gpus: int
+            The number of GPUs the task can make use of.
+        memory_limit: simtk.Quantity, optional
+            The maximum amount of memory the task is expected to use.
+        """
+
+        self._number_of_threads = number_of_threads
+        self._number_of_gpus = number_of_gpus
+
+        self._memory_limit = memory_limit
+
+        assert self._number_of_threads is None or self._number_of_threads > 0
+        assert self._number_of_gpus >= 0
+
+        assert (self._memory_limit is None or (isinstance(self._memory_limit, unit.Quantity) and
+                                               self._memory_limit.unit.is_compatible(unit.byte)))
+
+    def combine(self, other):
+        """Returns the requirements of a task which would execute the tasks
+        described by both this and another set of requirements.
+
+        Parameters
+        ----------
+        other: TaskResourceRequirements, optional
+            The other requirements. If `None`, the other task is assumed to require
+            all of the resources available to a worker.
+
+        Returns
+        -------
+        TaskResourceRequirements, optional
+            The combined requirements, or `None` if either task requires all of the
+            resources available to a worker.
+        """
+
+        if other is None:
+            return None
+
+        number_of_threads = None
+
+        if self._number_of_threads is not None and other.number_of_threads is not None:
+            number_of_threads = max(self._number_of_threads, other.number_of_threads)
+
+        number_of_gpus = max(self._number_of_gpus, other.number_of_gpus)
+
+        memory_limit = self._memory_limit
+
+        if memory_limit is None or (other.memory_limit is not None and other.memory_limit > memory_limit):
+            memory_limit = other.memory_limit
+
+        return TaskResourceRequirements(number_of_threads, number_of_gpus, memory_limit)
+
+    def __getstate__(self):
+        return {
+            'number_of_threads': self.number_of_threads,
+            'number_of_gpus': self.number_of_gpus,
+            'memory_limit': self.memory_limit
+        }
+
+    def __setstate__(self, state):
+
+        self._number_of_threads = state['number_of_threads']
+        self._number_of_gpus = state['number_of_gpus']
+        self._memory_limit = state['memory_limit']
+
+    def __eq__(self, other):
+        return self.number_of_threads == other.number_of_threads and \
+               self.number_of_gpus == other.number_of_gpus and \
+               self.memory_limit == other.memory_limit
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class PropertyEstimatorBackend:
     """An abstract base representation of a property estimator backend.
 
@@ -216,6 +326,86 @@ class PropertyEstimatorBackend:
             'number_of_gpus': self._resources_per_worker.number_of_gpus,
         }
 
+    @staticmethod
+    def _get_protocols_to_import():
+        """Returns the fully qualified names of each of the registered
+        protocol classes, so that they can be re-registered by workers
+        which run in a different process.
+
+        Returns
+        -------
+        list of str
+            The fully qualified class names.
+        """
+        from propertyestimator.workflow.plugins import available_protocols
+
+        return [protocol_class.__module__ + '.' +
+                protocol_class.__qualname__ for protocol_class in available_protocols.values()]
+
+    @staticmethod
+    def _import_protocols(protocols_to_import):
+        """Imports and registers a set of protocol classes.
+
+        Each spun up worker doesn't automatically import all of the modules
+        which were imported in the main launch script, and as such custom
+        plugins will no longer be registered. We re-import / register them here.
+
+        Parameters
+        ----------
+        protocols_to_import: list of str
+            The fully qualified names of the protocol classes to register.
+        """
+
+        from propertyestimator.workflow.plugins import available_protocols
+
+        for protocol_class in protocols_to_import:
+
+            module_name = '.'.join(protocol_class.split('.')[:-1])
+            class_name = protocol_class.split('.')[-1]
+
+            imported_module = importlib.import_module(module_name)
+            available_protocols[class_name] = getattr(imported_module, class_name)
+
+    def _get_task_resources(self, resource_requirements):
+        """Determines which of the resources available to a worker should
+        be allotted to a task with a given set of requirements.
+
+        Parameters
+        ----------
+        resource_requirements: TaskResourceRequirements, optional
+            The resources required by the task. If `None`, the task will
+            be allotted all of the resources of a worker.
+
+        Returns
+        -------
+        ComputeResources
+            The resources to allot to the task.
+        """
+
+        if resource_requirements is None:
+            return copy.deepcopy(self._resources_per_worker)
+
+        number_of_gpus = min(resource_requirements.number_of_gpus,
+                             self._resources_per_worker.number_of_gpus)
+
+        if resource_requirements.number_of_threads is not None:
+
+            number_of_threads = min(resource_requirements.number_of_threads,
+                                    self._resources_per_worker.number_of_threads)
+
+        elif number_of_gpus > 0:
+            # A single thread is enough to drive a gpu.
+            number_of_threads = 1
+        else:
+            number_of_threads = self._resources_per_worker.number_of_threads
+
+        preferred_gpu_toolkit = None
+
+        if number_of_gpus > 0:
+            preferred_gpu_toolkit = self._resources_per_worker.preferred_gpu_toolkit
+
+        return ComputeResources(number_of_threads, number_of_gpus, preferred_gpu_toolkit)
+
     def start(self):
         """Start the calculation backend."""
         pass
@@ -232,6 +422,14 @@ class PropertyEstimatorBackend:
         ----------
         function: function
             The function to run.
+        resource_requirements: TaskResourceRequirements, optional
+            The resources which the task requires. If `None` (the default),
+            the task will be allotted all of the resources of a worker.
+        priority: float, optional
+            The priority of the task. Backends which support prioritisation
+            should start tasks with a higher priority first.
+        kwargs: Any
+            Any remaining keyword arguments will be passed to the function.
 
         Returns
         -------
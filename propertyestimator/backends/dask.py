@@ -1,7 +1,6 @@
 """
 A collection of property estimator compute backends which use dask as the distribution engine.
 """
-import importlib
 import logging
 import multiprocessing
 import os
@@ -13,7 +12,7 @@ from dask_jobqueue import LSFCluster
 from distributed import get_worker
 from simtk import unit
 
-from propertyestimator.workflow.plugins import available_protocols
+from propertyestimator.utils.metrics import serve_worker_metrics
 from .backends import PropertyEstimatorBackend, ComputeResources, QueueWorkerResources
 
 
@@ -32,8 +31,88 @@ class BaseDaskBackend(PropertyEstimatorBackend):
 
     def start(self):
 
-        self._client = distributed.Client(self._cluster,
-                                          processes=False)
+        self._client = distributed.Client(self._cluster)
+
+    def _get_worker_memory(self):
+        """Returns the total amount of memory available to each worker
+        in bytes, if known.
+
+        Returns
+        -------
+        float, optional
+            The memory available to each worker, or `None` if this
+            is not known.
+        """
+
+        if not isinstance(self._resources_per_worker, QueueWorkerResources):
+            return None
+
+        worker_memory = (self._resources_per_worker.per_thread_memory_limit *
+                         self._resources_per_worker.number_of_threads)
+
+        return worker_memory.value_in_unit(unit.byte)
+
+    def _get_worker_dask_resources(self):
+        """Returns the abstract dask resources which each worker should
+        advertise, and which tasks then consume while they are running.
+
+        Returns
+        -------
+        dict of str and float
+            The resources of each worker.
+        """
+
+        worker_resources = {'CPU': self._resources_per_worker.number_of_threads}
+
+        if self._resources_per_worker.number_of_gpus > 0:
+            worker_resources['GPU'] = self._resources_per_worker.number_of_gpus
+
+        worker_memory = self._get_worker_memory()
+
+        if worker_memory is not None:
+            worker_resources['MEMORY'] = worker_memory
+
+        return worker_resources
+
+    def _get_task_dask_resources(self, task_resources, resource_requirements):
+        """Returns the abstract dask resources which a task will consume
+        while it is running.
+
+        Parameters
+        ----------
+        task_resources: ComputeResources
+            The resources which have been allotted to the task.
+        resource_requirements: TaskResourceRequirements, optional
+            The resources which the task requested.
+
+        Returns
+        -------
+        dict of str and float
+            The dask resources to consume.
+        """
+
+        task_dask_resources = {}
+
+        if task_resources.number_of_threads > 0:
+            task_dask_resources['CPU'] = task_resources.number_of_threads
+
+        if task_resources.number_of_gpus > 0:
+            task_dask_resources['GPU'] = task_resources.number_of_gpus
+
+        worker_memory = self._get_worker_memory()
+
+        if worker_memory is None:
+            return task_dask_resources
+
+        if resource_requirements is None:
+            task_dask_resources['MEMORY'] = worker_memory
+
+        elif resource_requirements.memory_limit is not None:
+
+            task_dask_resources['MEMORY'] = min(worker_memory,
+                                                resource_requirements.memory_limit.value_in_unit(unit.byte))
+
+        return task_dask_resources
 
     def stop(self):
 
@@ -198,6 +277,11 @@ class DaskLSFBackend(BaseDaskBackend):
                 '-gpu num={}:j_exclusive=yes:mode=shared:mps=no:'.format(self._resources_per_worker.number_of_gpus)
             ]
 
+        # Advertise the resources of each worker so that tasks with small
+        # requirements can run alongside those with larger ones.
+        worker_resources = self._get_worker_dask_resources()
+        worker_resources_string = ','.join(f'{key}={value}' for key, value in worker_resources.items())
+
         self._cluster = LSFCluster(queue=self._queue_name,
                                    cores=self._resources_per_worker.number_of_threads,
                                    memory=memory_string,
@@ -205,6 +289,7 @@ class DaskLSFBackend(BaseDaskBackend):
                                    mem=memory_bytes,
                                    job_extra=job_extra,
                                    env_extra=self._setup_script_commands,
+                                   extra=['--resources', worker_resources_string],
                                    local_directory='dask-worker-space')
 
         self._cluster.adapt(minimum=self._minimum_number_of_workers,
@@ -222,18 +307,8 @@ class DaskLSFBackend(BaseDaskBackend):
 
         gpu_assignments = kwargs.pop('gpu_assignments')
 
-        # Each spun up worker doesn't automatically import
-        # all of the modules which were imported in the main
-        # launch script, and as such custom plugins will no
-        # longer be registered. We re-import / register them
-        # here.
-        for protocol_class in protocols_to_import:
-
-            module_name = '.'.join(protocol_class.split('.')[:-1])
-            class_name = protocol_class.split('.')[-1]
-
-            imported_module = importlib.import_module(module_name)
-            available_protocols[class_name] = getattr(imported_module, class_name)
+        PropertyEstimatorBackend._import_protocols(protocols_to_import)
+        serve_worker_metrics()
 
         # Set up the logging per worker if the flag is set to True.
         if per_worker_logging:
@@ -266,30 +341,67 @@ class DaskLSFBackend(BaseDaskBackend):
     def submit_task(self, function, *args, **kwargs):
 
         key = kwargs.pop('key', None)
+        priority = kwargs.pop('priority', 0)
+        resource_requirements = kwargs.pop('resource_requirements', None)
 
-        protocols_to_import = [protocol_class.__module__ + '.' +
-                               protocol_class.__qualname__ for protocol_class in available_protocols.values()]
+        task_resources = self._get_task_resources(resource_requirements)
+
+        protocols_to_import = self._get_protocols_to_import()
 
         return self._client.submit(DaskLSFBackend._wrapped_function,
                                    function,
                                    *args,
-                                   available_resources=self._resources_per_worker,
+                                   available_resources=task_resources,
                                    available_protocols=protocols_to_import,
                                    gpu_assignments={},
                                    per_worker_logging=True,
-                                   key=key)
+                                   **kwargs,
+                                   key=key,
+                                   priority=priority,
+                                   resources=self._get_task_dask_resources(task_resources,
+                                                                           resource_requirements))
 
 
 class DaskLocalClusterBackend(BaseDaskBackend):
     """A property estimator backend which uses a dask `LocalCluster` to
     run calculations.
+
+    Notes
+    -----
+    By default each worker is a thread of the calling process, which keeps
+    start up fast, but means that pure python tasks (such as bootstrapping or
+    json serialization) are serialized by the GIL. When `processes` is true,
+    each worker instead runs in its own process.
     """
 
-    def __init__(self, number_of_workers=1, resources_per_worker=ComputeResources()):
-        """Constructs a new DaskLocalClusterBackend"""
+    # The environment variables which control the size of the thread
+    # pools used by numerical libraries within each worker process.
+    _thread_pool_variables = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+    def __init__(self, number_of_workers=1, resources_per_worker=ComputeResources(),
+                 processes=False, memory_limit_per_worker=None):
+        """Constructs a new DaskLocalClusterBackend
+
+        Parameters
+        ----------
+        number_of_workers: int
+            The number of workers to create.
+        resources_per_worker: ComputeResources
+            The compute resources available to each worker.
+        processes: bool
+            If true, each worker will run in its own process, rather
+            than as a thread of the calling process.
+        memory_limit_per_worker: simtk.unit.Quantity, optional
+            The maximum amount of memory which each worker may use. This is
+            only enforced when `processes` is true, but is always used when
+            scheduling tasks which declare a `memory_limit`.
+        """
 
         super().__init__(number_of_workers, resources_per_worker)
 
+        self._processes = processes
+        self._memory_limit_per_worker = memory_limit_per_worker
+
         self._gpu_device_indices_by_worker = {}
 
         maximum_threads = multiprocessing.cpu_count()
@@ -300,6 +412,9 @@ class DaskLocalClusterBackend(BaseDaskBackend):
             raise ValueError('The total number of requested threads ({})is greater than is available on the'
                              'machine ({})'.format(requested_threads, maximum_threads))
 
+        if memory_limit_per_worker is not None and not memory_limit_per_worker.unit.is_compatible(unit.byte):
+            raise ValueError('The memory limit of each worker must have units compatible with bytes.')
+
         if resources_per_worker.number_of_gpus > 0:
 
             if resources_per_worker.preferred_gpu_toolkit == ComputeResources.GPUToolkit.OpenCL:
@@ -319,41 +434,99 @@ class DaskLocalClusterBackend(BaseDaskBackend):
                 raise ValueError('The number of available GPUs {} must match '
                                  'the number of requested workers {}.')
 
+    def _get_worker_memory(self):
+
+        if self._memory_limit_per_worker is None:
+            return None
+
+        return self._memory_limit_per_worker.value_in_unit(unit.byte)
+
     def start(self):
 
-        self._cluster = distributed.LocalCluster(self._number_of_workers,
-                                                 1,
-                                                 processes=False)
+        cluster_kwargs = {}
 
-        if self._resources_per_worker.number_of_gpus > 0:
+        if self._processes and self._memory_limit_per_worker is not None:
+            cluster_kwargs['memory_limit'] = int(self._get_worker_memory())
+
+        # Worker processes inherit the environment of this process when they
+        # are spawned, so their numerical thread pools are limited to the
+        # threads of a single worker to stop them oversubscribing the machine.
+        original_environment = {key: os.environ.get(key) for key in self._thread_pool_variables}
+
+        if self._processes:
+
+            for key in self._thread_pool_variables:
+                os.environ[key] = str(self._resources_per_worker.number_of_threads)
+
+        try:
 
-            for index, worker in enumerate(self._cluster.workers):
-                self._gpu_device_indices_by_worker[worker.id] = str(index)
+            self._cluster = distributed.LocalCluster(self._number_of_workers,
+                                                     self._resources_per_worker.number_of_threads,
+                                                     processes=self._processes,
+                                                     resources=self._get_worker_dask_resources(),
+                                                     **cluster_kwargs)
+
+        finally:
+
+            for key, value in original_environment.items():
+
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
 
         super(DaskLocalClusterBackend, self).start()
 
+        if self._resources_per_worker.number_of_gpus > 0:
+
+            # Workers are identified by their address, as this is the same whether the
+            # worker is a thread of this process or runs in a process of its own.
+            worker_addresses = sorted(self._client.scheduler_info()['workers'])
+
+            for index, worker_address in enumerate(worker_addresses):
+                self._gpu_device_indices_by_worker[worker_address] = str(index)
+
     @staticmethod
     def _wrapped_function(function, *args, **kwargs):
 
         available_resources = kwargs['available_resources']
         gpu_assignments = kwargs.pop('gpu_assignments')
 
+        protocols_to_import = kwargs.pop('available_protocols', None)
+
+        if protocols_to_import is not None:
+            PropertyEstimatorBackend._import_protocols(protocols_to_import)
+
+        serve_worker_metrics()
+
         if available_resources.number_of_gpus > 0:
 
-            worker_id = distributed.get_worker().id
-            available_resources._gpu_device_indices = gpu_assignments[worker_id]
+            worker_address = distributed.get_worker().address
+            available_resources._gpu_device_indices = gpu_assignments[worker_address]
 
-            logging.info('Launching a job with access to GPUs {}'.format(gpu_assignments[worker_id]))
+            logging.info('Launching a job with access to GPUs {}'.format(gpu_assignments[worker_address]))
 
         return function(*args, **kwargs)
 
     def submit_task(self, function, *args, **kwargs):
 
         key = kwargs.pop('key', None)
+        priority = kwargs.pop('priority', 0)
+        resource_requirements = kwargs.pop('resource_requirements', None)
+
+        task_resources = self._get_task_resources(resource_requirements)
+
+        if self._processes:
+            # Workers in other processes need any custom protocols to be re-registered.
+            kwargs['available_protocols'] = self._get_protocols_to_import()
 
         return self._client.submit(DaskLocalClusterBackend._wrapped_function,
                                    function,
                                    *args,
                                    key=key,
-                                   available_resources=self._resources_per_worker,
-                                   gpu_assignments=self._gpu_device_indices_by_worker)
+                                   priority=priority,
+                                   resources=self._get_task_dask_resources(task_resources,
+                                                                           resource_requirements),
+                                   available_resources=task_resources,
+                                   gpu_assignments=self._gpu_device_indices_by_worker,
+                                   **kwargs)
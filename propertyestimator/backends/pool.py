@@ -0,0 +1,379 @@
+"""
+A lightweight property estimator compute backend which runs tasks on
+a local pool of processes managed by `concurrent.futures`.
+"""
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent import futures
+
+from propertyestimator.utils.metrics import serve_worker_metrics
+from .backends import PropertyEstimatorBackend, ComputeResources
+
+
+class _PoolFuture(futures.Future):
+    """A future which points to the results of a task submitted to a
+    `ProcessPoolBackend`. This exposes the subset of the dask future API
+    which is used by the rest of the framework.
+    """
+
+    def __init__(self, key):
+        """Constructs a new _PoolFuture object.
+
+        Parameters
+        ----------
+        key: str, optional
+            The key which identifies the task.
+        """
+        super().__init__()
+        self.key = key
+
+    def release(self):
+        """Releases the results of the task. The results of a pooled task are
+        owned by this future, and so there is nothing to release."""
+        pass
+
+
+class ProcessPoolBackend(PropertyEstimatorBackend):
+    """A property estimator backend which runs tasks on a pool of local
+    worker processes, using a `concurrent.futures.ProcessPoolExecutor`.
+
+    Workers are only spawned when the first task is submitted, and so this backend
+    starts almost instantly, making it well suited to small, single machine deployments
+    and to testing.
+
+    Notes
+    -----
+    Futures returned by `submit_task` may be passed as arguments to later tasks. Such
+    tasks will only be started once all of the futures they depend on have completed,
+    and will be called with the results of those futures in their place. Queued tasks
+    are started in order of descending priority.
+    """
+
+    # The environment variables which control the size of the thread
+    # pools used by numerical libraries within each worker process.
+    _thread_pool_variables = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+    def __init__(self, number_of_workers=1, resources_per_worker=ComputeResources()):
+        """Constructs a new ProcessPoolBackend
+
+        Parameters
+        ----------
+        number_of_workers: int
+            The number of worker processes to create.
+        resources_per_worker: ComputeResources
+            The compute resources available to each worker.
+        """
+
+        super().__init__(number_of_workers, resources_per_worker)
+
+        self._executor = None
+
+        self._lock = threading.RLock()
+
+        # A heap of the tasks whose dependencies have completed but which
+        # are waiting for a worker to become free.
+        self._queued_tasks = []
+        self._task_counter = itertools.count()
+
+        self._number_of_running_tasks = 0
+        self._available_gpu_device_indices = []
+
+        maximum_threads = multiprocessing.cpu_count()
+        requested_threads = number_of_workers * resources_per_worker.number_of_threads
+
+        if requested_threads > maximum_threads:
+
+            raise ValueError('The total number of requested threads ({}) is greater than is available on the '
+                             'machine ({})'.format(requested_threads, maximum_threads))
+
+        if resources_per_worker.number_of_gpus > 0:
+
+            if resources_per_worker.preferred_gpu_toolkit == ComputeResources.GPUToolkit.OpenCL:
+                raise ValueError('The OpenCL gpu backend is not currently supported.')
+
+            if resources_per_worker.number_of_gpus > 1:
+                raise ValueError('Only one GPU per worker is currently supported.')
+
+            visible_devices = os.environ.get('CUDA_VISIBLE_DEVICES')
+
+            if visible_devices is None:
+                raise ValueError('The CUDA_VISIBLE_DEVICES variable is empty.')
+
+            gpu_device_indices = visible_devices.split(',')
+
+            if len(gpu_device_indices) != number_of_workers:
+                raise ValueError('The number of available GPUs {} must match '
+                                 'the number of requested workers {}.'.format(len(gpu_device_indices),
+                                                                              number_of_workers))
+
+            # Devices are handed out by their index into the visible devices.
+            self._available_gpu_device_indices = [str(index) for index in range(number_of_workers)]
+
+    def start(self):
+
+        self._executor = futures.ProcessPoolExecutor(max_workers=self._number_of_workers)
+
+    def stop(self):
+
+        with self._lock:
+
+            queued_tasks = self._queued_tasks
+            self._queued_tasks = []
+
+        for *_, result_future, _ in queued_tasks:
+            result_future.cancel()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        self._executor = None
+
+    @staticmethod
+    def _wrapped_function(function, *args, **kwargs):
+        """A function which is wrapped around any function submitted via
+        `submit_task`, which registers any custom protocols within the worker
+        process, and starts serving the metrics of the worker (see
+        `serve_worker_metrics`), before calling the function.
+
+        Parameters
+        ----------
+        function: function
+            The function which will be executed by the worker.
+        args: Any
+            The list of args to pass to the function.
+        kwargs: Any
+            The list of kwargs to pass to the function.
+
+        Returns
+        -------
+        Any
+            Returns the output of the function without modification.
+        """
+
+        available_resources = kwargs['available_resources']
+        protocols_to_import = kwargs.pop('available_protocols', None)
+
+        if protocols_to_import is not None:
+            PropertyEstimatorBackend._import_protocols(protocols_to_import)
+
+        serve_worker_metrics()
+
+        if available_resources.number_of_gpus > 0:
+            logging.info('Launching a job with access to GPUs {}'.format(available_resources.gpu_device_indices))
+
+        return function(*args, **kwargs)
+
+    def _dispatch_tasks(self):
+        """Starts as many of the queued tasks as there are free workers."""
+
+        with self._lock:
+
+            while (self._executor is not None and len(self._queued_tasks) > 0 and
+                   self._number_of_running_tasks < self._number_of_workers):
+
+                _, _, task_arguments, result_future, task_resources = heapq.heappop(self._queued_tasks)
+
+                if not result_future.set_running_or_notify_cancel():
+                    continue
+
+                function, args, kwargs = task_arguments
+
+                if task_resources.number_of_gpus > 0:
+                    task_resources._gpu_device_indices = self._available_gpu_device_indices.pop()
+
+                try:
+
+                    executor_future = self._submit_to_executor(ProcessPoolBackend._wrapped_function,
+                                                               function,
+                                                               *args,
+                                                               available_resources=task_resources,
+                                                               **kwargs)
+
+                except Exception as e:
+
+                    self._release_task_resources(task_resources)
+                    result_future.set_exception(e)
+
+                    continue
+
+                self._number_of_running_tasks += 1
+
+                executor_future.add_done_callback(
+                    lambda completed_future, future=result_future, resources=task_resources:
+                    self._on_task_completed(completed_future, future, resources))
+
+    def _submit_to_executor(self, function, *args, **kwargs):
+        """Submits a function to the underlying executor.
+
+        The executor only spawns its worker processes as tasks are submitted, and
+        these inherit the environment of this process when they are spawned. The
+        numerical thread pools of the workers are therefore limited to the threads
+        of a single worker (to stop them oversubscribing the machine) by setting
+        the relevant environment variables for the duration of the submission.
+
+        Parameters
+        ----------
+        function: function
+            The function to submit.
+        args: Any
+            The list of args to pass to the function.
+        kwargs: Any
+            The list of kwargs to pass to the function.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future returned by the executor.
+        """
+
+        original_environment = {key: os.environ.get(key) for key in self._thread_pool_variables}
+
+        for key in self._thread_pool_variables:
+            os.environ[key] = str(self._resources_per_worker.number_of_threads)
+
+        try:
+
+            return self._executor.submit(function, *args, **kwargs)
+
+        finally:
+
+            for key, value in original_environment.items():
+
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    def _release_task_resources(self, task_resources):
+        """Returns any GPUs allotted to a task to the pool of available devices.
+
+        Parameters
+        ----------
+        task_resources: ComputeResources
+            The resources which were allotted to the task.
+        """
+
+        if task_resources.gpu_device_indices is None:
+            return
+
+        with self._lock:
+            self._available_gpu_device_indices.append(task_resources.gpu_device_indices)
+
+    def _on_task_completed(self, executor_future, result_future, task_resources):
+        """Passes the results of a completed task onto the future returned
+        by `submit_task`, and starts the next queued task.
+
+        Parameters
+        ----------
+        executor_future: concurrent.futures.Future
+            The future returned by the underlying executor.
+        result_future: _PoolFuture
+            The future returned by `submit_task`.
+        task_resources: ComputeResources
+            The resources which were allotted to the task.
+        """
+
+        self._release_task_resources(task_resources)
+
+        with self._lock:
+            self._number_of_running_tasks -= 1
+
+        # Start the next task before handling the results, as the
+        # callbacks of the result future may take a while to run.
+        self._dispatch_tasks()
+
+        if executor_future.cancelled():
+            result_future.cancel()
+            return
+
+        exception = executor_future.exception()
+
+        if exception is not None:
+            result_future.set_exception(exception)
+        else:
+            result_future.set_result(executor_future.result())
+
+    def _queue_task(self, priority, function, args, kwargs, result_future, task_resources):
+        """Replaces any futures passed as arguments to a task with their
+        results, and queues the task for execution.
+
+        Parameters
+        ----------
+        priority: float
+            The priority of the task.
+        function: function
+            The function to run.
+        args: list of Any
+            The args to pass to the function.
+        kwargs: dict of str and Any
+            The kwargs to pass to the function.
+        result_future: _PoolFuture
+            The future which will hold the results of the task.
+        task_resources: ComputeResources
+            The resources allotted to the task.
+        """
+
+        def resolve_value(value):
+            return value.result() if isinstance(value, futures.Future) else value
+
+        try:
+
+            args = [resolve_value(value) for value in args]
+            kwargs = {key: resolve_value(value) for key, value in kwargs.items()}
+
+        except BaseException as e:
+
+            # A task which depends on a failed task fails in the same way.
+            if result_future.set_running_or_notify_cancel():
+                result_future.set_exception(e)
+
+            return
+
+        with self._lock:
+
+            heapq.heappush(self._queued_tasks, (-priority, next(self._task_counter),
+                                                (function, args, kwargs), result_future, task_resources))
+
+        self._dispatch_tasks()
+
+    def submit_task(self, function, *args, **kwargs):
+
+        key = kwargs.pop('key', None)
+        priority = kwargs.pop('priority', 0)
+        resource_requirements = kwargs.pop('resource_requirements', None)
+
+        task_resources = self._get_task_resources(resource_requirements)
+
+        # Workers in other processes need any custom protocols to be re-registered.
+        kwargs['available_protocols'] = self._get_protocols_to_import()
+
+        result_future = _PoolFuture(key)
+
+        dependencies = [value for value in itertools.chain(args, kwargs.values())
+                        if isinstance(value, futures.Future)]
+
+        remaining_dependencies = [len(dependencies)]
+        dependency_lock = threading.Lock()
+
+        def on_dependency_completed(_):
+
+            with dependency_lock:
+
+                remaining_dependencies[0] -= 1
+
+                if remaining_dependencies[0] > 0:
+                    return
+
+            self._queue_task(priority, function, args, kwargs, result_future, task_resources)
+
+        if len(dependencies) == 0:
+            self._queue_task(priority, function, args, kwargs, result_future, task_resources)
+
+        for dependency in dependencies:
+            dependency.add_done_callback(on_dependency_completed)
+
+        return result_future
@@ -186,6 +186,10 @@ class PropertyEstimatorResult(TypedBaseModel):
     exceptions: list of PropertyEstimatorException
         A list of the exceptions that were raised when unsuccessfully carrying out this
         estimation request.
+    estimated_time_remaining: simtk.unit.Quantity, optional
+        A rough estimate of how long the server will take to finish estimating
+        the queued properties, based on the historical runtimes of the protocols
+        used to estimate them.
     """
 
     def __init__(self, result_id=''):
@@ -206,6 +210,8 @@ class PropertyEstimatorResult(TypedBaseModel):
 
         self.exceptions = []
 
+        self.estimated_time_remaining = None
+
     def __getstate__(self):
 
         return {
@@ -217,6 +223,8 @@ class PropertyEstimatorResult(TypedBaseModel):
             'unsuccessful_properties': self.unsuccessful_properties,
 
             'exceptions': self.exceptions,
+
+            'estimated_time_remaining': self.estimated_time_remaining,
         }
 
     def __setstate__(self, state):
@@ -230,6 +238,8 @@ class PropertyEstimatorResult(TypedBaseModel):
 
         self.exceptions = state['exceptions']
 
+        self.estimated_time_remaining = state['estimated_time_remaining']
+
 
 class ConnectionOptions(TypedBaseModel):
     """The set of options to use when connecting to a
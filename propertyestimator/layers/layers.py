@@ -6,8 +6,10 @@ import logging
 import traceback
 from os import path
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.utils.exceptions import PropertyEstimatorException
 from propertyestimator.utils.serialization import TypedJSONDecoder, TypedJSONEncoder
+from propertyestimator.utils.tracing import TraceRecorder
 
 available_layers = {}
 
@@ -100,7 +102,8 @@ class PropertyCalculationLayer:
 
         callback_future = calculation_backend.submit_task(return_args,
                                                           *submitted_futures,
-                                                          key=f'return_{server_request.id}')
+                                                          key=f'return_{server_request.id}',
+                                                          resource_requirements=TaskResourceRequirements(1))
 
         def callback_wrapper(results_future):
             PropertyCalculationLayer._process_results(results_future, server_request, storage_backend, callback)
@@ -128,6 +131,8 @@ class PropertyCalculationLayer:
             The function to call when the backend returns the results (or an error).
         """
 
+        trace_recorder = TraceRecorder(server_request.trace_directory)
+
         # Wrap everything in a try catch to make sure the whole calculation backend /
         # server doesn't go down when an unexpected exception occurs.
         try:
@@ -180,7 +185,14 @@ class PropertyCalculationLayer:
                                 json.dump(data_object, file, cls=TypedJSONEncoder)
 
                             substance_id = data_object.substance.identifier
-                            storage_backend.store_simulation_data(substance_id, data_directory)
+
+                            with trace_recorder.span('store_simulation_data', 'storage',
+                                                     substance_id=substance_id):
+
+                                try:
+                                    storage_backend.store_simulation_data(substance_id, data_directory)
+                                except ValueError as e:
+                                    logging.warning(f'The data in {data_directory} could not be stored: {e}')
 
                 matches = [x for x in server_request.queued_properties if x.id == returned_output.property_id]
 
@@ -238,6 +250,11 @@ class PropertyCalculationLayer:
 
             server_request.exceptions.append(exception)
 
+        try:
+            trace_recorder.save()
+        except Exception as e:
+            logging.warning(f'Could not save the storage trace of request {server_request.id}: {e}')
+
         callback(server_request)
 
     @staticmethod
@@ -2,16 +2,16 @@
 The simulation reweighting estimation layer.
 """
 import abc
-import json
 import logging
 import pickle
 from os import path
 
 from propertyestimator.layers import register_calculation_layer, PropertyCalculationLayer
 from propertyestimator.substances import Substance
-from propertyestimator.utils.serialization import serialize_force_field, TypedJSONDecoder
+from propertyestimator.utils.metrics import default_registry
+from propertyestimator.utils.serialization import serialize_force_field
 from propertyestimator.utils.utils import SubhookedABCMeta
-from propertyestimator.workflow import WorkflowGraph, Workflow
+from propertyestimator.workflow import WorkflowGraph, Workflow, WorkflowOptions
 from propertyestimator.workflow.workflow import IWorkflowProperty
 
 
@@ -44,13 +44,18 @@ class ReweightingLayer(PropertyCalculationLayer):
             pickle.dump(serialize_force_field(target_force_field), file)
 
         stored_data_paths = ReweightingLayer._retrieve_stored_data(data_model.queued_properties,
-                                                                   storage_backend, layer_directory)
+                                                                   storage_backend, layer_directory,
+                                                                   data_model.options)
 
         workflow_graph = ReweightingLayer._build_workflow_graph(layer_directory,
                                                                 data_model.queued_properties,
                                                                 target_force_field_path,
                                                                 stored_data_paths,
-                                                                data_model.options)
+                                                                data_model.options,
+                                                                data_model.runtime_database_path,
+                                                                data_model.trace_directory,
+                                                                data_model.profiled_protocol_types,
+                                                                data_model.molecule_cache_directory)
 
         reweighting_futures = workflow_graph.submit(calculation_backend)
 
@@ -58,7 +63,7 @@ class ReweightingLayer(PropertyCalculationLayer):
                                                 data_model, callback, reweighting_futures, synchronous)
 
     @staticmethod
-    def _retrieve_stored_data(physical_properties, storage_backend, layer_directory):
+    def _retrieve_stored_data(physical_properties, storage_backend, layer_directory, options=None):
         """Extract all of the stored data from the backend which may be
         used in reweighting
 
@@ -70,6 +75,9 @@ class ReweightingLayer(PropertyCalculationLayer):
             The storage backend to retrieve the data from.
         layer_directory: str
             The directory in which to store the retrieved data.
+        options: PropertyEstimatorOptions, optional
+            The options which contain the criteria (see `WorkflowOptions`)
+            which the stored data must meet to be used.
 
         Returns
         -------
@@ -81,6 +89,10 @@ class ReweightingLayer(PropertyCalculationLayer):
 
         data_paths = {}
 
+        storage_lookups_counter = default_registry.counter('propertyestimator_storage_lookups_total',
+                                                           'The number of lookups of the storage backend.',
+                                                           ('kind', 'outcome'))
+
         for physical_property in physical_properties:
 
             if not isinstance(physical_property, IReweightable):
@@ -88,26 +100,39 @@ class ReweightingLayer(PropertyCalculationLayer):
                 # interface can be reweighted
                 continue
 
-            existing_data_paths = storage_backend.retrieve_simulation_data(physical_property.substance,
-                                                                           physical_property.multi_component_property)
+            property_type = type(physical_property).__name__
+            workflow_options = WorkflowOptions()
+
+            if (options is not None and options.workflow_options is not None and
+                property_type in options.workflow_options):
+
+                workflow_options = options.workflow_options[property_type]
+
+            # Only retrieve the data which could plausibly be reweighted to the
+            # state of the property with enough effective samples.
+            existing_data = storage_backend.query_simulation_data(
+                physical_property.substance,
+                physical_property.multi_component_property,
+                physical_property.thermodynamic_state,
+                temperature_window=workflow_options.reweighting_temperature_window,
+                pressure_window=workflow_options.reweighting_pressure_window,
+                minimum_effective_samples=workflow_options.reweighting_minimum_effective_samples)
 
-            if len(existing_data_paths) == 0:
+            storage_lookups_counter.increment(kind='simulation_data',
+                                              outcome='miss' if len(existing_data) == 0 else 'hit')
+
+            if len(existing_data) == 0:
                 continue
 
             # Take data from the storage backend and save it in the working directory.
-            for substance_id in existing_data_paths:
+            for substance_id in existing_data:
 
                 if substance_id not in data_paths:
                     data_paths[substance_id] = []
 
-                for data_directory in existing_data_paths[substance_id]:
-
-                    data = None
-
-                    with open(path.join(data_directory, 'data.json'), 'r') as file:
-                        data = json.load(file, cls=TypedJSONDecoder)
+                for data_directory, force_field_id in existing_data[substance_id]:
 
-                    force_field_path = path.join(layer_directory, data.force_field_id)
+                    force_field_path = path.join(layer_directory, force_field_id)
 
                     path_tuple = (data_directory, force_field_path)
 
@@ -116,7 +141,7 @@ class ReweightingLayer(PropertyCalculationLayer):
 
                     if not path.isfile(force_field_path):
 
-                        existing_force_field = storage_backend.retrieve_force_field(data.force_field_id)
+                        existing_force_field = storage_backend.retrieve_force_field(force_field_id)
 
                         with open(force_field_path, 'wb') as file:
                             pickle.dump(serialize_force_field(existing_force_field), file)
@@ -127,7 +152,9 @@ class ReweightingLayer(PropertyCalculationLayer):
 
     @staticmethod
     def _build_workflow_graph(working_directory, properties, target_force_field_path,
-                              stored_data_paths, options):
+                              stored_data_paths, options, runtime_database_path=None,
+                              trace_directory=None, profiled_protocol_types=None,
+                              molecule_cache_directory=None):
         """Construct a workflow graph, containing all of the workflows which should
         be followed to estimate a set of properties by reweighting.
 
@@ -146,8 +173,20 @@ class ReweightingLayer(PropertyCalculationLayer):
             its corresponding force field path.
         options: PropertyEstimatorOptions
             The options to run the workflows with.
+        runtime_database_path: str, optional
+            The path to the database in which to record the runtimes
+            of the executed protocols.
+        trace_directory: str, optional
+            The directory in which to save traces of the executed protocols.
+        profiled_protocol_types: list of str, optional
+            The types of protocol which should be executed under `cProfile`.
+        molecule_cache_directory: str, optional
+            The directory in which the workers should cache the molecules
+            which they create.
         """
-        workflow_graph = WorkflowGraph(working_directory)
+        workflow_graph = WorkflowGraph(working_directory, runtime_database_path,
+                                       trace_directory, profiled_protocol_types,
+                                       molecule_cache_directory)
 
         for property_to_calculate in properties:
 
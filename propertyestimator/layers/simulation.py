@@ -7,8 +7,9 @@ import pickle
 from os import path
 
 from propertyestimator.layers import register_calculation_layer, PropertyCalculationLayer
+from propertyestimator.utils.metrics import default_registry
 from propertyestimator.utils.serialization import serialize_force_field
-from propertyestimator.workflow import WorkflowGraph, Workflow
+from propertyestimator.workflow import WorkflowGraph, Workflow, WorkflowOptions
 
 
 @register_calculation_layer()
@@ -20,7 +21,59 @@ class SimulationLayer(PropertyCalculationLayer):
     """
 
     @staticmethod
-    def _build_workflow_graph(working_directory, properties, force_field_path, options):
+    def _retrieve_stored_coordinates(physical_property, storage_backend, options=None):
+        """Finds any stored, equilibrated coordinates which could be used as
+        the starting coordinates of the simulations of a property.
+
+        Parameters
+        ----------
+        physical_property: PhysicalProperty
+            The physical property to be estimated.
+        storage_backend: PropertyEstimatorStorage
+            The storage backend to retrieve the coordinates from.
+        options: PropertyEstimatorOptions, optional
+            The options which contain the criteria (see `WorkflowOptions`)
+            which the stored coordinates must meet to be used.
+
+        Returns
+        -------
+        list of tuple(str, dict of str and int)
+            A list of tuples of the paths to the stored coordinates, and the
+            number of molecules of each component which they contain, ordered
+            from the closest to the furthest from the state of the property.
+        """
+
+        property_type = type(physical_property).__name__
+        workflow_options = WorkflowOptions()
+
+        if (options is not None and options.workflow_options is not None and
+            property_type in options.workflow_options):
+
+            workflow_options = options.workflow_options[property_type]
+
+        if not workflow_options.use_stored_coordinates:
+            return []
+
+        stored_coordinates = storage_backend.query_equilibrated_coordinates(
+            physical_property.substance,
+            physical_property.thermodynamic_state,
+            temperature_window=workflow_options.stored_coordinates_temperature_window,
+            pressure_window=workflow_options.stored_coordinates_pressure_window)
+
+        storage_lookups_counter = default_registry.counter('propertyestimator_storage_lookups_total',
+                                                           'The number of lookups of the storage backend.',
+                                                           ('kind', 'outcome'))
+
+        storage_lookups_counter.increment(kind='equilibrated_coordinates',
+                                          outcome='miss' if len(stored_coordinates) == 0 else 'hit')
+
+        return stored_coordinates
+
+    @staticmethod
+    def _build_workflow_graph(working_directory, properties, force_field_path, options,
+                              runtime_database_path=None, trace_directory=None,
+                              profiled_protocol_types=None, storage_backend=None,
+                              molecule_cache_directory=None):
         """ Construct a graph of the protocols needed to calculate a set of properties.
 
         Parameters
@@ -34,8 +87,23 @@ class SimulationLayer(PropertyCalculationLayer):
             The path to the force field parameters to use in the workflow.
         options: PropertyEstimatorOptions
             The options to run the workflows with.
+        runtime_database_path: str, optional
+            The path to the database in which to record the runtimes
+            of the executed protocols.
+        trace_directory: str, optional
+            The directory in which to save traces of the executed protocols.
+        profiled_protocol_types: list of str, optional
+            The types of protocol which should be executed under `cProfile`.
+        storage_backend: PropertyEstimatorStorage, optional
+            The backend from which to retrieve any stored, equilibrated
+            coordinates which the workflows may start from.
+        molecule_cache_directory: str, optional
+            The directory in which the workers should cache the molecules
+            which they create.
         """
-        workflow_graph = WorkflowGraph(working_directory)
+        workflow_graph = WorkflowGraph(working_directory, runtime_database_path,
+                                       trace_directory, profiled_protocol_types,
+                                       molecule_cache_directory)
 
         for property_to_calculate in properties:
 
@@ -56,6 +124,11 @@ class SimulationLayer(PropertyCalculationLayer):
             global_metadata = Workflow.generate_default_metadata(property_to_calculate,
                                                                  force_field_path, options)
 
+            if storage_backend is not None:
+
+                global_metadata['stored_coordinates'] = SimulationLayer._retrieve_stored_coordinates(
+                    property_to_calculate, storage_backend, options)
+
             workflow = Workflow(property_to_calculate, global_metadata)
             workflow.schema = schema
 
@@ -81,7 +154,12 @@ class SimulationLayer(PropertyCalculationLayer):
         workflow_graph = SimulationLayer._build_workflow_graph(layer_directory,
                                                                      data_model.queued_properties,
                                                                      force_field_path,
-                                                                     data_model.options)
+                                                                     data_model.options,
+                                                                     data_model.runtime_database_path,
+                                                                     data_model.trace_directory,
+                                                                     data_model.profiled_protocol_types,
+                                                                     storage_backend,
+                                                                     data_model.molecule_cache_directory)
 
         simulation_futures = workflow_graph.submit(calculation_backend)
 
@@ -60,6 +60,12 @@ class Density(PhysicalProperty):
 
         build_coordinates.substance = ProtocolPath('substance', 'global')
 
+        if options is not None:
+            build_coordinates.number_of_packmol_attempts = options.number_of_packmol_attempts
+
+        if options is not None and options.use_stored_coordinates:
+            build_coordinates.stored_coordinates = ProtocolPath('stored_coordinates', 'global')
+
         schema.protocols[build_coordinates.id] = build_coordinates.schema
 
         assign_topology = forcefield.BuildSmirnoffSystem('build_topology')
@@ -69,6 +75,9 @@ class Density(PhysicalProperty):
         assign_topology.coordinate_file_path = ProtocolPath('coordinate_file_path', build_coordinates.id)
         assign_topology.substance = ProtocolPath('substance', 'global')
 
+        if options is not None and options.charge_cache_path is not None:
+            assign_topology.charge_cache_path = options.charge_cache_path
+
         schema.protocols[assign_topology.id] = assign_topology.schema
 
         # Equilibration
@@ -86,6 +95,13 @@ class Density(PhysicalProperty):
         npt_equilibration.steps = 100000  # Debug settings.
         npt_equilibration.output_frequency = 5000  # Debug settings.
 
+        if options is not None and options.use_stored_coordinates:
+
+            # Coordinates taken from a previously equilibrated
+            # system only need to be briefly re-equilibrated.
+            npt_equilibration.use_reduced_steps = ProtocolPath('used_stored_coordinates', build_coordinates.id)
+            npt_equilibration.reduced_steps = 10000  # Debug settings.
+
         npt_equilibration.thermodynamic_state = ProtocolPath('thermodynamic_state', 'global')
 
         npt_equilibration.input_coordinate_file = ProtocolPath('output_coordinate_file', energy_minimisation.id)
@@ -130,6 +146,9 @@ class Density(PhysicalProperty):
 
         converge_uncertainty.max_iterations = 100
 
+        if options is not None:
+            converge_uncertainty.adaptive_sampling = options.adaptive_sampling
+
         schema.protocols[converge_uncertainty.id] = converge_uncertainty.schema
 
         # Finally, extract uncorrelated data
@@ -185,6 +204,13 @@ class Density(PhysicalProperty):
         output_to_store.statistical_inefficiency = ProtocolPath('statistical_inefficiency', converge_uncertainty.id,
                                                                                             extract_density.id)
 
+        output_to_store.number_of_molecules = ProtocolPath('number_of_molecules', build_coordinates.id)
+
+        if options is not None:
+
+            output_to_store.trajectory_storage_format = options.trajectory_storage_format
+            output_to_store.trajectory_storage_precision = options.trajectory_storage_precision
+
         schema.outputs_to_store = {'full_system': output_to_store}
 
         return schema
@@ -208,7 +234,8 @@ class Density(PhysicalProperty):
         # The protocol which will be used to calculate the densities from
         # the existing data.
         density_calculation = analysis.ExtractAverageStatistic('calc_density_$(data_repl)')
-        base_reweighting_protocols, data_replicator = generate_base_reweighting_protocols(density_calculation)
+        base_reweighting_protocols, data_replicator = generate_base_reweighting_protocols(density_calculation,
+                                                                                          options=options)
 
         density_calculation.statistics_type = ObservableType.Density
         density_calculation.statistics_path = ProtocolPath('statistics_file_path',
@@ -16,6 +16,7 @@ from propertyestimator.protocols import analysis, coordinates, forcefield, group
 from propertyestimator.thermodynamics import ThermodynamicState, Ensemble
 from propertyestimator.utils import timeseries
 from propertyestimator.utils.exceptions import PropertyEstimatorException
+from propertyestimator.utils.openmm import deserialize_system
 from propertyestimator.utils.quantities import EstimatedQuantity
 from propertyestimator.utils.statistics import bootstrap
 from propertyestimator.workflow import plugins
@@ -113,15 +114,12 @@ class ExtractAverageDielectric(analysis.AverageTrajectoryProperty):
 
         base_exception = super(ExtractAverageDielectric, self).execute(directory, available_resources)
 
-        if isinstance(base_exception, ExtractAverageDielectric):
+        if isinstance(base_exception, PropertyEstimatorException):
             return base_exception
 
         charge_list = []
 
-        from simtk.openmm import XmlSerializer
-
-        with open(self._system_path, 'rb') as file:
-            self._system = XmlSerializer.deserialize(file.read().decode())
+        self._system = deserialize_system(self._system_path, read_only=True)
 
         for force_index in range(self._system.getNumForces()):
 
@@ -137,17 +135,30 @@ class ExtractAverageDielectric(analysis.AverageTrajectoryProperty):
 
                 charge_list.append(charge)
 
-        dipole_moments = mdtraj.geometry.dipole_moments(self.trajectory, charge_list)
+        dipole_moments = []
+        volumes = []
+
+        # Compute the dipole moments a chunk of frames at a time, so that
+        # the full trajectory never needs to be held in memory.
+        for trajectory_chunk in self._iterate_trajectory():
+
+            dipole_moments.append(mdtraj.geometry.dipole_moments(trajectory_chunk, charge_list))
+            volumes.append(trajectory_chunk.unitcell_volumes)
+
+        dipole_moments = np.concatenate(dipole_moments)
+        volumes = np.concatenate(volumes)
+
+        number_of_frames = len(dipole_moments)
 
         dipole_moments, self._equilibration_index, self._statistical_inefficiency = \
             timeseries.decorrelate_time_series(dipole_moments)
 
-        sample_indices = timeseries.get_uncorrelated_indices(len(self.trajectory[self._equilibration_index:]),
+        sample_indices = timeseries.get_uncorrelated_indices(number_of_frames - self._equilibration_index,
                                                              self._statistical_inefficiency)
 
         sample_indices = [index + self._equilibration_index for index in sample_indices]
 
-        volumes = self.trajectory[sample_indices].unitcell_volumes
+        volumes = volumes[sample_indices]
 
         self._uncorrelated_values = unit.Quantity(dipole_moments, None)
         self._uncorrelated_volumes = volumes * unit.nanometer ** 3
@@ -347,6 +358,12 @@ class DielectricConstant(PhysicalProperty):
 
         build_coordinates.substance = ProtocolPath('substance', 'global')
 
+        if options is not None:
+            build_coordinates.number_of_packmol_attempts = options.number_of_packmol_attempts
+
+        if options is not None and options.use_stored_coordinates:
+            build_coordinates.stored_coordinates = ProtocolPath('stored_coordinates', 'global')
+
         schema.protocols[build_coordinates.id] = build_coordinates.schema
 
         assign_topology = forcefield.BuildSmirnoffSystem('build_topology')
@@ -356,6 +373,9 @@ class DielectricConstant(PhysicalProperty):
         assign_topology.coordinate_file_path = ProtocolPath('coordinate_file_path', build_coordinates.id)
         assign_topology.substance = ProtocolPath('substance', 'global')
 
+        if options is not None and options.charge_cache_path is not None:
+            assign_topology.charge_cache_path = options.charge_cache_path
+
         schema.protocols[assign_topology.id] = assign_topology.schema
 
         # Equilibration
@@ -373,6 +393,13 @@ class DielectricConstant(PhysicalProperty):
         npt_equilibration.steps = 100000  # Debug settings.
         npt_equilibration.output_frequency = 5000  # Debug settings.
 
+        if options is not None and options.use_stored_coordinates:
+
+            # Coordinates taken from a previously equilibrated
+            # system only need to be briefly re-equilibrated.
+            npt_equilibration.use_reduced_steps = ProtocolPath('used_stored_coordinates', build_coordinates.id)
+            npt_equilibration.reduced_steps = 10000  # Debug settings.
+
         npt_equilibration.thermodynamic_state = ProtocolPath('thermodynamic_state', 'global')
 
         npt_equilibration.input_coordinate_file = ProtocolPath('output_coordinate_file', energy_minimisation.id)
@@ -420,6 +447,9 @@ class DielectricConstant(PhysicalProperty):
 
         converge_uncertainty.max_iterations = 400
 
+        if options is not None:
+            converge_uncertainty.adaptive_sampling = options.adaptive_sampling
+
         schema.protocols[converge_uncertainty.id] = converge_uncertainty.schema
 
         # Finally, extract uncorrelated data
@@ -475,6 +505,13 @@ class DielectricConstant(PhysicalProperty):
         output_to_store.statistical_inefficiency = ProtocolPath('statistical_inefficiency', converge_uncertainty.id,
                                                                 extract_dielectric.id)
 
+        output_to_store.number_of_molecules = ProtocolPath('number_of_molecules', build_coordinates.id)
+
+        if options is not None:
+
+            output_to_store.trajectory_storage_format = options.trajectory_storage_format
+            output_to_store.trajectory_storage_precision = options.trajectory_storage_precision
+
         schema.outputs_to_store = {'full_system': output_to_store}
 
         return schema
@@ -496,7 +533,8 @@ class DielectricConstant(PhysicalProperty):
         """
 
         dielectric_calculation = ExtractAverageDielectric('calc_dielectric_$(data_repl)')
-        base_reweighting_protocols, data_replicator = generate_base_reweighting_protocols(dielectric_calculation)
+        base_reweighting_protocols, data_replicator = generate_base_reweighting_protocols(dielectric_calculation,
+                                                                                          options=options)
 
         unpack_id = base_reweighting_protocols.unpack_stored_data.id
 
@@ -531,7 +569,6 @@ class DielectricConstant(PhysicalProperty):
                                                               base_reweighting_protocols.concatenate_trajectories,
                                                               base_reweighting_protocols.build_reference_system,
                                                               base_reweighting_protocols.reduced_reference_potential,
-                                                              base_reweighting_protocols.build_target_system,
                                                               base_reweighting_protocols.reduced_target_potential,
                                                               mbar_protocol)
 
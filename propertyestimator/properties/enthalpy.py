@@ -4,6 +4,7 @@ A collection of enthalpy physical property definitions.
 
 from collections import namedtuple
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.datasets.plugins import register_thermoml_property
 from propertyestimator.properties.plugins import register_estimable_property
 from propertyestimator.properties.properties import PhysicalProperty
@@ -49,6 +50,10 @@ class WeightValueByMoleFraction(protocols.BaseProtocol):
     def __init__(self, protocol_id):
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
+        self._lightweight = True
+
         self._value = None
         self._component = None
         self._full_substance = None
@@ -119,6 +124,12 @@ class EnthalpyOfMixing(PhysicalProperty):
 
         build_coordinates.substance = ProtocolPath('substance', 'global')
 
+        if options is not None:
+            build_coordinates.number_of_packmol_attempts = options.number_of_packmol_attempts
+
+        if options is not None and options.use_stored_coordinates:
+            build_coordinates.stored_coordinates = ProtocolPath('stored_coordinates', 'global')
+
         assign_topology = forcefield.BuildSmirnoffSystem(id_prefix + 'build_topology')
 
         assign_topology.force_field_path = ProtocolPath('force_field_path', 'global')
@@ -126,6 +137,9 @@ class EnthalpyOfMixing(PhysicalProperty):
         assign_topology.coordinate_file_path = ProtocolPath('coordinate_file_path', build_coordinates.id)
         assign_topology.substance = ProtocolPath('substance', 'global')
 
+        if options is not None and options.charge_cache_path is not None:
+            assign_topology.charge_cache_path = options.charge_cache_path
+
         # Equilibration
         energy_minimisation = simulation.RunEnergyMinimisation(id_prefix + 'energy_minimisation')
 
@@ -139,6 +153,13 @@ class EnthalpyOfMixing(PhysicalProperty):
         npt_equilibration.steps = 100000  # Debug settings.
         npt_equilibration.output_frequency = 5000  # Debug settings.
 
+        if options is not None and options.use_stored_coordinates:
+
+            # Coordinates taken from a previously equilibrated
+            # system only need to be briefly re-equilibrated.
+            npt_equilibration.use_reduced_steps = ProtocolPath('used_stored_coordinates', build_coordinates.id)
+            npt_equilibration.reduced_steps = 10000  # Debug settings.
+
         npt_equilibration.thermodynamic_state = ProtocolPath('thermodynamic_state', 'global')
 
         npt_equilibration.input_coordinate_file = ProtocolPath('output_coordinate_file', energy_minimisation.id)
@@ -169,6 +190,9 @@ class EnthalpyOfMixing(PhysicalProperty):
 
         converge_uncertainty.max_iterations = 1
 
+        if options is not None:
+            converge_uncertainty.adaptive_sampling = options.adaptive_sampling
+
         condition = groups.ConditionalGroup.Condition()
 
         condition.left_hand_value = ProtocolPath('value.uncertainty', converge_uncertainty.id, extract_enthalpy.id)
@@ -267,6 +291,9 @@ class EnthalpyOfMixing(PhysicalProperty):
         component_workflow.build_coordinates.substance = ReplicatorValue('repl')
         component_workflow.assign_topology.substance = ReplicatorValue('repl')
 
+        # The globally available stored coordinates are those of the full, mixed system.
+        component_workflow.build_coordinates.stored_coordinates = []
+
         # Set up a workflow to calculate the enthalpy of the full, mixed system.
         mixed_system_workflow = EnthalpyOfMixing.get_enthalpy_workflow('mixed_', False, options)
 
@@ -340,6 +367,9 @@ class EnthalpyOfMixing(PhysicalProperty):
                                                                       mixed_system_workflow.converge_uncertainty.id,
                                                                       'mixed_extract_enthalpy')
 
+        mixed_output_to_store.number_of_molecules = ProtocolPath('number_of_molecules',
+                                                                 mixed_system_workflow.build_coordinates.id)
+
         component_output_to_store = WorkflowOutputToStore()
 
         component_output_to_store.substance = ReplicatorValue('repl')
@@ -358,6 +388,16 @@ class EnthalpyOfMixing(PhysicalProperty):
                                                                           component_workflow.converge_uncertainty.id,
                                                                           'component_$(repl)_extract_enthalpy')
 
+        component_output_to_store.number_of_molecules = ProtocolPath('number_of_molecules',
+                                                                     component_workflow.build_coordinates.id)
+
+        if options is not None:
+
+            for output_to_store in [mixed_output_to_store, component_output_to_store]:
+
+                output_to_store.trajectory_storage_format = options.trajectory_storage_format
+                output_to_store.trajectory_storage_precision = options.trajectory_storage_precision
+
         schema.outputs_to_store = {
             'mixed_system': mixed_output_to_store,
             'component_$(repl)': component_output_to_store
@@ -387,7 +427,8 @@ class EnthalpyOfMixing(PhysicalProperty):
 
         mixture_protocols, mixture_data_replicator = generate_base_reweighting_protocols(extract_mixed_enthalpy,
                                                                                          'mix_data_repl',
-                                                                                         '_mixture')
+                                                                                         '_mixture',
+                                                                                         options)
 
         extract_mixed_enthalpy.statistics_path = ProtocolPath('statistics_file_path',
                                                               mixture_protocols.unpack_stored_data.id)
@@ -399,7 +440,8 @@ class EnthalpyOfMixing(PhysicalProperty):
 
         pure_protocols, pure_data_replicator = generate_base_reweighting_protocols(extract_pure_enthalpy,
                                                                                    'pure_data_repl',
-                                                                                   '_pure_$(comp_repl)')
+                                                                                   '_pure_$(comp_repl)',
+                                                                                   options)
 
         extract_pure_enthalpy.statistics_path = ProtocolPath('statistics_file_path',
                                                              pure_protocols.unpack_stored_data.id)
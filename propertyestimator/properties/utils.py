@@ -14,12 +14,11 @@ BaseReweightingProtocols = namedtuple('BaseReweightingProtocols', 'unpack_stored
                                                                   'concatenate_trajectories '
                                                                   'build_reference_system '
                                                                   'reduced_reference_potential '
-                                                                  'build_target_system '
                                                                   'reduced_target_potential '
                                                                   'mbar_protocol ')
 
 
-def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_repl', id_suffix=''):
+def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_repl', id_suffix='', options=None):
     """Constructs a set of protocols which, when combined in a workflow schema,
     may be executed to reweight a set of existing data to estimate a particular
     property. The reweighted observable of interest will be calculated by
@@ -34,6 +33,8 @@ def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_r
         The id to use for the data replicator.
     id_suffix: str
         A string suffix to append to each of the protocol ids.
+    options: WorkflowOptions, optional
+        The options to use when setting up the protocols.
 
     Returns
     -------
@@ -85,6 +86,9 @@ def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_r
     build_reference_system.coordinate_file_path = ProtocolPath('coordinate_file_path',
                                                                unpack_stored_data.id)
 
+    if options is not None and options.charge_cache_path is not None:
+        build_reference_system.charge_cache_path = options.charge_cache_path
+
     reduced_reference_potential = reweighting.CalculateReducedPotentialOpenMM('reduced_potential{}'.format(
                                                                               replicator_suffix))
 
@@ -93,25 +97,22 @@ def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_r
                                                                    unpack_stored_data.id)
     reduced_reference_potential.coordinate_file_path = ProtocolPath('coordinate_file_path',
                                                                     unpack_stored_data.id)
-    reduced_reference_potential.trajectory_file_path = ProtocolPath('output_trajectory_path',
-                                                                    concatenate_trajectories.id)
-
-    # Calculate the reduced potential of the target state.
-    build_target_system = forcefield.BuildSmirnoffSystem('build_system_target' + id_suffix)
-
-    build_target_system.force_field_path = ProtocolPath('force_field_path', 'global')
-    build_target_system.substance = ProtocolPath('substance', 'global')
-    build_target_system.coordinate_file_path = ProtocolPath('output_coordinate_path',
-                                                            concatenate_trajectories.id)
+    reduced_reference_potential.trajectory = ProtocolPath('output_trajectory', concatenate_trajectories.id)
 
+    # Calculate the reduced potential of the target state. The system is parameterised
+    # directly by the protocol so that, when reweighting many sets of data, the system
+    # template built for the first set is reused rather than being rebuilt and serialized.
     reduced_target_potential = reweighting.CalculateReducedPotentialOpenMM('reduced_potential_target' + id_suffix)
 
     reduced_target_potential.thermodynamic_state = ProtocolPath('thermodynamic_state', 'global')
-    reduced_target_potential.system_path = ProtocolPath('system_path', build_target_system.id)
+    reduced_target_potential.force_field_path = ProtocolPath('force_field_path', 'global')
+    reduced_target_potential.substance = ProtocolPath('substance', 'global')
     reduced_target_potential.coordinate_file_path = ProtocolPath('output_coordinate_path',
                                                                  concatenate_trajectories.id)
-    reduced_target_potential.trajectory_file_path = ProtocolPath('output_trajectory_path',
-                                                                 concatenate_trajectories.id)
+    reduced_target_potential.trajectory = ProtocolPath('output_trajectory', concatenate_trajectories.id)
+
+    if options is not None and options.charge_cache_path is not None:
+        reduced_target_potential.charge_cache_path = options.charge_cache_path
 
     # Finally, apply MBAR to get the reweighted value.
     mbar_protocol = reweighting.ReweightWithMBARProtocol('mbar' + id_suffix)
@@ -128,7 +129,6 @@ def generate_base_reweighting_protocols(analysis_protocol, replicator_id='data_r
                                               concatenate_trajectories,
                                               build_reference_system,
                                               reduced_reference_potential,
-                                              build_target_system,
                                               reduced_target_potential,
                                               mbar_protocol)
 
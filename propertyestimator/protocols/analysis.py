@@ -8,10 +8,12 @@ from os import path
 import numpy as np
 from simtk import unit
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.utils import statistics, timeseries
 from propertyestimator.utils.exceptions import PropertyEstimatorException
 from propertyestimator.utils.quantities import EstimatedQuantity
-from propertyestimator.utils.statistics import StatisticsArray, bootstrap
+from propertyestimator.utils.statistics import StatisticsArray, StatisticsFileReader, bootstrap
+from propertyestimator.utils.trajectories import get_number_of_frames, iterate_trajectory, write_trajectory_chunks
 from propertyestimator.workflow.decorators import protocol_input, protocol_output, MergeBehaviour
 from propertyestimator.workflow.plugins import register_calculation_protocol
 from propertyestimator.workflow.protocols import BaseProtocol
@@ -57,6 +59,8 @@ class AveragePropertyProtocol(BaseProtocol):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._bootstrap_iterations = 250
         self._bootstrap_sample_size = 1.0
 
@@ -97,6 +101,9 @@ class AveragePropertyProtocol(BaseProtocol):
 class AverageTrajectoryProperty(AveragePropertyProtocol):
     """An abstract base class for protocols which will calculate the
     average of a property from a simulation trajectory.
+
+    The trajectory is not loaded into memory as a whole, but should
+    instead be streamed a chunk at a time using `_iterate_trajectory`.
     """
 
     @protocol_input(str)
@@ -116,11 +123,23 @@ class AverageTrajectoryProperty(AveragePropertyProtocol):
         self._input_coordinate_file = None
         self._trajectory_path = None
 
-        self.trajectory = None
+    def _iterate_trajectory(self, frame_indices=None):
+        """Iterates over the trajectory to average a chunk of frames at a time.
 
-    def execute(self, directory, available_resources):
+        Parameters
+        ----------
+        frame_indices: list of int, optional
+            The indices of the frames to iterate over. If `None`,
+            all frames will be iterated over.
 
-        import mdtraj
+        Returns
+        -------
+        generator of mdtraj.Trajectory
+            The chunks of the trajectory.
+        """
+        return iterate_trajectory(self._trajectory_path, self._input_coordinate_file, frame_indices)
+
+    def execute(self, directory, available_resources):
 
         if self._trajectory_path is None:
 
@@ -128,8 +147,6 @@ class AverageTrajectoryProperty(AveragePropertyProtocol):
                                               message='The AverageTrajectoryProperty protocol '
                                                        'requires a previously calculated trajectory')
 
-        self.trajectory = mdtraj.load_dcd(filename=self._trajectory_path, top=self._input_coordinate_file)
-
         return self._get_output_dictionary()
 
 
@@ -137,8 +154,16 @@ class AverageTrajectoryProperty(AveragePropertyProtocol):
 class ExtractAverageStatistic(AveragePropertyProtocol):
     """Extracts the average value from a statistics file which was generated
     during a simulation.
+
+    When executed repeatedly (e.g. as part of a `ConditionalGroup`), only the
+    rows which have been appended to the statistics file since the previous
+    execution are read from disk.
     """
 
+    # The maximum number of candidate equilibration times to consider
+    # when decorrelating the statistics.
+    _maximum_equilibration_candidates = 500
+
     @protocol_input(str)
     def statistics_path(self):
         """The file path to the trajectory to average over."""
@@ -156,7 +181,55 @@ class ExtractAverageStatistic(AveragePropertyProtocol):
         self._statistics_path = None
         self._statistics_type = statistics.ObservableType.PotentialEnergy
 
-        self._statistics = None
+        # The values which have been read so far, and where in the
+        # statistics file to read any new values from.
+        self._cached_statistics_path = None
+        self._cached_values = None
+        self._cached_file_offset = 0
+
+    def _read_values(self):
+        """Reads the values of the statistic to average, reading only those values
+        which were appended to the statistics file since this method was last called.
+
+        Returns
+        -------
+        unit.Quantity, optional
+            The values, or `None` if the statistics file does not contain any.
+        """
+
+        if (self._cached_statistics_path != self._statistics_path or
+            self._cached_file_offset > path.getsize(self._statistics_path)):
+
+            # The file has changed, so the cached values are no longer valid.
+            self._cached_statistics_path = self._statistics_path
+            self._cached_values = None
+            self._cached_file_offset = 0
+
+        # Only the column of the statistic being averaged needs to be read.
+        new_statistics, self._cached_file_offset = StatisticsArray.from_file_tail(self._statistics_path,
+                                                                                  self._cached_file_offset,
+                                                                                  [self._statistics_type])
+
+        if new_statistics is not None:
+
+            new_values = new_statistics.get_observable(self._statistics_type)
+
+            if new_values is None:
+                return None
+
+            if self._cached_values is None:
+                self._cached_values = new_values
+
+            else:
+
+                statistics_unit = self._cached_values.unit
+
+                self._cached_values = unit.Quantity(np.concatenate([
+                    self._cached_values.value_in_unit(statistics_unit),
+                    new_values.value_in_unit(statistics_unit)
+                ]), statistics_unit)
+
+        return self._cached_values
 
     def execute(self, directory, available_resources):
 
@@ -168,9 +241,10 @@ class ExtractAverageStatistic(AveragePropertyProtocol):
                                               message='The ExtractAverageStatistic protocol '
                                                        'requires a previously calculated statistics file')
 
-        self._statistics = statistics.StatisticsArray.from_pandas_csv(self.statistics_path)
-
-        values = self._statistics.get_observable(self._statistics_type)
+        try:
+            values = self._read_values()
+        except ValueError as e:
+            return PropertyEstimatorException(directory=directory, message=str(e))
 
         if values is None or len(values) == 0:
 
@@ -179,12 +253,13 @@ class ExtractAverageStatistic(AveragePropertyProtocol):
                                                       'data.'.format(self._statistics_path))
 
         statistics_unit = values[0].unit
-        values.value_in_unit(statistics_unit)
+        values = np.array(values.value_in_unit(statistics_unit))
 
-        values = np.array(values)
+        # Bound the cost of detecting equilibration for long time series.
+        equilibration_stride = max(1, len(values) // self._maximum_equilibration_candidates)
 
         values, self._equilibration_index, self._statistical_inefficiency = \
-            timeseries.decorrelate_time_series(values)
+            timeseries.decorrelate_time_series(values, equilibration_stride)
 
         final_value, final_uncertainty = bootstrap(self._bootstrap_function,
                                                    self._bootstrap_iterations,
@@ -225,6 +300,8 @@ class ExtractUncorrelatedData(BaseProtocol):
     def __init__(self, protocol_id):
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._equilibration_index = None
         self._statistical_inefficiency = None
 
@@ -266,8 +343,6 @@ class ExtractUncorrelatedTrajectoryData(ExtractUncorrelatedData):
 
     def execute(self, directory, available_resources):
 
-        import mdtraj
-
         logging.info('Subsampling trajectory: {}'.format(self.id))
 
         if self._input_trajectory_path is None:
@@ -276,16 +351,21 @@ class ExtractUncorrelatedTrajectoryData(ExtractUncorrelatedData):
                                               message='The ExtractUncorrelatedTrajectoryData protocol '
                                                        'requires a previously calculated trajectory')
 
-        trajectory = mdtraj.load_dcd(filename=self._input_trajectory_path, top=self._input_coordinate_file)
-        trajectory = trajectory[self._equilibration_index:]
+        number_of_frames = get_number_of_frames(self._input_trajectory_path) - self._equilibration_index
+
+        uncorrelated_indices = timeseries.get_uncorrelated_indices(number_of_frames, self._statistical_inefficiency)
+        uncorrelated_indices = [index + self._equilibration_index for index in uncorrelated_indices]
 
-        uncorrelated_indices = timeseries.get_uncorrelated_indices(trajectory.n_frames, self._statistical_inefficiency)
-        uncorrelated_trajectory = trajectory[uncorrelated_indices]
+        # Stream only the uncorrelated frames from the input trajectory
+        # into the output trajectory, a chunk at a time.
+        uncorrelated_chunks = iterate_trajectory(self._input_trajectory_path,
+                                                 self._input_coordinate_file,
+                                                 uncorrelated_indices)
 
         self._output_trajectory_path = path.join(directory, 'uncorrelated_trajectory.dcd')
-        uncorrelated_trajectory.save_dcd(self._output_trajectory_path)
+        write_trajectory_chunks(uncorrelated_chunks, self._output_trajectory_path)
 
-        self._number_of_uncorrelated_samples = len(trajectory)
+        self._number_of_uncorrelated_samples = number_of_frames
 
         logging.info('Trajectory subsampled: {}'.format(self.id))
 
@@ -325,16 +405,17 @@ class ExtractUncorrelatedStatisticsData(ExtractUncorrelatedData):
                                               message='The ExtractUncorrelatedStatisticsData protocol '
                                                        'requires a previously calculated statisitics file')
 
-        statistics = StatisticsArray.from_pandas_csv(self._input_statistics_path)
+        # Only the uncorrelated rows of the statistics file are loaded into memory.
+        statistics_reader = StatisticsFileReader(self._input_statistics_path)
 
-        uncorrelated_indices = timeseries.get_uncorrelated_indices(len(statistics) - self._equilibration_index,
+        uncorrelated_indices = timeseries.get_uncorrelated_indices(len(statistics_reader) - self._equilibration_index,
                                                                    self._statistical_inefficiency)
 
         uncorrelated_indices = [index + self._equilibration_index for index in uncorrelated_indices]
-        uncorrelated_statistics = statistics.from_statistics_array(statistics, uncorrelated_indices)
+        uncorrelated_statistics = statistics_reader.read_rows(uncorrelated_indices)
 
-        self._output_statistics_path = path.join(directory, 'uncorrelated_statistics.csv')
-        uncorrelated_statistics.save_as_pandas_csv(self._output_statistics_path)
+        self._output_statistics_path = path.join(directory, 'uncorrelated_statistics.bin')
+        uncorrelated_statistics.save_as_binary(self._output_statistics_path)
 
         logging.info('Statistics subsampled: {}'.format(self.id))
 
@@ -3,12 +3,14 @@ A collection of protocols for building coordinates for molecular systems.
 """
 
 import logging
+import shutil
 from enum import Enum
 from os import path
 
 from simtk import unit
 from simtk.openmm import app
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.substances import Substance
 from propertyestimator.utils import packmol, create_molecule_from_smiles
 from propertyestimator.utils.exceptions import PropertyEstimatorException
@@ -53,28 +55,73 @@ class BuildCoordinatesPackmol(BaseProtocol):
         while building the coordinates."""
         pass
 
+    @protocol_input(int)
+    def number_of_packmol_attempts(self):
+        """The number of times to attempt to pack the box, each time with a different
+        random seed. Attempts are run concurrently (bounded by the number of available
+        threads), and the first which succeeds is used."""
+        pass
+
+    @protocol_input(list)
+    def stored_coordinates(self):
+        """A list of tuples of the paths to previously equilibrated coordinates of
+        this substance, and the number of molecules of each component they contain,
+        ordered from the most to the least preferred. If any of these contain the
+        same number of molecules as the system to build, the first such set of
+        coordinates is used in place of packing a new box."""
+        pass
+
     @protocol_output(str)
     def coordinate_file_path(self):
         """The file path to the created PDB coordinate file."""
         pass
 
+    @protocol_output(dict)
+    def number_of_molecules(self):
+        """The number of molecules of each component (keyed by the
+        component identifier) in the created system."""
+        pass
+
+    @protocol_output(bool)
+    def used_stored_coordinates(self):
+        """Whether the coordinates were taken from `stored_coordinates`
+        rather than being packed from scratch."""
+        pass
+
     def __init__(self, protocol_id):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         # inputs
         self._substance = None
+        self._stored_coordinates = []
 
         # outputs
         self._coordinate_file_path = None
         self._positions = None
 
+        self._number_of_molecules = None
+        self._used_stored_coordinates = False
+
         self._max_molecules = 1000
         self._mass_density = 0.95 * unit.grams / unit.milliliters
 
         self._verbose_packmol = False
         self._retain_packmol_files = False
 
+        self._number_of_packmol_attempts = 1
+
+    @property
+    def resource_requirements(self):
+
+        if isinstance(self._number_of_packmol_attempts, int) and self._number_of_packmol_attempts > 1:
+            # Each of the concurrent packmol attempts can occupy a thread.
+            return TaskResourceRequirements(number_of_threads=self._number_of_packmol_attempts)
+
+        return self._resource_requirements
+
     def _build_molecule_arrays(self, directory):
         """Converts the input substance into a list of openeye OEMol's and a list of
         counts for how many of each there should be as determined by the `max_molecules`
@@ -115,8 +162,40 @@ class BuildCoordinatesPackmol(BaseProtocol):
         for index, component in enumerate(self._substance.components):
             number_of_molecules[index] = molecules_per_component[component.identifier]
 
+        self._number_of_molecules = molecules_per_component
+
         return molecules, number_of_molecules, None
 
+    def _find_stored_coordinates(self):
+        """Finds the first of the `stored_coordinates` which contains
+        the same number of molecules as the system to build.
+
+        Returns
+        -------
+        str, optional
+            The path to the matching coordinates, or `None` if
+            there are none.
+        """
+
+        if self._stored_coordinates is None:
+            return None
+
+        number_of_molecules = self._substance.get_molecules_per_component(self._max_molecules)
+
+        for coordinate_path, stored_number_of_molecules in self._stored_coordinates:
+
+            if stored_number_of_molecules != number_of_molecules:
+                continue
+
+            if not path.isfile(coordinate_path):
+
+                logging.warning(f'The stored coordinates at {coordinate_path} could not be found.')
+                continue
+
+            return coordinate_path
+
+        return None
+
     def _save_results(self, directory, topology, positions):
         """Save the results of running PACKMOL in the working directory
 
@@ -148,6 +227,19 @@ class BuildCoordinatesPackmol(BaseProtocol):
             return PropertyEstimatorException(directory=directory,
                                               message='The substance input is non-optional')
 
+        stored_coordinate_path = self._find_stored_coordinates()
+
+        if stored_coordinate_path is not None:
+
+            self._coordinate_file_path = path.join(directory, 'output.pdb')
+            shutil.copyfile(stored_coordinate_path, self._coordinate_file_path)
+
+            self._number_of_molecules = self._substance.get_molecules_per_component(self._max_molecules)
+            self._used_stored_coordinates = True
+
+            logging.info(f'Coordinates for {self._substance.identifier} taken from {stored_coordinate_path}')
+            return self._get_output_dictionary()
+
         molecules, number_of_molecules, exception = self._build_molecule_arrays(directory)
 
         if exception is not None:
@@ -161,7 +253,9 @@ class BuildCoordinatesPackmol(BaseProtocol):
                                                mass_density=self._mass_density,
                                                verbose=self._verbose_packmol,
                                                working_directory=packmol_directory,
-                                               retain_working_files=self._retain_packmol_files)
+                                               retain_working_files=self._retain_packmol_files,
+                                               number_of_attempts=self._number_of_packmol_attempts,
+                                               maximum_concurrent_attempts=available_resources.number_of_threads)
 
         if topology is None or positions is None:
 
@@ -219,7 +313,9 @@ class SolvateExistingStructure(BuildCoordinatesPackmol):
                                                mass_density=self._mass_density,
                                                verbose=self._verbose_packmol,
                                                working_directory=packmol_directory,
-                                               retain_working_files=self._retain_packmol_files)
+                                               retain_working_files=self._retain_packmol_files,
+                                               number_of_attempts=self._number_of_packmol_attempts,
+                                               maximum_concurrent_attempts=available_resources.number_of_threads)
 
         if topology is None or positions is None:
             return PropertyEstimatorException(directory=directory,
@@ -280,6 +376,8 @@ class BuildDockedCoordinates(BaseProtocol):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._ligand_substance = None
         self._number_of_ligand_conformations = 100
 
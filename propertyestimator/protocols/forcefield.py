@@ -3,16 +3,16 @@ A collection of protocols for assigning force field parameters to molecular syst
 """
 
 import logging
-import pickle
 from os import path
 
 from simtk import unit
 from simtk.openmm import app
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.substances import Substance
-from propertyestimator.utils import create_molecule_from_smiles
 from propertyestimator.utils.exceptions import PropertyEstimatorException
-from propertyestimator.utils.serialization import deserialize_force_field
+from propertyestimator.utils.openmm import serialize_system
+from propertyestimator.utils.systems import load_force_field, create_smirnoff_system
 from propertyestimator.workflow.decorators import protocol_input, protocol_output
 from propertyestimator.workflow.plugins import register_calculation_protocol
 from propertyestimator.workflow.protocols import BaseProtocol
@@ -44,6 +44,13 @@ class BuildSmirnoffSystem(BaseProtocol):
         """The cutoff after which non-bonded interactions are truncated."""
         pass
 
+    @protocol_input(str)
+    def charge_cache_path(self):
+        """The path to a `PartialChargeCache` which will be consulted before
+        generating the partial charges of each molecule, and populated with any
+        newly generated charges. If empty, charges will always be generated."""
+        pass
+
     @protocol_output(str)
     def system_path(self):
         """The assigned system."""
@@ -53,6 +60,8 @@ class BuildSmirnoffSystem(BaseProtocol):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         # inputs
         self._force_field_path = None
         self._coordinate_file_path = None
@@ -60,6 +69,8 @@ class BuildSmirnoffSystem(BaseProtocol):
 
         self._nonbonded_cutoff = 1.0 * unit.nanometer
 
+        self._charge_cache_path = ''
+
         # outputs
         self._system_path = None
 
@@ -69,58 +80,30 @@ class BuildSmirnoffSystem(BaseProtocol):
 
         pdb_file = app.PDBFile(self._coordinate_file_path)
 
-        force_field = None
-
         try:
 
-            with open(self._force_field_path, 'rb') as file:
-                force_field = deserialize_force_field(pickle.load(file))
-
-        except pickle.UnpicklingError:
-
-            try:
-
-                from openforcefield.typing.engines.smirnoff import ForceField
-                force_field = ForceField(self._force_field_path)
+            force_field = load_force_field(self._force_field_path)
 
-            except Exception as e:
+        except Exception as e:
 
-                return PropertyEstimatorException(directory=directory,
-                                                  message='{} could not load the ForceField: {}'.format(self.id, e))
-
-        molecules = []
-
-        for component in self._substance.components:
-
-            molecule = create_molecule_from_smiles(component.smiles, 0)
-
-            if molecule is None:
-                return PropertyEstimatorException(directory=directory,
-                                                  message='{} could not be converted to a Molecule'.format(component))
-
-            molecules.append(molecule)
+            return PropertyEstimatorException(directory=directory,
+                                              message='{} could not load the ForceField: {}'.format(self.id, e))
 
-        from openforcefield.typing.engines import smirnoff
+        try:
 
-        system = force_field.createSystem(pdb_file.topology,
-                                          molecules,
-                                          nonbondedMethod=smirnoff.PME,
-                                          nonbondedCutoff=self._nonbonded_cutoff,
-                                          chargeMethod='OECharges_AM1BCCSym')
+            # The system is only needed to save it to disk, and so
+            # its XML representation is taken directly.
+            system_xml = create_smirnoff_system(force_field, pdb_file.topology, self._substance,
+                                                self._nonbonded_cutoff, self._charge_cache_path,
+                                                serialize=True)
 
-        if system is None:
+        except ValueError as e:
 
             return PropertyEstimatorException(directory=directory,
-                                              message='Failed to create a system from the'
-                                                       'provided topology and molecules')
-
-        from simtk.openmm import XmlSerializer
-        system_xml = XmlSerializer.serialize(system)
-
-        self._system_path = path.join(directory, 'system.xml')
+                                              message='{} could not create a system: {}'.format(self.id, e))
 
-        with open(self._system_path, 'wb') as file:
-            file.write(system_xml.encode('utf-8'))
+        self._system_path = path.join(directory, 'system.xml.gz')
+        serialize_system(system_xml, self._system_path)
 
         logging.info('Topology generated: ' + self.id)
 
@@ -10,11 +10,13 @@ protocols until certain conditions have been met.
 import copy
 import json
 import logging
+import math
 from enum import Enum, unique
 from os import path, makedirs
 
 from propertyestimator.utils import graph
 from propertyestimator.utils.exceptions import PropertyEstimatorException
+from propertyestimator.utils.tracing import trace_span
 from propertyestimator.workflow import plugins
 from propertyestimator.workflow.decorators import MergeBehaviour, protocol_input
 from propertyestimator.workflow.plugins import register_calculation_protocol, available_protocols
@@ -67,6 +69,25 @@ class ProtocolGroup(BaseProtocol):
                                     key is the protocol id, and the value the protocol itself."""
         return self._protocols
 
+    @property
+    def resource_requirements(self):
+        """TaskResourceRequirements, optional: The combined resource requirements of
+        the grouped protocols."""
+
+        resource_requirements = None
+
+        for index, protocol in enumerate(self._protocols.values()):
+
+            if protocol.resource_requirements is None:
+                return None
+
+            if index == 0:
+                resource_requirements = protocol.resource_requirements
+            else:
+                resource_requirements = resource_requirements.combine(protocol.resource_requirements)
+
+        return resource_requirements
+
     def __init__(self, protocol_id):
         """Constructs a new ProtocolGroup.
         """
@@ -297,7 +318,10 @@ class ProtocolGroup(BaseProtocol):
                     value = self._protocols[value_reference.start_protocol].get_value(value_reference)
                     protocol_to_execute.set_value(source_path, value)
 
-            return_value = protocol_to_execute.execute(working_directory, available_resources)
+            with trace_span('execute', 'protocol', protocol_id=protocol_to_execute.id,
+                            protocol_type=type(protocol_to_execute).__name__):
+
+                return_value = protocol_to_execute.execute(working_directory, available_resources)
 
             if isinstance(return_value, PropertyEstimatorException):
                 return return_value
@@ -650,6 +674,14 @@ class ProtocolGroup(BaseProtocol):
 class ConditionalGroup(ProtocolGroup):
     """A collection of protocols which are to execute until
     a given condition is met.
+
+    When `adaptive_sampling` is enabled, the number of steps taken by any protocols
+    in this group with a `steps` input (e.g. simulations) in the next iteration is
+    predicted from how far the `LessThan` conditions of the group are from being met.
+    Assuming that the uncertainty of an average scales as sqrt(g * var / N), where
+    g is the statistical inefficiency and var the variance of the data, and that g
+    and var remain roughly constant as more data is collected, then reducing an
+    uncertainty by a factor of r requires collecting r^2 times as much data.
     """
     @unique
     class ConditionType(Enum):
@@ -712,6 +744,20 @@ class ConditionalGroup(ProtocolGroup):
          groups conditions."""
         pass
 
+    @protocol_input(bool)
+    def adaptive_sampling(self):
+        """If true, the number of steps taken by protocols in this group in the next
+        iteration will be predicted from how far the conditions are from being met,
+        rather than remaining fixed."""
+        pass
+
+    @protocol_input(int, merge_behavior=MergeBehaviour.GreatestValue)
+    def maximum_adaptive_steps(self):
+        """The maximum number of steps which adaptive sampling may request that a
+        protocol takes in a single iteration. If zero (the default), this will be
+        ten times the initial number of steps of the protocol."""
+        pass
+
     @property
     def conditions(self):
         return self._conditions
@@ -724,6 +770,14 @@ class ConditionalGroup(ProtocolGroup):
         self._max_iterations = 10
         self._conditions = []
 
+        self._adaptive_sampling = False
+        self._maximum_adaptive_steps = 0
+
+        # The initial, and total number of steps taken by
+        # each of the protocols with a `steps` input.
+        self._initial_steps = {}
+        self._total_steps = {}
+
         self.required_inputs.append(ProtocolPath('conditions'))
 
     def _set_schema(self, schema_value):
@@ -755,6 +809,42 @@ class ConditionalGroup(ProtocolGroup):
             True if the condition has been met.
         """
 
+        left_hand_value, right_hand_value = self._get_condition_values(condition)
+
+        if left_hand_value is None or right_hand_value is None:
+            return False
+
+        right_hand_value_correct_units = right_hand_value
+
+        if isinstance(right_hand_value, unit.Quantity) and isinstance(left_hand_value, unit.Quantity):
+            right_hand_value_correct_units = right_hand_value.in_units_of(left_hand_value.unit)
+
+        logging.info(f'Evaluating condition for protocol {self.id}: '
+                     f'{left_hand_value} {condition.type} {right_hand_value_correct_units}')
+
+        if condition.type == self.ConditionType.LessThan:
+            return left_hand_value < right_hand_value
+        elif condition.type == self.ConditionType.GreaterThan:
+            return left_hand_value > right_hand_value
+
+        raise NotImplementedError()
+
+    def _get_condition_values(self, condition):
+        """Retrieves the values on either side of a condition.
+
+        Parameters
+        ----------
+        condition: ConditionalGroup.Condition
+            The condition to retrieve the values of.
+
+        Returns
+        -------
+        Any
+            The left hand value.
+        Any
+            The right hand value.
+        """
+
         left_hand_value = None
 
         if not isinstance(condition.left_hand_value, ProtocolPath):
@@ -769,26 +859,92 @@ class ConditionalGroup(ProtocolGroup):
         else:
             right_hand_value = self.get_value(condition.right_hand_value)
 
-        if left_hand_value is None or right_hand_value is None:
-            return False
+        return left_hand_value, right_hand_value
 
-        right_hand_value_correct_units = right_hand_value
+    def _get_sampling_ratio(self):
+        """Predicts how many times more data needs to be collected for all of
+        the `LessThan` conditions of this group to be met.
 
-        if isinstance(right_hand_value, unit.Quantity) and isinstance(left_hand_value, unit.Quantity):
-            right_hand_value_correct_units = right_hand_value.in_units_of(left_hand_value.unit)
+        Returns
+        -------
+        float, optional
+            The predicted ratio, or `None` if it could not be predicted.
+        """
 
-        logging.info(f'Evaluating condition for protocol {self.id}: '
-                     f'{left_hand_value} {condition.type} {right_hand_value_correct_units}')
+        sampling_ratio = None
 
-        if condition.type == self.ConditionType.LessThan:
-            return left_hand_value < right_hand_value
-        elif condition.type == self.ConditionType.GreaterThan:
-            return left_hand_value > right_hand_value
+        for condition in self._conditions:
 
-        raise NotImplementedError()
+            if condition.type != self.ConditionType.LessThan:
+                continue
+
+            left_hand_value, right_hand_value = self._get_condition_values(condition)
+
+            if isinstance(left_hand_value, unit.Quantity) and isinstance(right_hand_value, unit.Quantity):
+
+                right_hand_value = right_hand_value.value_in_unit(left_hand_value.unit)
+                left_hand_value = left_hand_value.value_in_unit(left_hand_value.unit)
+
+            if (not isinstance(left_hand_value, (int, float)) or
+                not isinstance(right_hand_value, (int, float)) or
+                right_hand_value <= 0.0):
+
+                continue
+
+            condition_ratio = (left_hand_value / right_hand_value) ** 2
+
+            if sampling_ratio is None or condition_ratio > sampling_ratio:
+                sampling_ratio = condition_ratio
+
+        return sampling_ratio
+
+    def _get_stepped_protocols(self):
+        """Returns the protocols in this group which have a `steps` input.
+
+        Returns
+        -------
+        list of BaseProtocol
+            The protocols with a `steps` input.
+        """
+        return [protocol for protocol in self._protocols.values() if hasattr(protocol, 'steps')]
+
+    def _update_adaptive_steps(self):
+        """Sets the number of steps that the protocols in this group should take
+        in the next iteration, such that the conditions of the group are predicted
+        to be met after the next iteration."""
+
+        sampling_ratio = self._get_sampling_ratio()
+
+        if sampling_ratio is None:
+            return
+
+        for protocol in self._get_stepped_protocols():
+
+            initial_steps = self._initial_steps[protocol.id]
+            total_steps = self._total_steps[protocol.id]
+
+            required_steps = int(math.ceil(total_steps * (sampling_ratio - 1.0)))
+
+            minimum_steps = max(1, initial_steps // 10)
+
+            maximum_steps = self._maximum_adaptive_steps
+
+            if maximum_steps is None or maximum_steps <= 0:
+                maximum_steps = initial_steps * 10
+
+            required_steps = min(max(required_steps, minimum_steps), maximum_steps)
+
+            # Make sure at least one new frame is generated
+            # for protocols which output frames periodically.
+            output_frequency = getattr(protocol, 'output_frequency', None)
+
+            if isinstance(output_frequency, int) and output_frequency > 0:
+                required_steps = int(math.ceil(required_steps / output_frequency)) * output_frequency
 
-    @staticmethod
-    def _write_checkpoint(directory, current_iteration):
+            logging.info(f'Adaptively setting the number of steps of {protocol.id} to {required_steps}')
+            protocol.steps = required_steps
+
+    def _write_checkpoint(self, directory, current_iteration):
         """Creates a checkpoint file for this group so that it can continue
         executing where it left off if it was killed for some reason (e.g the
         worker it was running on was killed).
@@ -803,11 +959,19 @@ class ConditionalGroup(ProtocolGroup):
 
         checkpoint_path = path.join(directory, 'checkpoint.json')
 
+        checkpoint_dictionary = {
+            'current_iteration': current_iteration,
+
+            'initial_steps': self._initial_steps,
+            'total_steps': self._total_steps,
+
+            'steps': {protocol.id: protocol.steps for protocol in self._get_stepped_protocols()}
+        }
+
         with open(checkpoint_path, 'w') as file:
-            json.dump({'current_iteration': current_iteration}, file)
+            json.dump(checkpoint_dictionary, file)
 
-    @staticmethod
-    def _read_checkpoint(directory):
+    def _read_checkpoint(self, directory):
         """Creates a checkpoint file for this group so that it can continue
         executing where it left off if it was killed for some reason (e.g the
         worker it was running on was killed).
@@ -834,6 +998,14 @@ class ConditionalGroup(ProtocolGroup):
             checkpoint_dictionary = json.load(file)
             current_iteration = checkpoint_dictionary['current_iteration']
 
+        self._initial_steps = checkpoint_dictionary.get('initial_steps', {})
+        self._total_steps = checkpoint_dictionary.get('total_steps', {})
+
+        for protocol_id, steps in checkpoint_dictionary.get('steps', {}).items():
+
+            if protocol_id in self._protocols:
+                self._protocols[protocol_id].steps = steps
+
         return current_iteration
 
     def execute(self, directory, available_resources):
@@ -857,6 +1029,11 @@ class ConditionalGroup(ProtocolGroup):
         should_continue = True
         current_iteration = self._read_checkpoint(directory)
 
+        for protocol in self._get_stepped_protocols():
+
+            self._initial_steps.setdefault(protocol.id, protocol.steps)
+            self._total_steps.setdefault(protocol.id, 0)
+
         while should_continue:
 
             # Create a checkpoint file so we can pick off where
@@ -865,12 +1042,17 @@ class ConditionalGroup(ProtocolGroup):
             self._write_checkpoint(directory, current_iteration)
 
             current_iteration += 1
-            return_value = super(ConditionalGroup, self).execute(directory, available_resources)
+
+            with trace_span('iteration', 'conditional_group', protocol_id=self.id, iteration=current_iteration):
+                return_value = super(ConditionalGroup, self).execute(directory, available_resources)
 
             if isinstance(return_value, PropertyEstimatorException):
                 # Exit on exceptions.
                 return return_value
 
+            for protocol in self._get_stepped_protocols():
+                self._total_steps[protocol.id] += protocol.steps
+
             conditions_met = True
 
             for condition in self._conditions:
@@ -893,6 +1075,9 @@ class ConditionalGroup(ProtocolGroup):
 
             logging.info(f'Conditional criteria not yet met after {current_iteration} iterations')
 
+            if self._adaptive_sampling:
+                self._update_adaptive_steps()
+
     def can_merge(self, other):
         return super(ConditionalGroup, self).can_merge(other)
 
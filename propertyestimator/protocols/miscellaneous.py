@@ -3,6 +3,7 @@ A collection of protocols for running analysing the results of molecular simulat
 """
 import numpy as np
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.substances import Substance
 from propertyestimator.utils.exceptions import PropertyEstimatorException
 from propertyestimator.utils.quantities import EstimatedQuantity
@@ -35,6 +36,10 @@ class AddQuantities(BaseProtocol):
         """Constructs a new AddQuantities object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
+        self._lightweight = True
+
         self._values = None
         self._result = None
 
@@ -80,6 +85,10 @@ class SubtractQuantities(BaseProtocol):
         """Constructs a new AddQuantities object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
+        self._lightweight = True
+
         self._value_a = None
         self._value_b = None
 
@@ -123,6 +132,10 @@ class FilterSubstanceByRole(BaseProtocol):
         """Constructs a new AddQuantities object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
+        self._lightweight = True
+
         self._input_substance = None
         self._component_role = None
 
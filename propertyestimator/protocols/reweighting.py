@@ -2,6 +2,7 @@
 A collection of protocols for reweighting cached simulation data.
 """
 
+import hashlib
 import json
 import logging
 import sys
@@ -11,13 +12,18 @@ import numpy as np
 import pymbar
 from simtk import unit
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.substances import Substance
 from propertyestimator.thermodynamics import ThermodynamicState
 from propertyestimator.utils.exceptions import PropertyEstimatorException
-from propertyestimator.utils.openmm import setup_platform_with_resources
+from propertyestimator.utils.openmm import setup_platform_with_resources, deserialize_system, \
+    default_context_pool
 from propertyestimator.utils.quantities import EstimatedQuantity
 from propertyestimator.utils.serialization import TypedJSONDecoder
 from propertyestimator.utils.statistics import bootstrap
+from propertyestimator.utils.systems import load_force_field, create_smirnoff_system, hash_force_field, \
+    hash_topology
+from propertyestimator.utils.trajectories import TrajectorySegment, VirtualTrajectory
 from propertyestimator.workflow.decorators import protocol_input, protocol_output
 from propertyestimator.workflow.plugins import register_calculation_protocol
 from propertyestimator.workflow.protocols import BaseProtocol
@@ -27,6 +33,11 @@ from propertyestimator.workflow.protocols import BaseProtocol
 class UnpackStoredSimulationData(BaseProtocol):
     """Loads a `StoredSimulationData` object from disk,
     and makes its attributes easily accessible to other protocols.
+
+    Stored trajectories may be in any of the `TrajectoryFileFormat` formats
+    (e.g. a compressed XTC file). These are decoded transparently when they
+    are streamed by the protocols which consume them, and so are never
+    converted back into a full precision copy.
     """
 
     @protocol_input(tuple)
@@ -57,7 +68,8 @@ class UnpackStoredSimulationData(BaseProtocol):
 
     @protocol_output(str)
     def trajectory_file_path(self):
-        """A path to the stored simulation trajectory."""
+        """A path to the stored simulation trajectory, in any of
+        the supported `TrajectoryFileFormat` formats."""
         pass
 
     @protocol_output(str)
@@ -75,6 +87,8 @@ class UnpackStoredSimulationData(BaseProtocol):
         """Constructs a new UnpackStoredSimulationData object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._simulation_data_path = None
 
         self._substance = None
@@ -137,6 +151,10 @@ class UnpackStoredSimulationData(BaseProtocol):
 class ConcatenateTrajectories(BaseProtocol):
     """A protocol which concatenates multiple trajectories into
     a single one.
+
+    The trajectories are concatenated virtually - the output trajectory
+    only references the frames of the input trajectories, which are read
+    directly from the input files when the output is iterated over.
     """
 
     @protocol_input(list)
@@ -155,25 +173,25 @@ class ConcatenateTrajectories(BaseProtocol):
         the concatenated trajectory."""
         pass
 
-    @protocol_output(str)
-    def output_trajectory_path(self):
-        """The path to the concatenated trajectory."""
+    @protocol_output(VirtualTrajectory)
+    def output_trajectory(self):
+        """The concatenated trajectory."""
         pass
 
     def __init__(self, protocol_id):
         """Constructs a new AddQuantities object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._input_coordinate_paths = None
         self._input_trajectory_paths = None
 
         self._output_coordinate_path = None
-        self._output_trajectory_path = None
+        self._output_trajectory = None
 
     def execute(self, directory, available_resources):
 
-        import mdtraj
-
         if len(self._input_coordinate_paths) != len(self._input_trajectory_paths):
 
             return PropertyEstimatorException(directory=directory, message='There should be the same number of '
@@ -184,18 +202,12 @@ class ConcatenateTrajectories(BaseProtocol):
             return PropertyEstimatorException(directory=directory, message='No trajectories were '
                                                                            'given to concatenate.')
 
-        trajectories = []
-
-        for coordinate_path, trajectory_path in zip(self._input_coordinate_paths,
-                                                    self._input_trajectory_paths):
-
-            self._output_coordinate_path = self._output_coordinate_path or coordinate_path
-            trajectories.append(mdtraj.load_dcd(trajectory_path, coordinate_path))
+        self._output_coordinate_path = self._input_coordinate_paths[0]
 
-        output_trajectory = trajectories[0] if len(trajectories) == 1 else mdtraj.join(trajectories, True, False)
+        segments = [TrajectorySegment(trajectory_path, coordinate_path) for coordinate_path, trajectory_path in
+                    zip(self._input_coordinate_paths, self._input_trajectory_paths)]
 
-        self._output_trajectory_path = path.join(directory, 'output_trajectory.dcd')
-        output_trajectory.save_dcd(self._output_trajectory_path)
+        self._output_trajectory = VirtualTrajectory(segments)
 
         return self._get_output_dictionary()
 
@@ -212,14 +224,43 @@ class CalculateReducedPotentialOpenMM(BaseProtocol):
 
     @protocol_input(str)
     def system_path(self):
+        """The path to the system to calculate the reduced potentials with.
+        This is ignored if a `force_field_path` is set (is not empty)."""
         pass
 
     @protocol_input(str)
-    def coordinate_file_path(self):
+    def force_field_path(self):
+        """The path to the force field to parameterise the system with. If not
+        empty, the system is taken directly from the worker-local system template
+        cache (see `create_smirnoff_system`) rather than loaded from `system_path`."""
+        pass
+
+    @protocol_input(Substance)
+    def substance(self):
+        """The composition of the system. Only required if a
+        `force_field_path` is set."""
         pass
 
     @protocol_input(str)
-    def trajectory_file_path(self):
+    def charge_cache_path(self):
+        """The path to a `PartialChargeCache` to use when parameterising
+        the system from the `force_field_path`. If empty, no cache is used."""
+        pass
+
+    @protocol_input(unit.Quantity)
+    def nonbonded_cutoff(self):
+        """The cutoff after which non-bonded interactions are truncated when
+        parameterising the system from the `force_field_path`."""
+        pass
+
+    @protocol_input(str)
+    def coordinate_file_path(self):
+        pass
+
+    @protocol_input(VirtualTrajectory)
+    def trajectory(self):
+        """The (possibly virtually concatenated) trajectory to calculate
+        the reduced potentials of."""
         pass
 
     @protocol_output(np.ndarray)
@@ -230,28 +271,51 @@ class CalculateReducedPotentialOpenMM(BaseProtocol):
         """Constructs a new UnpackStoredSimulationData object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=None,
+                                                               number_of_gpus=1)
+
         self._thermodynamic_state = None
 
-        self._system_path = None
+        self._system_path = ''
         self._system = None
+        self._system_hash = None
+
+        self._force_field_path = ''
+        self._substance = Substance()
+        self._charge_cache_path = ''
+
+        self._nonbonded_cutoff = 1.0 * unit.nanometer
 
         self._coordinate_file_path = None
-        self._trajectory_file_path = None
 
-        self._reduced_potentials = None
+        self._trajectory = None
 
-    def execute(self, directory, available_resources):
+        self._reduced_potentials = None
 
-        import openmmtools
-        import mdtraj
+    def _create_context(self, box_vectors, available_resources):
+        """Borrows an OpenMM context for the system of interest from
+        the worker-local `default_context_pool`.
 
-        from simtk.openmm import XmlSerializer
+        Parameters
+        ----------
+        box_vectors: list of simtk.unit.Quantity
+            The default periodic box vectors of the system.
+        available_resources: ComputeResources
+            The resources available to run on.
 
-        with open(self._system_path, 'rb') as file:
-            self._system = XmlSerializer.deserialize(file.read().decode())
+        Returns
+        -------
+        openmmtools.states.ThermodynamicState
+            The thermodynamic state of the system.
+        PooledContext
+            The borrowed context, which must be returned to the pool.
+        """
+        import openmmtools
 
-        trajectory = mdtraj.load_dcd(self._trajectory_file_path, self._coordinate_file_path)
-        self._system.setDefaultPeriodicBoxVectors(*trajectory.openmm_boxes(0))
+        # The system is identified by the hash computed when it was loaded, rather
+        # than its current contents, so that the context can be reused for any
+        # trajectory of the same system.
+        self._system.setDefaultPeriodicBoxVectors(*box_vectors)
 
         openmm_state = openmmtools.states.ThermodynamicState(system=self._system,
                                                              temperature=self._thermodynamic_state.temperature,
@@ -262,22 +326,97 @@ class CalculateReducedPotentialOpenMM(BaseProtocol):
         # Setup the requested platform:
         platform = setup_platform_with_resources(available_resources)
 
-        context_cache = openmmtools.cache.ContextCache(platform)
-        openmm_context, openmm_context_integrator = context_cache.get_context(openmm_state,
-                                                                              integrator)
+        state_key = (str(self._thermodynamic_state.temperature), str(self._thermodynamic_state.pressure))
+
+        pooled_context = default_context_pool.acquire(openmm_state.system, integrator, platform,
+                                                      state_key, self._system_hash, openmm_state.create_context)
+
+        return openmm_state, pooled_context
+
+    def _load_system(self):
+        """Loads the system of interest, either by parameterising it with
+        the force field at `force_field_path`, or from `system_path`, along
+        with a hash which identifies it."""
+
+        if len(self._force_field_path) == 0:
+
+            self._system, self._system_hash = deserialize_system(self._system_path, return_hash=True)
+            return
+
+        from simtk.openmm import app
+
+        force_field = load_force_field(self._force_field_path)
+        topology = app.PDBFile(self._coordinate_file_path).topology
+
+        self._system = create_smirnoff_system(force_field, topology, self._substance,
+                                              self._nonbonded_cutoff, self._charge_cache_path)
+
+        # A parameterised system is fully determined by its topology, force field and
+        # cutoff, which are much cheaper to hash than the serialized system.
+        system_hash = hashlib.sha256()
+
+        system_hash.update(hash_topology(topology).encode())
+        system_hash.update(hash_force_field(force_field).encode())
+        system_hash.update(str(self._nonbonded_cutoff).encode())
+
+        self._system_hash = system_hash.hexdigest()
+
+    def execute(self, directory, available_resources):
+
+        if len(self._force_field_path) == 0 and len(self._system_path) == 0:
+
+            return PropertyEstimatorException(directory=directory,
+                                              message='Either a system_path or a force_field_path '
+                                                      'must be set.')
+
+        if len(self._force_field_path) > 0 and self._substance.number_of_components == 0:
+
+            return PropertyEstimatorException(directory=directory,
+                                              message='A substance must be set to parameterise the '
+                                                      'system from the force_field_path.')
+
+        try:
+
+            self._load_system()
+
+        except Exception as e:
+
+            return PropertyEstimatorException(directory=directory,
+                                              message='{} could not load the system: {}'.format(self.id, e))
 
-        reduced_potentials = np.zeros(trajectory.n_frames)
+        trajectory = self._trajectory
 
-        for frame_index in range(trajectory.n_frames):
+        openmm_state = None
+        pooled_context = None
 
-            positions = trajectory.openmm_positions(frame_index)
-            box_vectors = trajectory.openmm_boxes(frame_index)
+        reduced_potentials = np.zeros(len(trajectory))
+        frame_index = 0
 
-            openmm_context.setPeriodicBoxVectors(*box_vectors)
-            openmm_context.setPositions(positions)
+        try:
 
-            # set box vectors
-            reduced_potentials[frame_index] = openmm_state.reduced_potential(openmm_context)
+            # Stream the frames of the trajectory from disk, rather
+            # than loading the full trajectory into memory.
+            for trajectory_chunk in trajectory.iterate_chunks():
+
+                if pooled_context is None:
+                    openmm_state, pooled_context = self._create_context(trajectory_chunk.openmm_boxes(0),
+                                                                        available_resources)
+
+                for chunk_frame_index in range(trajectory_chunk.n_frames):
+
+                    positions = trajectory_chunk.openmm_positions(chunk_frame_index)
+                    box_vectors = trajectory_chunk.openmm_boxes(chunk_frame_index)
+
+                    pooled_context.context.setPeriodicBoxVectors(*box_vectors)
+                    pooled_context.context.setPositions(positions)
+
+                    reduced_potentials[frame_index] = openmm_state.reduced_potential(pooled_context.context)
+                    frame_index += 1
+
+        finally:
+
+            if pooled_context is not None:
+                default_context_pool.release(pooled_context)
 
         self._reduced_potentials = reduced_potentials
 
@@ -338,6 +477,8 @@ class ReweightWithMBARProtocol(BaseProtocol):
         """Constructs a new ReweightWithMBARProtocol object."""
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=1)
+
         self._reference_reduced_potentials = None
         self._reference_observables = None
 
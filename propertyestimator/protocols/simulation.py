@@ -4,15 +4,16 @@ A collection of protocols for running molecular simulations.
 
 import logging
 import yaml
-from os import path
+from os import path, unlink
 
 from simtk import unit, openmm
 from simtk.openmm import app
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.thermodynamics import ThermodynamicState, Ensemble
-from propertyestimator.utils import statistics
 from propertyestimator.utils.exceptions import PropertyEstimatorException
-from propertyestimator.utils.openmm import setup_platform_with_resources
+from propertyestimator.utils.openmm import setup_platform_with_resources, StatisticsReporter, deserialize_system, \
+    default_context_pool, create_simulation
 from propertyestimator.workflow.decorators import protocol_input, protocol_output, MergeBehaviour
 from propertyestimator.workflow.plugins import register_calculation_protocol
 from propertyestimator.workflow.protocols import BaseProtocol
@@ -44,6 +45,9 @@ class RunEnergyMinimisation(BaseProtocol):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=None,
+                                                               number_of_gpus=1)
+
         # inputs
         self._input_coordinate_file = None
 
@@ -61,23 +65,39 @@ class RunEnergyMinimisation(BaseProtocol):
 
         input_pdb_file = app.PDBFile(self._input_coordinate_file)
 
-        with open(self._system_path, 'rb') as file:
-            self._system = openmm.XmlSerializer.deserialize(file.read().decode())
+        self._system, system_hash = deserialize_system(self._system_path, read_only=True, return_hash=True)
 
         integrator = openmm.VerletIntegrator(0.002 * unit.picoseconds)
-        simulation = app.Simulation(input_pdb_file.topology, self._system, integrator, platform)
 
-        box_vectors = input_pdb_file.topology.getPeriodicBoxVectors()
+        pooled_context = default_context_pool.acquire(self._system, integrator, platform, system_hash=system_hash)
+
+        try:
+
+            simulation = create_simulation(input_pdb_file.topology, self._system,
+                                           pooled_context.integrator, pooled_context.context)
+
+            box_vectors = input_pdb_file.topology.getPeriodicBoxVectors()
 
-        if box_vectors is None:
-            box_vectors = simulation.system.getDefaultPeriodicBoxVectors()
+            if box_vectors is None:
+                box_vectors = simulation.system.getDefaultPeriodicBoxVectors()
 
-        simulation.context.setPeriodicBoxVectors(*box_vectors)
-        simulation.context.setPositions(input_pdb_file.positions)
+            simulation.context.setPeriodicBoxVectors(*box_vectors)
+            simulation.context.setPositions(input_pdb_file.positions)
 
-        simulation.minimizeEnergy()
+            simulation.minimizeEnergy()
 
-        positions = simulation.context.getState(getPositions=True).getPositions()
+            positions = simulation.context.getState(getPositions=True).getPositions()
+
+        except Exception as e:
+
+            # The context may have been left in an invalid state,
+            # and so is not returned to the pool.
+            default_context_pool.discard(pooled_context)
+
+            return PropertyEstimatorException(directory=directory,
+                                              message='Energy minimisation failed: {}'.format(e))
+
+        default_context_pool.release(pooled_context)
 
         self._output_coordinate_file = path.join(directory, 'minimised.pdb')
 
@@ -93,6 +113,15 @@ class RunEnergyMinimisation(BaseProtocol):
 class RunOpenMMSimulation(BaseProtocol):
     """Performs a molecular dynamics simulation in a given ensemble using
     an OpenMM backend.
+
+    When executed repeatedly (e.g. as part of a `ConditionalGroup`), or when
+    restarted from a checkpoint, the simulation is continued, and the newly
+    sampled frames and statistics are appended to the existing trajectory and
+    statistics files.
+
+    The OpenMM context used to run the simulation is borrowed from the worker-local
+    `default_context_pool` for the duration of each execution, and the state of the
+    simulation is checkpointed before the context is returned.
     """
 
     @protocol_input(int, merge_behavior=MergeBehaviour.GreatestValue)
@@ -100,6 +129,19 @@ class RunOpenMMSimulation(BaseProtocol):
         """The number of timesteps to evolve the system by."""
         pass
 
+    @protocol_input(bool)
+    def use_reduced_steps(self):
+        """If true, the system will only be evolved by `reduced_steps` rather
+        than by `steps` (for example, when equilibrating coordinates which were
+        taken from a previously equilibrated system)."""
+        pass
+
+    @protocol_input(int, merge_behavior=MergeBehaviour.GreatestValue)
+    def reduced_steps(self):
+        """The number of timesteps to evolve the system by when
+        `use_reduced_steps` is true."""
+        pass
+
     @protocol_input(unit.Quantity, merge_behavior=MergeBehaviour.SmallestValue)
     def thermostat_friction(self):
         """The thermostat friction coefficient."""
@@ -154,8 +196,14 @@ class RunOpenMMSimulation(BaseProtocol):
 
         super().__init__(protocol_id)
 
+        self._resource_requirements = TaskResourceRequirements(number_of_threads=None,
+                                                               number_of_gpus=1)
+
         self._steps = 1000
 
+        self._use_reduced_steps = False
+        self._reduced_steps = 0
+
         self._thermostat_friction = 1.0 / unit.picoseconds
         self._timestep = 0.001 * unit.picoseconds
 
@@ -163,9 +211,6 @@ class RunOpenMMSimulation(BaseProtocol):
 
         self._ensemble = Ensemble.NPT
 
-        # keep a track of the simulation object in case we need to restart.
-        self._simulation_object = None
-
         # inputs
         self._input_coordinate_file = None
         self._thermodynamic_state = None
@@ -179,8 +224,6 @@ class RunOpenMMSimulation(BaseProtocol):
         self._trajectory_file_path = None
         self._statistics_file_path = None
 
-        self._temporary_statistics_path = None
-
     def execute(self, directory, available_resources):
 
         temperature = self._thermodynamic_state.temperature
@@ -199,34 +242,44 @@ class RunOpenMMSimulation(BaseProtocol):
 
         logging.info('Performing a simulation in the ' + str(self._ensemble) + ' ensemble: ' + self.id)
 
-        if self._simulation_object is None:
-
-            # Set up the simulation object if one does not already exist
-            # (if this protocol is part of a conditional group for e.g.
-            # the simulation object will most likely persist without the
-            # need to recreate it at each iteration.)
-            self._simulation_object = self._setup_simulation_object(directory,
-                                                                    temperature,
-                                                                    pressure,
-                                                                    available_resources)
+        simulation, statistics_reporter, pooled_context = self._setup_simulation_object(directory,
+                                                                                        temperature,
+                                                                                        pressure,
+                                                                                        available_resources)
 
         try:
-            self._simulation_object.step(self._steps)
+
+            simulation.step(self._reduced_steps if self._use_reduced_steps else self._steps)
+
+            state = simulation.context.getState(getPositions=True)
+
+            with open(path.join(directory, 'checkpoint.chk'), 'wb') as file:
+                file.write(simulation.context.createCheckpoint())
+
         except Exception as e:
 
+            # The context may have been left in an invalid state,
+            # and so is not returned to the pool.
+            statistics_reporter.close()
+            simulation.reporters.clear()
+
+            default_context_pool.discard(pooled_context)
+
             return PropertyEstimatorException(directory=directory,
                                               message='Simulation failed: {}'.format(e))
 
-        # Save the newly generated statistics data as a pandas csv file.
-        pressure = None if self._ensemble == Ensemble.NVT else self._thermodynamic_state.pressure
+        # Make sure the reporters close their files before the
+        # context is made available to other protocols.
+        statistics_reporter.close()
+        simulation.reporters.clear()
+        del simulation
 
-        working_statistics = statistics.StatisticsArray.from_openmm_csv(self._temporary_statistics_path, pressure)
-        working_statistics.save_as_pandas_csv(self._statistics_file_path)
+        default_context_pool.release(pooled_context)
 
-        positions = self._simulation_object.context.getState(getPositions=True).getPositions()
+        positions = state.getPositions()
 
         topology = app.PDBFile(self._input_coordinate_file).topology
-        topology.setPeriodicBoxVectors(self._simulation_object.context.getState().getPeriodicBoxVectors())
+        topology.setPeriodicBoxVectors(state.getPeriodicBoxVectors())
 
         self._output_coordinate_file = path.join(directory, 'output.pdb')
 
@@ -240,7 +293,8 @@ class RunOpenMMSimulation(BaseProtocol):
         return self._get_output_dictionary()
 
     def _setup_simulation_object(self, directory, temperature, pressure, available_resources):
-        """Creates a new OpenMM simulation object.
+        """Creates a new OpenMM simulation object around a context borrowed
+        from the `default_context_pool`.
 
         Parameters
         ----------
@@ -252,16 +306,24 @@ class RunOpenMMSimulation(BaseProtocol):
             The pressure at which to run the simulation
         available_resources: ComputeResources
             The resources available to run on.
+
+        Returns
+        -------
+        simtk.openmm.app.Simulation
+            The created simulation object.
+        StatisticsReporter
+            The reporter which writes the statistics file, which must be
+            closed once the simulation has finished.
+        PooledContext
+            The borrowed context, which must be returned to the pool.
         """
         import openmmtools
-        from simtk.openmm import XmlSerializer
 
         platform = setup_platform_with_resources(available_resources)
 
         input_pdb_file = app.PDBFile(self._input_coordinate_file)
 
-        with open(self._system_path, 'rb') as file:
-            self._system = XmlSerializer.deserialize(file.read().decode())
+        self._system, system_hash = deserialize_system(self._system_path, read_only=True, return_hash=True)
 
         openmm_state = openmmtools.states.ThermodynamicState(system=self._system,
                                                              temperature=temperature,
@@ -271,14 +333,79 @@ class RunOpenMMSimulation(BaseProtocol):
                                                self._thermostat_friction,
                                                self._timestep)
 
-        simulation = app.Simulation(input_pdb_file.topology,
-                                    openmm_state.get_system(True),
-                                    integrator,
-                                    platform)
+        system = openmm_state.get_system(True)
+
+        # The system is fully determined by the contents of the system file and the
+        # thermodynamic state, and so does not need to be hashed itself.
+        pooled_context = default_context_pool.acquire(system, integrator, platform,
+                                                      (str(temperature), str(pressure)), system_hash)
+
+        try:
+
+            simulation, statistics_reporter = self._setup_pooled_simulation(directory, temperature, pressure,
+                                                                            input_pdb_file, system, pooled_context)
+
+        except Exception:
+
+            # The context may have been left in an invalid state,
+            # and so is not returned to the pool.
+            default_context_pool.discard(pooled_context)
+            raise
+
+        return simulation, statistics_reporter, pooled_context
+
+    def _setup_pooled_simulation(self, directory, temperature, pressure, input_pdb_file, system, pooled_context):
+        """Creates a new OpenMM simulation object around a context borrowed
+        from the `default_context_pool`, either loading its state from a
+        checkpoint or populating it from the input coordinates.
+
+        Parameters
+        ----------
+        directory: str
+            The directory in which the object will produce output files.
+        temperature: unit.Quantiy
+            The temperature at which to run the simulation
+        pressure: unit.Quantiy
+            The pressure at which to run the simulation
+        input_pdb_file: simtk.openmm.app.PDBFile
+            The file containing the input coordinates.
+        system: simtk.openmm.System
+            The system which the context was created from.
+        pooled_context: PooledContext
+            The borrowed context.
+
+        Returns
+        -------
+        simtk.openmm.app.Simulation
+            The created simulation object.
+        StatisticsReporter
+            The reporter which writes the statistics file.
+        """
+
+        # A borrowed context retains the integrator settings of its previous borrower.
+        pooled_context.integrator.setTemperature(temperature)
+        pooled_context.integrator.setFriction(self._thermostat_friction)
+        pooled_context.integrator.setStepSize(self._timestep)
+
+        simulation = create_simulation(input_pdb_file.topology,
+                                       system,
+                                       pooled_context.integrator,
+                                       pooled_context.context)
 
         checkpoint_path = path.join(directory, 'checkpoint.chk')
 
-        if path.isfile(checkpoint_path):
+        trajectory_path = path.join(directory, 'trajectory.dcd')
+        statistics_path = path.join(directory, 'statistics.bin')
+
+        self._trajectory_file_path = trajectory_path
+        self._statistics_file_path = statistics_path
+
+        is_restarting = path.isfile(checkpoint_path)
+
+        if not is_restarting and path.isfile(statistics_path):
+            unlink(statistics_path)
+
+        if is_restarting:
 
             # Load the simulation state from a checkpoint file.
             with open(checkpoint_path, 'rb') as f:
@@ -296,14 +423,6 @@ class RunOpenMMSimulation(BaseProtocol):
             simulation.context.setPositions(input_pdb_file.positions)
             simulation.context.setVelocitiesToTemperature(temperature)
 
-        trajectory_path = path.join(directory, 'trajectory.dcd')
-        statistics_path = path.join(directory, 'statistics.csv')
-
-        self._temporary_statistics_path = path.join(directory, 'temp_statistics.csv')
-
-        self._trajectory_file_path = trajectory_path
-        self._statistics_file_path = statistics_path
-
         configuration_path = path.join(directory, 'input.pdb')
 
         with open(configuration_path, 'w+') as configuration_file:
@@ -311,16 +430,19 @@ class RunOpenMMSimulation(BaseProtocol):
             app.PDBFile.writeFile(input_pdb_file.topology,
                                   input_pdb_file.positions, configuration_file)
 
-        simulation.reporters.append(app.DCDReporter(trajectory_path, self._output_frequency))
-
-        simulation.reporters.append(app.StateDataReporter(self._temporary_statistics_path, self._output_frequency,
-                                                          step=True, potentialEnergy=True, kineticEnergy=True,
-                                                          totalEnergy=True, temperature=True, volume=True,
-                                                          density=True))
+        append_trajectory = is_restarting and path.isfile(trajectory_path)
+        simulation.reporters.append(app.DCDReporter(trajectory_path, self._output_frequency, append_trajectory))
 
         simulation.reporters.append(app.CheckpointReporter(checkpoint_path, self._output_frequency))
 
-        return simulation
+        # Statistics are appended directly to a binary statistics file as they are
+        # generated, so there is no need to convert them after the simulation.
+        reporter_pressure = None if self._ensemble == Ensemble.NVT else pressure
+
+        statistics_reporter = StatisticsReporter(statistics_path, self._output_frequency, reporter_pressure)
+        simulation.reporters.append(statistics_reporter)
+
+        return simulation, statistics_reporter
 
 
 @register_calculation_protocol()
@@ -4,18 +4,37 @@ Property calculator 'server' side API.
 
 import json
 import logging
+import time
 import uuid
 from os import path, makedirs
 
+from simtk import unit
+
 from tornado.ioloop import IOLoop
 from tornado.iostream import StreamClosedError
 from tornado.tcpserver import TCPServer
+from tornado.web import Application, RequestHandler
 
 from propertyestimator.client import PropertyEstimatorSubmission, PropertyEstimatorResult, PropertyEstimatorOptions
 from propertyestimator.layers import available_layers
 from propertyestimator.utils.exceptions import PropertyEstimatorException
+from propertyestimator.utils.metrics import MetricsRegistry, default_registry
 from propertyestimator.utils.serialization import TypedBaseModel
 from propertyestimator.utils.tcp import PropertyEstimatorMessageTypes, pack_int, unpack_int
+from propertyestimator.utils.tracing import merge_trace_files
+from propertyestimator.workflow.runtimes import ProtocolRuntimeDatabase, ProtocolCostModel
+
+
+class _MetricsRequestHandler(RequestHandler):
+    """Serves the metrics of a set of registries in the Prometheus text format."""
+
+    def initialize(self, registries):
+        self._registries = registries
+
+    def get(self):
+
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(''.join(registry.render() for registry in self._registries))
 
 
 class PropertyEstimatorServer(TCPServer):
@@ -62,7 +81,9 @@ class PropertyEstimatorServer(TCPServer):
         in a fixed ratio)
         """
 
-        def __init__(self, estimation_id='', queued_properties=None, options=None, force_field_id=None):
+        def __init__(self, estimation_id='', queued_properties=None, options=None, force_field_id=None,
+                     runtime_database_path=None, trace_directory=None, profiled_protocol_types=None,
+                     molecule_cache_directory=None):
             """Constructs a new ServerEstimationRequest object.
 
             Parameters
@@ -75,6 +96,17 @@ class PropertyEstimatorServer(TCPServer):
                 The options used to estimate the properties.
             force_field_id: str
                 The unique server side id of the force field parameters used to estimate the properties.
+            runtime_database_path: str, optional
+                The path to the database in which to record the runtimes of any protocols
+                executed while estimating the properties.
+            trace_directory: str, optional
+                The directory in which to save traces of where time is spent while
+                estimating the properties. If `None`, no traces will be saved.
+            profiled_protocol_types: list of str, optional
+                The types of protocol which should be executed under `cProfile`.
+            molecule_cache_directory: str, optional
+                The directory in which the workers should cache the molecules
+                which they create while estimating the properties.
             """
             self.id = estimation_id
 
@@ -89,6 +121,13 @@ class PropertyEstimatorServer(TCPServer):
 
             self.force_field_id = force_field_id
 
+            self.runtime_database_path = runtime_database_path
+
+            self.trace_directory = trace_directory
+            self.profiled_protocol_types = profiled_protocol_types
+
+            self.molecule_cache_directory = molecule_cache_directory
+
         def __getstate__(self):
             return {
                 'id': self.id,
@@ -103,6 +142,13 @@ class PropertyEstimatorServer(TCPServer):
                 'options': self.options,
 
                 'force_field_id': self.force_field_id,
+
+                'runtime_database_path': self.runtime_database_path,
+
+                'trace_directory': self.trace_directory,
+                'profiled_protocol_types': self.profiled_protocol_types,
+
+                'molecule_cache_directory': self.molecule_cache_directory
             }
 
         def __setstate__(self, state):
@@ -119,8 +165,17 @@ class PropertyEstimatorServer(TCPServer):
 
             self.force_field_id = state['force_field_id']
 
+            self.runtime_database_path = state['runtime_database_path']
+
+            self.trace_directory = state['trace_directory']
+            self.profiled_protocol_types = state['profiled_protocol_types']
+
+            self.molecule_cache_directory = state.get('molecule_cache_directory', None)
+
     def __init__(self, calculation_backend, storage_backend,
-                 port=8000, working_directory='working-data'):
+                 port=8000, working_directory='working-data', runtime_database_path=None,
+                 enable_tracing=False, profiled_protocol_types=None, metrics_port=None,
+                 molecule_cache_directory=None):
         """Constructs a new PropertyEstimatorServer object.
 
         Parameters
@@ -133,6 +188,31 @@ class PropertyEstimatorServer(TCPServer):
             The port on which to listen for incoming client requests.
         working_directory: str
             The local directory in which to store all local, temporary calculation data.
+        runtime_database_path: str, optional
+            The path to the database in which to record how long each executed protocol
+            took to run. If `None`, the database will be stored in the `working_directory`.
+        enable_tracing: bool
+            If true, a trace of where time was spent while estimating the properties of
+            each server request will be saved in the `traces` subdirectory of the
+            `working_directory`, as a `{request_id}.trace.json` file in the Chrome trace
+            event format.
+        profiled_protocol_types: list of str, optional
+            The types of protocol which should be executed under `cProfile` when tracing
+            is enabled. The profiles will be saved alongside the traces.
+        metrics_port: int, optional
+            The port on which to serve metrics about the server (such as the depth
+            of the request queue and the throughput of each layer) over HTTP, in the
+            Prometheus text format at the `/metrics` path. If `None`, no metrics will
+            be served. Only the metrics tracked within this process are served, and so
+            the metrics of any workers which run in separate processes (such as the hit
+            rates of their caches) must be served by the workers themselves by setting
+            the `PROPERTYESTIMATOR_WORKER_METRICS_PORT` environment variable of the
+            workers (see `serve_worker_metrics`).
+        molecule_cache_directory: str, optional
+            The directory in which the workers will cache the molecules which they create
+            from smiles patterns, so that they can be shared between workers and reused by
+            later requests. This should be accessible by all of the workers. If `None`, the
+            molecules will be cached in the `working_directory`.
         """
 
         assert calculation_backend is not None and storage_backend is not None
@@ -147,6 +227,28 @@ class PropertyEstimatorServer(TCPServer):
         if not path.isdir(self._working_directory):
             makedirs(self._working_directory)
 
+        if runtime_database_path is None:
+            runtime_database_path = path.join(self._working_directory, 'protocol_runtimes.sqlite')
+
+        self._runtime_database_path = path.abspath(runtime_database_path)
+
+        self._runtime_database = ProtocolRuntimeDatabase(self._runtime_database_path)
+        self._cost_model = ProtocolCostModel(self._runtime_database)
+
+        self._enable_tracing = enable_tracing
+        self._profiled_protocol_types = profiled_protocol_types
+
+        self._trace_directory = path.abspath(path.join(self._working_directory, 'traces'))
+
+        if molecule_cache_directory is None:
+            molecule_cache_directory = path.join(self._working_directory, 'molecule_cache')
+
+        self._molecule_cache_directory = path.abspath(molecule_cache_directory)
+
+        # The calculation layer which each server request is currently being
+        # processed by, and the time at which it was submitted to that layer.
+        self._active_layers = {}
+
         self._queued_calculations = {}
         self._finished_calculations = {}
 
@@ -159,6 +261,16 @@ class PropertyEstimatorServer(TCPServer):
         # properties per substance.
         self._server_request_ids_per_client_id = {}
 
+        # The time at which each server request was first scheduled.
+        self._request_start_times = {}
+
+        self._metrics_port = metrics_port
+        self._metrics_server = None
+
+        self._last_runtime_timestamp = time.time()
+
+        self._setup_metrics()
+
         super().__init__()
 
         self.bind(self._port)
@@ -166,6 +278,87 @@ class PropertyEstimatorServer(TCPServer):
 
         calculation_backend.start()
 
+        if self._metrics_port is not None:
+
+            metrics_application = Application([(r'/metrics', _MetricsRequestHandler,
+                                                 {'registries': [self._metrics_registry, default_registry]})])
+
+            self._metrics_server = metrics_application.listen(self._metrics_port)
+
+    def _setup_metrics(self):
+        """Registers the metrics which are tracked by this server.
+
+        The metrics which describe the server itself are held in a registry owned
+        by the server, so that they start from zero for each new server created
+        in the same process. The storage lookup counter is shared with the
+        calculation layers, and so, like the other worker metrics, remains
+        in the process wide `default_registry`. Worker metrics are per process,
+        and so are only included here for workers which run within this process.
+        """
+
+        self._metrics_registry = MetricsRegistry()
+
+        self._submissions_counter = self._metrics_registry.counter(
+            'propertyestimator_submissions_total',
+            'The number of requests submitted by clients.')
+        self._submitted_properties_counter = self._metrics_registry.counter(
+            'propertyestimator_submitted_properties_total',
+            'The number of properties submitted for estimation by clients.')
+
+        self._queries_counter = self._metrics_registry.counter(
+            'propertyestimator_queries_total',
+            'The number of request status queries made by clients.')
+
+        self._queued_requests_gauge = self._metrics_registry.gauge(
+            'propertyestimator_queued_requests',
+            'The number of server requests currently queued.')
+        self._finished_requests_gauge = self._metrics_registry.gauge(
+            'propertyestimator_finished_requests',
+            'The number of server requests which have finished.')
+
+        self._layer_transitions_counter = self._metrics_registry.counter(
+            'propertyestimator_layer_transitions_total',
+            'The number of times a server request was passed to a calculation layer.', ('layer',))
+        self._layer_duration_histogram = self._metrics_registry.histogram(
+            'propertyestimator_layer_duration_seconds',
+            'How long calculation layers took to process a server request.', ('layer',))
+
+        self._request_duration_histogram = self._metrics_registry.histogram(
+            'propertyestimator_request_duration_seconds',
+            'How long server requests took to be processed by all calculation layers.')
+        self._finished_properties_counter = self._metrics_registry.counter(
+            'propertyestimator_finished_properties_total',
+            'The number of properties which were either estimated, or could not be.', ('outcome',))
+
+        self._storage_lookups_counter = default_registry.counter('propertyestimator_storage_lookups_total',
+                                                                 'The number of lookups of the storage backend.',
+                                                                 ('kind', 'outcome'))
+
+        self._protocol_runtime_histogram = self._metrics_registry.histogram(
+            'propertyestimator_protocol_runtime_seconds',
+            'How long protocols took to execute.', ('protocol_type', 'outcome'))
+
+        self._metrics_registry.add_collector(self._collect_metrics)
+
+    def _collect_metrics(self):
+        """Updates the metrics which are derived from the state of
+        the server just before they are rendered."""
+
+        self._queued_requests_gauge.set_value(len(self._queued_calculations))
+        self._finished_requests_gauge.set_value(len(self._finished_calculations))
+
+        # Protocols are executed by the calculation backend, so their
+        # runtimes are collected from the runtime database.
+        for record in self._runtime_database.query(since=self._last_runtime_timestamp):
+
+            outcome = 'succeeded' if record.succeeded else 'failed'
+
+            self._protocol_runtime_histogram.observe(record.runtime,
+                                                     protocol_type=record.protocol_type,
+                                                     outcome=outcome)
+
+            self._last_runtime_timestamp = max(self._last_runtime_timestamp, record.timestamp)
+
     async def _handle_job_submission(self, stream, address, message_length):
         """An asynchronous routine for handling the receiving and processing
         of job submissions from a client.
@@ -193,6 +386,9 @@ class PropertyEstimatorServer(TCPServer):
         # TODO: Add exception handling so the server can gracefully reject bad json.
         client_data_model = PropertyEstimatorSubmission.parse_json(json_model)
 
+        self._submissions_counter.increment()
+        self._submitted_properties_counter.increment(len(client_data_model.properties))
+
         client_request_id = str(uuid.uuid4())
 
         while client_request_id in self._server_request_ids_per_client_id:
@@ -233,6 +429,8 @@ class PropertyEstimatorServer(TCPServer):
         encoded_request_id = await stream.read_bytes(message_length)
         client_request_id = encoded_request_id.decode()
 
+        self._queries_counter.increment()
+
         response = None
 
         if client_request_id not in self._server_request_ids_per_client_id:
@@ -372,6 +570,9 @@ class PropertyEstimatorServer(TCPServer):
         force_field = client_data_model.force_field
         force_field_id = self._storage_backend.has_force_field(force_field)
 
+        self._storage_lookups_counter.increment(kind='force_field',
+                                                outcome='miss' if force_field_id is None else 'hit')
+
         if force_field_id is None:
 
             force_field_id = str(uuid.uuid4())
@@ -405,10 +606,19 @@ class PropertyEstimatorServer(TCPServer):
 
             options_copy = PropertyEstimatorOptions.parse_json(client_data_model.options.json())
 
+            trace_directory = None
+
+            if self._enable_tracing:
+                trace_directory = path.join(self._trace_directory, calculation_id)
+
             request = self.ServerEstimationRequest(estimation_id=calculation_id,
                                                    queued_properties=properties_to_estimate,
                                                    options=options_copy,
-                                                   force_field_id=force_field_id)
+                                                   force_field_id=force_field_id,
+                                                   runtime_database_path=self._runtime_database_path,
+                                                   trace_directory=trace_directory,
+                                                   profiled_protocol_types=self._profiled_protocol_types,
+                                                   molecule_cache_directory=self._molecule_cache_directory)
 
             server_requests[calculation_id] = request
 
@@ -428,6 +638,7 @@ class PropertyEstimatorServer(TCPServer):
                 existing_id = server_request_id
 
                 self._queued_calculations[server_request_id] = server_request
+                self._request_start_times[server_request_id] = time.time()
 
             self._server_request_ids_per_client_id[client_request_id].append(existing_id)
 
@@ -500,8 +711,65 @@ class PropertyEstimatorServer(TCPServer):
 
             request_results.exceptions.extend(server_request.exceptions)
 
+        request_results.estimated_time_remaining = self._estimate_time_remaining(client_request_id)
+
         return request_results
 
+    def _estimate_time_remaining(self, client_request_id):
+        """Estimates how long it will take for all of the properties queued as
+        part of a client request to be estimated by the layer which they are currently
+        being processed by, assuming that the independent parts of each calculation
+        will run in parallel.
+
+        Parameters
+        ----------
+        client_request_id: str
+            The id of the client request.
+
+        Returns
+        -------
+        simtk.unit.Quantity
+            The estimated time remaining.
+        """
+
+        self._cost_model.refresh()
+
+        predicted_runtimes = {}
+        time_remaining = 0.0
+
+        for server_request_id in self._server_request_ids_per_client_id[client_request_id]:
+
+            if (server_request_id not in self._queued_calculations or
+                server_request_id not in self._active_layers):
+
+                continue
+
+            server_request = self._queued_calculations[server_request_id]
+            layer_type, launch_time = self._active_layers[server_request_id]
+
+            elapsed_time = time.time() - launch_time
+
+            for physical_property in server_request.queued_properties:
+
+                property_type = type(physical_property).__name__
+
+                if (server_request.options.workflow_schemas is None or
+                    property_type not in server_request.options.workflow_schemas or
+                    layer_type not in server_request.options.workflow_schemas[property_type]):
+
+                    continue
+
+                if (property_type, layer_type) not in predicted_runtimes:
+
+                    workflow_schema = server_request.options.workflow_schemas[property_type][layer_type]
+                    predicted_runtime = self._cost_model.predict_workflow(workflow_schema)
+
+                    predicted_runtimes[(property_type, layer_type)] = predicted_runtime
+
+                time_remaining = max(time_remaining, predicted_runtimes[(property_type, layer_type)] - elapsed_time)
+
+        return time_remaining * unit.second
+
     def _schedule_server_request(self, server_request):
         """Schedules the estimation of the requested properties.
 
@@ -515,6 +783,11 @@ class PropertyEstimatorServer(TCPServer):
             should be performed.
         """
 
+        if server_request.id in self._active_layers:
+
+            previous_layer_type, launch_time = self._active_layers[server_request.id]
+            self._layer_duration_histogram.observe(time.time() - launch_time, layer=previous_layer_type)
+
         if len(server_request.options.allowed_calculation_layers) == 0 or \
            len(server_request.queued_properties) == 0:
 
@@ -533,6 +806,30 @@ class PropertyEstimatorServer(TCPServer):
             self._queued_calculations.pop(server_request.id)
             self._finished_calculations[server_request.id] = server_request
 
+            self._active_layers.pop(server_request.id, None)
+
+            if server_request.id in self._request_start_times:
+
+                start_time = self._request_start_times.pop(server_request.id)
+                self._request_duration_histogram.observe(time.time() - start_time)
+
+            self._finished_properties_counter.increment(sum(len(properties) for properties in
+                                                            server_request.estimated_properties.values()),
+                                                        outcome='estimated')
+            self._finished_properties_counter.increment(sum(len(properties) for properties in
+                                                            server_request.unsuccessful_properties.values()),
+                                                        outcome='unsuccessful')
+
+            if server_request.trace_directory is not None:
+
+                try:
+
+                    merge_trace_files(server_request.trace_directory,
+                                      path.join(self._trace_directory, f'{server_request.id}.trace.json'))
+
+                except Exception as e:
+                    logging.warning(f'Could not save the trace of server request {server_request.id}: {e}')
+
             logging.info(f'Finished server request {server_request.id}')
             return
 
@@ -561,6 +858,9 @@ class PropertyEstimatorServer(TCPServer):
 
         current_layer = available_layers[current_layer_type]
 
+        self._active_layers[server_request.id] = (current_layer_type, time.time())
+        self._layer_transitions_counter.increment(layer=current_layer_type)
+
         current_layer.schedule_calculation(self._calculation_backend,
                                            self._storage_backend,
                                            layer_directory,
@@ -583,4 +883,8 @@ class PropertyEstimatorServer(TCPServer):
         provided backend.
         """
         self._calculation_backend.stop()
+
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
+
         IOLoop.current().stop()
@@ -1,6 +1,9 @@
 """
 A collection of classes representing data stored by a storage backend.
 """
+from os import path
+
+from propertyestimator.utils.files import calculate_file_checksum
 
 
 class StoredSimulationData:
@@ -21,11 +24,57 @@ class StoredSimulationData:
         self.coordinate_file_name = None
         self.trajectory_file_name = None
 
+        # The number of molecules of each component (keyed by the
+        # component identifier) present in the stored coordinates.
+        self.number_of_molecules = None
+
         self.statistics_file_name = None
         self.statistical_inefficiency = 0.0
 
+        # The number of uncorrelated samples in the stored data.
+        self.effective_samples = None
+
         self.force_field_id = None
 
+        self.file_checksums = {}
+
+    def validate_files(self, data_directory):
+        """Checks that each of the stored files exists, and that its
+        contents match the checksum which was recorded when it was captured.
+
+        Parameters
+        ----------
+        data_directory: str
+            The directory which contains the stored files.
+
+        Returns
+        -------
+        list of str
+            The names of any files which are missing or corrupted.
+        """
+
+        invalid_file_names = []
+
+        for file_name in [self.coordinate_file_name, self.trajectory_file_name, self.statistics_file_name]:
+
+            if file_name is None:
+                continue
+
+            file_path = path.join(data_directory, file_name)
+
+            if not path.isfile(file_path):
+
+                invalid_file_names.append(file_name)
+                continue
+
+            if file_name not in self.file_checksums:
+                continue
+
+            if calculate_file_checksum(file_path) != self.file_checksums[file_name]:
+                invalid_file_names.append(file_name)
+
+        return invalid_file_names
+
     def __getstate__(self):
 
         return {
@@ -40,10 +89,15 @@ class StoredSimulationData:
             'coordinate_file_name': self.coordinate_file_name,
             'trajectory_file_name': self.trajectory_file_name,
 
+            'number_of_molecules': self.number_of_molecules,
+
             'statistics_file_name': self.statistics_file_name,
             'statistical_inefficiency': self.statistical_inefficiency,
+            'effective_samples': self.effective_samples,
 
             'force_field_id': self.force_field_id,
+
+            'file_checksums': self.file_checksums
         }
 
     def __setstate__(self, state):
@@ -59,7 +113,13 @@ class StoredSimulationData:
         self.coordinate_file_name = state['coordinate_file_name']
         self.trajectory_file_name = state['trajectory_file_name']
 
+        self.number_of_molecules = state.get('number_of_molecules', None)
+
         self.statistics_file_name = state['statistics_file_name']
         self.statistical_inefficiency = state['statistical_inefficiency']
+        self.effective_samples = state.get('effective_samples', None)
 
         self.force_field_id = state['force_field_id']
+
+        # Data stored before checksums were recorded will not have any.
+        self.file_checksums = state.get('file_checksums', {})
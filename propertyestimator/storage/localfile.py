@@ -7,7 +7,6 @@ import pickle
 from os import path, makedirs
 from shutil import move
 
-from propertyestimator.substances import Substance
 from .storage import PropertyEstimatorStorage
 
 
@@ -30,6 +29,9 @@ class LocalFileStorage(PropertyEstimatorStorage):
 
         super().__init__()
 
+    def _get_stored_file_path(self, simulation_data_key, file_name):
+        return path.join(self._root_directory, f'{simulation_data_key}_data', file_name)
+
     def store_object(self, storage_key, object_to_store):
 
         file_path = path.join(self._root_directory, storage_key)
@@ -83,32 +85,55 @@ class LocalFileStorage(PropertyEstimatorStorage):
         move(simulation_data_directory, path.join(self._root_directory, f'{unique_id}_data'))
         return unique_id
 
-    def retrieve_simulation_data(self, substance, include_pure_data=True):
+    def query_simulation_data(self, substance, include_pure_data=True, thermodynamic_state=None,
+                              temperature_window=None, pressure_window=None, force_field_id=None,
+                              minimum_effective_samples=None):
 
-        substance_ids = [substance.identifier]
+        matching_keys = self._query_simulation_data_keys(substance, include_pure_data, thermodynamic_state,
+                                                         temperature_window, pressure_window, force_field_id,
+                                                         minimum_effective_samples)
 
-        if isinstance(substance, Substance) and include_pure_data is True:
+        return_data = {}
 
-            for component in substance.components:
+        for substance_id in matching_keys:
 
-                component_substance = Substance()
-                component_substance.add_component(component, Substance.MoleFraction())
+            return_data[substance_id] = []
 
-                if component_substance.identifier not in substance_ids:
-                    substance_ids.append(component_substance.identifier)
+            for simulation_data_key in matching_keys[substance_id]:
 
-        return_paths = {}
+                data_directory = path.join(self._root_directory, f'{simulation_data_key}_data')
+                force_field_id = self._simulation_data_index[simulation_data_key]['force_field_id']
+
+                return_data[substance_id].append((data_directory, force_field_id))
+
+        return return_data
+
+    def query_equilibrated_coordinates(self, substance, thermodynamic_state, temperature_window=None,
+                                       pressure_window=None, number_of_molecules=None):
+
+        matching_keys = self._query_equilibrated_coordinate_keys(substance, thermodynamic_state,
+                                                                 temperature_window, pressure_window,
+                                                                 number_of_molecules)
 
-        for substance_id in substance_ids:
+        return_data = []
 
-            if substance_id not in self._simulation_data_by_substance:
-                continue
+        for simulation_data_key in matching_keys:
 
-            return_paths[substance_id] = []
+            index_entry = self._simulation_data_index[simulation_data_key]
 
-            for simulation_data_key in self._simulation_data_by_substance[substance_id]:
+            coordinate_path = path.join(self._root_directory, f'{simulation_data_key}_data',
+                                        index_entry['coordinate_file_name'])
+
+            return_data.append((coordinate_path, index_entry['number_of_molecules']))
+
+        return return_data
+
+    def retrieve_simulation_data(self, substance, include_pure_data=True):
+
+        return_paths = {}
+        matching_data = self.query_simulation_data(substance, include_pure_data)
 
-                stored_object = self.retrieve_object(simulation_data_key)
-                return_paths[substance_id].append(path.join(self._root_directory, f'{stored_object.unique_id}_data'))
+        for substance_id in matching_data:
+            return_paths[substance_id] = [data_directory for data_directory, _ in matching_data[substance_id]]
 
         return return_paths
@@ -4,10 +4,14 @@ Defines the base API for the property estimator storage backend.
 
 import hashlib
 import json
+import logging
 import pickle
 import uuid
 from os import path
 
+from simtk import unit
+
+from propertyestimator.substances import Substance
 from propertyestimator.utils.serialization import serialize_force_field, deserialize_force_field, TypedJSONDecoder, \
     TypedJSONEncoder
 
@@ -37,9 +41,16 @@ class PropertyEstimatorStorage:
         self._simulation_data_by_substance = {}
         self._simulation_data_by_substance_file = 'internal_simulation_data_map'
 
+        # An index of the thermodynamic state, force field and number of
+        # effective samples of each piece of stored simulation data, so that
+        # it can be queried without retrieving the data objects themselves.
+        self._simulation_data_index = {}
+        self._simulation_data_index_file = 'internal_simulation_data_index'
+
         self._load_stored_object_keys()
         self._load_force_field_hashes()
         self._load_simulation_data_map()
+        self._load_simulation_data_index()
 
     def _load_stored_object_keys(self):
         """Load the unique key to each object stored in the storage system.
@@ -269,6 +280,395 @@ class PropertyEstimatorStorage:
         """
         self.store_object(self._simulation_data_by_substance_file, self._simulation_data_by_substance)
 
+    @staticmethod
+    def _create_simulation_data_index_entry(simulation_data):
+        """Creates the index entry which summarises a piece
+        of stored simulation data.
+
+        Parameters
+        ----------
+        simulation_data: StoredSimulationData
+            The data to summarise.
+
+        Returns
+        -------
+        dict of str and Any
+            The index entry.
+        """
+
+        thermodynamic_state = simulation_data.thermodynamic_state
+
+        temperature = None
+        pressure = None
+
+        if thermodynamic_state.temperature is not None:
+            temperature = thermodynamic_state.temperature.value_in_unit(unit.kelvin)
+
+        if thermodynamic_state.pressure is not None:
+            pressure = thermodynamic_state.pressure.value_in_unit(unit.atmosphere)
+
+        return {
+            'temperature': temperature,
+            'pressure': pressure,
+
+            'force_field_id': simulation_data.force_field_id,
+            'effective_samples': simulation_data.effective_samples,
+
+            'coordinate_file_name': simulation_data.coordinate_file_name,
+            'number_of_molecules': simulation_data.number_of_molecules
+        }
+
+    def _get_stored_file_path(self, simulation_data_key, file_name):
+        """Returns the path to one of the files of a piece of stored
+        simulation data, if the storage system stores them on disk.
+
+        Parameters
+        ----------
+        simulation_data_key: str
+            The key of the stored simulation data.
+        file_name: str
+            The name of the file.
+
+        Returns
+        -------
+        str, optional
+            The path to the file, or `None` if it is not available.
+        """
+        return None
+
+    def _backfill_number_of_molecules(self, simulation_data_key, simulation_data):
+        """Determines the number of molecules of each component in the coordinates
+        of simulation data which was stored before this was recorded, and updates
+        the stored data with it.
+
+        The composition is derived from the substance of the data, and is only
+        accepted if it contains the same total number of molecules as the stored
+        coordinates, as the maximum number of molecules used to build the
+        coordinates was not recorded.
+
+        Parameters
+        ----------
+        simulation_data_key: str
+            The key of the stored simulation data.
+        simulation_data: StoredSimulationData
+            The stored simulation data.
+        """
+        from simtk.openmm import app
+
+        if (simulation_data.number_of_molecules is not None or
+            simulation_data.substance is None or
+            simulation_data.coordinate_file_name is None):
+
+            return
+
+        coordinate_path = self._get_stored_file_path(simulation_data_key, simulation_data.coordinate_file_name)
+
+        if coordinate_path is None or not path.isfile(coordinate_path):
+            return
+
+        total_molecules = app.PDBFile(coordinate_path).topology.getNumResidues()
+
+        # Boxes were built from a maximum of 1000 molecules unless otherwise requested.
+        for maximum_molecules in [1000, total_molecules]:
+
+            number_of_molecules = simulation_data.substance.get_molecules_per_component(maximum_molecules)
+
+            if sum(number_of_molecules.values()) != total_molecules:
+                continue
+
+            simulation_data.number_of_molecules = number_of_molecules
+            self.store_object(simulation_data_key, simulation_data)
+
+            break
+
+    def _load_simulation_data_index(self):
+        """Load the index of the stored simulation data, adding entries for
+        any stored data which is not yet indexed (e.g. data stored before the
+        index was introduced), and rebuilding any entries which were created
+        before the composition of the stored coordinates was recorded.
+        """
+        simulation_data_index = self.retrieve_object(self._simulation_data_index_file)
+
+        if simulation_data_index is None:
+            simulation_data_index = {}
+
+        for substance_id in self._simulation_data_by_substance:
+
+            for simulation_data_key in self._simulation_data_by_substance[substance_id]:
+
+                if (simulation_data_key in simulation_data_index and
+                    simulation_data_index[simulation_data_key].get('number_of_molecules') is not None):
+
+                    self._simulation_data_index[simulation_data_key] = simulation_data_index[simulation_data_key]
+                    continue
+
+                simulation_data = self.retrieve_object(simulation_data_key)
+
+                if simulation_data is None:
+                    continue
+
+                try:
+                    self._backfill_number_of_molecules(simulation_data_key, simulation_data)
+                except Exception as e:
+
+                    logging.warning(f'The number of molecules in the coordinates of the stored '
+                                    f'{simulation_data_key} data could not be determined: {e}')
+
+                self._simulation_data_index[simulation_data_key] = \
+                    self._create_simulation_data_index_entry(simulation_data)
+
+        self._save_simulation_data_index()
+
+    def _save_simulation_data_index(self):
+        """Save the index of the stored simulation data.
+        """
+        self.store_object(self._simulation_data_index_file, self._simulation_data_index)
+
+    @staticmethod
+    def _get_substance_ids(substance, include_pure_data):
+        """Returns the ids of a substance and, optionally, of each
+        of its components.
+
+        Parameters
+        ----------
+        substance: Substance
+            The substance of interest.
+        include_pure_data: bool
+            Whether to include the ids of each of the components of the substance.
+
+        Returns
+        -------
+        list of str
+            The substance ids.
+        """
+
+        substance_ids = [substance.identifier]
+
+        if isinstance(substance, Substance) and include_pure_data is True:
+
+            for component in substance.components:
+
+                component_substance = Substance()
+                component_substance.add_component(component, Substance.MoleFraction())
+
+                if component_substance.identifier not in substance_ids:
+                    substance_ids.append(component_substance.identifier)
+
+        return substance_ids
+
+    def _query_simulation_data_keys(self, substance, include_pure_data=True, thermodynamic_state=None,
+                                    temperature_window=None, pressure_window=None, force_field_id=None,
+                                    minimum_effective_samples=None):
+        """Finds the keys of the stored simulation data which match a query,
+        using only the simulation data index. See `query_simulation_data` for
+        details of the parameters.
+
+        Returns
+        -------
+        dict of str and list of str
+            The keys of the matching data, partitioned by substance id.
+        """
+
+        if thermodynamic_state is None and (temperature_window is not None or pressure_window is not None):
+            raise ValueError('A thermodynamic state must be provided when querying by temperature or pressure.')
+
+        target_temperature = None
+        target_pressure = None
+
+        if temperature_window is not None:
+
+            target_temperature = thermodynamic_state.temperature.value_in_unit(unit.kelvin)
+            temperature_window = temperature_window.value_in_unit(unit.kelvin)
+
+        if pressure_window is not None and thermodynamic_state.pressure is not None:
+
+            target_pressure = thermodynamic_state.pressure.value_in_unit(unit.atmosphere)
+            pressure_window = pressure_window.value_in_unit(unit.atmosphere)
+
+        matching_keys = {}
+
+        for substance_id in self._get_substance_ids(substance, include_pure_data):
+
+            if substance_id not in self._simulation_data_by_substance:
+                continue
+
+            for simulation_data_key in self._simulation_data_by_substance[substance_id]:
+
+                if simulation_data_key not in self._simulation_data_index:
+                    continue
+
+                index_entry = self._simulation_data_index[simulation_data_key]
+
+                if force_field_id is not None and index_entry['force_field_id'] != force_field_id:
+                    continue
+
+                if target_temperature is not None and (
+                    index_entry['temperature'] is None or
+                    abs(index_entry['temperature'] - target_temperature) > temperature_window):
+
+                    continue
+
+                if target_pressure is not None and (
+                    index_entry['pressure'] is None or
+                    abs(index_entry['pressure'] - target_pressure) > pressure_window):
+
+                    continue
+
+                # Data whose number of effective samples is unknown is conservatively retained.
+                if (minimum_effective_samples is not None and index_entry['effective_samples'] is not None and
+                    index_entry['effective_samples'] < minimum_effective_samples):
+
+                    continue
+
+                if substance_id not in matching_keys:
+                    matching_keys[substance_id] = []
+
+                matching_keys[substance_id].append(simulation_data_key)
+
+        return matching_keys
+
+    def query_simulation_data(self, substance, include_pure_data=True, thermodynamic_state=None,
+                              temperature_window=None, pressure_window=None, force_field_id=None,
+                              minimum_effective_samples=None):
+        """Retrieves the stored data for a given substance which matches a
+        set of criteria. The data is filtered using an index of the stored data,
+        so that the data objects themselves never need to be loaded.
+
+        Parameters
+        ----------
+        substance: Substance
+            The substance to check for.
+        include_pure_data: bool
+            If the substance if a mixture where has multiple components and `include_pure_data`
+            is True, data will be returned for both the mixed system, and for the individual
+            components, otherwise only data for the mixed system will be returned.
+        thermodynamic_state: ThermodynamicState, optional
+            The state which the data should be close to. This must be set if
+            either `temperature_window` or `pressure_window` are set.
+        temperature_window: simtk.unit.Quantity, optional
+            Only data whose temperature is within this window of the temperature
+            of `thermodynamic_state` will be returned. If `None`, data at any
+            temperature will be returned.
+        pressure_window: simtk.unit.Quantity, optional
+            Only data whose pressure is within this window of the pressure of
+            `thermodynamic_state` will be returned. If `None`, or if the state
+            does not define a pressure, data at any pressure will be returned.
+        force_field_id: str, optional
+            If set, only data generated using this force field will be returned.
+        minimum_effective_samples: float, optional
+            If set, only data which contains at least this many effective
+            (i.e. uncorrelated) samples will be returned.
+
+        Returns
+        -------
+        dict of str and list of tuple(str, str)
+            A dictionary of tuples of the directory path to the stored data,
+            and the id of the force field used to generate it, partitioned by
+            substance id.
+        """
+        raise NotImplementedError()
+
+    def _query_equilibrated_coordinate_keys(self, substance, thermodynamic_state, temperature_window=None,
+                                            pressure_window=None, number_of_molecules=None):
+        """Finds the keys of the stored simulation data whose coordinates may
+        be used as an equilibrated starting box, using only the simulation data
+        index. See `query_equilibrated_coordinates` for details of the parameters.
+
+        Returns
+        -------
+        list of str
+            The keys of the matching data, ordered from the closest to the
+            furthest from the target state.
+        """
+
+        target_temperature = thermodynamic_state.temperature.value_in_unit(unit.kelvin)
+        target_pressure = None
+
+        if temperature_window is not None:
+            temperature_window = temperature_window.value_in_unit(unit.kelvin)
+
+        if thermodynamic_state.pressure is not None:
+            target_pressure = thermodynamic_state.pressure.value_in_unit(unit.atmosphere)
+
+        if pressure_window is not None:
+            pressure_window = pressure_window.value_in_unit(unit.atmosphere)
+
+        matching_keys = []
+
+        for simulation_data_key in self._simulation_data_by_substance.get(substance.identifier, []):
+
+            if simulation_data_key not in self._simulation_data_index:
+                continue
+
+            index_entry = self._simulation_data_index[simulation_data_key]
+
+            # Only coordinates whose composition is known can be safely reused.
+            if (index_entry.get('coordinate_file_name') is None or
+                index_entry.get('number_of_molecules') is None or
+                index_entry['temperature'] is None):
+
+                continue
+
+            if number_of_molecules is not None and index_entry['number_of_molecules'] != number_of_molecules:
+                continue
+
+            temperature_difference = abs(index_entry['temperature'] - target_temperature)
+
+            if temperature_window is not None and temperature_difference > temperature_window:
+                continue
+
+            pressure_difference = 0.0
+
+            if target_pressure is not None:
+
+                if index_entry['pressure'] is None:
+                    continue
+
+                pressure_difference = abs(index_entry['pressure'] - target_pressure)
+
+                if pressure_window is not None and pressure_difference > pressure_window:
+                    continue
+
+            matching_keys.append((temperature_difference, pressure_difference, simulation_data_key))
+
+        # The density of a box depends far more strongly on the temperature
+        # than the pressure, so the temperature takes precedence.
+        return [simulation_data_key for _, _, simulation_data_key in sorted(matching_keys)]
+
+    def query_equilibrated_coordinates(self, substance, thermodynamic_state, temperature_window=None,
+                                       pressure_window=None, number_of_molecules=None):
+        """Retrieves the final, equilibrated coordinates of the stored simulations
+        of a substance, so that they may be used as the starting coordinates of
+        new simulations of that substance at a nearby state.
+
+        Parameters
+        ----------
+        substance: Substance
+            The substance to find coordinates for.
+        thermodynamic_state: ThermodynamicState
+            The state which the coordinates should be close to.
+        temperature_window: simtk.unit.Quantity, optional
+            Only coordinates whose temperature is within this window of the
+            temperature of `thermodynamic_state` will be returned. If `None`,
+            coordinates at any temperature will be returned.
+        pressure_window: simtk.unit.Quantity, optional
+            Only coordinates whose pressure is within this window of the
+            pressure of `thermodynamic_state` will be returned. If `None`,
+            coordinates at any pressure will be returned.
+        number_of_molecules: dict of str and int, optional
+            If set, only coordinates which contain exactly this number of
+            molecules of each component (keyed by the component identifier)
+            will be returned.
+
+        Returns
+        -------
+        list of tuple(str, dict of str and int)
+            A list of tuples of the path to the stored coordinates, and the
+            number of molecules of each component which they contain, ordered
+            from the closest to the furthest from `thermodynamic_state`.
+        """
+        raise NotImplementedError()
+
     def retrieve_simulation_data(self, substance, include_pure_data=True):
         """Retrieves any data that has been stored for a given substance.
 
@@ -309,6 +709,12 @@ class PropertyEstimatorStorage:
         -------
         str
             The unique id of the stored data.
+
+        Raises
+        ------
+        ValueError
+            If any of the files to store do not match the checksums
+            which were recorded when they were captured.
         """
 
         simulation_data_object = None
@@ -316,6 +722,13 @@ class PropertyEstimatorStorage:
         with open(path.join(simulation_data_directory, 'data.json'), 'r') as file:
             simulation_data_object = json.load(file, cls=TypedJSONDecoder)
 
+        invalid_file_names = simulation_data_object.validate_files(simulation_data_directory)
+
+        if len(invalid_file_names) > 0:
+
+            raise ValueError(f'The {", ".join(invalid_file_names)} file(s) in the simulation data directory '
+                             f'({simulation_data_directory}) are either missing or corrupted.')
+
         simulation_data_key = None
         data_to_store = None
 
@@ -356,6 +769,13 @@ class PropertyEstimatorStorage:
 
         self.store_object(simulation_data_key, data_to_store)
 
+        if simulation_data_key not in self._simulation_data_index:
+
+            self._simulation_data_index[simulation_data_key] = \
+                self._create_simulation_data_index_entry(data_to_store)
+
+            self._save_simulation_data_index()
+
         if (substance_id not in self._simulation_data_by_substance or
             simulation_data_key not in self._simulation_data_by_substance[substance_id]):
 
@@ -1,4 +1,7 @@
-from propertyestimator.backends import DaskLSFBackend, QueueWorkerResources
+from simtk import unit
+
+from propertyestimator.backends import DaskLSFBackend, QueueWorkerResources, DaskLocalClusterBackend, \
+    ComputeResources, TaskResourceRequirements
 from propertyestimator.workflow.plugins import available_protocols
 
 
@@ -50,3 +53,90 @@ def test_lsf_wrapped_function():
                                               gpu_assignments=gpu_assignments)
 
     assert expected_output == result
+
+
+def test_task_resource_requirements():
+    """Test that tasks are only allotted the resources which they require."""
+
+    backend = DaskLocalClusterBackend(1, ComputeResources(2))
+
+    task_resources = backend._get_task_resources(None)
+    assert task_resources == ComputeResources(2)
+
+    task_resources = backend._get_task_resources(TaskResourceRequirements(1))
+    assert task_resources == ComputeResources(1)
+
+    task_resources = backend._get_task_resources(TaskResourceRequirements(None, 1))
+    assert task_resources == ComputeResources(2)
+
+    assert backend._get_task_dask_resources(task_resources, None) == {'CPU': 2}
+
+    combined_requirements = TaskResourceRequirements(1).combine(TaskResourceRequirements(None, 1))
+
+    assert combined_requirements.number_of_threads is None
+    assert combined_requirements.number_of_gpus == 1
+
+    assert TaskResourceRequirements(1).combine(None) is None
+
+
+def test_lsf_task_memory_resources():
+    """Test that the memory requirements of a task are mapped onto
+    dask resources when running on a queue based backend."""
+
+    backend = DaskLSFBackend(resources_per_worker=QueueWorkerResources(2, per_thread_memory_limit=1 * unit.gigabyte))
+
+    worker_resources = backend._get_worker_dask_resources()
+
+    assert worker_resources['CPU'] == 2
+    assert 'GPU' not in worker_resources
+    assert worker_resources['MEMORY'] == 2.0e9
+
+    requirements = TaskResourceRequirements(1, memory_limit=0.5 * unit.gigabyte)
+    task_resources = backend._get_task_resources(requirements)
+
+    task_dask_resources = backend._get_task_dask_resources(task_resources, requirements)
+
+    assert task_dask_resources['CPU'] == 1
+    assert task_dask_resources['MEMORY'] == 0.5e9
+
+
+def test_local_wrapped_function():
+    """Test that the local backend wrapped function registers any
+    protocols which it is passed before calling the function."""
+
+    protocols_to_import = DaskLocalClusterBackend._get_protocols_to_import()
+
+    result = DaskLocalClusterBackend._wrapped_function(dummy_function,
+                                                       12345,
+                                                       available_resources=ComputeResources(),
+                                                       available_protocols=protocols_to_import,
+                                                       gpu_assignments={})
+
+    assert result == 12345
+
+
+def test_local_task_memory_resources():
+    """Test that the memory limit of each local worker is used
+    when scheduling tasks which declare a memory limit."""
+
+    backend = DaskLocalClusterBackend(1, ComputeResources(1), processes=True,
+                                      memory_limit_per_worker=2 * unit.gigabyte)
+
+    assert backend._get_worker_dask_resources()['MEMORY'] == 2.0e9
+
+    requirements = TaskResourceRequirements(1, memory_limit=0.5 * unit.gigabyte)
+    task_resources = backend._get_task_resources(requirements)
+
+    assert backend._get_task_dask_resources(task_resources, requirements)['MEMORY'] == 0.5e9
+
+
+def test_local_process_backend():
+    """Test that tasks can be run on a process based local backend."""
+
+    backend = DaskLocalClusterBackend(1, ComputeResources(1), processes=True)
+    backend.start()
+
+    future = backend.submit_task(dummy_function, 12345, resource_requirements=TaskResourceRequirements(1))
+    assert future.result() == 12345
+
+    backend.stop()
@@ -0,0 +1,105 @@
+"""
+Units tests for propertyestimator.backends.pool
+"""
+import os
+import time
+
+import pytest
+
+from propertyestimator.backends import ProcessPoolBackend, ComputeResources, TaskResourceRequirements
+
+
+def dummy_function(*args, **kwargs):
+
+    assert len(args) == 1
+    return args[0]
+
+
+def sum_function(*args, **kwargs):
+    return sum(args)
+
+
+def failing_function(*args, **kwargs):
+    raise ValueError('The task failed.')
+
+
+def test_pool_backend():
+    """Test that tasks can be run on a process pool backend."""
+
+    backend = ProcessPoolBackend(1, ComputeResources(1))
+    backend.start()
+
+    future = backend.submit_task(dummy_function, 12345, resource_requirements=TaskResourceRequirements(1))
+
+    assert future.result() == 12345
+    future.release()
+
+    backend.stop()
+
+
+def test_pool_backend_startup():
+    """Test that the pool backend starts without waiting on its workers."""
+
+    start_time = time.perf_counter()
+
+    backend = ProcessPoolBackend(1, ComputeResources(1))
+    backend.start()
+
+    assert time.perf_counter() - start_time < 1.0
+
+    backend.stop()
+
+
+def test_pool_future_dependencies():
+    """Test that futures passed as arguments to a task are replaced
+    by their results, and that failures propagate to dependent tasks."""
+
+    backend = ProcessPoolBackend(1, ComputeResources(1))
+    backend.start()
+
+    first_future = backend.submit_task(dummy_function, 1, key='first')
+    second_future = backend.submit_task(dummy_function, 2, key='second', priority=1)
+
+    sum_future = backend.submit_task(sum_function, first_future, second_future, key='sum')
+    chained_future = backend.submit_task(sum_function, sum_future, 4, key='chained')
+
+    assert chained_future.result() == 7
+
+    failed_future = backend.submit_task(failing_function, key='failed')
+    dependent_future = backend.submit_task(dummy_function, failed_future, key='dependent')
+
+    with pytest.raises(ValueError):
+        dependent_future.result()
+
+    callback_results = []
+
+    callback_future = backend.submit_task(dummy_function, chained_future)
+    callback_future.add_done_callback(lambda future: callback_results.append(future.result()))
+
+    assert callback_future.result() == 7
+
+    backend.stop()
+
+    assert callback_results == [7]
+
+
+def get_thread_variable(*args, **kwargs):
+
+    return os.environ.get('OMP_NUM_THREADS')
+
+
+def test_pool_thread_pool_variables():
+    """Test that the numerical thread pools of the workers are limited
+    without changing the environment of the calling process."""
+
+    original_value = os.environ.get('OMP_NUM_THREADS')
+
+    backend = ProcessPoolBackend(1, ComputeResources(1))
+    backend.start()
+
+    future = backend.submit_task(get_thread_variable)
+    assert future.result() == '1'
+
+    backend.stop()
+
+    assert os.environ.get('OMP_NUM_THREADS') == original_value
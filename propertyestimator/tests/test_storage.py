@@ -6,6 +6,7 @@ import tempfile
 from os import path, makedirs
 from shutil import rmtree
 
+import pytest
 from simtk import unit
 
 from propertyestimator.storage import LocalFileStorage, StoredSimulationData
@@ -96,3 +97,195 @@ def test_local_simulation_storage():
 
     if path.isdir(temporary_backend_directory):
         rmtree(temporary_backend_directory)
+
+
+def test_corrupted_simulation_data():
+    """Tests that simulation data whose files do not match their
+    recorded checksums are not stored."""
+
+    substance = Substance()
+    substance.add_component(Substance.Component(smiles='C'),
+                            Substance.MoleFraction())
+
+    dummy_simulation_data = StoredSimulationData()
+
+    dummy_simulation_data.substance = substance
+    dummy_simulation_data.thermodynamic_state = ThermodynamicState(298.0*unit.kelvin,
+                                                                   1.0*unit.atmosphere)
+
+    dummy_simulation_data.statistics_file_name = 'statistics.csv'
+    dummy_simulation_data.file_checksums['statistics.csv'] = 'corrupted'
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        data_directory = path.join(temporary_directory, 'data')
+        makedirs(data_directory)
+
+        with open(path.join(data_directory, 'statistics.csv'), 'w') as file:
+            file.write('Temperature\n298.0\n')
+
+        with open(path.join(data_directory, 'data.json'), 'w') as file:
+            json.dump(dummy_simulation_data, file, cls=TypedJSONEncoder)
+
+        assert dummy_simulation_data.validate_files(data_directory) == ['statistics.csv']
+
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        with pytest.raises(ValueError):
+            local_storage.store_simulation_data(substance.identifier, data_directory)
+
+        assert len(local_storage.retrieve_simulation_data(substance)) == 0
+
+
+def test_query_simulation_data():
+    """Tests that stored simulation data can be filtered by state,
+    force field and number of effective samples."""
+
+    substance = Substance()
+    substance.add_component(Substance.Component(smiles='C'),
+                            Substance.MoleFraction())
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        for index, (temperature, force_field_id, effective_samples) in enumerate([(298.0, 'ff_a', 100),
+                                                                                   (320.0, 'ff_a', 100),
+                                                                                   (300.0, 'ff_b', 10)]):
+
+            dummy_simulation_data = StoredSimulationData()
+
+            dummy_simulation_data.substance = substance
+            dummy_simulation_data.thermodynamic_state = ThermodynamicState(temperature*unit.kelvin,
+                                                                           1.0*unit.atmosphere)
+
+            dummy_simulation_data.force_field_id = force_field_id
+            dummy_simulation_data.effective_samples = effective_samples
+
+            data_directory = path.join(temporary_directory, f'data_{index}')
+            makedirs(data_directory)
+
+            with open(path.join(data_directory, 'data.json'), 'w') as file:
+                json.dump(dummy_simulation_data, file, cls=TypedJSONEncoder)
+
+            local_storage.store_simulation_data(substance.identifier, data_directory)
+
+        target_state = ThermodynamicState(299.0*unit.kelvin, 1.0*unit.atmosphere)
+
+        def query(**kwargs):
+            results = local_storage.query_simulation_data(substance, **kwargs)
+            return sorted(force_field_id for _, force_field_id in results.get(substance.identifier, []))
+
+        assert query() == ['ff_a', 'ff_a', 'ff_b']
+        assert query(thermodynamic_state=target_state, temperature_window=5.0*unit.kelvin) == ['ff_a', 'ff_b']
+        assert query(force_field_id='ff_b') == ['ff_b']
+        assert query(minimum_effective_samples=50) == ['ff_a', 'ff_a']
+
+        # Make sure the index is reloaded from storage.
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        assert query(thermodynamic_state=target_state, temperature_window=5.0*unit.kelvin,
+                     minimum_effective_samples=50) == ['ff_a']
+
+
+def test_query_equilibrated_coordinates():
+    """Tests that the stored coordinates closest to a given state,
+    and with a given composition, can be found."""
+
+    substance = Substance()
+    substance.add_component(Substance.Component(smiles='C'),
+                            Substance.MoleFraction())
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        for index, (temperature, number_of_molecules) in enumerate([(320.0, 1000),
+                                                                    (300.0, 1000),
+                                                                    (299.0, 500)]):
+
+            dummy_simulation_data = StoredSimulationData()
+
+            dummy_simulation_data.substance = substance
+            dummy_simulation_data.thermodynamic_state = ThermodynamicState(temperature*unit.kelvin,
+                                                                           1.0*unit.atmosphere)
+
+            dummy_simulation_data.coordinate_file_name = 'output.pdb'
+            dummy_simulation_data.number_of_molecules = {substance.components[0].identifier: number_of_molecules}
+
+            dummy_simulation_data.force_field_id = 'ff_a'
+
+            data_directory = path.join(temporary_directory, f'data_{index}')
+            makedirs(data_directory)
+
+            with open(path.join(data_directory, 'output.pdb'), 'w') as file:
+                file.write(f'REMARK {temperature}\n')
+
+            with open(path.join(data_directory, 'data.json'), 'w') as file:
+                json.dump(dummy_simulation_data, file, cls=TypedJSONEncoder)
+
+            local_storage.store_simulation_data(substance.identifier, data_directory)
+
+        target_state = ThermodynamicState(298.0*unit.kelvin, 1.0*unit.atmosphere)
+        target_number_of_molecules = {substance.components[0].identifier: 1000}
+
+        results = local_storage.query_equilibrated_coordinates(substance, target_state)
+        assert len(results) == 3
+
+        results = local_storage.query_equilibrated_coordinates(substance, target_state,
+                                                               number_of_molecules=target_number_of_molecules)
+
+        assert [number_of_molecules for _, number_of_molecules in results] == [target_number_of_molecules] * 2
+
+        with open(results[0][0]) as file:
+            assert file.read() == 'REMARK 300.0\n'
+
+        results = local_storage.query_equilibrated_coordinates(substance, target_state,
+                                                               temperature_window=5.0*unit.kelvin)
+
+        assert len(results) == 2
+        assert all(path.isfile(coordinate_path) for coordinate_path, _ in results)
+
+
+def test_backfill_number_of_molecules():
+    """Tests that the composition of coordinates which were stored before
+    it was recorded is determined when the storage index is loaded."""
+
+    substance = Substance()
+    substance.add_component(Substance.Component(smiles='C'),
+                            Substance.MoleFraction())
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        dummy_simulation_data = StoredSimulationData()
+
+        dummy_simulation_data.substance = substance
+        dummy_simulation_data.thermodynamic_state = ThermodynamicState(298.0*unit.kelvin, 1.0*unit.atmosphere)
+
+        dummy_simulation_data.coordinate_file_name = 'output.pdb'
+        dummy_simulation_data.force_field_id = 'ff_a'
+
+        data_directory = path.join(temporary_directory, 'data')
+        makedirs(data_directory)
+
+        with open(path.join(data_directory, 'output.pdb'), 'w') as file:
+
+            file.write('HETATM    1  C1  MOL     1       0.000   0.000   0.000  1.00  0.00           C\n'
+                       'HETATM    2  C1  MOL     2       5.000   0.000   0.000  1.00  0.00           C\n'
+                       'END\n')
+
+        with open(path.join(data_directory, 'data.json'), 'w') as file:
+            json.dump(dummy_simulation_data, file, cls=TypedJSONEncoder)
+
+        local_storage.store_simulation_data(substance.identifier, data_directory)
+
+        target_state = ThermodynamicState(298.0*unit.kelvin, 1.0*unit.atmosphere)
+        assert len(local_storage.query_equilibrated_coordinates(substance, target_state)) == 0
+
+        # Reloading the storage should fill in the missing composition.
+        local_storage = LocalFileStorage(path.join(temporary_directory, 'storage'))
+
+        results = local_storage.query_equilibrated_coordinates(substance, target_state)
+        assert [number_of_molecules for _, number_of_molecules in results] == [{substance.components[0].identifier: 2}]
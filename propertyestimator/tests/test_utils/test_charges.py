@@ -0,0 +1,36 @@
+"""
+Units tests for propertyestimator.utils.charges
+"""
+import tempfile
+from os import path
+
+from propertyestimator.utils.charges import PartialChargeCache
+
+
+def test_partial_charge_cache():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        cache_path = path.join(temporary_directory, 'charges', 'charges.sqlite')
+        charge_cache = PartialChargeCache(cache_path)
+
+        assert charge_cache.retrieve('[Cl-]', 'OECharges_AM1BCCSym', '1.0') is None
+
+        charge_cache.store('[Cl-]', 'OECharges_AM1BCCSym', '1.0', [-1.0])
+
+        # A second cache object should see the charges stored by the first.
+        other_cache = PartialChargeCache(cache_path)
+
+        assert other_cache.retrieve('[Cl-]', 'OECharges_AM1BCCSym', '1.0') == [-1.0]
+        assert other_cache.retrieve('[Cl-]', 'OECharges_AM1BCCSym', '2.0') is None
+        assert other_cache.retrieve('[Cl-]', 'OECharges_AM1BCC', '1.0') is None
+
+        charge_cache.store('[Cl-]', 'OECharges_AM1BCCSym', '1.0', [-0.5])
+        assert other_cache.retrieve('[Cl-]', 'OECharges_AM1BCCSym', '1.0') == [-0.5]
+
+        assert charge_cache.number_of_hits == 0
+        assert charge_cache.number_of_misses == 1
+
+        assert other_cache.number_of_hits == 2
+        assert other_cache.number_of_misses == 2
+        assert other_cache.hit_rate == 0.5
@@ -0,0 +1,39 @@
+"""
+Units tests for propertyestimator.utils.files
+"""
+import hashlib
+import os
+import tempfile
+from os import path
+
+from propertyestimator.utils.files import FileCaptureMethod, calculate_file_checksum, capture_file
+
+
+def test_capture_file():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        source_path = path.join(temporary_directory, 'source.dat')
+        destination_directory = path.join(temporary_directory, 'destination')
+
+        os.makedirs(destination_directory)
+
+        contents = os.urandom(3 * 1024 + 7)
+
+        with open(source_path, 'wb') as file:
+            file.write(contents)
+
+        assert calculate_file_checksum(source_path, block_size=1024) == hashlib.sha256(contents).hexdigest()
+
+        capture_method = capture_file(source_path, destination_directory)
+        destination_path = path.join(destination_directory, 'source.dat')
+
+        assert capture_method in [FileCaptureMethod.Reflink, FileCaptureMethod.Hardlink]
+        assert calculate_file_checksum(destination_path) == calculate_file_checksum(source_path)
+
+        copy_path = path.join(temporary_directory, 'copy.dat')
+        capture_method = capture_file(source_path, copy_path, allow_hardlink=False)
+
+        assert capture_method in [FileCaptureMethod.Reflink, FileCaptureMethod.Copy]
+        assert not path.samefile(source_path, copy_path)
+        assert calculate_file_checksum(copy_path) == calculate_file_checksum(source_path)
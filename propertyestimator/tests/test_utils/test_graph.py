@@ -172,3 +172,52 @@ def test_uuid_utils():
 
     with pytest.raises(ValueError):
         graph.append_uuid(invalid_protocol_id, dummy_uuid)
+
+
+def test_find_linear_chains():
+    """Test finding fusable chains of nodes in a graph."""
+
+    dummy_graph = {
+        "A": ["B"],
+        "B": ["C", "D"],
+        "C": ["E"],
+        "D": ["E"],
+        "E": ["F"],
+        "F": ["G"],
+        "G": []
+    }
+
+    chains = graph.find_linear_chains(dummy_graph, ["A", "B", "E", "F", "G"])
+
+    assert len(chains) == 2
+    assert ["A", "B"] in chains
+    assert ["E", "F", "G"] in chains
+
+    chains = graph.find_linear_chains(dummy_graph, ["A", "B", "E", "F", "G"], terminal_nodes=["F"])
+
+    assert len(chains) == 2
+    assert ["A", "B"] in chains
+    assert ["E", "F"] in chains
+
+    chains = graph.find_linear_chains(dummy_graph, ["C", "D", "E"])
+
+    assert len(chains) == 1
+    assert chains[0] == ["C", "E"] or chains[0] == ["D", "E"]
+
+
+def test_critical_path_lengths():
+    """Test calculating the critical path lengths of a graph."""
+
+    dummy_graph = {
+        "A": ["B", "C"],
+        "B": ["D"],
+        "C": ["D"],
+        "D": [],
+        "E": []
+    }
+
+    node_costs = {"A": 1.0, "B": 10.0, "C": 2.0, "D": 3.0, "E": 5.0}
+
+    critical_path_lengths = graph.calculate_critical_path_lengths(dummy_graph, node_costs)
+
+    assert critical_path_lengths == {"A": 14.0, "B": 13.0, "C": 5.0, "D": 3.0, "E": 5.0}
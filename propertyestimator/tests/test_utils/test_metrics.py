@@ -0,0 +1,97 @@
+"""
+Units tests for propertyestimator.utils.metrics
+"""
+import socket
+from urllib.request import urlopen
+
+import pytest
+
+from propertyestimator.utils import metrics
+from propertyestimator.utils.metrics import MetricsRegistry, default_registry, serve_worker_metrics, \
+    WORKER_METRICS_PORT_VARIABLE
+
+
+def test_counters_and_gauges():
+
+    registry = MetricsRegistry()
+
+    counter = registry.counter('dummy_total', 'A dummy counter.', ('kind',))
+    counter.increment(kind='a')
+    counter.increment(2, kind='b')
+
+    assert registry.counter('dummy_total', 'A dummy counter.', ('kind',)) is counter
+    assert counter.get_value(kind='a') == 1.0
+    assert counter.get_value(kind='b') == 2.0
+
+    with pytest.raises(ValueError):
+        counter.increment(-1, kind='a')
+
+    with pytest.raises(ValueError):
+        counter.increment(other='a')
+
+    with pytest.raises(ValueError):
+        registry.gauge('dummy_total', 'A dummy gauge.')
+
+    gauge = registry.gauge('dummy_queue', 'A dummy gauge.')
+    registry.add_collector(lambda: gauge.set_value(5))
+
+    rendered_metrics = registry.render()
+
+    assert '# TYPE dummy_total counter' in rendered_metrics
+    assert 'dummy_total{kind="a"} 1.0' in rendered_metrics
+    assert 'dummy_total{kind="b"} 2.0' in rendered_metrics
+    assert 'dummy_queue 5.0' in rendered_metrics
+
+
+def test_histograms():
+
+    registry = MetricsRegistry()
+
+    histogram = registry.histogram('dummy_seconds', 'A dummy histogram.', buckets=(1.0, 10.0))
+
+    histogram.observe(0.5)
+    histogram.observe(1.0)
+    histogram.observe(5.0)
+    histogram.observe(50.0)
+
+    assert histogram.get_count() == 4
+
+    rendered_metrics = registry.render()
+
+    assert 'dummy_seconds_bucket{le="1.0"} 2.0' in rendered_metrics
+    assert 'dummy_seconds_bucket{le="10.0"} 3.0' in rendered_metrics
+    assert 'dummy_seconds_bucket{le="+Inf"} 4.0' in rendered_metrics
+    assert 'dummy_seconds_sum 56.5' in rendered_metrics
+    assert 'dummy_seconds_count 4.0' in rendered_metrics
+
+
+def test_serve_worker_metrics(monkeypatch):
+
+    monkeypatch.delenv(WORKER_METRICS_PORT_VARIABLE, raising=False)
+    assert serve_worker_metrics() is None
+
+    with socket.socket() as free_socket:
+
+        free_socket.bind(('', 0))
+        base_port = free_socket.getsockname()[1]
+
+    monkeypatch.setenv(WORKER_METRICS_PORT_VARIABLE, str(base_port))
+    monkeypatch.setattr(metrics, '_worker_metrics_server', None)
+
+    default_registry.counter('dummy_worker_total', 'A dummy worker counter.').increment()
+
+    port = serve_worker_metrics()
+
+    try:
+
+        assert port >= base_port
+        assert serve_worker_metrics() == port
+
+        with urlopen('http://localhost:{}/metrics'.format(port)) as response:
+            rendered_metrics = response.read().decode()
+
+        assert 'dummy_worker_total 1.0' in rendered_metrics
+
+    finally:
+        metrics._worker_metrics_server.shutdown()
+        metrics._worker_metrics_server.server_close()
@@ -0,0 +1,188 @@
+"""
+Units tests for propertyestimator.utils.openmm
+"""
+import gzip
+import tempfile
+from os import path
+from types import SimpleNamespace
+
+import pytest
+from simtk import openmm, unit
+
+from propertyestimator.utils.openmm import serialize_system, deserialize_system, ContextPool, StatisticsReporter
+from propertyestimator.utils.statistics import StatisticsArray, ObservableType
+
+
+def test_system_serialization():
+
+    system = openmm.System()
+
+    for _ in range(3):
+        system.addParticle(1.0)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        compressed_path = path.join(temporary_directory, 'system.xml.gz')
+        serialize_system(system, compressed_path)
+
+        with open(compressed_path, 'rb') as file:
+            assert gzip.decompress(file.read()).decode() == openmm.XmlSerializer.serialize(system)
+
+        deserialized_system = deserialize_system(compressed_path)
+        assert deserialized_system.getNumParticles() == 3
+
+        # Modifying a deserialized system must not affect the cached copy.
+        deserialized_system.addParticle(1.0)
+        assert deserialize_system(compressed_path).getNumParticles() == 3
+
+        # Read only systems should be shared rather than parsed again.
+        read_only_system = deserialize_system(compressed_path, read_only=True)
+
+        assert read_only_system.getNumParticles() == 3
+        assert deserialize_system(compressed_path, read_only=True) is read_only_system
+        assert deserialize_system(compressed_path) is not read_only_system
+
+        # Identical systems should produce identical files.
+        with open(compressed_path, 'rb') as file:
+            file_contents = file.read()
+
+        serialize_system(system, compressed_path)
+
+        with open(compressed_path, 'rb') as file:
+            assert file.read() == file_contents
+
+        # Uncompressed files should still be supported.
+        uncompressed_path = path.join(temporary_directory, 'system.xml')
+
+        with open(uncompressed_path, 'w') as file:
+            file.write(openmm.XmlSerializer.serialize(system))
+
+        assert deserialize_system(uncompressed_path).getNumParticles() == 3
+
+
+def test_context_pool():
+
+    system = openmm.System()
+
+    for _ in range(3):
+        system.addParticle(1.0)
+
+    platform = openmm.Platform.getPlatformByName('Reference')
+
+    context_pool = ContextPool(maximum_contexts=1)
+
+    pooled_context = context_pool.acquire(system, openmm.VerletIntegrator(0.001), platform)
+    context_pool.release(pooled_context)
+
+    # An identical request should be given the now idle context.
+    assert context_pool.acquire(system, openmm.VerletIntegrator(0.001), platform) is pooled_context
+
+    # A context can not be shared while it is borrowed.
+    other_context = context_pool.acquire(system, openmm.VerletIntegrator(0.001), platform)
+    assert other_context is not pooled_context
+
+    assert context_pool.number_of_contexts == 2
+    assert context_pool.estimated_memory == 2 * 3 * ContextPool.estimated_bytes_per_particle
+
+    # Returning both contexts should evict one, as the pool may only hold one.
+    context_pool.release(pooled_context)
+    context_pool.release(other_context)
+
+    assert context_pool.number_of_contexts == 1
+
+    # Contexts for different states should not be shared.
+    state_context = context_pool.acquire(system, openmm.VerletIntegrator(0.001), platform, state_key=('300 K',))
+    assert state_context is not other_context
+
+    context_pool.release(state_context)
+    context_pool.clear()
+
+    assert context_pool.number_of_contexts == 0
+
+
+def test_context_pool_content_hash():
+    """Test that contexts are keyed by the content hash of a system
+    file, and that discarded contexts are no longer accounted for."""
+
+    system = openmm.System()
+
+    for _ in range(3):
+        system.addParticle(1.0)
+
+    platform = openmm.Platform.getPlatformByName('Reference')
+    context_pool = ContextPool()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        system_path = path.join(temporary_directory, 'system.xml.gz')
+        serialize_system(system, system_path)
+
+        read_only_system, system_hash = deserialize_system(system_path, read_only=True, return_hash=True)
+        _, other_hash = deserialize_system(system_path, return_hash=True)
+
+        assert system_hash == other_hash
+
+    pooled_context = context_pool.acquire(read_only_system, openmm.VerletIntegrator(0.001),
+                                          platform, system_hash=system_hash)
+    context_pool.release(pooled_context)
+
+    assert context_pool.acquire(read_only_system, openmm.VerletIntegrator(0.001),
+                                platform, system_hash=system_hash) is pooled_context
+
+    context_pool.discard(pooled_context)
+
+    assert context_pool.number_of_contexts == 0
+    assert context_pool.estimated_memory == 0
+
+
+def test_statistics_reporter():
+    """Test that the statistics reporter appends rows to
+    a new or existing binary statistics file."""
+
+    system = openmm.System()
+
+    for _ in range(3):
+        system.addParticle(1.0)
+
+    context = openmm.Context(system, openmm.VerletIntegrator(0.001), openmm.Platform.getPlatformByName('Reference'))
+    context.setPositions([openmm.Vec3(0.0, 0.0, 0.0)] * 3 * unit.nanometer)
+
+    state = context.getState(getEnergy=True)
+    simulation = SimpleNamespace(system=system)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        file_path = path.join(temporary_directory, 'statistics.bin')
+
+        reporter = StatisticsReporter(file_path, 1)
+
+        reporter.report(simulation, state)
+        reporter.report(simulation, state)
+        reporter.close()
+
+        # Reporting to an existing file should append to it.
+        reporter = StatisticsReporter(file_path, 1)
+        reporter.report(simulation, state)
+        reporter.close()
+
+        statistics_array = StatisticsArray.from_binary(file_path)
+
+        assert len(statistics_array) == 3
+        assert not statistics_array.has_observable(ObservableType.Enthalpy)
+
+        # A partially written row should be discarded before appending.
+        with open(file_path, 'ab') as file:
+            file.write(b'\x00' * 4)
+
+        reporter = StatisticsReporter(file_path, 1)
+        reporter.report(simulation, state)
+        reporter.close()
+
+        statistics_array = StatisticsArray.from_binary(file_path)
+        assert len(statistics_array) == 4
+
+        # The observables being reported must match those in the existing file.
+        reporter = StatisticsReporter(file_path, 1, 1.0 * unit.atmosphere)
+
+        with pytest.raises(ValueError):
+            reporter.report(simulation, state)
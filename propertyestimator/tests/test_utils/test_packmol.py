@@ -60,3 +60,76 @@ def test_packmol_packbox():
 
     topology, positions = packmol.pack_box(molecules, [1], box_size=20*unit.angstrom)
     _validate_paracetamol_results(topology, positions)
+
+
+def _create_linear_topology(number_of_atoms):
+    """Creates the topology of a single, linear molecule."""
+    import mdtraj
+
+    topology = mdtraj.Topology()
+    residue = topology.add_residue('MOL', topology.add_chain())
+
+    atoms = [topology.add_atom(f'C{index}', mdtraj.element.carbon, residue) for index in range(number_of_atoms)]
+
+    for atom_a, atom_b in zip(atoms[:-1], atoms[1:]):
+        topology.add_bond(atom_a, atom_b)
+
+    return topology
+
+
+def test_correct_packmol_bonds():
+    """Tests that the bonds of each copy of each molecule are
+    generated, and that existing bonds are not duplicated."""
+    import mdtraj
+
+    molecule_topologies = [_create_linear_topology(3), _create_linear_topology(2)]
+
+    bonds = packmol._generate_bonds(molecule_topologies, [2, 3])
+
+    assert bonds.tolist() == [[0, 1], [1, 2], [3, 4], [4, 5], [6, 7], [8, 9], [10, 11]]
+
+    # Mimic the topology of a packmol output file, in which
+    # some bonds (possibly reversed) have already been detected.
+    packed_topology = mdtraj.Topology()
+    residue = packed_topology.add_residue('MOL', packed_topology.add_chain())
+
+    atoms = [packed_topology.add_atom(f'C{index}', mdtraj.element.carbon, residue) for index in range(12)]
+
+    packed_topology.add_bond(atoms[1], atoms[0])
+    packed_topology.add_bond(atoms[10], atoms[11])
+
+    assert packmol._add_missing_bonds(packed_topology, bonds) == 5
+    assert packed_topology.n_bonds == 7
+
+
+def test_packmol_attempts(tmpdir, monkeypatch):
+    """Tests that the first successful packing attempt is used, and
+    that any attempts which are still running are killed."""
+    import os
+    import time
+
+    # A stand-in for packmol which only succeeds for a seed of 1234568,
+    # and which otherwise hangs.
+    executable_path = os.path.join(str(tmpdir), 'packmol')
+
+    with open(executable_path, 'w') as file:
+        file.write('#!/bin/sh\n'
+                   'if grep -q "seed 1234568"; then echo " Success!"; else exec sleep 60; fi\n')
+
+    os.chmod(executable_path, 0o755)
+    monkeypatch.setattr(packmol, 'PACKMOL_PATH', executable_path)
+
+    input_filenames = []
+
+    for index in range(3):
+
+        input_filename = os.path.join(str(tmpdir), f'input_{index}.txt')
+        input_filenames.append(input_filename)
+
+        with open(input_filename, 'w') as file:
+            file.write(f'seed {1234567 + index}\n')
+
+    start_time = time.perf_counter()
+
+    assert packmol._run_packmol_attempts(input_filenames, 3, False) == 1
+    assert time.perf_counter() - start_time < 30.0
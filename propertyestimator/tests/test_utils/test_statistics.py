@@ -2,13 +2,14 @@
 Units tests for propertyestimator.utils.statistics
 """
 import os
+import tempfile
 
 import numpy as np
 
 from simtk import unit
 
 from propertyestimator.utils import get_data_filename
-from propertyestimator.utils.statistics import StatisticsArray, bootstrap
+from propertyestimator.utils.statistics import StatisticsArray, StatisticsFileReader, bootstrap, ObservableType
 
 
 def test_statistics_object():
@@ -26,6 +27,122 @@ def test_statistics_object():
     assert subsampled_array is not None and len(subsampled_array) == 3
 
 
+def test_incremental_statistics():
+
+    statistics_object = StatisticsArray.from_openmm_csv(get_data_filename('properties/stats_openmm.csv'),
+                                                        1*unit.atmosphere)
+
+    first_half = StatisticsArray.from_statistics_array(statistics_object, list(range(len(statistics_object) // 2)))
+    second_half = StatisticsArray.from_statistics_array(statistics_object,
+                                                        list(range(len(statistics_object) // 2,
+                                                                   len(statistics_object))))
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        file_path = os.path.join(temporary_directory, 'stats_pandas.csv')
+
+        first_half.save_as_pandas_csv(file_path, append=True)
+
+        new_rows, offset = StatisticsArray.from_pandas_csv_tail(file_path)
+        assert len(new_rows) == len(first_half)
+
+        new_rows, offset = StatisticsArray.from_pandas_csv_tail(file_path, offset)
+        assert new_rows is None
+
+        second_half.save_as_pandas_csv(file_path, append=True)
+
+        new_rows, offset = StatisticsArray.from_pandas_csv_tail(file_path, offset)
+        assert len(new_rows) == len(second_half)
+
+        full_statistics = StatisticsArray.from_pandas_csv(file_path)
+        assert len(full_statistics) == len(statistics_object)
+
+
+def test_binary_statistics():
+
+    statistics_object = StatisticsArray.from_openmm_csv(get_data_filename('properties/stats_openmm.csv'),
+                                                        1*unit.atmosphere)
+
+    half_length = len(statistics_object) // 2
+
+    first_half = StatisticsArray.from_statistics_array(statistics_object, list(range(half_length)))
+    second_half = StatisticsArray.from_statistics_array(statistics_object,
+                                                        list(range(half_length, len(statistics_object))))
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        file_path = os.path.join(temporary_directory, 'statistics.bin')
+
+        first_half.save_as_binary(file_path, append=True)
+        assert StatisticsArray.is_binary_file(file_path)
+
+        new_rows, offset = StatisticsArray.from_file_tail(file_path)
+        assert len(new_rows) == half_length
+
+        new_rows, offset = StatisticsArray.from_file_tail(file_path, offset)
+        assert new_rows is None
+
+        second_half.save_as_binary(file_path, append=True)
+
+        new_rows, offset = StatisticsArray.from_file_tail(file_path, offset)
+        assert len(new_rows) == len(second_half)
+
+        full_statistics = StatisticsArray.from_file(file_path)
+        assert len(full_statistics) == len(statistics_object)
+
+        for observable_type in [ObservableType.Density, ObservableType.Enthalpy]:
+
+            expected_values = statistics_object.get_observable(observable_type)
+            loaded_values = full_statistics.get_observable(observable_type)
+
+            assert np.allclose(expected_values.value_in_unit(expected_values.unit),
+                               loaded_values.value_in_unit(expected_values.unit))
+
+
+def test_statistics_file_reader():
+
+    statistics_object = StatisticsArray.from_openmm_csv(get_data_filename('properties/stats_openmm.csv'),
+                                                        1*unit.atmosphere)
+
+    expected_densities = statistics_object.get_observable(ObservableType.Density)
+    expected_densities = np.array(expected_densities.value_in_unit(unit.gram / unit.milliliter))
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        csv_path = os.path.join(temporary_directory, 'statistics.csv')
+        statistics_object.save_as_pandas_csv(csv_path)
+
+        binary_path = os.path.join(temporary_directory, 'statistics.bin')
+        statistics_object.save_as_binary(binary_path)
+
+        for file_path in [csv_path, binary_path]:
+
+            reader = StatisticsFileReader(file_path, chunk_size=7)
+
+            assert len(reader) == len(statistics_object)
+            assert ObservableType.Enthalpy in reader.observable_types
+
+            sliced_array = reader.read([ObservableType.Density], start=2, step=3)
+
+            assert not sliced_array.has_observable(ObservableType.PotentialEnergy)
+            assert np.allclose(sliced_array.get_observable(ObservableType.Density) / (unit.gram / unit.milliliter),
+                               expected_densities[2::3])
+
+            subset_array = reader.read_rows([5, 1, 3], [ObservableType.Density])
+            assert np.allclose(subset_array.get_observable(ObservableType.Density) / (unit.gram / unit.milliliter),
+                               expected_densities[[5, 1, 3]])
+
+            chunks = list(reader.iterate_chunks(observable_types=[ObservableType.Density]))
+
+            assert len(chunks) == int(np.ceil(len(statistics_object) / 7))
+            assert sum(len(chunk) for chunk in chunks) == len(statistics_object)
+
+            projected_array = StatisticsArray.from_file(file_path, [ObservableType.Density])
+
+            assert len(projected_array) == len(statistics_object)
+            assert not projected_array.has_observable(ObservableType.Volume)
+
+
 def test_bootstrap():
 
     simple_data = np.array([1.0, 1.0, 1.0, 1.0])
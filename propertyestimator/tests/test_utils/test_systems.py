@@ -0,0 +1,95 @@
+"""
+Units tests for propertyestimator.utils.systems
+"""
+from simtk import openmm, unit
+from simtk.openmm import app
+
+from propertyestimator.utils.systems import SystemTemplate, _find_molecule_instances, _create_sub_topology, \
+    hash_topology
+
+
+class DummyForceField:
+    """A force field which places a harmonic bond with a
+    fixed force constant between each bonded pair of atoms."""
+
+    def __init__(self, force_constant):
+        self.force_constant = force_constant
+
+    def createSystem(self, topology, molecules, **_):
+
+        system = openmm.System()
+
+        for _ in topology.atoms():
+            system.addParticle(1.0)
+
+        bond_force = openmm.HarmonicBondForce()
+
+        for bond in topology.bonds():
+            bond_force.addBond(bond[0].index, bond[1].index, 0.1, self.force_constant)
+
+        system.addForce(bond_force)
+        return system
+
+
+def _create_dummy_topology(number_of_molecules):
+    """Creates a topology which contains a number of copies of a
+    linear, three atom molecule."""
+
+    topology = app.Topology()
+    chain = topology.addChain()
+
+    for _ in range(number_of_molecules):
+
+        residue = topology.addResidue('MOL', chain)
+
+        atoms = [topology.addAtom(name, app.Element.getBySymbol(symbol), residue)
+                 for name, symbol in [('C1', 'C'), ('O1', 'O'), ('H1', 'H')]]
+
+        topology.addBond(atoms[0], atoms[1])
+        topology.addBond(atoms[1], atoms[2])
+
+    return topology
+
+
+def test_find_molecule_instances():
+
+    topology = _create_dummy_topology(3)
+    molecule_instances = _find_molecule_instances(topology)
+
+    assert len(molecule_instances) == 3
+    assert all(molecule_type == 0 for molecule_type, _ in molecule_instances)
+    assert molecule_instances[1][1] == [3, 4, 5]
+
+    sub_topology = _create_sub_topology(topology, molecule_instances[1][1])
+
+    assert sub_topology.getNumAtoms() == 3
+    assert len(list(sub_topology.bonds())) == 2
+
+    assert hash_topology(sub_topology) == hash_topology(_create_dummy_topology(1))
+
+
+def test_swap_parameters():
+
+    topology = _create_dummy_topology(4)
+
+    system = DummyForceField(100.0).createSystem(topology, [])
+    template = SystemTemplate(system, topology, 'a')
+
+    new_system = template.create_system(DummyForceField(200.0), [], 'b')
+
+    assert template.parameters_hash == 'b'
+
+    bond_force = new_system.getForce(0)
+    assert bond_force.getNumBonds() == 8
+
+    for bond_index in range(bond_force.getNumBonds()):
+
+        _, _, _, force_constant = bond_force.getBondParameters(bond_index)
+        assert force_constant.value_in_unit(unit.kilojoule_per_mole / unit.nanometer ** 2) == 200.0
+
+    # The created system must be independent of the template.
+    new_system.addParticle(1.0)
+    assert template.system.getNumParticles() == 12
+
+    system_xml = template.create_system(serialize=True)
+    assert openmm.XmlSerializer.deserialize(system_xml).getNumParticles() == 12
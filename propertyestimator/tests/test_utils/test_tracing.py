@@ -0,0 +1,66 @@
+"""
+Units tests for propertyestimator.utils.tracing
+"""
+import json
+import tempfile
+from os import path
+
+from propertyestimator.utils.tracing import TraceRecorder, merge_trace_files, trace_span
+
+
+def test_disabled_recorder():
+    """Test that a recorder without a directory records nothing."""
+
+    trace_recorder = TraceRecorder()
+
+    with trace_recorder.span('dummy', 'test'):
+        pass
+
+    assert not trace_recorder.enabled
+    assert len(trace_recorder.events) == 0
+
+    assert trace_recorder.profile('dummy', sum, [1, 2]) == 3
+
+
+def test_trace_recording():
+    """Test recording spans and merging them into a single trace."""
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        trace_directory = path.join(temporary_directory, 'traces')
+
+        recorder_a = TraceRecorder(trace_directory)
+        recorder_a.add_span('queued', 'scheduling', 1.0, 2.5, protocol_id='a')
+
+        with recorder_a.activate():
+
+            with trace_span('execute', 'protocol', protocol_id='a'):
+                pass
+
+        # Spans outside of an active recorder should be discarded.
+        with trace_span('execute', 'protocol', protocol_id='b'):
+            pass
+
+        assert len(recorder_a.events) == 2
+
+        assert recorder_a.events[0]['ts'] == 1.0e6
+        assert recorder_a.events[0]['dur'] == 1.5e6
+        assert recorder_a.events[0]['args'] == {'protocol_id': 'a'}
+
+        recorder_a.save('a')
+
+        recorder_b = TraceRecorder(trace_directory)
+        assert recorder_b.profile('b', sum, [1, 2]) == 3
+        recorder_b.add_span('queued', 'scheduling', 0.5, 1.0)
+        recorder_b.save()
+
+        assert path.isfile(path.join(trace_directory, 'b.prof'))
+
+        merged_path = path.join(temporary_directory, 'merged.trace.json')
+        merge_trace_files(trace_directory, merged_path)
+
+        with open(merged_path) as file:
+            merged_trace = json.load(file)
+
+        assert len(merged_trace['traceEvents']) == 3
+        assert merged_trace['traceEvents'][0]['ts'] == 0.5e6
@@ -0,0 +1,123 @@
+"""
+Units tests for propertyestimator.utils.trajectories
+"""
+import json
+import tempfile
+from os import path
+
+import mdtraj
+import numpy as np
+import pytest
+
+from propertyestimator.utils.serialization import TypedJSONEncoder, TypedJSONDecoder
+from propertyestimator.utils.trajectories import get_number_of_frames, iterate_trajectory, write_trajectory_chunks, \
+    TrajectorySegment, VirtualTrajectory, TrajectoryFileFormat, trajectory_file_extensions
+
+
+def _create_dummy_trajectory(directory, number_of_frames):
+    """Creates a trajectory of a box of argon atoms with random
+    coordinates, and saves it to a coordinate and a DCD file."""
+
+    topology = mdtraj.Topology()
+    chain = topology.add_chain()
+
+    for _ in range(3):
+
+        residue = topology.add_residue('AR', chain)
+        topology.add_atom('Ar', mdtraj.element.argon, residue)
+
+    xyz = np.random.rand(number_of_frames, 3, 3).astype(np.float32)
+
+    unitcell_lengths = np.ones((number_of_frames, 3), dtype=np.float32)
+    unitcell_angles = np.full((number_of_frames, 3), 90.0, dtype=np.float32)
+
+    trajectory = mdtraj.Trajectory(xyz, topology, unitcell_lengths=unitcell_lengths,
+                                   unitcell_angles=unitcell_angles)
+
+    coordinate_path = path.join(directory, 'input.pdb')
+    trajectory_path = path.join(directory, 'trajectory.dcd')
+
+    trajectory[0].save_pdb(coordinate_path)
+    trajectory.save_dcd(trajectory_path)
+
+    return coordinate_path, trajectory_path, mdtraj.load_dcd(trajectory_path, top=coordinate_path)
+
+
+def test_iterate_trajectory():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        coordinate_path, trajectory_path, trajectory = _create_dummy_trajectory(temporary_directory, 25)
+
+        assert get_number_of_frames(trajectory_path) == 25
+
+        chunks = list(iterate_trajectory(trajectory_path, coordinate_path, chunk_size=10))
+
+        assert [chunk.n_frames for chunk in chunks] == [10, 10, 5]
+        assert np.allclose(np.concatenate([chunk.xyz for chunk in chunks]), trajectory.xyz)
+
+        frame_indices = [3, 9, 10, 11, 24]
+        chunks = list(iterate_trajectory(trajectory_path, coordinate_path, frame_indices, chunk_size=10))
+
+        assert np.allclose(np.concatenate([chunk.xyz for chunk in chunks]), trajectory.xyz[frame_indices])
+
+
+def test_write_trajectory_chunks():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        coordinate_path, trajectory_path, trajectory = _create_dummy_trajectory(temporary_directory, 25)
+
+        output_path = path.join(temporary_directory, 'output.dcd')
+
+        chunks = iterate_trajectory(trajectory_path, coordinate_path, range(0, 25, 2), chunk_size=10)
+        assert write_trajectory_chunks(chunks, output_path) == 13
+
+        output_trajectory = mdtraj.load_dcd(output_path, top=coordinate_path)
+
+        assert np.allclose(output_trajectory.xyz, trajectory.xyz[::2], atol=1.0e-5)
+        assert np.allclose(output_trajectory.unitcell_lengths, trajectory.unitcell_lengths[::2])
+
+
+@pytest.mark.parametrize('file_format', [TrajectoryFileFormat.XTC, TrajectoryFileFormat.HDF5])
+def test_compressed_trajectory_chunks(file_format):
+
+    if file_format == TrajectoryFileFormat.HDF5:
+        pytest.importorskip('tables')
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        coordinate_path, trajectory_path, trajectory = _create_dummy_trajectory(temporary_directory, 25)
+
+        output_path = path.join(temporary_directory, 'output' + trajectory_file_extensions[file_format])
+
+        chunks = iterate_trajectory(trajectory_path, coordinate_path, chunk_size=10)
+        assert write_trajectory_chunks(chunks, output_path, file_format, precision=2) == 25
+
+        assert get_number_of_frames(output_path) == 25
+
+        output_xyz = np.concatenate([chunk.xyz for chunk in iterate_trajectory(output_path, coordinate_path)])
+        assert np.allclose(output_xyz, trajectory.xyz, atol=5.1e-3)
+
+
+def test_virtual_trajectory():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        coordinate_path, trajectory_path, trajectory = _create_dummy_trajectory(temporary_directory, 25)
+
+        virtual_trajectory = VirtualTrajectory([
+            TrajectorySegment(trajectory_path, coordinate_path),
+            TrajectorySegment(trajectory_path, coordinate_path, 5, 10)
+        ])
+
+        assert len(virtual_trajectory) == 30
+        assert virtual_trajectory.coordinate_path == coordinate_path
+
+        virtual_trajectory = json.loads(json.dumps(virtual_trajectory, cls=TypedJSONEncoder), cls=TypedJSONDecoder)
+
+        assert isinstance(virtual_trajectory, VirtualTrajectory)
+        assert len(virtual_trajectory) == 30
+
+        xyz = np.concatenate([chunk.xyz for chunk in virtual_trajectory.iterate_chunks(chunk_size=10)])
+        assert np.allclose(xyz, np.concatenate([trajectory.xyz, trajectory.xyz[5:10]]))
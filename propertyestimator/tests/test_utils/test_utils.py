@@ -65,3 +65,48 @@ def test_interfaces():
     """Test that interface checking is working."""
     dummy_class = DummyDecoratedClass()
     assert isinstance(dummy_class, DummyInterface)
+
+
+def test_molecule_cache(tmpdir, monkeypatch):
+    """Tests that molecules created from smiles are cached, both in
+    memory and on disk, and are keyed by their number of conformers."""
+    from os import listdir, path
+
+    cache_directory = str(tmpdir)
+
+    # Make sure that molecules cached by other tests do not affect this one.
+    monkeypatch.setattr(utils, '_cached_molecules', type(utils._cached_molecules)())
+
+    molecule = utils.create_molecule_from_smiles('CO', 2, cache_directory)
+    assert molecule is not None
+
+    number_of_conformers = molecule.NumConfs()
+
+    assert len(listdir(cache_directory)) == 1
+    assert ('CO', 2) in utils._cached_molecules
+
+    # Make sure that the returned molecule is a copy of the cached one.
+    molecule.Clear()
+    assert utils.create_molecule_from_smiles('CO', 2, cache_directory).NumAtoms() == 6
+
+    # Make sure that the molecule is loaded from disk when not cached in memory.
+    utils._cached_molecules.clear()
+
+    cached_molecule = utils.create_molecule_from_smiles('CO', 2, cache_directory)
+
+    assert cached_molecule.NumAtoms() == 6
+    assert cached_molecule.NumConfs() == number_of_conformers
+
+    utils.create_molecule_from_smiles('CO', 0, cache_directory)
+    assert len(listdir(cache_directory)) == 2
+
+    # Make sure that the default cache directory is used when none is given.
+    default_cache_directory = path.join(cache_directory, 'default')
+
+    monkeypatch.delenv(utils.MOLECULE_CACHE_DIRECTORY_VARIABLE, raising=False)
+    monkeypatch.setattr(utils, '_default_molecule_cache_directory', None)
+
+    utils.set_default_molecule_cache_directory(default_cache_directory)
+    utils.create_molecule_from_smiles('C', 0)
+
+    assert len(listdir(default_cache_directory)) == 1
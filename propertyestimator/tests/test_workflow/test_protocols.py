@@ -14,6 +14,7 @@ from propertyestimator.protocols.analysis import ExtractAverageStatistic, Extrac
     ExtractUncorrelatedStatisticsData
 from propertyestimator.protocols.coordinates import BuildCoordinatesPackmol, SolvateExistingStructure
 from propertyestimator.protocols.forcefield import BuildSmirnoffSystem
+from propertyestimator.protocols.groups import ConditionalGroup
 from propertyestimator.protocols.miscellaneous import AddQuantities, FilterSubstanceByRole, SubtractQuantities
 from propertyestimator.protocols.simulation import RunEnergyMinimisation, RunOpenMMSimulation
 from propertyestimator.substances import Substance
@@ -187,7 +188,7 @@ def test_base_simulation_protocols():
         extract_density = ExtractAverageStatistic('extract_density')
 
         extract_density.statistics_type = ObservableType.Density
-        extract_density.statistics_path = path.join(temporary_directory, 'statistics.csv')
+        extract_density.statistics_path = npt_equilibration.statistics_file_path
 
         result = extract_density.execute(temporary_directory, ComputeResources())
         assert not isinstance(result, PropertyEstimatorException)
@@ -217,7 +218,7 @@ def test_base_simulation_protocols():
 
         extract_uncorrelated_statistics.statistical_inefficiency = extract_density.statistical_inefficiency
         extract_uncorrelated_statistics.equilibration_index = extract_density.equilibration_index
-        extract_uncorrelated_statistics.input_statistics_path = path.join(temporary_directory, 'statistics.csv')
+        extract_uncorrelated_statistics.input_statistics_path = npt_equilibration.statistics_file_path
 
         result = extract_uncorrelated_statistics.execute(temporary_directory, ComputeResources())
         assert not isinstance(result, PropertyEstimatorException)
@@ -313,3 +314,43 @@ def test_solvation_protocol():
         solvated_pdb = PDBFile(solvate_coordinates.coordinate_file_path)
 
         assert solvated_pdb.topology.getNumResidues() == 10
+
+
+def test_adaptive_sampling():
+    """Tests that a conditional group predicts the number of steps needed
+    to meet its conditions."""
+
+    simulation = RunOpenMMSimulation('simulation')
+    simulation.steps = 1000
+    simulation.output_frequency = 100
+
+    conditional_group = ConditionalGroup('conditional_group')
+    conditional_group.add_protocols(simulation)
+
+    conditional_group.adaptive_sampling = True
+
+    condition = ConditionalGroup.Condition()
+
+    condition.left_hand_value = 2.0 * unit.kelvin
+    condition.right_hand_value = 1.0 * unit.kelvin
+    condition.type = ConditionalGroup.ConditionType.LessThan
+
+    conditional_group.add_condition(condition)
+
+    # Halving the uncertainty requires four times as much data.
+    conditional_group._initial_steps = {simulation.id: 1000}
+    conditional_group._total_steps = {simulation.id: 1000}
+
+    conditional_group._update_adaptive_steps()
+    assert simulation.steps == 3000
+
+    # Make sure the requested steps are bounded.
+    conditional_group.maximum_adaptive_steps = 2000
+
+    conditional_group._update_adaptive_steps()
+    assert simulation.steps == 2000
+
+    condition.left_hand_value = 1.01 * unit.kelvin
+
+    conditional_group._update_adaptive_steps()
+    assert simulation.steps == 100
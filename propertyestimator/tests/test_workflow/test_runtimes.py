@@ -0,0 +1,75 @@
+"""
+Units tests for propertyestimator.workflow.runtimes
+"""
+import tempfile
+from os import path
+
+from simtk import unit
+
+from propertyestimator.backends import ComputeResources
+from propertyestimator.tests.test_workflow.utils import DummyEstimatedQuantityProtocol
+from propertyestimator.utils.quantities import EstimatedQuantity
+from propertyestimator.workflow import WorkflowSchema
+from propertyestimator.workflow.runtimes import ProtocolRuntimeDatabase, ProtocolCostModel
+from propertyestimator.workflow.utils import ProtocolPath
+
+
+def test_runtime_database():
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        runtime_database = ProtocolRuntimeDatabase(path.join(temporary_directory, 'runtimes.sqlite'))
+
+        runtime_database.record('TypeA', 'protocol_a', 1.0, ComputeResources(2))
+        runtime_database.record('TypeA', 'protocol_b', 5.0, succeeded=False)
+        runtime_database.record('TypeB', 'protocol_c', 3.0, number_of_atoms=10, number_of_steps=100)
+
+        assert len(runtime_database.query()) == 3
+        assert len(runtime_database.query(protocol_type='TypeA')) == 2
+        assert len(runtime_database.query(protocol_type='TypeA', succeeded=True)) == 1
+
+        record = runtime_database.query(protocol_type='TypeA', succeeded=True)[0]
+
+        assert record.protocol_id == 'protocol_a'
+        assert record.number_of_threads == 2
+        assert record.number_of_gpus == 0
+
+        record = runtime_database.query(protocol_type='TypeB')[0]
+
+        assert record.number_of_atoms == 10
+        assert record.number_of_steps == 100
+
+
+def test_cost_model_workflow_prediction():
+
+    dummy_schema = WorkflowSchema()
+
+    dummy_protocol_a = DummyEstimatedQuantityProtocol('protocol_a')
+    dummy_protocol_a.input_value = EstimatedQuantity(1 * unit.kelvin, 0.1 * unit.kelvin, 'dummy_source')
+
+    dummy_schema.protocols[dummy_protocol_a.id] = dummy_protocol_a.schema
+
+    dummy_protocol_b = DummyEstimatedQuantityProtocol('protocol_b')
+    dummy_protocol_b.input_value = ProtocolPath('output_value', dummy_protocol_a.id)
+
+    dummy_schema.protocols[dummy_protocol_b.id] = dummy_protocol_b.schema
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        runtime_database = ProtocolRuntimeDatabase(path.join(temporary_directory, 'runtimes.sqlite'))
+        cost_model = ProtocolCostModel(runtime_database, default_runtime=2.0)
+
+        # With no history, each protocol should take the default runtime.
+        assert cost_model.predict(dummy_protocol_a.schema) == 2.0
+        assert cost_model.predict_workflow(dummy_schema) == 4.0
+
+        protocol_type = type(dummy_protocol_a).__name__
+
+        runtime_database.record(protocol_type, 'protocol_a', 3.0)
+        runtime_database.record(protocol_type, 'protocol_a', 5.0)
+        runtime_database.record(protocol_type, 'protocol_a', 100.0, succeeded=False)
+
+        cost_model.refresh()
+
+        assert cost_model.predict(dummy_protocol_a.schema) == 4.0
+        assert cost_model.predict_workflow(dummy_schema) == 8.0
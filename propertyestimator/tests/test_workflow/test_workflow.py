@@ -3,6 +3,7 @@ Units tests for propertyestimator.layers.simulation
 """
 import tempfile
 from collections import OrderedDict
+from os import path
 
 import pytest
 from simtk import unit
@@ -17,6 +18,7 @@ from propertyestimator.properties.density import Density
 from propertyestimator.properties.dielectric import DielectricConstant
 from propertyestimator.properties.plugins import registered_properties
 from propertyestimator.protocols.groups import ConditionalGroup
+from propertyestimator.protocols.miscellaneous import AddQuantities
 from propertyestimator.substances import Substance
 from propertyestimator.tests.test_workflow.utils import DummyReplicableProtocol, create_dummy_metadata, \
     DummyEstimatedQuantityProtocol
@@ -53,6 +55,22 @@ def test_workflow_schema_simulation(registered_property_name, available_layer):
     assert json_schema == property_recreated_json
 
 
+def test_workflow_options_state():
+    """Tests that workflow options serialized before newer options were
+    added are loaded with the default values of those options."""
+
+    default_options = WorkflowOptions()
+
+    state = default_options.__getstate__()
+    state = {key: state[key] for key in ['convergence_mode', 'absolute_uncertainty',
+                                         'relative_uncertainty_fraction']}
+
+    options = WorkflowOptions(adaptive_sampling=True, number_of_packmol_attempts=4)
+    options.__setstate__(state)
+
+    assert options.__getstate__() == default_options.__getstate__()
+
+
 @pytest.mark.parametrize("registered_property_name", registered_properties)
 @pytest.mark.parametrize("available_layer", available_layers)
 def test_cloned_schema_merging_simulation(registered_property_name, available_layer):
@@ -301,3 +319,103 @@ def test_simple_workflow_graph_with_groups():
         result = results_futures[0].result()
         assert isinstance(result, CalculationLayerResult)
         assert result.calculated_property.value == 1 * unit.kelvin
+
+
+def test_fused_workflow_graph():
+    """Tests that chains of lightweight protocols are fused into a single task,
+    while each protocol still stores its own output."""
+    dummy_schema = WorkflowSchema()
+
+    dummy_protocol_a = DummyEstimatedQuantityProtocol('protocol_a')
+    dummy_protocol_a.input_value = EstimatedQuantity(1 * unit.kelvin, 0.1 * unit.kelvin, 'dummy_source')
+
+    dummy_schema.protocols[dummy_protocol_a.id] = dummy_protocol_a.schema
+
+    add_protocol_a = AddQuantities('add_a')
+    add_protocol_a.values = [ProtocolPath('output_value', dummy_protocol_a.id),
+                             ProtocolPath('output_value', dummy_protocol_a.id)]
+
+    dummy_schema.protocols[add_protocol_a.id] = add_protocol_a.schema
+
+    add_protocol_b = AddQuantities('add_b')
+    add_protocol_b.values = [ProtocolPath('result', add_protocol_a.id),
+                             ProtocolPath('output_value', dummy_protocol_a.id)]
+
+    dummy_schema.protocols[add_protocol_b.id] = add_protocol_b.schema
+
+    dummy_schema.final_value_source = ProtocolPath('result', add_protocol_b.id)
+
+    dummy_schema.validate_interfaces()
+
+    dummy_property = create_dummy_property(Density)
+
+    dummy_workflow = Workflow(dummy_property, {})
+    dummy_workflow.schema = dummy_schema
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+
+        workflow_graph = WorkflowGraph(temporary_directory)
+        workflow_graph.add_workflow(dummy_workflow)
+
+        fused_chains = workflow_graph._find_fusable_chains()
+
+        assert len(fused_chains) == 1
+        assert [protocol_id.split('|')[-1] for protocol_id in fused_chains[0]] == ['add_a', 'add_b']
+
+        dask_local_backend = DaskLocalClusterBackend(1, ComputeResources(1))
+        dask_local_backend.start()
+
+        results_futures = workflow_graph.submit(dask_local_backend)
+
+        assert len(results_futures) == 1
+
+        result = results_futures[0].result()
+        assert isinstance(result, CalculationLayerResult)
+        assert result.calculated_property.value == 3 * unit.kelvin
+
+        for protocol_id in fused_chains[0]:
+
+            protocol = dummy_workflow.protocols[protocol_id]
+            assert path.isfile(path.join(protocol.directory, f'{protocol_id}_output.json'))
+
+
+def test_workflow_graph_critical_paths():
+    """Tests that protocols at the start of long chains of work are prioritised."""
+    dummy_schema = WorkflowSchema()
+
+    dummy_protocol_a = DummyEstimatedQuantityProtocol('protocol_a')
+    dummy_protocol_a.input_value = EstimatedQuantity(1 * unit.kelvin, 0.1 * unit.kelvin, 'dummy_source')
+
+    dummy_schema.protocols[dummy_protocol_a.id] = dummy_protocol_a.schema
+
+    add_protocol = AddQuantities('add')
+    add_protocol.values = [ProtocolPath('output_value', dummy_protocol_a.id)]
+
+    dummy_schema.protocols[add_protocol.id] = add_protocol.schema
+
+    dummy_schema.final_value_source = ProtocolPath('result', add_protocol.id)
+    dummy_schema.validate_interfaces()
+
+    dummy_property = create_dummy_property(Density)
+
+    dummy_workflow = Workflow(dummy_property, {})
+    dummy_workflow.schema = dummy_schema
+
+    workflow_graph = WorkflowGraph()
+    workflow_graph.add_workflow(dummy_workflow)
+
+    estimated_runtimes = {
+        DummyEstimatedQuantityProtocol.__name__: 10.0,
+        AddQuantities.__name__: 0.5
+    }
+
+    critical_path_lengths = workflow_graph._calculate_critical_path_lengths(estimated_runtimes)
+
+    assert len(critical_path_lengths) == 2
+
+    for protocol_id, critical_path_length in critical_path_lengths.items():
+
+        if protocol_id.endswith('protocol_a'):
+            assert critical_path_length == 10.5
+        else:
+            assert critical_path_length == 0.5
@@ -0,0 +1,285 @@
+"""
+A collection of utilities for generating partial charges, and for
+caching them on disk so that they can be shared between workers.
+"""
+import json
+import logging
+import sqlite3
+from contextlib import closing
+from os import path, makedirs
+
+from propertyestimator.utils.metrics import default_registry
+
+
+def get_toolkit_version():
+    """Returns the versions of the OpenEye toolkits used to
+    generate partial charges.
+
+    Returns
+    -------
+    str
+        The versions of the OEChem and QUACPAC toolkits.
+    """
+    from openeye import oechem, oequacpac
+    return 'oechem-{}_oequacpac-{}'.format(oechem.OEChemGetRelease(), oequacpac.OEQuacPacGetRelease())
+
+
+def canonicalize_molecule(molecule):
+    """Creates a copy of a molecule whose atoms and bonds are in a canonical
+    order, and returns it along with its canonical isomeric smiles pattern.
+
+    Parameters
+    ----------
+    molecule: OEMol
+        The molecule to canonicalize.
+
+    Returns
+    -------
+    OEMol
+        The canonically ordered copy of the molecule.
+    str
+        The canonical isomeric smiles pattern of the molecule.
+    """
+    from openeye import oechem
+
+    canonical_molecule = oechem.OEMol(molecule)
+
+    oechem.OECanonicalOrderAtoms(canonical_molecule)
+    oechem.OECanonicalOrderBonds(canonical_molecule)
+
+    return canonical_molecule, oechem.OECreateIsoSmiString(canonical_molecule)
+
+
+def generate_partial_charges(molecule, charge_method):
+    """Generates the partial charges of a molecule using one of
+    the OpenEye `OECharges_*` charge methods.
+
+    Parameters
+    ----------
+    molecule: OEMol
+        The molecule to generate charges for. This will not be modified.
+    charge_method: str
+        The name of the charge method, e.g. `OECharges_AM1BCCSym`.
+
+    Returns
+    -------
+    list of float, optional
+        The partial charge of each atom in the molecule, in units of
+        elementary charge, or `None` if the charges could not be generated.
+    """
+    from openeye import oechem, oeomega, oequacpac
+
+    if not charge_method.startswith('OECharges_') or not hasattr(oequacpac, charge_method):
+
+        raise ValueError('The {} charge method is not a supported OpenEye '
+                         'charge method.'.format(charge_method))
+
+    charged_molecule = oechem.OEMol(molecule)
+
+    if charged_molecule.GetDimension() != 3:
+
+        # Semi-empirical charge methods require the molecule to have coordinates.
+        omega = oeomega.OEOmega()
+
+        omega.SetMaxConfs(1)
+        omega.SetIncludeInput(False)
+        omega.SetCanonOrder(False)
+        omega.SetSampleHydrogens(True)
+        omega.SetStrictStereo(True)
+        omega.SetStrictAtomTypes(False)
+
+        if not omega(charged_molecule):
+
+            logging.warning('Could not generate a conformer for ' + oechem.OECreateIsoSmiString(molecule))
+            return None
+
+    if not oequacpac.OEAssignPartialCharges(charged_molecule, getattr(oequacpac, charge_method)):
+
+        logging.warning('Could not generate {} charges for {}'.format(charge_method,
+                                                                      oechem.OECreateIsoSmiString(molecule)))
+        return None
+
+    return [atom.GetPartialCharge() for atom in charged_molecule.GetAtoms()]
+
+
+class PartialChargeCache:
+    """A simple, local SQLite backed store of the partial charges which
+    have been generated for molecules, keyed by the canonical isomeric smiles
+    of the molecule, the charge method, and the version of the toolkit
+    used to generate them.
+
+    The charges of each molecule are stored in the canonical atom order
+    of that molecule (see `canonicalize_molecule`).
+
+    The cache may safely be written to by multiple workers at once
+    so long as they share a file system which supports file locking.
+    """
+
+    _table_name = 'partial_charges'
+
+    @property
+    def cache_path(self):
+        """str: The path to the underlying SQLite database."""
+        return self._cache_path
+
+    @property
+    def number_of_hits(self):
+        """int: The number of lookups made through this object which found charges."""
+        return self._number_of_hits
+
+    @property
+    def number_of_misses(self):
+        """int: The number of lookups made through this object which did not find charges."""
+        return self._number_of_misses
+
+    @property
+    def hit_rate(self):
+        """float: The fraction of lookups made through this object which found charges."""
+        number_of_lookups = self._number_of_hits + self._number_of_misses
+        return 0.0 if number_of_lookups == 0 else self._number_of_hits / number_of_lookups
+
+    def __init__(self, cache_path):
+        """Constructs a new PartialChargeCache object.
+
+        Parameters
+        ----------
+        cache_path: str
+            The path to the cache database. This will be created if
+            it does not already exist.
+        """
+
+        self._cache_path = cache_path
+
+        self._number_of_hits = 0
+        self._number_of_misses = 0
+
+        self._lookups_counter = default_registry.counter('propertyestimator_charge_cache_lookups_total',
+                                                         'The number of partial charge cache lookups.',
+                                                         ('result',))
+
+        cache_directory = path.dirname(cache_path)
+
+        if len(cache_directory) > 0 and not path.isdir(cache_directory):
+            makedirs(cache_directory, exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {self._table_name} ('
+                               f'smiles TEXT NOT NULL, '
+                               f'charge_method TEXT NOT NULL, '
+                               f'toolkit_version TEXT NOT NULL, '
+                               f'charges TEXT NOT NULL, '
+                               f'PRIMARY KEY (smiles, charge_method, toolkit_version))')
+
+    def _connect(self):
+        """Opens a new connection to the database.
+
+        Returns
+        -------
+        sqlite3.Connection
+            The opened connection.
+        """
+        # A generous timeout is used as many workers may be trying
+        # to write to the cache at once.
+        return sqlite3.connect(self._cache_path, timeout=60.0)
+
+    def retrieve(self, smiles, charge_method, toolkit_version):
+        """Retrieves the cached charges of a molecule.
+
+        Parameters
+        ----------
+        smiles: str
+            The canonical isomeric smiles pattern of the molecule.
+        charge_method: str
+            The method used to generate the charges.
+        toolkit_version: str
+            The version of the toolkit used to generate the charges.
+
+        Returns
+        -------
+        list of float, optional
+            The charges in the canonical atom order of the molecule,
+            or `None` if no charges have been cached.
+        """
+
+        with closing(self._connect()) as connection, connection:
+
+            row = connection.execute(f'SELECT charges FROM {self._table_name} WHERE '
+                                     f'smiles = ? AND charge_method = ? AND toolkit_version = ?',
+                                     (smiles, charge_method, toolkit_version)).fetchone()
+
+        if row is None:
+
+            self._number_of_misses += 1
+            self._lookups_counter.increment(result='miss')
+
+            return None
+
+        self._number_of_hits += 1
+        self._lookups_counter.increment(result='hit')
+
+        return json.loads(row[0])
+
+    def store(self, smiles, charge_method, toolkit_version, charges):
+        """Stores the charges of a molecule in the cache, replacing
+        any which have already been stored.
+
+        Parameters
+        ----------
+        smiles: str
+            The canonical isomeric smiles pattern of the molecule.
+        charge_method: str
+            The method used to generate the charges.
+        toolkit_version: str
+            The version of the toolkit used to generate the charges.
+        charges: list of float
+            The charges in the canonical atom order of the molecule.
+        """
+
+        with closing(self._connect()) as connection, connection:
+
+            connection.execute(f'INSERT OR REPLACE INTO {self._table_name} VALUES (?, ?, ?, ?)',
+                               (smiles, charge_method, toolkit_version, json.dumps(list(charges))))
+
+    def assign_charges(self, molecule, charge_method):
+        """Returns a canonically ordered copy of a molecule with partial charges
+        assigned. The charges are taken from the cache if available, and are
+        otherwise generated and then added to the cache.
+
+        Parameters
+        ----------
+        molecule: OEMol
+            The molecule to assign charges to. This will not be modified.
+        charge_method: str
+            The name of the OpenEye charge method, e.g. `OECharges_AM1BCCSym`.
+
+        Returns
+        -------
+        OEMol, optional
+            The charged copy of the molecule, or `None` if charges
+            could not be generated.
+        """
+
+        charged_molecule, smiles = canonicalize_molecule(molecule)
+        toolkit_version = get_toolkit_version()
+
+        charges = self.retrieve(smiles, charge_method, toolkit_version)
+
+        if charges is None:
+
+            charges = generate_partial_charges(charged_molecule, charge_method)
+
+            if charges is None:
+                return None
+
+            self.store(smiles, charge_method, toolkit_version, charges)
+
+        if len(charges) != charged_molecule.NumAtoms():
+
+            raise ValueError(f'The {len(charges)} cached charges of {smiles} do not match '
+                             f'its {charged_molecule.NumAtoms()} atoms.')
+
+        for atom, charge in zip(charged_molecule.GetAtoms(), charges):
+            atom.SetPartialCharge(charge)
+
+        return charged_molecule
@@ -0,0 +1,144 @@
+"""
+A collection of utilities for capturing (i.e. linking or copying) files
+without needlessly duplicating their contents, and for checking their integrity.
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import sys
+from enum import Enum
+
+# The ioctl request code used to clone (reflink) a file on Linux.
+_FICLONE = 0x40049409
+
+
+class FileCaptureMethod(Enum):
+    """The ways in which a file may be captured."""
+
+    Reflink = 'Reflink'
+    Hardlink = 'Hardlink'
+    Copy = 'Copy'
+
+
+def calculate_file_checksum(file_path, block_size=1 << 20):
+    """Calculates the SHA-256 checksum of a file, reading it
+    one block at a time.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the file.
+    block_size: int
+        The number of bytes to read at a time.
+
+    Returns
+    -------
+    str
+        The hex digest of the checksum.
+    """
+
+    checksum = hashlib.sha256()
+
+    with open(file_path, 'rb') as file:
+
+        for block in iter(lambda: file.read(block_size), b''):
+            checksum.update(block)
+
+    return checksum.hexdigest()
+
+
+def _reflink_file(source_path, destination_path):
+    """Attempts to create a copy-on-write clone of a file. This is only
+    supported on Linux file systems such as Btrfs and XFS.
+
+    Parameters
+    ----------
+    source_path: str
+        The path to the file to clone.
+    destination_path: str
+        The path to create the clone at.
+
+    Returns
+    -------
+    bool
+        True if the clone was created.
+    """
+
+    if not sys.platform.startswith('linux'):
+        return False
+
+    import fcntl
+
+    try:
+
+        with open(source_path, 'rb') as source_file, open(destination_path, 'wb') as destination_file:
+            fcntl.ioctl(destination_file.fileno(), _FICLONE, source_file.fileno())
+
+    except OSError:
+
+        if os.path.isfile(destination_path):
+            os.unlink(destination_path)
+
+        return False
+
+    shutil.copystat(source_path, destination_path)
+    return True
+
+
+def capture_file(source_path, destination_path, allow_hardlink=True):
+    """Captures a file at a new path, without duplicating its contents
+    where possible.
+
+    The file is reflinked (i.e. cloned copy-on-write) if the file system
+    supports it, hardlinked if the destination is on the same file system
+    as the source, and otherwise copied.
+
+    Notes
+    -----
+    A hardlinked file shares its contents with the original, so any later
+    modifications to the original file will also modify the captured file.
+    Hardlinks should only be allowed when the original will not be modified.
+
+    Parameters
+    ----------
+    source_path: str
+        The path to the file to capture.
+    destination_path: str
+        The path to capture the file at. If this is a directory, the
+        file will be captured inside of it using its original name.
+    allow_hardlink: bool
+        Whether the file may be hardlinked.
+
+    Returns
+    -------
+    FileCaptureMethod
+        The way in which the file was captured.
+    """
+
+    if os.path.isdir(destination_path):
+        destination_path = os.path.join(destination_path, os.path.basename(source_path))
+
+    if os.path.lexists(destination_path):
+        os.unlink(destination_path)
+
+    if _reflink_file(source_path, destination_path):
+        return FileCaptureMethod.Reflink
+
+    if allow_hardlink:
+
+        try:
+
+            os.link(source_path, destination_path)
+            return FileCaptureMethod.Hardlink
+
+        except OSError as e:
+
+            if e.errno not in [errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP]:
+                raise
+
+            logging.debug(f'{source_path} could not be hardlinked ({e.strerror}) and will be copied.')
+
+    shutil.copy2(source_path, destination_path)
+    return FileCaptureMethod.Copy
@@ -229,6 +229,108 @@ def is_acyclic(graph):
     return len(graph) == 0 or len(topological_sort(graph)) != 0
 
 
+def find_linear_chains(graph, fusable_nodes, terminal_nodes=None):
+    """Finds the chains of nodes in a graph which may be fused together
+    into, and executed as, a single node.
+
+    A chain is built by walking from a fusable node to its only dependant
+    for as long as that dependant is also fusable. Because every node in
+    a chain (bar the last one) has exactly one dependant, nodes outside of
+    the chain may only ever depend on its final node, and so fusing the
+    chain can never introduce a cycle into the graph.
+
+    Notes
+    -----
+    The graph must be directed and acyclic.
+
+    Parameters
+    ----------
+    graph: dict(str, list(str))
+        The graph to explore. Each key in the dictionary represents a node in the graph, and each
+        string in the value list represents a node which depends on the node defined by the key.
+    fusable_nodes: list(str)
+        The nodes which are allowed to be fused together.
+    terminal_nodes: list(str), optional
+        The nodes whose outputs are needed from outside of the graph, and
+        which may therefore only appear at the end of a chain.
+
+    Returns
+    -------
+    list(list(str))
+        The chains of nodes, ordered such that each node depends on the node
+        before it. Only chains of more than one node are returned.
+    """
+
+    if terminal_nodes is None:
+        terminal_nodes = []
+
+    fusable_nodes = set(fusable_nodes)
+    terminal_nodes = set(terminal_nodes)
+
+    visited_nodes = set()
+    chains = []
+
+    for node_key in topological_sort(graph):
+
+        if node_key in visited_nodes or node_key not in fusable_nodes:
+            continue
+
+        chain = [node_key]
+        visited_nodes.add(node_key)
+
+        current_node_key = node_key
+
+        while (current_node_key not in terminal_nodes and
+               len(graph[current_node_key]) == 1 and
+               graph[current_node_key][0] in fusable_nodes and
+               graph[current_node_key][0] not in visited_nodes):
+
+            current_node_key = graph[current_node_key][0]
+
+            chain.append(current_node_key)
+            visited_nodes.add(current_node_key)
+
+        if len(chain) < 2:
+            continue
+
+        chains.append(chain)
+
+    return chains
+
+
+def calculate_critical_path_lengths(graph, node_costs):
+    """Calculates the length of the critical (i.e. most costly) path which
+    starts at each node of a graph and runs to the end of the graph, such that
+    nodes with the longest chains of work depending on them can be identified.
+
+    Notes
+    -----
+    The graph must be directed and acyclic.
+
+    Parameters
+    ----------
+    graph: dict(str, list(str))
+        The graph to explore. Each key in the dictionary represents a node in the graph, and each
+        string in the value list represents a node which depends on the node defined by the key.
+    node_costs: dict(str, float)
+        The cost (e.g. the estimated runtime) of each node in the graph.
+
+    Returns
+    -------
+    dict(str, float)
+        The length of the critical path starting at (and including) each node.
+    """
+
+    critical_path_lengths = {}
+
+    for node_key in reversed(topological_sort(graph)):
+
+        dependant_path_lengths = [critical_path_lengths[dependant] for dependant in graph[node_key]]
+        critical_path_lengths[node_key] = node_costs[node_key] + max(dependant_path_lengths, default=0.0)
+
+    return critical_path_lengths
+
+
 def append_uuid(base_id, uuid):
     """Appends a uuid to a base id
 
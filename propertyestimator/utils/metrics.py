@@ -0,0 +1,550 @@
+"""
+A collection of simple metrics (counters, gauges and histograms) which can
+be rendered in the Prometheus text exposition format.
+"""
+import errno
+import logging
+import math
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# The environment variable which, when set, defines the first port on
+# which the calculation workers will serve their metrics.
+WORKER_METRICS_PORT_VARIABLE = 'PROPERTYESTIMATOR_WORKER_METRICS_PORT'
+
+
+def _format_value(value):
+    """Formats a sample value as expected by the Prometheus text format.
+
+    Parameters
+    ----------
+    value: float
+        The value to format.
+
+    Returns
+    -------
+    str
+        The formatted value.
+    """
+
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+
+    if math.isnan(value):
+        return 'NaN'
+
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    """Formats a set of labels as expected by the Prometheus text format.
+
+    Parameters
+    ----------
+    labels: list of tuple of str and str
+        The (name, value) of each label.
+
+    Returns
+    -------
+    str
+        The formatted labels.
+    """
+
+    if len(labels) == 0:
+        return ''
+
+    formatted_labels = []
+
+    for label_name, label_value in labels:
+
+        escaped_value = str(label_value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+        formatted_labels.append(f'{label_name}="{escaped_value}"')
+
+    return '{' + ','.join(formatted_labels) + '}'
+
+
+class BaseMetric:
+    """The base class for a named metric, whose values may be
+    partitioned by a set of labels."""
+
+    metric_type = None
+
+    @property
+    def name(self):
+        """str: The name of the metric."""
+        return self._name
+
+    @property
+    def description(self):
+        """str: A description of what the metric measures."""
+        return self._description
+
+    @property
+    def label_names(self):
+        """tuple of str: The names of the labels which partition this metric."""
+        return self._label_names
+
+    def __init__(self, name, description, label_names=()):
+        """Constructs a new BaseMetric object.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+        """
+
+        self._name = name
+        self._description = description
+        self._label_names = tuple(label_names)
+
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _get_label_values(self, labels):
+        """Converts a dictionary of labels into a tuple of values
+        ordered by `label_names`.
+
+        Parameters
+        ----------
+        labels: dict of str and str
+            The labels to convert.
+
+        Returns
+        -------
+        tuple of str
+            The label values.
+        """
+
+        if set(labels) != set(self._label_names):
+
+            raise ValueError(f'The {self._name} metric expects the {", ".join(self._label_names)} '
+                             f'labels, but was given {", ".join(labels)}.')
+
+        return tuple(str(labels[label_name]) for label_name in self._label_names)
+
+    def _get_samples(self):
+        """Returns the samples of this metric.
+
+        Returns
+        -------
+        list of tuple of str, list of tuple of str and str, and float
+            The name suffix, labels and value of each sample.
+        """
+        raise NotImplementedError()
+
+    def render(self):
+        """Renders this metric in the Prometheus text format.
+
+        Returns
+        -------
+        str
+            The rendered metric.
+        """
+
+        lines = [
+            f'# HELP {self._name} {self._description}',
+            f'# TYPE {self._name} {self.metric_type}'
+        ]
+
+        with self._lock:
+            samples = self._get_samples()
+
+        for suffix, labels, value in samples:
+            lines.append(f'{self._name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+
+        return '\n'.join(lines)
+
+
+class Counter(BaseMetric):
+    """A metric whose value can only ever increase."""
+
+    metric_type = 'counter'
+
+    def increment(self, amount=1.0, **labels):
+        """Increments the value of the counter.
+
+        Parameters
+        ----------
+        amount: float
+            The (non-negative) amount to increment the counter by.
+        labels: dict of str and str
+            The labels of the value to increment.
+        """
+
+        if amount < 0:
+            raise ValueError('Counters can only be incremented by non-negative amounts.')
+
+        label_values = self._get_label_values(labels)
+
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def get_value(self, **labels):
+        """float: Returns the current value of the counter."""
+        return self._values.get(self._get_label_values(labels), 0.0)
+
+    def _get_samples(self):
+
+        return [('', list(zip(self._label_names, label_values)), value)
+                for label_values, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """A metric whose value can arbitrarily go up and down."""
+
+    metric_type = 'gauge'
+
+    def increment(self, amount=1.0, **labels):
+        """Increments (or decrements if negative) the value of the gauge.
+
+        Parameters
+        ----------
+        amount: float
+            The amount to increment the gauge by.
+        labels: dict of str and str
+            The labels of the value to increment.
+        """
+
+        label_values = self._get_label_values(labels)
+
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def set_value(self, value, **labels):
+        """Sets the value of the gauge.
+
+        Parameters
+        ----------
+        value: float
+            The value to set.
+        labels: dict of str and str
+            The labels of the value to set.
+        """
+
+        label_values = self._get_label_values(labels)
+
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(BaseMetric):
+    """A metric which counts observed values in a set of cumulative buckets."""
+
+    metric_type = 'histogram'
+
+    default_buckets = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, 14400.0, 86400.0)
+
+    def __init__(self, name, description, label_names=(), buckets=None):
+        """Constructs a new Histogram object.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+        buckets: tuple of float, optional
+            The upper bounds of the buckets. If `None`, `default_buckets`
+            will be used, which are suited to timings in seconds.
+        """
+
+        super().__init__(name, description, label_names)
+
+        if buckets is None:
+            buckets = self.default_buckets
+
+        self._buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """Records an observed value.
+
+        Parameters
+        ----------
+        value: float
+            The observed value.
+        labels: dict of str and str
+            The labels of the observation.
+        """
+
+        label_values = self._get_label_values(labels)
+
+        with self._lock:
+
+            if label_values not in self._values:
+                self._values[label_values] = ([0] * (len(self._buckets) + 1), 0.0)
+
+            bucket_counts, total = self._values[label_values]
+            bucket_counts[bisect_left(self._buckets, value)] += 1
+
+            self._values[label_values] = (bucket_counts, total + value)
+
+    def get_count(self, **labels):
+        """int: Returns the number of observed values."""
+
+        label_values = self._get_label_values(labels)
+
+        if label_values not in self._values:
+            return 0
+
+        return sum(self._values[label_values][0])
+
+    def _get_samples(self):
+
+        samples = []
+
+        for label_values, (bucket_counts, total) in sorted(self._values.items()):
+
+            labels = list(zip(self._label_names, label_values))
+            cumulative_count = 0
+
+            for upper_bound, bucket_count in zip(self._buckets + (math.inf,), bucket_counts):
+
+                cumulative_count += bucket_count
+                samples.append(('_bucket', labels + [('le', _format_value(upper_bound))], cumulative_count))
+
+            samples.append(('_sum', labels, total))
+            samples.append(('_count', labels, cumulative_count))
+
+        return samples
+
+
+class MetricsRegistry:
+    """A collection of metrics which are rendered together."""
+
+    def __init__(self):
+        """Constructs a new MetricsRegistry object."""
+
+        self._metrics = {}
+        self._collectors = []
+
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, description, label_names, **kwargs):
+        """Returns the metric with a given name, creating it if it
+        has not yet been registered.
+
+        Parameters
+        ----------
+        metric_class: type of BaseMetric
+            The type of metric.
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+
+        Returns
+        -------
+        BaseMetric
+            The registered metric.
+        """
+
+        with self._lock:
+
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, description, label_names, **kwargs)
+
+            metric = self._metrics[name]
+
+        if type(metric) != metric_class or metric.label_names != tuple(label_names):
+
+            raise ValueError(f'A different {metric.metric_type} metric has already been '
+                             f'registered with the name {name}.')
+
+        return metric
+
+    def counter(self, name, description, label_names=()):
+        """Returns the counter with a given name, creating it if needed.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+
+        Returns
+        -------
+        Counter
+            The registered counter.
+        """
+        return self._get_or_create(Counter, name, description, label_names)
+
+    def gauge(self, name, description, label_names=()):
+        """Returns the gauge with a given name, creating it if needed.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+
+        Returns
+        -------
+        Gauge
+            The registered gauge.
+        """
+        return self._get_or_create(Gauge, name, description, label_names)
+
+    def histogram(self, name, description, label_names=(), buckets=None):
+        """Returns the histogram with a given name, creating it if needed.
+
+        Parameters
+        ----------
+        name: str
+            The name of the metric.
+        description: str
+            A description of what the metric measures.
+        label_names: tuple of str
+            The names of the labels which partition this metric.
+        buckets: tuple of float, optional
+            The upper bounds of the buckets.
+
+        Returns
+        -------
+        Histogram
+            The registered histogram.
+        """
+        return self._get_or_create(Histogram, name, description, label_names, buckets=buckets)
+
+    def add_collector(self, collector):
+        """Adds a function which will be called to update any metrics
+        (e.g. the current depth of a queue) just before they are rendered.
+
+        Parameters
+        ----------
+        collector: function
+            The function to call, which takes no arguments.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """Renders all of the registered metrics in the Prometheus
+        text exposition format.
+
+        Returns
+        -------
+        str
+            The rendered metrics.
+        """
+
+        for collector in self._collectors:
+            collector()
+
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+default_registry = MetricsRegistry()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves the metrics of the `default_registry` in the Prometheus text format."""
+
+    def do_GET(self):
+
+        if self.path != '/metrics':
+
+            self.send_error(404)
+            return
+
+        body = default_registry.render().encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_worker_metrics_server = None
+_worker_metrics_server_lock = threading.Lock()
+
+
+def serve_worker_metrics(maximum_port_attempts=100):
+    """Serves the metrics in the `default_registry` of this process over HTTP
+    (at the `/metrics` path) if the `PROPERTYESTIMATOR_WORKER_METRICS_PORT`
+    environment variable is set. Calling this function more than once within
+    the same process has no further effect.
+
+    Notes
+    -----
+    The metrics of the `default_registry` (such as those of the charge, molecule
+    and context caches) are tracked per process. When calculations are run by
+    workers in separate processes (or on separate machines), these metrics are
+    not visible from the server, and must instead be scraped from each worker.
+
+    As several workers may run on the same machine, each worker serves its metrics
+    on the first free port at or above the port set by the environment variable.
+
+    Parameters
+    ----------
+    maximum_port_attempts: int
+        The maximum number of ports to try before giving up.
+
+    Returns
+    -------
+    int, optional
+        The port on which the metrics are being served, or `None` if they
+        are not being served.
+    """
+    global _worker_metrics_server
+
+    base_port = os.environ.get(WORKER_METRICS_PORT_VARIABLE)
+
+    if base_port is None or len(base_port) == 0:
+        return None
+
+    with _worker_metrics_server_lock:
+
+        if _worker_metrics_server is not None:
+            return _worker_metrics_server.server_address[1]
+
+        for port in range(int(base_port), int(base_port) + maximum_port_attempts):
+
+            try:
+                _worker_metrics_server = HTTPServer(('', port), _MetricsRequestHandler)
+
+            except OSError as e:
+
+                if e.errno != errno.EADDRINUSE:
+                    raise
+
+                continue
+
+            break
+
+        if _worker_metrics_server is None:
+
+            logging.warning('The worker metrics could not be served as no free ports were found '
+                            'between {} and {}.'.format(base_port, int(base_port) + maximum_port_attempts - 1))
+
+            return None
+
+        server_thread = threading.Thread(target=_worker_metrics_server.serve_forever, daemon=True)
+        server_thread.start()
+
+        port = _worker_metrics_server.server_address[1]
+
+    logging.info('Serving the worker metrics on port {}.'.format(port))
+    return port
@@ -1,7 +1,22 @@
 """
 A set of utilities for helping to perform simulations using openmm.
 """
+import gzip
+import hashlib
+import io
 import logging
+import struct
+import threading
+from collections import OrderedDict
+from os import path
+
+from propertyestimator.utils.metrics import default_registry
+
+# The maximum number of deserialized systems to hold in memory in each worker.
+_maximum_cached_systems = 8
+
+_cached_systems = OrderedDict()
+_cached_systems_lock = threading.Lock()
 
 
 def setup_platform_with_resources(compute_resources):
@@ -49,3 +64,636 @@ def setup_platform_with_resources(compute_resources):
         logging.info('Setting up a simulation with {} threads'.format(compute_resources.number_of_threads))
 
     return platform
+
+
+def serialize_system(system, file_path, compression_level=6):
+    """Serializes an OpenMM system to a gzip compressed XML file.
+
+    Parameters
+    ----------
+    system: simtk.openmm.System or str
+        The system to serialize, or its XML representation.
+    file_path: str
+        The path to save the system to, which by convention should
+        end in `.xml.gz`.
+    compression_level: int
+        The gzip compression level, from 1 (fastest) to 9 (smallest).
+    """
+    from simtk.openmm import XmlSerializer
+
+    system_xml = system if isinstance(system, str) else XmlSerializer.serialize(system)
+
+    file_contents = io.BytesIO()
+
+    # The modification time is fixed so that identical systems
+    # produce identical files (and hence content hashes).
+    with gzip.GzipFile(fileobj=file_contents, mode='wb', compresslevel=compression_level, mtime=0) as file:
+        file.write(system_xml.encode('utf-8'))
+
+    with open(file_path, 'wb') as file:
+        file.write(file_contents.getvalue())
+
+
+def deserialize_system(file_path, read_only=False, return_hash=False):
+    """Deserializes an OpenMM system from either a plain or a gzip
+    compressed XML file.
+
+    Systems which are requested as `read_only` are cached in-process by the hash
+    of the contents of the file, so that repeatedly loading the same system within
+    a worker only requires the file to be read and hashed, rather than parsed.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the serialized system.
+    read_only: bool
+        If true, the returned system is shared with the in-process cache (and hence
+        with any other caller in the same worker), and so must not be modified in
+        any way, including by setting its default periodic box vectors. Objects
+        which copy the system on construction (such as an openmmtools
+        `ThermodynamicState` or an OpenMM `Context`) may safely be created from it.
+
+        If false, a newly parsed system is returned which the caller is free to modify.
+    return_hash: bool
+        If true, the hash of the contents of the file is also returned. This
+        identifies the system far more cheaply than `hash_system`, and so should
+        be passed to `ContextPool.acquire` when borrowing a context for it.
+
+    Returns
+    -------
+    simtk.openmm.System
+        The deserialized system.
+    str, optional
+        The hash of the contents of the file, if `return_hash` is true.
+    """
+    from simtk.openmm import XmlSerializer
+
+    with open(file_path, 'rb') as file:
+        file_contents = file.read()
+
+    content_hash = hashlib.sha256(file_contents).hexdigest()
+
+    if read_only:
+
+        with _cached_systems_lock:
+
+            system = _cached_systems.get(content_hash)
+
+            if system is not None:
+
+                _cached_systems.move_to_end(content_hash)
+                return (system, content_hash) if return_hash else system
+
+    if file_contents[:2] == b'\x1f\x8b':
+        file_contents = gzip.decompress(file_contents)
+
+    system = XmlSerializer.deserialize(file_contents.decode('utf-8'))
+
+    if not read_only:
+        return (system, content_hash) if return_hash else system
+
+    with _cached_systems_lock:
+
+        # Another thread may have cached the same system in the meantime,
+        # in which case its copy is shared instead.
+        system = _cached_systems.setdefault(content_hash, system)
+        _cached_systems.move_to_end(content_hash)
+
+        while len(_cached_systems) > _maximum_cached_systems:
+            _cached_systems.popitem(last=False)
+
+    return (system, content_hash) if return_hash else system
+
+
+class StatisticsReporter:
+    """An OpenMM reporter which appends the statistics of a simulation (such as
+    its energies, temperature and volume) to a binary statistics file, which
+    can be loaded using `StatisticsArray.from_binary`.
+
+    Each report is written to disk immediately, so that the statistics file
+    remains consistent with any trajectory or checkpoint files which are
+    reported at the same interval. The header of the file is only written
+    (or validated) by the first report, after which each report appends a
+    single packed row through the same open file.
+    """
+
+    def __init__(self, file_path, report_interval, pressure=None):
+        """Constructs a new StatisticsReporter object.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the binary statistics file to append to. The file
+            will be created if it does not already exist.
+        report_interval: int
+            The interval (in time steps) at which to write reports.
+        pressure: simtk.unit.Quantity, optional
+            The pressure at which the simulation is being performed, if it is
+            being performed in a constant pressure ensemble. If set, the enthalpy
+            of the system will also be reported.
+        """
+
+        self._file_path = file_path
+        self._report_interval = report_interval
+
+        self._pressure = pressure
+
+        self._degrees_of_freedom = None
+        self._total_mass = None
+
+        self._file = None
+        self._row_format = None
+
+    def _open_file(self):
+        """Opens the statistics file for appending, writing its header if the
+        file does not yet exist, or otherwise checking that its header matches
+        the observables which will be reported."""
+        from propertyestimator.utils.statistics import ObservableType, StatisticsArray
+
+        observable_types = [observable_type for observable_type in ObservableType if
+                            observable_type != ObservableType.Enthalpy or self._pressure is not None]
+
+        row_size = 8 * len(observable_types)
+
+        if path.isfile(self._file_path) and path.getsize(self._file_path) > 0:
+
+            with open(self._file_path, 'r+b') as file:
+
+                existing_observable_types, data_offset = StatisticsArray._read_binary_header(file)
+
+                if existing_observable_types != observable_types:
+
+                    raise ValueError(f'The observables being reported do not match those '
+                                     f'already stored in {self._file_path}.')
+
+                # A simulation which was interrupted mid-report may have left a
+                # partially written row, which would misalign any appended rows.
+                file_size = path.getsize(self._file_path)
+                partial_row_size = (file_size - data_offset) % row_size
+
+                if partial_row_size > 0:
+                    file.truncate(file_size - partial_row_size)
+
+            self._file = open(self._file_path, 'ab')
+
+        else:
+
+            self._file = open(self._file_path, 'wb')
+            StatisticsArray._write_binary_header(self._file, observable_types)
+
+        self._row_format = '<{}d'.format(len(observable_types))
+
+    def close(self):
+        """Closes the statistics file."""
+
+        if self._file is None:
+            return
+
+        self._file.close()
+        self._file = None
+
+    def __del__(self):
+        self.close()
+
+    def _initialize_constants(self, system):
+        """Computes the number of degrees of freedom, and the
+        total mass of a system.
+
+        Parameters
+        ----------
+        system: simtk.openmm.System
+            The system being simulated.
+        """
+        from simtk import openmm, unit
+
+        self._degrees_of_freedom = 0
+
+        for particle_index in range(system.getNumParticles()):
+
+            if system.getParticleMass(particle_index) > 0 * unit.dalton:
+                self._degrees_of_freedom += 3
+
+        for constraint_index in range(system.getNumConstraints()):
+
+            particle_1, particle_2, _ = system.getConstraintParameters(constraint_index)
+
+            if (system.getParticleMass(particle_1) > 0 * unit.dalton or
+                system.getParticleMass(particle_2) > 0 * unit.dalton):
+
+                self._degrees_of_freedom -= 1
+
+        if any(isinstance(system.getForce(force_index), openmm.CMMotionRemover) for
+               force_index in range(system.getNumForces())):
+
+            self._degrees_of_freedom -= 3
+
+        self._total_mass = sum([system.getParticleMass(particle_index) for
+                                particle_index in range(system.getNumParticles())], 0 * unit.dalton)
+
+    def describeNextReport(self, simulation):
+        """Get information about the next report this object will generate.
+
+        Parameters
+        ----------
+        simulation: simtk.openmm.app.Simulation
+            The simulation to generate a report for.
+
+        Returns
+        -------
+        tuple
+            The number of steps until the next report, and whether the
+            positions, velocities, forces and energies are needed.
+        """
+        steps = self._report_interval - simulation.currentStep % self._report_interval
+        return steps, False, False, False, True
+
+    def report(self, simulation, state):
+        """Appends a report of the current state of a simulation.
+
+        Parameters
+        ----------
+        simulation: simtk.openmm.app.Simulation
+            The simulation to generate a report for.
+        state: simtk.openmm.State
+            The current state of the simulation.
+        """
+        from simtk import unit
+
+        if self._degrees_of_freedom is None:
+            self._initialize_constants(simulation.system)
+
+        if self._file is None:
+            self._open_file()
+
+        potential_energy = state.getPotentialEnergy()
+        kinetic_energy = state.getKineticEnergy()
+
+        total_energy = potential_energy + kinetic_energy
+
+        temperature = 2.0 * kinetic_energy / (self._degrees_of_freedom * unit.MOLAR_GAS_CONSTANT_R)
+
+        volume = state.getPeriodicBoxVolume()
+        density = self._total_mass / volume / unit.AVOGADRO_CONSTANT_NA
+
+        # The values are written in the column order and units of `StatisticsArray` binary files.
+        row = [
+            potential_energy.value_in_unit(unit.kilojoule_per_mole),
+            kinetic_energy.value_in_unit(unit.kilojoule_per_mole),
+            total_energy.value_in_unit(unit.kilojoule_per_mole),
+            temperature.value_in_unit(unit.kelvin),
+            volume.value_in_unit(unit.nanometer**3),
+            density.value_in_unit(unit.gram / unit.milliliter)
+        ]
+
+        if self._pressure is not None:
+
+            enthalpy = total_energy + volume * self._pressure * unit.AVOGADRO_CONSTANT_NA
+            row.append(enthalpy.value_in_unit(unit.kilojoule_per_mole))
+
+        self._file.write(struct.pack(self._row_format, *row))
+        self._file.flush()
+
+
+def hash_system(system):
+    """Computes a hash of the XML representation of an OpenMM system.
+
+    Parameters
+    ----------
+    system: simtk.openmm.System
+        The system to hash.
+
+    Returns
+    -------
+    str
+        The hex digest of the hash.
+    """
+    from simtk.openmm import XmlSerializer
+    return hashlib.sha256(XmlSerializer.serialize(system).encode('utf-8')).hexdigest()
+
+
+def create_simulation(topology, system, integrator, context):
+    """Creates an OpenMM `Simulation` object around an existing context (such
+    as one borrowed from a `ContextPool`), rather than creating a new one.
+
+    Parameters
+    ----------
+    topology: simtk.openmm.app.Topology
+        The topology of the simulated system.
+    system: simtk.openmm.System
+        The system which the context was created from.
+    integrator: simtk.openmm.Integrator
+        The integrator which the context was created with.
+    context: simtk.openmm.Context
+        The context to simulate with.
+
+    Returns
+    -------
+    simtk.openmm.app.Simulation
+        The created simulation.
+    """
+    from simtk.openmm import app
+
+    # Mirror the attributes set by `Simulation.__init__`, without
+    # creating a new context.
+    simulation = app.Simulation.__new__(app.Simulation)
+
+    simulation.topology = topology
+    simulation.system = system
+    simulation.integrator = integrator
+    simulation.currentStep = 0
+    simulation.reporters = []
+    simulation.context = context
+
+    try:
+        simulation._usesPBC = system.usesPeriodicBoundaryConditions()
+    except Exception:
+        simulation._usesPBC = topology.getUnitCellDimensions() is not None
+
+    return simulation
+
+
+class PooledContext:
+    """An OpenMM context (and its integrator) which
+    has been borrowed from a `ContextPool`."""
+
+    @property
+    def context(self):
+        """simtk.openmm.Context: The borrowed context."""
+        return self._context
+
+    @property
+    def integrator(self):
+        """simtk.openmm.Integrator: The integrator of the borrowed context."""
+        return self._integrator
+
+    @property
+    def key(self):
+        """tuple: The key which identifies which contexts are interchangeable."""
+        return self._key
+
+    @property
+    def estimated_memory(self):
+        """int: The estimated memory in bytes used by the context."""
+        return self._estimated_memory
+
+    def __init__(self, context, integrator, key, estimated_memory):
+        """Constructs a new PooledContext object.
+
+        Parameters
+        ----------
+        context: simtk.openmm.Context
+            The context.
+        integrator: simtk.openmm.Integrator
+            The integrator of the context.
+        key: tuple
+            The key which identifies which contexts are interchangeable.
+        estimated_memory: int
+            The estimated memory in bytes used by the context.
+        """
+
+        self._context = context
+        self._integrator = integrator
+        self._key = key
+        self._estimated_memory = estimated_memory
+
+
+class ContextPool:
+    """A worker-local, size bounded pool of OpenMM contexts which protocols can
+    borrow from, so that the cost of creating a context (including compiling its
+    kernels) is only paid once for each system, state and platform.
+
+    Contexts are interchangeable if they were created for the same system (as
+    identified by its hash), thermodynamic state, platform (including its default
+    property values) and integrator type. Borrowers must set the positions, box
+    vectors, velocities and integrator parameters they need, as these will hold
+    the values left by the previous borrower.
+
+    Idle contexts are evicted in least recently used order when the pool holds
+    more than `maximum_contexts` contexts, or when the estimated memory of the
+    contexts exceeds `maximum_memory`.
+    """
+
+    # A rough estimate of the memory required per particle of a context,
+    # which is used when accounting for the memory held by the pool.
+    estimated_bytes_per_particle = 4096
+
+    @property
+    def maximum_contexts(self):
+        """int: The maximum number of contexts held by the pool."""
+        return self._maximum_contexts
+
+    @property
+    def maximum_memory(self):
+        """int: The maximum estimated memory in bytes of the contexts held by the pool."""
+        return self._maximum_memory
+
+    @property
+    def number_of_contexts(self):
+        """int: The number of contexts (both idle and borrowed) held by the pool."""
+        with self._lock:
+            return self._number_of_contexts
+
+    @property
+    def estimated_memory(self):
+        """int: The estimated memory in bytes of the contexts held by the pool."""
+        with self._lock:
+            return self._estimated_memory
+
+    def __init__(self, maximum_contexts=4, maximum_memory=4 * 1024 ** 3):
+        """Constructs a new ContextPool object.
+
+        Parameters
+        ----------
+        maximum_contexts: int
+            The maximum number of contexts to hold in the pool.
+        maximum_memory: int
+            The maximum estimated memory in bytes of the contexts held by the pool.
+        """
+
+        self._maximum_contexts = maximum_contexts
+        self._maximum_memory = maximum_memory
+
+        # The idle contexts available for each key, ordered
+        # from least to most recently used.
+        self._idle_contexts = OrderedDict()
+
+        self._number_of_contexts = 0
+        self._estimated_memory = 0
+
+        self._lock = threading.Lock()
+
+        self._requests_counter = default_registry.counter('propertyestimator_context_pool_requests_total',
+                                                          'The number of contexts requested from the pool.',
+                                                          ('result',))
+        self._evictions_counter = default_registry.counter('propertyestimator_context_pool_evictions_total',
+                                                           'The number of contexts evicted from the pool.')
+        self._memory_gauge = default_registry.gauge('propertyestimator_context_pool_memory_bytes',
+                                                    'The estimated memory used by pooled contexts.')
+
+    @staticmethod
+    def _get_key(system_hash, state_key, platform, integrator):
+        """Returns the key which identifies interchangeable contexts.
+
+        Parameters
+        ----------
+        system_hash: str
+            The hash of the system.
+        state_key: tuple
+            A hashable representation of the thermodynamic state.
+        platform: simtk.openmm.Platform
+            The platform to create the context on.
+        integrator: simtk.openmm.Integrator
+            The integrator to create the context with.
+
+        Returns
+        -------
+        tuple
+            The key.
+        """
+
+        platform_properties = tuple((name, platform.getPropertyDefaultValue(name))
+                                    for name in sorted(platform.getPropertyNames()))
+
+        return system_hash, state_key, platform.getName(), platform_properties, integrator.__class__.__name__
+
+    def _evict(self):
+        """Evicts idle contexts until the pool is within its limits. This
+        must be called while holding the pool lock."""
+
+        while ((self._number_of_contexts > self._maximum_contexts or
+                self._estimated_memory > self._maximum_memory) and len(self._idle_contexts) > 0):
+
+            key, pooled_contexts = next(iter(self._idle_contexts.items()))
+            pooled_context = pooled_contexts.pop(0)
+
+            if len(pooled_contexts) == 0:
+                del self._idle_contexts[key]
+
+            self._number_of_contexts -= 1
+            self._estimated_memory -= pooled_context.estimated_memory
+
+            self._evictions_counter.increment()
+
+            del pooled_context
+
+        self._memory_gauge.set_value(self._estimated_memory)
+
+    def acquire(self, system, integrator, platform, state_key=None, system_hash=None, context_factory=None):
+        """Borrows a context from the pool, creating a new one if no idle,
+        interchangeable context is available. The context must be returned
+        to the pool with `release` once it is no longer needed.
+
+        Parameters
+        ----------
+        system: simtk.openmm.System
+            The system to create the context for.
+        integrator: simtk.openmm.Integrator
+            The integrator to create a new context with. If an existing context is
+            borrowed, its own integrator (of the same type) is used instead.
+        platform: simtk.openmm.Platform
+            The platform to create the context on.
+        state_key: tuple, optional
+            A hashable representation of the thermodynamic state of the context.
+        system_hash: str, optional
+            The hash of the system, such as the content hash returned by `deserialize_system`.
+            If `None`, it will be computed using `hash_system`, which requires the full system
+            to be serialized, and so should be avoided where possible.
+        context_factory: function, optional
+            A function which takes the integrator and platform and creates the context.
+            If `None`, a context will be created directly from the system.
+
+        Returns
+        -------
+        PooledContext
+            The borrowed context.
+        """
+        from simtk import openmm
+
+        if system_hash is None:
+            system_hash = hash_system(system)
+
+        key = self._get_key(system_hash, state_key, platform, integrator)
+
+        with self._lock:
+
+            pooled_contexts = self._idle_contexts.get(key)
+
+            if pooled_contexts is not None:
+
+                pooled_context = pooled_contexts.pop()
+
+                if len(pooled_contexts) == 0:
+                    del self._idle_contexts[key]
+
+                self._requests_counter.increment(result='hit')
+                return pooled_context
+
+        self._requests_counter.increment(result='miss')
+
+        if context_factory is None:
+            context = openmm.Context(system, integrator, platform)
+        else:
+            context = context_factory(integrator, platform)
+
+        estimated_memory = system.getNumParticles() * self.estimated_bytes_per_particle
+        pooled_context = PooledContext(context, integrator, key, estimated_memory)
+
+        with self._lock:
+
+            self._number_of_contexts += 1
+            self._estimated_memory += estimated_memory
+
+            self._evict()
+
+        return pooled_context
+
+    def release(self, pooled_context):
+        """Returns a borrowed context to the pool.
+
+        Parameters
+        ----------
+        pooled_context: PooledContext
+            The context to return.
+        """
+
+        with self._lock:
+
+            if pooled_context.key in self._idle_contexts:
+                self._idle_contexts.move_to_end(pooled_context.key)
+
+            self._idle_contexts.setdefault(pooled_context.key, []).append(pooled_context)
+
+            self._evict()
+
+    def discard(self, pooled_context):
+        """Removes a borrowed context from the pool rather than returning it,
+        for example if it may have been left in an invalid state.
+
+        Parameters
+        ----------
+        pooled_context: PooledContext
+            The context to discard.
+        """
+
+        with self._lock:
+
+            self._number_of_contexts -= 1
+            self._estimated_memory -= pooled_context.estimated_memory
+
+            self._memory_gauge.set_value(self._estimated_memory)
+
+    def clear(self):
+        """Evicts all of the idle contexts from the pool."""
+
+        with self._lock:
+
+            maximum_contexts = self._maximum_contexts
+            self._maximum_contexts = -1
+
+            try:
+                self._evict()
+            finally:
+                self._maximum_contexts = maximum_contexts
+
+
+default_context_pool = ContextPool()
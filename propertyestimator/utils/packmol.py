@@ -12,6 +12,7 @@ import random
 import shutil
 import string
 import subprocess
+import time
 
 import numpy as np
 
@@ -29,7 +30,15 @@ _HEADER_TEMPLATE = """
 tolerance {0:f}
 filetype pdb
 output {1:s}
+seed {2:d}
 """
+
+# The seed which packmol uses by default, and which is used
+# by the first of any packing attempts.
+_DEFAULT_SEED = 1234567
+
+# The interval (in seconds) at which running packmol processes are polled.
+_POLL_INTERVAL = 0.1
 # add_amber_ter
 
 _BOX_TEMPLATE = """
@@ -56,7 +65,9 @@ def pack_box(molecules,
              mass_density=None,
              verbose=False,
              working_directory=None,
-             retain_working_files=False):
+             retain_working_files=False,
+             number_of_attempts=1,
+             maximum_concurrent_attempts=1):
 
     """Run packmol to generate a box containing a mixture of molecules.
 
@@ -85,6 +96,12 @@ def pack_box(molecules,
     retain_working_files: bool
         If True all of the working files, such as individual molecule coordinate
         files, will be retained.
+    number_of_attempts: int
+        The number of times to attempt to pack the box, each time with a different
+        random seed, before giving up.
+    maximum_concurrent_attempts: int
+        The maximum number of packmol processes to run at once. As soon as any
+        attempt succeeds, any other running attempts are killed.
 
     Returns
     -------
@@ -102,6 +119,9 @@ def pack_box(molecules,
     if len(molecules) != len(number_of_copies):
         raise ValueError('Length of `molecules` and `number_of_copies` must be identical.')
 
+    if number_of_attempts < 1 or maximum_concurrent_attempts < 1:
+        raise ValueError('At least one packing attempt must be made.')
+
     temporary_directory = False
 
     if working_directory is None:
@@ -127,8 +147,6 @@ def pack_box(molecules,
     if PACKMOL_PATH is None:
         raise IOError("Packmol not found, cannot run pack_box()")
 
-    output_filename = os.path.join(working_directory, "packmol_output.pdb")
-
     # Approximate volume to initialize box
     if box_size is None:
 
@@ -139,67 +157,81 @@ def pack_box(molecules,
 
     unitless_box_angstrom = box_size.value_in_unit(unit.angstrom)
 
-    packmol_input = _HEADER_TEMPLATE.format(tolerance, output_filename)
+    packmol_structures = ''
 
     for (pdb_filename, molecule, count) in zip(pdb_filenames,
                                                molecules,
                                                number_of_copies):
 
-        packmol_input += _BOX_TEMPLATE.format(pdb_filename,
-                                              count,
-                                              unitless_box_angstrom,
-                                              unitless_box_angstrom,
-                                              unitless_box_angstrom)
+        packmol_structures += _BOX_TEMPLATE.format(pdb_filename,
+                                                   count,
+                                                   unitless_box_angstrom,
+                                                   unitless_box_angstrom,
+                                                   unitless_box_angstrom)
 
     if structure_to_solvate is not None:
 
         if not os.path.isfile(structure_to_solvate):
             raise ValueError(f'The structure to solvate ({structure_to_solvate}) does not exist.')
 
-        packmol_input += _SOLVATE_TEMPLATE.format(structure_to_solvate,
-                                                  unitless_box_angstrom / 2.0,
-                                                  unitless_box_angstrom / 2.0,
-                                                  unitless_box_angstrom / 2.0)
+        packmol_structures += _SOLVATE_TEMPLATE.format(structure_to_solvate,
+                                                       unitless_box_angstrom / 2.0,
+                                                       unitless_box_angstrom / 2.0,
+                                                       unitless_box_angstrom / 2.0)
 
-    # Write packmol input
-    packmol_filename = os.path.join(working_directory, "packmol_input.txt")
+    # Write the packmol input of each attempt, each of which
+    # differs only in its random seed and output file.
+    attempt_filenames = []
 
-    with open(packmol_filename, 'w') as file_handle:
-        file_handle.write(packmol_input)
+    for attempt_index in range(number_of_attempts):
 
-    packmol_succeeded = False
+        output_filename = os.path.join(working_directory, "packmol_output.pdb")
+        packmol_filename = os.path.join(working_directory, "packmol_input.txt")
 
-    with open(packmol_filename) as file_handle:
+        if number_of_attempts > 1:
 
-        result = subprocess.check_output(PACKMOL_PATH,
-                                         stdin=file_handle,
-                                         stderr=subprocess.STDOUT).decode("utf-8")
+            output_filename = os.path.join(working_directory, f"packmol_output_{attempt_index}.pdb")
+            packmol_filename = os.path.join(working_directory, f"packmol_input_{attempt_index}.txt")
 
-        if verbose:
-            logging.info(result)
+        packmol_input = _HEADER_TEMPLATE.format(tolerance, output_filename, _DEFAULT_SEED + attempt_index)
+        packmol_input += packmol_structures
 
-        packmol_succeeded = result.find('Success!') > 0
+        with open(packmol_filename, 'w') as file_handle:
+            file_handle.write(packmol_input)
+
+        attempt_filenames.append((packmol_filename, output_filename))
+
+    successful_index = _run_packmol_attempts([packmol_filename for packmol_filename, _ in attempt_filenames],
+                                             maximum_concurrent_attempts,
+                                             verbose)
 
     if not retain_working_files:
 
-        os.unlink(packmol_filename)
+        for attempt_index, (packmol_filename, output_filename) in enumerate(attempt_filenames):
+
+            os.unlink(packmol_filename)
+
+            if os.path.isfile(packmol_filename + '.log'):
+                os.unlink(packmol_filename + '.log')
+
+            if attempt_index != successful_index and os.path.isfile(output_filename):
+                os.unlink(output_filename)
 
         for filename in pdb_filenames:
             os.unlink(filename)
 
-    if not packmol_succeeded:
+    if successful_index is None:
 
         if verbose:
             logging.info("Packmol failed to converge")
 
-        if os.path.isfile(output_filename):
-            os.unlink(output_filename)
-
         if temporary_directory and not retain_working_files:
             shutil.rmtree(working_directory)
 
         return None, None
 
+    _, output_filename = attempt_filenames[successful_index]
+
     # Append missing connect statements to the end of the
     # output file.
     positions, topology = _correct_packmol_output(output_filename,
@@ -226,6 +258,88 @@ def pack_box(molecules,
     return topology, positions
 
 
+def _run_packmol_attempts(input_filenames, maximum_concurrent_attempts, verbose):
+    """Runs packmol on each of a set of input files, with at most
+    `maximum_concurrent_attempts` processes running at once, until
+    one of the runs succeeds. The output of each run is written to
+    a log file alongside its input file.
+
+    Parameters
+    ----------
+    input_filenames: list of str
+        The paths to the packmol input files, in the order in which
+        they should be attempted.
+    maximum_concurrent_attempts: int
+        The maximum number of packmol processes to run at once.
+    verbose: bool
+        If True, the output of each packmol run is logged.
+
+    Returns
+    -------
+    int, optional
+        The index of the first input file which was successfully
+        packed, or `None` if all of the attempts failed.
+    """
+
+    pending_indices = list(range(len(input_filenames)))
+    running_processes = {}
+
+    successful_index = None
+
+    try:
+
+        while successful_index is None and (len(pending_indices) > 0 or len(running_processes) > 0):
+
+            while len(pending_indices) > 0 and len(running_processes) < maximum_concurrent_attempts:
+
+                attempt_index = pending_indices.pop(0)
+
+                with open(input_filenames[attempt_index]) as input_file, \
+                     open(input_filenames[attempt_index] + '.log', 'w') as log_file:
+
+                    running_processes[attempt_index] = subprocess.Popen(PACKMOL_PATH,
+                                                                        stdin=input_file,
+                                                                        stdout=log_file,
+                                                                        stderr=subprocess.STDOUT)
+
+            finished_indices = sorted(attempt_index for attempt_index, process in running_processes.items()
+                                      if process.poll() is not None)
+
+            if len(finished_indices) == 0:
+
+                time.sleep(_POLL_INTERVAL)
+                continue
+
+            for attempt_index in finished_indices:
+
+                running_processes.pop(attempt_index)
+
+                with open(input_filenames[attempt_index] + '.log') as log_file:
+                    result = log_file.read()
+
+                if verbose:
+                    logging.info(result)
+
+                if result.find('Success!') > 0:
+
+                    successful_index = attempt_index
+                    break
+
+                if verbose:
+                    logging.info(f'Packmol attempt {attempt_index} failed to converge')
+
+    finally:
+
+        # Kill any attempts which are still running, either because another
+        # attempt has already succeeded, or because an exception was raised.
+        for process in running_processes.values():
+
+            process.kill()
+            process.wait()
+
+    return successful_index
+
+
 def _approximate_volume_by_density(molecules,
                                    n_copies,
                                    mass_density=1.0*unit.grams/unit.milliliters,
@@ -307,9 +421,6 @@ def _correct_packmol_output(file_path, molecule_topologies,
 
     trajectory = mdtraj.load(file_path)
 
-    atoms_data_frame, _ = trajectory.topology.to_dataframe()
-
-    all_bonds = []
     all_positions = trajectory.openmm_positions(0)
 
     all_topologies = []
@@ -325,52 +436,96 @@ def _correct_packmol_output(file_path, molecule_topologies,
         all_topologies.append(solvated_trajectory.topology)
         all_copies.append(1)
 
+    all_bonds = _generate_bonds(all_topologies, all_copies)
+
+    # We have to check whether there are any existing bonds, because mdtraj will
+    # sometimes automatically detect some based on residue names (e.g HOH), and
+    # this behaviour cannot be disabled.
+    _add_missing_bonds(trajectory.topology, all_bonds)
+
+    return all_positions, trajectory.topology.to_openmm()
+
+
+def _generate_bonds(molecule_topologies, number_of_copies):
+    """Generates the bonds between the atoms of each copy of a set of
+    molecules, where the copies of each molecule are assumed to appear
+    contiguously and in the same order as `molecule_topologies`.
+
+    Parameters
+    ----------
+    molecule_topologies: list of mdtraj.Topology
+        The topologies of the molecules.
+    number_of_copies: list of int
+        The number of copies of each molecule.
+
+    Returns
+    -------
+    numpy.ndarray
+        The unique bonds (shape=[nbonds,2]) between atoms, where the
+        first atom index of each bond is less than the second.
+    """
+
+    all_bonds = []
     offset = 0
 
-    for (molecule_topology, count) in zip(all_topologies, all_copies):
+    for (molecule_topology, count) in zip(molecule_topologies, number_of_copies):
 
         _, molecule_bonds = molecule_topology.to_dataframe()
 
-        for i in range(count):
+        if count > 0 and len(molecule_bonds) > 0:
 
-            for bond in molecule_bonds:
+            bond_indices = np.asarray(molecule_bonds[:, :2]).astype(np.int64)
+            copy_offsets = offset + np.arange(count, dtype=np.int64) * molecule_topology.n_atoms
 
-                all_bonds.append([int(bond[0].item()) + offset,
-                                  int(bond[1].item()) + offset])
+            # Broadcast the bonds of a single molecule over the offsets of all of its copies.
+            copy_bonds = bond_indices[np.newaxis, :, :] + copy_offsets[:, np.newaxis, np.newaxis]
+            all_bonds.append(copy_bonds.reshape(-1, 2))
 
-            offset += molecule_topology.n_atoms
+        offset += count * molecule_topology.n_atoms
 
-    all_bonds = np.unique(all_bonds, axis=0).tolist()
+    if len(all_bonds) == 0:
+        return np.empty((0, 2), dtype=np.int64)
 
-    # We have to check whether there are any existing bonds, because mdtraj will
-    # sometimes automatically detect some based on residue names (e.g HOH), and
-    # this behaviour cannot be disabled.
-    existing_bonds = []
+    return np.unique(np.sort(np.concatenate(all_bonds), axis=1), axis=0)
 
-    for bond in trajectory.topology.bonds:
-        existing_bonds.append(bond)
 
-    for bond in all_bonds:
+def _add_missing_bonds(topology, bonds):
+    """Adds a set of bonds to a topology, skipping any which
+    the topology already contains.
 
-        atom_a = trajectory.topology.atom(bond[0])
-        atom_b = trajectory.topology.atom(bond[1])
+    Parameters
+    ----------
+    topology: mdtraj.Topology
+        The topology to add the bonds to.
+    bonds: numpy.ndarray
+        The bonds (shape=[nbonds,2]) to add, where the first atom index
+        of each bond is less than the second.
 
-        bond_exists = False
+    Returns
+    -------
+    int
+        The number of bonds which were added.
+    """
+
+    existing_bonds = set()
 
-        for existing_bond in existing_bonds:
+    for bond in topology.bonds:
 
-            if ((existing_bond.atom1 == atom_a and existing_bond.atom2 == atom_b) or
-                (existing_bond.atom2 == atom_a and existing_bond.atom1 == atom_b)):
+        index_a, index_b = bond.atom1.index, bond.atom2.index
+        existing_bonds.add((index_a, index_b) if index_a < index_b else (index_b, index_a))
 
-                bond_exists = True
-                break
+    atoms = list(topology.atoms)
+    number_of_added_bonds = 0
 
-        if bond_exists:
+    for index_a, index_b in bonds.tolist():
+
+        if (index_a, index_b) in existing_bonds:
             continue
 
-        trajectory.topology.add_bond(atom_a, atom_b)
+        topology.add_bond(atoms[index_a], atoms[index_b])
+        number_of_added_bonds += 1
 
-    return all_positions, trajectory.topology.to_openmm()
+    return number_of_added_bonds
 
 
 def _create_pdb_and_topology(molecule, file_path):
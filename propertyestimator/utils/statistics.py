@@ -1,10 +1,12 @@
 """
 A collection of classes for loading and manipulating statistics data files.
 """
-import copy
+import json
 import math
+import struct
 from enum import Enum
 from io import StringIO
+from os import path
 
 import numpy as np
 import pandas as pd
@@ -28,8 +30,42 @@ class ObservableType(Enum):
 class StatisticsArray:
     """
     A data object for storing and retrieving statistics generated by an OpenMM simulation.
+
+    Notes
+    -----
+    As well as pandas csv files, statistics arrays may be stored in a compact
+    binary format, which can be cheaply appended to. Binary files begin with the
+    `binary_file_signature`, followed by the length (as a little-endian, unsigned
+    64-bit integer) of a JSON header which describes the columns stored in the file
+    and their units. The header is then followed by the data itself, stored as
+    rows of little-endian, 64-bit floats.
     """
 
+    binary_file_signature = b'PESTATS1'
+
+    # The units in which each observable is stored in binary files.
+    _binary_units = {
+        ObservableType.PotentialEnergy: unit.kilojoule_per_mole,
+        ObservableType.KineticEnergy: unit.kilojoule_per_mole,
+        ObservableType.TotalEnergy: unit.kilojoule_per_mole,
+        ObservableType.Temperature: unit.kelvin,
+        ObservableType.Volume: unit.nanometer**3,
+        ObservableType.Density: unit.gram / unit.milliliter,
+        ObservableType.Enthalpy: unit.kilojoule_per_mole,
+    }
+
+    # The headers of the columns which store each observable in pandas csv files.
+    # The values in these columns are stored in the same units as in binary files.
+    _pandas_columns = {
+        ObservableType.PotentialEnergy: 'Potential Energy (kJ/mole)',
+        ObservableType.KineticEnergy: 'Kinetic Energy (kJ/mole)',
+        ObservableType.TotalEnergy: 'Total Energy (kJ/mole)',
+        ObservableType.Temperature: 'Temperature (K)',
+        ObservableType.Volume: 'Box Volume (nm^3)',
+        ObservableType.Density: 'Density (g/mL)',
+        ObservableType.Enthalpy: 'Enthalpy (kJ/mole)',
+    }
+
     def __init__(self, potential_energies, kinetic_energies, total_energies,
                  temperatures, volumes, densities, enthalpies):
         """Constructs a new StatisticsArray object.
@@ -56,7 +92,13 @@ class StatisticsArray:
         int
             The number of data items in the array.
         """
-        return len(self._internal_data[ObservableType.PotentialEnergy])
+
+        for observable_type in ObservableType:
+
+            if self._internal_data[observable_type] is not None:
+                return len(self._internal_data[observable_type])
+
+        return 0
 
     def get_observable(self, observable_type):
         """Return the data for a given observable.
@@ -90,40 +132,89 @@ class StatisticsArray:
         bool
             True if data for the `observable_type` is available.
         """
-        return observable_type in self._internal_data
+        return self._internal_data.get(observable_type) is not None
 
-    def save_as_pandas_csv(self, file_path):
+    def save_as_pandas_csv(self, file_path, append=False):
         """Saves the `StatisticsArray` to a pandas csv file.
 
         Parameters
         ----------
         file_path: str
             The file path to save the csv file to.
+        append: bool
+            If true, and the file already exists, the data will be appended
+            to the end of the existing file rather than overwriting it.
         """
 
-        data = np.array([
-            self._internal_data[ObservableType.PotentialEnergy] / unit.kilojoule_per_mole,
-            self._internal_data[ObservableType.KineticEnergy] / unit.kilojoule_per_mole,
-            self._internal_data[ObservableType.TotalEnergy] / unit.kilojoule_per_mole,
-            self._internal_data[ObservableType.Temperature] / unit.kelvin,
-            self._internal_data[ObservableType.Volume] / unit.nanometer**3,
-            self._internal_data[ObservableType.Density] / unit.gram * unit.milliliter,
-            self._internal_data[ObservableType.Enthalpy] / unit.kilojoule_per_mole])
-
-        data = data.transpose()
-
-        columns = [
-            "Potential Energy (kJ/mole)",
-            "Kinetic Energy (kJ/mole)",
-            "Total Energy (kJ/mole)",
-            "Temperature (K)",
-            "Box Volume (nm^3)",
-            "Density (g/mL)",
-            "Enthalpy (kJ/mole)"
-        ]
-
-        data_frame = pd.DataFrame(data=data, columns=columns)
-        data_frame.to_csv(file_path)
+        observable_types = [observable_type for observable_type in ObservableType if
+                            self.has_observable(observable_type)]
+
+        data = np.column_stack([
+            np.asarray(self._internal_data[observable_type].value_in_unit(self._binary_units[observable_type]))
+            for observable_type in observable_types
+        ])
+
+        columns = [self._pandas_columns[observable_type] for observable_type in observable_types]
+
+        if not append or not path.isfile(file_path):
+
+            data_frame = pd.DataFrame(data=data, columns=columns)
+            data_frame.to_csv(file_path)
+
+            return
+
+        # Continue the row index on from the existing rows (excluding the header).
+        number_of_existing_rows = -1
+
+        with open(file_path, 'rb') as file:
+
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                number_of_existing_rows += chunk.count(b'\n')
+
+        index = range(number_of_existing_rows, number_of_existing_rows + len(data))
+
+        data_frame = pd.DataFrame(data=data, columns=columns, index=index)
+        data_frame.to_csv(file_path, mode='a', header=False)
+
+    def save_as_binary(self, file_path, append=False):
+        """Saves the `StatisticsArray` to a binary statistics file.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to save the binary file to.
+        append: bool
+            If true, and the file already exists, the data will be appended
+            to the end of the existing file rather than overwriting it.
+        """
+
+        observable_types = [observable_type for observable_type in ObservableType if
+                            self.has_observable(observable_type)]
+
+        data = np.column_stack([
+            np.asarray(self._internal_data[observable_type].value_in_unit(self._binary_units[observable_type]))
+            for observable_type in observable_types
+        ]).astype('<f8')
+
+        if append and path.isfile(file_path):
+
+            with open(file_path, 'rb') as file:
+                existing_observable_types, _ = self._read_binary_header(file)
+
+            if existing_observable_types != observable_types:
+
+                raise ValueError(f'The observables being appended do not match those '
+                                 f'already stored in {file_path}.')
+
+            with open(file_path, 'ab') as file:
+                file.write(data.tobytes())
+
+            return
+
+        with open(file_path, 'wb') as file:
+
+            self._write_binary_header(file, observable_types)
+            file.write(data.tobytes())
 
     @classmethod
     def from_openmm_csv(cls, file_path, pressure=None):
@@ -193,63 +284,326 @@ class StatisticsArray:
                    temperatures, volumes, densities, enthalpies)
 
     @classmethod
-    def from_pandas_csv(cls, file_path):
+    def _from_columns(cls, observable_types, columns):
+        """Creates a new `StatisticsArray` object from a set of columns
+        of raw statistics data.
+
+        Parameters
+        ----------
+        observable_types: list of ObservableType
+            The observable stored in each column.
+        columns: list of np.ndarray
+            The values of each column, in the units given by `_binary_units`.
+        """
+
+        observables = {observable_type: None for observable_type in ObservableType}
+
+        for observable_type, column in zip(observable_types, columns):
+            observables[observable_type] = np.array(column, dtype=float) * cls._binary_units[observable_type]
+
+        return cls(*[observables[observable_type] for observable_type in ObservableType])
+
+    @classmethod
+    def _from_pandas_data_frame(cls, data, observable_types=None):
+        """Creates a new `StatisticsArray` object from a data frame which
+        was loaded from a pandas csv file.
+
+        Parameters
+        ----------
+        data: pandas.DataFrame
+            The loaded data frame.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            which are stored in the data frame will be loaded.
+        """
+
+        if observable_types is None:
+
+            # All but the enthalpy columns are required when loading a full file.
+            observable_types = [observable_type for observable_type in ObservableType if
+                                observable_type != ObservableType.Enthalpy or
+                                cls._pandas_columns[observable_type] in data]
+
+        for observable_type in observable_types:
+
+            if cls._pandas_columns[observable_type] not in data:
+
+                raise ValueError(f'The statistics file does not contain a '
+                                 f'{cls._pandas_columns[observable_type]} column.')
+
+        columns = [np.array(data[cls._pandas_columns[observable_type]]) for observable_type in observable_types]
+        return cls._from_columns(observable_types, columns)
+
+    @classmethod
+    def _get_pandas_columns(cls, observable_types):
+        """Returns the names of the csv columns which need to be
+        read to load a set of observables.
+
+        Parameters
+        ----------
+        observable_types: list of ObservableType, optional
+            The observables to load, or `None` to load all of them.
+
+        Returns
+        -------
+        list of str, optional
+            The column names, or `None` if all columns should be read.
+        """
+
+        if observable_types is None:
+            return None
+
+        return [cls._pandas_columns[observable_type] for observable_type in observable_types]
+
+    @classmethod
+    def from_pandas_csv(cls, file_path, observable_types=None):
         """Creates a new `StatisticsArray` object from an pandas csv file.
 
         Parameters
         ----------
         file_path: str
             The file path to the csv file.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
         """
-        file_contents = None
 
-        with open(file_path, 'r') as file:
+        if path.getsize(file_path) < 1:
+            raise ValueError('The statistics file is empty.')
 
-            file_contents = file.read()
+        data = pd.read_csv(file_path, usecols=cls._get_pandas_columns(observable_types))
+        return cls._from_pandas_data_frame(data, observable_types)
 
-            if len(file_contents) < 1:
+    @classmethod
+    def from_pandas_csv_tail(cls, file_path, byte_offset=0, observable_types=None):
+        """Creates a new `StatisticsArray` object from only those rows of
+        a pandas csv file which lie after a given byte offset. This allows
+        data which is appended to a csv file to be read incrementally.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to the csv file.
+        byte_offset: int
+            The offset (as returned by a previous call to this method)
+            after which to read rows from.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
+
+        Returns
+        -------
+        StatisticsArray, optional
+            The newly read rows, or `None` if there are no new rows.
+        int
+            The offset after the last row which was read.
+        """
+
+        with open(file_path, 'rb') as file:
+
+            header = file.readline()
+
+            if len(header) < 1:
                 raise ValueError('The statistics file is empty.')
 
-        string_object = StringIO(file_contents)
-        data = pd.read_csv(string_object)
+            byte_offset = max(byte_offset, file.tell())
 
-        if 'Potential Energy (kJ/mole)' not in data:
-            raise ValueError('The statistics file does not contain a Potential Energy column.')
+            file.seek(byte_offset)
+            file_contents = file.read()
 
-        potential_energies = np.array(data['Potential Energy (kJ/mole)']) * unit.kilojoule / unit.mole
+        # Only read complete rows, in case the file is still being written to.
+        last_line_end = file_contents.rfind(b'\n') + 1
 
-        if 'Kinetic Energy (kJ/mole)' not in data:
-            raise ValueError('The statistics file does not contain a Kinetic Energy column.')
+        if last_line_end == 0:
+            return None, byte_offset
 
-        kinetic_energies = np.array(data['Kinetic Energy (kJ/mole)']) * unit.kilojoule / unit.mole
+        file_contents = file_contents[:last_line_end]
 
-        if 'Total Energy (kJ/mole)' not in data:
-            raise ValueError('The statistics file does not contain a Total Energy column.')
+        string_object = StringIO((header + file_contents).decode())
+        data = pd.read_csv(string_object, usecols=cls._get_pandas_columns(observable_types))
 
-        total_energies = np.array(data['Total Energy (kJ/mole)']) * unit.kilojoule / unit.mole
+        return cls._from_pandas_data_frame(data, observable_types), byte_offset + last_line_end
 
-        if 'Temperature (K)' not in data:
-            raise ValueError('The statistics file does not contain a Temperature column.')
+    @classmethod
+    def is_binary_file(cls, file_path):
+        """Checks whether a file is a binary statistics file.
 
-        temperatures = np.array(data['Temperature (K)']) * unit.kelvin
+        Parameters
+        ----------
+        file_path: str
+            The file path to check.
 
-        if 'Box Volume (nm^3)' not in data:
-            raise ValueError('The statistics file does not contain a Box Volume column.')
+        Returns
+        -------
+        bool
+            True if the file is a binary statistics file.
+        """
 
-        volumes = np.array(data['Box Volume (nm^3)']) * unit.nanometer * unit.nanometer * unit.nanometer
+        with open(file_path, 'rb') as file:
+            return file.read(len(cls.binary_file_signature)) == cls.binary_file_signature
 
-        if 'Density (g/mL)' not in data:
-            raise ValueError('The statistics file does not contain a Density column.')
+    @classmethod
+    def _write_binary_header(cls, file, observable_types):
+        """Writes the header of a binary statistics file.
 
-        densities = np.array(data['Density (g/mL)']) * unit.gram / unit.milliliter
+        Parameters
+        ----------
+        file: file object
+            The opened binary file, positioned at its start.
+        observable_types: list of ObservableType
+            The observables which will be stored in each column of the file.
+        """
 
-        enthalpies = None
+        header = json.dumps({
+            'columns': [observable_type.value for observable_type in observable_types],
+            'units': [str(cls._binary_units[observable_type]) for observable_type in observable_types]
+        }).encode()
 
-        if 'Enthalpy (kJ/mole)' in data:
-            enthalpies = np.array(data['Enthalpy (kJ/mole)']) * unit.kilojoule_per_mole
+        # Pad the header so that the data is aligned to 8 bytes.
+        header += b' ' * (-len(header) % 8)
 
-        return cls(potential_energies, kinetic_energies, total_energies,
-                   temperatures, volumes, densities, enthalpies)
+        file.write(cls.binary_file_signature)
+        file.write(struct.pack('<Q', len(header)))
+        file.write(header)
+
+    @classmethod
+    def _read_binary_header(cls, file):
+        """Reads the header of a binary statistics file.
+
+        Parameters
+        ----------
+        file: file object
+            The opened binary file, positioned at its start.
+
+        Returns
+        -------
+        list of ObservableType
+            The observables stored in each column of the file.
+        int
+            The offset in bytes at which the data starts.
+        """
+
+        if file.read(len(cls.binary_file_signature)) != cls.binary_file_signature:
+            raise ValueError('The file is not a binary statistics file.')
+
+        header_length = struct.unpack('<Q', file.read(8))[0]
+        header = json.loads(file.read(header_length).decode())
+
+        observable_types = [ObservableType(column) for column in header['columns']]
+
+        for observable_type, unit_string in zip(observable_types, header['units']):
+
+            if unit_string != str(cls._binary_units[observable_type]):
+
+                raise ValueError(f'The {observable_type.value} column is stored in unexpected '
+                                 f'units ({unit_string}).')
+
+        return observable_types, len(cls.binary_file_signature) + 8 + header_length
+
+    @classmethod
+    def from_binary(cls, file_path, observable_types=None):
+        """Creates a new `StatisticsArray` object from a binary statistics file.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to the binary file.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
+        """
+        statistics_array, _ = cls.from_binary_tail(file_path, observable_types=observable_types)
+
+        if statistics_array is None:
+            raise ValueError('The statistics file is empty.')
+
+        return statistics_array
+
+    @classmethod
+    def from_binary_tail(cls, file_path, byte_offset=0, observable_types=None):
+        """Creates a new `StatisticsArray` object from only those rows of
+        a binary statistics file which lie after a given byte offset. This
+        allows data which is appended to a binary file to be read incrementally.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to the binary file.
+        byte_offset: int
+            The offset (as returned by a previous call to this method)
+            after which to read rows from.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
+
+        Returns
+        -------
+        StatisticsArray, optional
+            The newly read rows, or `None` if there are no new rows.
+        int
+            The offset after the last row which was read.
+        """
+
+        reader = StatisticsFileReader(file_path)
+
+        # Only read complete rows, in case the file is still being written to.
+        start_row = max(0, math.ceil((byte_offset - reader.data_offset) / reader.row_size))
+        number_of_rows = len(reader)
+
+        if start_row >= number_of_rows:
+            return None, reader.data_offset + start_row * reader.row_size
+
+        statistics_array = reader.read(observable_types, start_row, number_of_rows)
+        return statistics_array, reader.data_offset + number_of_rows * reader.row_size
+
+    @classmethod
+    def from_file(cls, file_path, observable_types=None):
+        """Creates a new `StatisticsArray` object from either a binary
+        statistics file, or a pandas csv file.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to the statistics file.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
+        """
+
+        if cls.is_binary_file(file_path):
+            return cls.from_binary(file_path, observable_types)
+
+        return cls.from_pandas_csv(file_path, observable_types)
+
+    @classmethod
+    def from_file_tail(cls, file_path, byte_offset=0, observable_types=None):
+        """Creates a new `StatisticsArray` object from only those rows of either
+        a binary statistics file, or a pandas csv file which lie after a given
+        byte offset.
+
+        Parameters
+        ----------
+        file_path: str
+            The file path to the statistics file.
+        byte_offset: int
+            The offset (as returned by a previous call to this method)
+            after which to read rows from.
+        observable_types: list of ObservableType, optional
+            The observables to load. If `None`, all of the observables
+            stored in the file will be loaded.
+
+        Returns
+        -------
+        StatisticsArray, optional
+            The newly read rows, or `None` if there are no new rows.
+        int
+            The offset after the last row which was read.
+        """
+
+        if cls.is_binary_file(file_path):
+            return cls.from_binary_tail(file_path, byte_offset, observable_types)
+
+        return cls.from_pandas_csv_tail(file_path, byte_offset, observable_types)
 
     @classmethod
     def from_statistics_array(cls, existing_instance, data_indices=None):
@@ -272,23 +626,318 @@ class StatisticsArray:
             The created array object.
         """
 
-        potential_energies = copy.deepcopy(existing_instance.get_observable(ObservableType.PotentialEnergy))
-        kinetic_energies = copy.deepcopy(existing_instance.get_observable(ObservableType.KineticEnergy))
-        total_energies = copy.deepcopy(existing_instance.get_observable(ObservableType.TotalEnergy))
-        temperatures = copy.deepcopy(existing_instance.get_observable(ObservableType.Temperature))
-        volumes = copy.deepcopy(existing_instance.get_observable(ObservableType.Volume))
-        densities = copy.deepcopy(existing_instance.get_observable(ObservableType.Density))
-        enthalpies = copy.deepcopy(existing_instance.get_observable(ObservableType.Enthalpy))
-
-        return_object = StatisticsArray(potential_energies[data_indices],
-                                        kinetic_energies[data_indices],
-                                        total_energies[data_indices],
-                                        temperatures[data_indices],
-                                        volumes[data_indices],
-                                        densities[data_indices],
-                                        enthalpies[data_indices])
-
-        return return_object
+        observables = []
+
+        for observable_type in ObservableType:
+
+            values = existing_instance.get_observable(observable_type)
+
+            if values is None:
+
+                observables.append(None)
+                continue
+
+            values_unit = values.unit
+            values = np.asarray(values.value_in_unit(values_unit))
+
+            # Indexing a numpy array (with either a slice or a list of indices)
+            # already returns a new array, so there is no need to deep copy it.
+            values = values.copy() if data_indices is None else values[data_indices]
+            observables.append(values * values_unit)
+
+        return cls(*observables)
+
+
+class StatisticsFileReader:
+    """Lazily reads the data stored in a statistics file (in either the binary
+    or the pandas csv format), loading only the columns and rows which are
+    requested, rather than the whole file.
+
+    Binary files are memory mapped, so that only the requested data is ever
+    read from disk. Pandas csv files are read a chunk of rows at a time.
+    """
+
+    @property
+    def file_path(self):
+        """str: The path to the statistics file."""
+        return self._file_path
+
+    @property
+    def observable_types(self):
+        """list of ObservableType: The observables stored in the file."""
+        return self._observable_types
+
+    @property
+    def data_offset(self):
+        """int: The offset in bytes at which the data of a binary file starts."""
+        return self._data_offset
+
+    @property
+    def row_size(self):
+        """int: The size in bytes of each row of a binary file."""
+        return 8 * len(self._observable_types)
+
+    def __init__(self, file_path, chunk_size=100000):
+        """Constructs a new StatisticsFileReader object.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the statistics file.
+        chunk_size: int
+            The number of rows to read at a time from a pandas csv file.
+        """
+
+        self._file_path = file_path
+        self._chunk_size = chunk_size
+
+        self._is_binary = StatisticsArray.is_binary_file(file_path)
+        self._data_offset = 0
+
+        if self._is_binary:
+
+            with open(file_path, 'rb') as file:
+                self._observable_types, self._data_offset = StatisticsArray._read_binary_header(file)
+
+        else:
+
+            if path.getsize(file_path) < 1:
+                raise ValueError('The statistics file is empty.')
+
+            column_names = pd.read_csv(file_path, nrows=0).columns
+
+            self._observable_types = [observable_type for observable_type in ObservableType if
+                                      StatisticsArray._pandas_columns[observable_type] in column_names]
+
+    def __len__(self):
+        """Get the number of complete rows in the file.
+
+        Returns
+        -------
+        int
+            The number of rows in the file.
+        """
+
+        if self._is_binary:
+            return (path.getsize(self._file_path) - self._data_offset) // self.row_size
+
+        # Count the rows, excluding the header.
+        number_of_rows = -1
+
+        with open(self._file_path, 'rb') as file:
+
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                number_of_rows += chunk.count(b'\n')
+
+        return number_of_rows
+
+    def _validate_observable_types(self, observable_types):
+        """Checks that a set of requested observables are stored in the file.
+
+        Parameters
+        ----------
+        observable_types: list of ObservableType, optional
+            The requested observables, or `None` to request all of
+            those stored in the file.
+
+        Returns
+        -------
+        list of ObservableType
+            The requested observables.
+        """
+
+        if observable_types is None:
+            return list(self._observable_types)
+
+        for observable_type in observable_types:
+
+            if observable_type in self._observable_types:
+                continue
+
+            raise ValueError(f'The statistics file does not contain a {observable_type.value} column.')
+
+        return list(observable_types)
+
+    def _memory_map(self, number_of_rows):
+        """Memory maps the data stored in a binary file.
+
+        Parameters
+        ----------
+        number_of_rows: int
+            The number of rows to map.
+
+        Returns
+        -------
+        np.memmap, shape=(number_of_rows, len(observable_types))
+            The mapped data.
+        """
+
+        return np.memmap(self._file_path, dtype='<f8', mode='r', offset=self._data_offset,
+                         shape=(number_of_rows, len(self._observable_types)))
+
+    def _read_csv_chunks(self, observable_types):
+        """Iterates over the chunks of rows of a pandas csv file.
+
+        Parameters
+        ----------
+        observable_types: list of ObservableType
+            The observables to read.
+
+        Returns
+        -------
+        generator of int and np.ndarray
+            The index of the first row in each chunk, and the data
+            of the chunk, with one column per requested observable.
+        """
+
+        column_names = StatisticsArray._get_pandas_columns(observable_types)
+        start_index = 0
+
+        for data_frame in pd.read_csv(self._file_path, usecols=column_names, chunksize=self._chunk_size):
+
+            data = np.column_stack([np.array(data_frame[column_name], dtype=float)
+                                    for column_name in column_names])
+
+            yield start_index, data
+            start_index += len(data)
+
+    def read_rows(self, row_indices, observable_types=None):
+        """Reads a subset of the rows of the file.
+
+        Parameters
+        ----------
+        row_indices: list of int
+            The indices of the rows to read.
+        observable_types: list of ObservableType, optional
+            The observables to read. If `None`, all of the observables
+            stored in the file will be read.
+
+        Returns
+        -------
+        StatisticsArray
+            The requested rows.
+        """
+
+        observable_types = self._validate_observable_types(observable_types)
+        row_indices = np.asarray(row_indices, dtype=int).reshape(-1)
+
+        if self._is_binary:
+
+            number_of_rows = len(self)
+            data = self._memory_map(number_of_rows) if number_of_rows > 0 else np.empty((0, self.row_size // 8))
+
+            columns = [np.array(data[row_indices, self._observable_types.index(observable_type)])
+                       for observable_type in observable_types]
+
+            del data
+            return StatisticsArray._from_columns(observable_types, columns)
+
+        # Gather the requested rows from each chunk in turn, in the
+        # order of their indices, before restoring the requested order.
+        sort_order = np.argsort(row_indices, kind='stable')
+        sorted_indices = row_indices[sort_order]
+
+        data = np.empty((len(row_indices), len(observable_types)))
+        number_of_gathered_rows = 0
+
+        for start_index, chunk_data in self._read_csv_chunks(observable_types):
+
+            lower_bound = np.searchsorted(sorted_indices, start_index, side='left')
+            upper_bound = np.searchsorted(sorted_indices, start_index + len(chunk_data), side='left')
+
+            if lower_bound == upper_bound:
+                continue
+
+            data[sort_order[lower_bound:upper_bound]] = chunk_data[sorted_indices[lower_bound:upper_bound] -
+                                                                   start_index]
+
+            number_of_gathered_rows += upper_bound - lower_bound
+
+            if upper_bound == len(sorted_indices):
+                break
+
+        if number_of_gathered_rows != len(row_indices):
+            raise IndexError('The requested rows lie outside of the statistics file.')
+
+        return StatisticsArray._from_columns(observable_types, data.T)
+
+    def read(self, observable_types=None, start=None, stop=None, step=None):
+        """Reads a slice of the rows of the file.
+
+        Parameters
+        ----------
+        observable_types: list of ObservableType, optional
+            The observables to read. If `None`, all of the observables
+            stored in the file will be read.
+        start: int, optional
+            The index of the first row to read.
+        stop: int, optional
+            The index of the row to read up to.
+        step: int, optional
+            The stride with which to read rows.
+
+        Returns
+        -------
+        StatisticsArray
+            The requested rows.
+        """
+
+        number_of_rows = len(self)
+        row_indices = range(*slice(start, stop, step).indices(number_of_rows))
+
+        if not self._is_binary:
+            return self.read_rows(row_indices, observable_types)
+
+        observable_types = self._validate_observable_types(observable_types)
+
+        if len(row_indices) == 0:
+            return StatisticsArray._from_columns(observable_types, [[] for _ in observable_types])
+
+        # Slicing the mapped data (rather than indexing it with a list)
+        # avoids having to construct the full list of row indices.
+        data = self._memory_map(number_of_rows)
+
+        columns = [np.array(data[row_indices.start:row_indices.stop:row_indices.step,
+                                 self._observable_types.index(observable_type)])
+                   for observable_type in observable_types]
+
+        del data
+        return StatisticsArray._from_columns(observable_types, columns)
+
+    def iterate_chunks(self, chunk_size=None, observable_types=None):
+        """Iterates over the file a chunk of rows at a time.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            The number of rows in each chunk. If `None`, the chunk size
+            which this reader was created with is used.
+        observable_types: list of ObservableType, optional
+            The observables to read. If `None`, all of the observables
+            stored in the file will be read.
+
+        Returns
+        -------
+        generator of StatisticsArray
+            The chunks of rows.
+        """
+
+        if chunk_size is None:
+            chunk_size = self._chunk_size
+
+        observable_types = self._validate_observable_types(observable_types)
+
+        if not self._is_binary:
+
+            for _, chunk_data in self._read_csv_chunks(observable_types):
+                yield StatisticsArray._from_columns(observable_types, chunk_data.T)
+
+            return
+
+        number_of_rows = len(self)
+
+        for start_index in range(0, number_of_rows, chunk_size):
+            yield self.read(observable_types, start_index, min(start_index + chunk_size, number_of_rows))
 
 
 def bootstrap(bootstrap_function, iterations=200, relative_sample_size=1.0, data_sub_counts=None, **data_kwargs):
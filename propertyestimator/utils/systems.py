@@ -0,0 +1,678 @@
+"""
+A collection of utilities for creating OpenMM systems from smirnoff force fields,
+including a worker-local cache of system templates which allows systems that share
+a topology and force field structure to be created by only swapping their parameters.
+"""
+import hashlib
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from xml.etree import ElementTree
+
+from propertyestimator.utils import create_molecule_from_smiles
+from propertyestimator.utils.charges import PartialChargeCache
+from propertyestimator.utils.serialization import deserialize_force_field, serialize_force_field
+
+# The maximum number of templates to hold in memory in each worker.
+_maximum_cached_templates = 4
+
+_cached_system_templates = OrderedDict()
+_cached_system_templates_lock = threading.Lock()
+
+# The charge method used to generate partial charges for all systems.
+_charge_method = 'OECharges_AM1BCCSym'
+
+
+def load_force_field(force_field_path):
+    """Loads a smirnoff force field from disk, either from a pickled
+    `serialize_force_field` dictionary, or from an OFFXML file.
+
+    Parameters
+    ----------
+    force_field_path: str
+        The path to the force field.
+
+    Returns
+    -------
+    openforcefield.typing.engines.smirnoff.ForceField
+        The loaded force field.
+    """
+
+    try:
+
+        with open(force_field_path, 'rb') as file:
+            return deserialize_force_field(pickle.load(file))
+
+    except pickle.UnpicklingError:
+
+        from openforcefield.typing.engines.smirnoff import ForceField
+        return ForceField(force_field_path)
+
+
+def hash_force_field(force_field, structure_only=False):
+    """Computes a hash of a smirnoff force field.
+
+    Parameters
+    ----------
+    force_field: openforcefield.typing.engines.smirnoff.ForceField
+        The force field to hash.
+    structure_only: bool
+        If true, only the structure of the force field (i.e. which parameters
+        it contains, their smirks patterns, and which attributes they define)
+        will be hashed, and not the values of the parameters.
+
+    Returns
+    -------
+    str
+        The hex digest of the hash.
+    """
+
+    force_field_hash = hashlib.sha256()
+
+    serialized_force_field = serialize_force_field(force_field)
+
+    for index in sorted(serialized_force_field):
+
+        if not structure_only:
+
+            force_field_hash.update(serialized_force_field[index].encode())
+            continue
+
+        for element in ElementTree.fromstring(serialized_force_field[index]).iter():
+
+            force_field_hash.update(element.tag.encode())
+
+            for attribute_name in sorted(element.attrib):
+
+                force_field_hash.update(attribute_name.encode())
+
+                if attribute_name in ['smirks', 'id']:
+                    force_field_hash.update(element.attrib[attribute_name].encode())
+
+    return force_field_hash.hexdigest()
+
+
+def hash_topology(topology):
+    """Computes a hash of the atoms and bonds in an OpenMM topology.
+
+    Parameters
+    ----------
+    topology: simtk.openmm.app.Topology
+        The topology to hash.
+
+    Returns
+    -------
+    str
+        The hex digest of the hash.
+    """
+
+    topology_hash = hashlib.sha256()
+
+    for atom in topology.atoms():
+
+        element_symbol = '' if atom.element is None else atom.element.symbol
+        topology_hash.update('{}:{};'.format(atom.residue.name, element_symbol).encode())
+
+    for bond in topology.bonds():
+
+        index_a, index_b = sorted((bond[0].index, bond[1].index))
+        topology_hash.update('{}-{};'.format(index_a, index_b).encode())
+
+    return topology_hash.hexdigest()
+
+
+def create_molecules(substance, charge_cache_path=None):
+    """Creates the molecules of each component of a substance, optionally
+    with partial charges assigned from a `PartialChargeCache`.
+
+    Parameters
+    ----------
+    substance: Substance
+        The substance to create the molecules of.
+    charge_cache_path: str, optional
+        The path to the charge cache. If `None` or empty, no charges
+        are assigned.
+
+    Returns
+    -------
+    list of OEMol
+        The created molecules.
+    """
+
+    molecules = []
+
+    charge_cache = None if not charge_cache_path else PartialChargeCache(charge_cache_path)
+
+    for component in substance.components:
+
+        molecule = create_molecule_from_smiles(component.smiles, 0)
+
+        if molecule is None:
+            raise ValueError('{} could not be converted to a Molecule'.format(component))
+
+        if charge_cache is not None:
+
+            molecule = charge_cache.assign_charges(molecule, _charge_method)
+
+            if molecule is None:
+                raise ValueError('Partial charges could not be generated for {}'.format(component))
+
+        molecules.append(molecule)
+
+    if charge_cache is not None:
+
+        logging.info('{} charge cache hits, {} misses'.format(charge_cache.number_of_hits,
+                                                              charge_cache.number_of_misses))
+
+    return molecules
+
+
+def _find_molecule_instances(topology):
+    """Finds each of the molecules (i.e. bonded clusters of atoms) in a
+    topology, and groups together those which are identical.
+
+    Parameters
+    ----------
+    topology: simtk.openmm.app.Topology
+        The topology to search.
+
+    Returns
+    -------
+    list of tuple of int and list of int
+        The index of the type of each molecule, and the indices
+        of its atoms in ascending order.
+    """
+
+    atoms = list(topology.atoms())
+    parent_indices = list(range(len(atoms)))
+
+    def find_root(atom_index):
+
+        while parent_indices[atom_index] != atom_index:
+
+            parent_indices[atom_index] = parent_indices[parent_indices[atom_index]]
+            atom_index = parent_indices[atom_index]
+
+        return atom_index
+
+    bonds = [(bond[0].index, bond[1].index) for bond in topology.bonds()]
+
+    for index_a, index_b in bonds:
+        parent_indices[find_root(index_a)] = find_root(index_b)
+
+    atom_indices_by_root = OrderedDict()
+
+    for atom in atoms:
+        atom_indices_by_root.setdefault(find_root(atom.index), []).append(atom.index)
+
+    bonds_by_root = {}
+
+    for index_a, index_b in bonds:
+        bonds_by_root.setdefault(find_root(index_a), []).append((index_a, index_b))
+
+    molecule_types = {}
+    molecule_instances = []
+
+    for root, atom_indices in atom_indices_by_root.items():
+
+        local_indices = {atom_index: local_index for local_index, atom_index in enumerate(atom_indices)}
+
+        elements = tuple('' if atoms[atom_index].element is None else
+                         atoms[atom_index].element.symbol for atom_index in atom_indices)
+
+        local_bonds = tuple(sorted(tuple(sorted((local_indices[index_a], local_indices[index_b])))
+                                   for index_a, index_b in bonds_by_root.get(root, [])))
+
+        molecule_type = molecule_types.setdefault((elements, local_bonds), len(molecule_types))
+        molecule_instances.append((molecule_type, atom_indices))
+
+    return molecule_instances
+
+
+def _create_sub_topology(topology, atom_indices):
+    """Creates a topology which contains only a subset of the atoms
+    (and the bonds between them) of an existing topology.
+
+    Parameters
+    ----------
+    topology: simtk.openmm.app.Topology
+        The topology to take the atoms from.
+    atom_indices: list of int
+        The indices of the atoms to include.
+
+    Returns
+    -------
+    simtk.openmm.app.Topology
+        The created topology.
+    """
+    from simtk.openmm import app
+
+    atoms = list(topology.atoms())
+
+    sub_topology = app.Topology()
+    chain = sub_topology.addChain()
+
+    residues = {}
+    new_atoms = {}
+
+    for atom_index in atom_indices:
+
+        atom = atoms[atom_index]
+
+        if atom.residue.index not in residues:
+            residues[atom.residue.index] = sub_topology.addResidue(atom.residue.name, chain)
+
+        new_atoms[atom_index] = sub_topology.addAtom(atom.name, atom.element, residues[atom.residue.index])
+
+    for bond in topology.bonds():
+
+        if bond[0].index not in new_atoms or bond[1].index not in new_atoms:
+            continue
+
+        sub_topology.addBond(new_atoms[bond[0].index], new_atoms[bond[1].index])
+
+    return sub_topology
+
+
+def _get_force_terms(force):
+    """Returns accessors for the terms of the forces whose
+    parameters can be swapped.
+
+    Parameters
+    ----------
+    force: simtk.openmm.Force
+        The force to get the terms of.
+
+    Returns
+    -------
+    list of tuple of int, function and function, optional
+        The number of terms of each type in the force, a function which returns
+        the particle indices and parameters of a term, and a function which sets
+        the particle indices and parameters of a term. `None` is returned if the
+        parameters of the force cannot be swapped.
+    """
+    from simtk import openmm
+
+    def split_parameters(number_of_particles, getter):
+
+        def get_term(index):
+
+            values = getter(index)
+
+            if number_of_particles == 1:
+                return (index,), values
+
+            return tuple(values[:number_of_particles]), values[number_of_particles:]
+
+        return get_term
+
+    if isinstance(force, openmm.HarmonicBondForce):
+
+        return [(force.getNumBonds(), split_parameters(2, force.getBondParameters),
+                 lambda index, term: force.setBondParameters(index, *term))]
+
+    if isinstance(force, openmm.HarmonicAngleForce):
+
+        return [(force.getNumAngles(), split_parameters(3, force.getAngleParameters),
+                 lambda index, term: force.setAngleParameters(index, *term))]
+
+    if isinstance(force, openmm.PeriodicTorsionForce):
+
+        return [(force.getNumTorsions(), split_parameters(4, force.getTorsionParameters),
+                 lambda index, term: force.setTorsionParameters(index, *term))]
+
+    if isinstance(force, openmm.NonbondedForce):
+
+        return [(force.getNumParticles(), split_parameters(1, force.getParticleParameters),
+                 lambda index, term: force.setParticleParameters(index, *term[1:])),
+                (force.getNumExceptions(), split_parameters(2, force.getExceptionParameters),
+                 lambda index, term: force.setExceptionParameters(index, *term))]
+
+    if force.__class__.__name__ in ['CMMotionRemover', 'MonteCarloBarostat']:
+        return []
+
+    return None
+
+
+class SystemTemplate:
+    """A parameterised OpenMM system whose parameters can be quickly swapped
+    for those of a different force field with the same structure, without
+    rebuilding the system from scratch.
+    """
+
+    @property
+    def system(self):
+        """simtk.openmm.System: The parameterised system."""
+        return self._system
+
+    @property
+    def parameters_hash(self):
+        """str: The hash of the force field whose parameters the system currently has."""
+        return self._parameters_hash
+
+    def __init__(self, system, topology, parameters_hash):
+        """Constructs a new SystemTemplate object.
+
+        Parameters
+        ----------
+        system: simtk.openmm.System
+            The parameterised system.
+        topology: simtk.openmm.app.Topology
+            The topology of the system.
+        parameters_hash: str
+            The hash of the force field the system was parameterised with.
+        """
+
+        self._system = system
+        self._topology = topology
+        self._parameters_hash = parameters_hash
+
+        self._molecule_instances = _find_molecule_instances(topology)
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _iterate_force_terms(system):
+        """Iterates over the accessors of the terms of each force in a system.
+
+        Parameters
+        ----------
+        system: simtk.openmm.System
+            The system to iterate over.
+
+        Returns
+        -------
+        tuple of str, int, function and function
+            A key which identifies the type of term, the number of terms, and
+            the accessors returned by `_get_force_terms` for that type of term.
+
+        Raises
+        ------
+        ValueError
+            If the system contains a force whose parameters cannot be swapped.
+        """
+
+        force_counts = {}
+
+        for force_index in range(system.getNumForces()):
+
+            force = system.getForce(force_index)
+            force_name = force.__class__.__name__
+
+            force_terms = _get_force_terms(force)
+
+            if force_terms is None:
+                raise ValueError('The parameters of a {} cannot be swapped.'.format(force_name))
+
+            force_count = force_counts.get(force_name, 0)
+            force_counts[force_name] = force_count + 1
+
+            for term_type_index, (number_of_terms, get_term, set_term) in enumerate(force_terms):
+                yield (force_name, force_count, term_type_index), number_of_terms, get_term, set_term
+
+    def _create_local_terms(self, force_field, molecules, atom_indices, charge_method):
+        """Parameterises a single copy of a molecule, and returns its
+        terms keyed by the molecule local indices of their particles.
+
+        Parameters
+        ----------
+        force_field: openforcefield.typing.engines.smirnoff.ForceField
+            The force field to parameterise the molecule with.
+        molecules: list of OEMol
+            The molecules of each component of the system.
+        atom_indices: list of int
+            The indices of the atoms of a copy of the molecule in the full system.
+        charge_method: str, optional
+            The method to generate partial charges with, or `None` if the
+            molecules already have charges assigned.
+
+        Returns
+        -------
+        dict of tuple and dict of tuple and tuple
+            The terms of each type of each force, keyed by the local indices of their
+            particles and by the number of previous terms with the same indices.
+        """
+        from openforcefield.typing.engines import smirnoff
+
+        sub_topology = _create_sub_topology(self._topology, atom_indices)
+
+        local_system = force_field.createSystem(sub_topology,
+                                                molecules,
+                                                nonbondedMethod=smirnoff.NoCutoff,
+                                                chargeMethod=charge_method)
+
+        local_terms = {}
+
+        for term_type, number_of_terms, get_term, _ in self._iterate_force_terms(local_system):
+
+            terms = {}
+
+            for term_index in range(number_of_terms):
+
+                particle_indices, parameters = get_term(term_index)
+
+                occurrence = 0
+
+                while (particle_indices, occurrence) in terms:
+                    occurrence += 1
+
+                terms[(particle_indices, occurrence)] = parameters
+
+            local_terms[term_type] = terms
+
+        return local_terms
+
+    def swap_parameters(self, force_field, molecules, parameters_hash, charge_method=None):
+        """Replaces the parameters of the system with those of a force field
+        which has the same structure as the one the system was parameterised
+        with.
+
+        Each unique molecule in the system is parameterised individually with
+        the new force field, and its parameters copied onto each of its copies in
+        the system, so that the (expensive) matching of parameters to the full
+        topology is avoided.
+
+        Parameters
+        ----------
+        force_field: openforcefield.typing.engines.smirnoff.ForceField
+            The force field to take the new parameters from.
+        molecules: list of OEMol
+            The molecules of each component of the system.
+        parameters_hash: str
+            The hash of the new force field.
+        charge_method: str, optional
+            The method to generate partial charges with, or `None` if the
+            molecules already have charges assigned.
+
+        Raises
+        ------
+        ValueError
+            If the parameters could not be swapped, for example because the
+            system contains forces which are not supported.
+        """
+
+        if parameters_hash == self._parameters_hash:
+            return
+
+        local_terms_by_type = {}
+
+        for molecule_type, atom_indices in self._molecule_instances:
+
+            if molecule_type in local_terms_by_type:
+                continue
+
+            local_terms_by_type[molecule_type] = self._create_local_terms(force_field, molecules,
+                                                                          atom_indices, charge_method)
+
+        number_of_atoms = self._system.getNumParticles()
+
+        atom_molecules = [None] * number_of_atoms
+        atom_local_indices = [None] * number_of_atoms
+
+        for instance_index, (molecule_type, atom_indices) in enumerate(self._molecule_instances):
+
+            for local_index, atom_index in enumerate(atom_indices):
+
+                atom_molecules[atom_index] = instance_index
+                atom_local_indices[atom_index] = local_index
+
+        # Gather all of the new parameters before modifying the system, so
+        # that a failed swap leaves the template untouched.
+        new_terms = []
+
+        for term_type, number_of_terms, get_term, set_term in self._iterate_force_terms(self._system):
+
+            occurrences = {}
+
+            for term_index in range(number_of_terms):
+
+                particle_indices, _ = get_term(term_index)
+                instance_index = atom_molecules[particle_indices[0]]
+
+                if any(atom_molecules[particle_index] != instance_index for particle_index in particle_indices):
+                    raise ValueError('Terms which span multiple molecules cannot be swapped.')
+
+                local_indices = tuple(atom_local_indices[particle_index] for particle_index in particle_indices)
+
+                occurrence = occurrences.get((instance_index, local_indices), 0)
+                occurrences[(instance_index, local_indices)] = occurrence + 1
+
+                molecule_type = self._molecule_instances[instance_index][0]
+                local_terms = local_terms_by_type[molecule_type].get(term_type, {})
+
+                if (local_indices, occurrence) not in local_terms:
+                    raise ValueError('The new force field does not assign the same terms as the template.')
+
+                new_parameters = local_terms[(local_indices, occurrence)]
+                new_terms.append((set_term, term_index, tuple(particle_indices) + tuple(new_parameters)))
+
+        for set_term, term_index, term in new_terms:
+            set_term(term_index, term)
+
+        self._parameters_hash = parameters_hash
+
+    def create_system(self, force_field=None, molecules=None, parameters_hash=None, charge_method=None,
+                      serialize=False):
+        """Creates a copy of the parameterised system, optionally first swapping
+        in the parameters of a different force field (see `swap_parameters`).
+
+        Copying an OpenMM system requires it to be serialized to XML and then parsed
+        again. Callers which only need the XML representation of the system (e.g. to
+        save it to disk) should set `serialize` so that the system is not parsed.
+
+        Parameters
+        ----------
+        force_field: openforcefield.typing.engines.smirnoff.ForceField, optional
+            The force field to take the new parameters from.
+        molecules: list of OEMol, optional
+            The molecules of each component of the system.
+        parameters_hash: str, optional
+            The hash of the new force field.
+        charge_method: str, optional
+            The method to generate partial charges with, or `None` if the
+            molecules already have charges assigned.
+        serialize: bool
+            If true, the XML representation of the system is returned
+            rather than a copy of the system.
+
+        Returns
+        -------
+        simtk.openmm.System or str
+            The copied system, or its XML representation if `serialize` is true.
+        """
+        from simtk.openmm import XmlSerializer
+
+        with self._lock:
+
+            if force_field is not None:
+                self.swap_parameters(force_field, molecules, parameters_hash, charge_method)
+
+            system_xml = XmlSerializer.serialize(self._system)
+
+        if serialize:
+            return system_xml
+
+        return XmlSerializer.deserialize(system_xml)
+
+
+def create_smirnoff_system(force_field, topology, substance, nonbonded_cutoff, charge_cache_path=None,
+                           serialize=False):
+    """Creates an OpenMM system parameterised with a smirnoff force field.
+
+    Systems are built from a worker-local cache of templates keyed by the
+    topology, the structure of the force field and the nonbonded cutoff. When
+    a template already exists, only the parameters of the force field are
+    swapped into it, rather than the system being built from scratch.
+
+    Parameters
+    ----------
+    force_field: openforcefield.typing.engines.smirnoff.ForceField
+        The force field to parameterise the system with.
+    topology: simtk.openmm.app.Topology
+        The topology of the system.
+    substance: Substance
+        The composition of the system.
+    nonbonded_cutoff: simtk.unit.Quantity
+        The cutoff after which non-bonded interactions are truncated.
+    charge_cache_path: str, optional
+        The path to a `PartialChargeCache` to take partial charges from. If
+        `None` or empty, the force field will generate the partial charges.
+    serialize: bool
+        If true, the XML representation of the system is returned rather than
+        the system itself (see `SystemTemplate.create_system`).
+
+    Returns
+    -------
+    simtk.openmm.System or str
+        The parameterised system, which the caller is free to modify,
+        or its XML representation if `serialize` is true.
+    """
+    from openforcefield.typing.engines import smirnoff
+    from simtk import unit
+
+    molecules = create_molecules(substance, charge_cache_path)
+
+    # The force field only needs to generate charges if they
+    # were not already assigned from the charge cache.
+    charge_method = _charge_method if not charge_cache_path else None
+
+    template_key = (hash_topology(topology),
+                    hash_force_field(force_field, structure_only=True),
+                    nonbonded_cutoff.value_in_unit(unit.nanometer))
+
+    parameters_hash = hash_force_field(force_field)
+
+    with _cached_system_templates_lock:
+
+        template = _cached_system_templates.get(template_key)
+
+        if template is not None:
+            _cached_system_templates.move_to_end(template_key)
+
+    if template is not None:
+
+        try:
+            return template.create_system(force_field, molecules, parameters_hash, charge_method, serialize)
+        except ValueError as e:
+            logging.info('The cached system template could not be reused: {}'.format(e))
+
+    system = force_field.createSystem(topology,
+                                      molecules,
+                                      nonbondedMethod=smirnoff.PME,
+                                      nonbondedCutoff=nonbonded_cutoff,
+                                      chargeMethod=charge_method)
+
+    if system is None:
+        raise ValueError('Failed to create a system from the provided topology and molecules')
+
+    template = SystemTemplate(system, topology, parameters_hash)
+
+    with _cached_system_templates_lock:
+
+        _cached_system_templates[template_key] = template
+
+        while len(_cached_system_templates) > _maximum_cached_templates:
+            _cached_system_templates.popitem(last=False)
+
+    return template.create_system(serialize=serialize)
@@ -115,7 +115,7 @@ def calculate_autocorrelation_time(time_series, minimum_samples=3):
     return (statistical_inefficiency - 1.0) / 2.0
 
 
-def detect_equilibration(time_series, minimum_samples=3):
+def detect_equilibration(time_series, minimum_samples=3, nskip=1):
     """Detect when a time series set has effectively become stationary (i.e has reached equilibrium).
 
     Notes
@@ -135,6 +135,10 @@ def detect_equilibration(time_series, minimum_samples=3):
         The time series to analyse.
     minimum_samples: int
         The minimum number of data points to consider in the calculation.
+    nskip: int
+        The stride between the candidate equilibration times which are
+        considered. Larger values reduce the cost of the search for long
+        time series, at the expense of a less precise equilibration time.
 
     Returns
     -------
@@ -153,9 +157,9 @@ def detect_equilibration(time_series, minimum_samples=3):
     if time_series.std() == 0.0:
         return 0, 1, 1
 
-    effect_samples_array = np.ones([number_of_timesteps - 1], np.float32)
+    effect_samples_array = np.zeros([number_of_timesteps - 1], np.float32)
 
-    for current_timestep in range(0, number_of_timesteps - 1):
+    for current_timestep in range(0, number_of_timesteps - 1, nskip):
 
         try:
             statistical_inefficiency_array[current_timestep] = calculate_statistical_inefficiency(
@@ -173,13 +177,16 @@ def detect_equilibration(time_series, minimum_samples=3):
     return equilibration_time, statistical_inefficiency, maximum_effective_samples
 
 
-def decorrelate_time_series(time_series):
+def decorrelate_time_series(time_series, nskip=1):
     """Extracts an uncorrelated sub-time series from a possibly correlated one.
 
     Parameters
     ----------
     time_series : np.ndarray, shape=(num_frames, num_dimensions), dtype=float
         The possibly correlated time series.
+    nskip: int
+        The stride between the candidate equilibration times which are
+        considered when detecting equilibration.
 
     Returns
     -------
@@ -192,7 +199,7 @@ def decorrelate_time_series(time_series):
     """
 
     # Compute the indices of the uncorrelated time series
-    [equilibration_index, inefficiency, effective_samples] = detect_equilibration(time_series)
+    [equilibration_index, inefficiency, effective_samples] = detect_equilibration(time_series, nskip=nskip)
     equilibrated_data = time_series[equilibration_index:]
 
     # Extract a set of uncorrelated data points.
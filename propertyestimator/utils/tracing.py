@@ -0,0 +1,242 @@
+"""
+A collection of utilities for tracing where time is spent while estimating
+properties. Traces are stored in the Chrome trace event format, and so may be
+viewed using either `chrome://tracing` or any compatible viewer (e.g. Perfetto).
+"""
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from os import path, makedirs
+
+_thread_local = threading.local()
+
+
+class TraceRecorder:
+    """Records timed spans of work as Chrome trace events, and
+    saves them to a trace directory.
+
+    A recorder without a trace directory is disabled, and will
+    silently discard all spans.
+    """
+
+    @property
+    def enabled(self):
+        """bool: Whether this recorder is actually recording spans."""
+        return self._trace_directory is not None
+
+    @property
+    def trace_directory(self):
+        """str: The directory in which to save the recorded spans."""
+        return self._trace_directory
+
+    @property
+    def events(self):
+        """list of dict: The trace events recorded so far."""
+        return self._events
+
+    def __init__(self, trace_directory=None):
+        """Constructs a new TraceRecorder object.
+
+        Parameters
+        ----------
+        trace_directory: str, optional
+            The directory in which to save the recorded spans. If `None`,
+            no spans will be recorded.
+        """
+
+        self._trace_directory = trace_directory
+        self._events = []
+
+    def add_span(self, name, category, start_time, end_time, **arguments):
+        """Records a span of work which has already completed.
+
+        Parameters
+        ----------
+        name: str
+            The name of the span.
+        category: str
+            The category of the span (e.g. 'protocol' or 'storage')
+        start_time: float
+            The wall clock time (as returned by `time.time()`) that the span started at.
+        end_time: float
+            The wall clock time (as returned by `time.time()`) that the span ended at.
+        arguments: dict of str and Any
+            Any extra, JSON serializable information to attach to the span.
+        """
+
+        if not self.enabled:
+            return
+
+        # Chrome traces measure time in microseconds.
+        self._events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start_time * 1.0e6,
+            'dur': max(end_time - start_time, 0.0) * 1.0e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': arguments
+        })
+
+    @contextmanager
+    def span(self, name, category, **arguments):
+        """A context manager which records the time spent within it as a span.
+
+        Parameters
+        ----------
+        name: str
+            The name of the span.
+        category: str
+            The category of the span (e.g. 'protocol' or 'storage')
+        arguments: dict of str and Any
+            Any extra, JSON serializable information to attach to the span.
+        """
+
+        start_time = time.time()
+
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start_time, time.time(), **arguments)
+
+    @contextmanager
+    def activate(self):
+        """A context manager which makes this recorder the one used by
+        `trace_span` on the current thread."""
+
+        previous_recorder = getattr(_thread_local, 'recorder', None)
+        _thread_local.recorder = self
+
+        try:
+            yield self
+        finally:
+            _thread_local.recorder = previous_recorder
+
+    def profile(self, name, function, *args, **kwargs):
+        """Calls a function under `cProfile`, and saves the collected
+        statistics to `{name}.prof` in the trace directory. If this recorder
+        is disabled, the function is called without being profiled.
+
+        Parameters
+        ----------
+        name: str
+            The name to give the statistics file.
+        function: function
+            The function to call.
+        args: Any
+            The positional arguments to pass to the function.
+        kwargs: Any
+            The keyword arguments to pass to the function.
+
+        Returns
+        -------
+        Any
+            The value returned by the function.
+        """
+
+        if not self.enabled:
+            return function(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+
+        finally:
+
+            makedirs(self._trace_directory, exist_ok=True)
+            profiler.dump_stats(path.join(self._trace_directory, f'{name}.prof'))
+
+    def save(self, file_name=None):
+        """Saves the recorded spans to a file in the trace directory.
+
+        Parameters
+        ----------
+        file_name: str, optional
+            The name of the file to save the spans to, excluding the
+            `.trace.json` extension. If `None`, a unique name is generated.
+        """
+
+        if not self.enabled or len(self._events) == 0:
+            return
+
+        if file_name is None:
+            file_name = str(uuid.uuid4())
+
+        makedirs(self._trace_directory, exist_ok=True)
+
+        with open(path.join(self._trace_directory, f'{file_name}.trace.json'), 'w') as file:
+            json.dump(self._events, file)
+
+
+def get_current_recorder():
+    """Returns the recorder which is active on the current thread.
+
+    Returns
+    -------
+    TraceRecorder
+        The active recorder, or a disabled recorder if none is active.
+    """
+    recorder = getattr(_thread_local, 'recorder', None)
+    return recorder if recorder is not None else TraceRecorder()
+
+
+@contextmanager
+def trace_span(name, category, **arguments):
+    """A context manager which records the time spent within it as a span
+    of the recorder which is active on the current thread (if any).
+
+    Parameters
+    ----------
+    name: str
+        The name of the span.
+    category: str
+        The category of the span (e.g. 'protocol' or 'storage')
+    arguments: dict of str and Any
+        Any extra, JSON serializable information to attach to the span.
+    """
+
+    with get_current_recorder().span(name, category, **arguments):
+        yield
+
+
+def merge_trace_files(trace_directory, output_path):
+    """Merges all of the spans saved in a trace directory into a single
+    Chrome trace file.
+
+    Parameters
+    ----------
+    trace_directory: str
+        The directory containing the saved spans.
+    output_path: str
+        The path to save the merged trace file to.
+    """
+
+    if not path.isdir(trace_directory):
+        return
+
+    trace_events = []
+
+    for file_name in sorted(os.listdir(trace_directory)):
+
+        if not file_name.endswith('.trace.json'):
+            continue
+
+        try:
+
+            with open(path.join(trace_directory, file_name), 'r') as file:
+                trace_events.extend(json.load(file))
+
+        except json.JSONDecodeError:
+            logging.warning(f'The {file_name} trace file could not be read and will be skipped.')
+
+    trace_events.sort(key=lambda event: event['ts'])
+
+    with open(output_path, 'w') as file:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, file)
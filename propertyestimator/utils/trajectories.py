@@ -0,0 +1,404 @@
+"""
+A collection of utilities for streaming trajectories from disk a chunk of
+frames at a time, rather than loading them fully into memory.
+"""
+import logging
+from enum import Enum
+
+import numpy as np
+
+# The default number of frames to hold in memory at any one time.
+default_chunk_size = 1000
+
+
+class TrajectoryFileFormat(Enum):
+    """The file formats which trajectories may be written to.
+
+    DCD files store coordinates at full (single) precision. XTC files store
+    compressed coordinates with a precision of 10^-3 nm, and HDF5 files store
+    zlib compressed coordinates (as well as the topology of the trajectory).
+    """
+
+    DCD = 'DCD'
+    XTC = 'XTC'
+    HDF5 = 'HDF5'
+
+
+# The file extension associated with each trajectory file format.
+trajectory_file_extensions = {
+    TrajectoryFileFormat.DCD: '.dcd',
+    TrajectoryFileFormat.XTC: '.xtc',
+    TrajectoryFileFormat.HDF5: '.h5'
+}
+
+
+def get_number_of_frames(trajectory_path):
+    """Returns the number of frames stored in a trajectory file,
+    without loading the frames themselves.
+
+    Parameters
+    ----------
+    trajectory_path: str
+        The path to the trajectory file.
+
+    Returns
+    -------
+    int
+        The number of frames in the trajectory.
+    """
+    import mdtraj
+
+    with mdtraj.open(trajectory_path) as trajectory_file:
+        return len(trajectory_file)
+
+
+def iterate_trajectory(trajectory_path, topology_path, frame_indices=None, chunk_size=None):
+    """Iterates over the frames of a trajectory file a chunk at a time.
+
+    Parameters
+    ----------
+    trajectory_path: str
+        The path to the trajectory file.
+    topology_path: str
+        The path to a coordinate file which contains the topology
+        of the trajectory.
+    frame_indices: list of int, optional
+        The indices of the frames to yield. If `None`, all frames will be
+        yielded. The frames are always yielded in ascending order.
+    chunk_size: int, optional
+        The number of frames to read from disk at a time. If `None`,
+        `default_chunk_size` is used.
+
+    Returns
+    -------
+    generator of mdtraj.Trajectory
+        The chunks of the trajectory.
+    """
+    import mdtraj
+
+    if chunk_size is None:
+        chunk_size = default_chunk_size
+
+    start_index = 0
+
+    if frame_indices is not None:
+
+        frame_indices = np.unique(np.asarray(frame_indices, dtype=int))
+
+        if len(frame_indices) == 0:
+            return
+
+        # There is no need to read any of the frames before the first requested one.
+        start_index = int(frame_indices[0])
+
+    for chunk in mdtraj.iterload(trajectory_path, top=topology_path, chunk=chunk_size, skip=start_index):
+
+        end_index = start_index + chunk.n_frames
+
+        if frame_indices is None:
+
+            yield chunk
+
+            start_index = end_index
+            continue
+
+        lower_bound = np.searchsorted(frame_indices, start_index, side='left')
+        upper_bound = np.searchsorted(frame_indices, end_index, side='left')
+
+        if lower_bound < upper_bound:
+            yield chunk[frame_indices[lower_bound:upper_bound] - start_index]
+
+        if upper_bound == len(frame_indices):
+            break
+
+        start_index = end_index
+
+
+def _open_trajectory_file(output_path, file_format):
+    """Opens a trajectory file to write to.
+
+    Parameters
+    ----------
+    output_path: str
+        The path to the file to create.
+    file_format: TrajectoryFileFormat
+        The format of the file.
+
+    Returns
+    -------
+    mdtraj.formats.DCDTrajectoryFile or mdtraj.formats.XTCTrajectoryFile or mdtraj.formats.HDF5TrajectoryFile
+        The opened file.
+    """
+    from mdtraj.formats import DCDTrajectoryFile, HDF5TrajectoryFile, XTCTrajectoryFile
+
+    if file_format == TrajectoryFileFormat.DCD:
+        return DCDTrajectoryFile(output_path, 'w', force_overwrite=True)
+    elif file_format == TrajectoryFileFormat.XTC:
+        return XTCTrajectoryFile(output_path, 'w', force_overwrite=True)
+    elif file_format == TrajectoryFileFormat.HDF5:
+        return HDF5TrajectoryFile(output_path, 'w', force_overwrite=True)
+
+    raise ValueError(f'The {file_format} trajectory file format is not supported.')
+
+
+def write_trajectory_chunks(trajectory_chunks, output_path, file_format=TrajectoryFileFormat.DCD, precision=None):
+    """Writes a stream of trajectory chunks to a single trajectory file,
+    holding only one chunk in memory at a time.
+
+    Parameters
+    ----------
+    trajectory_chunks: iterable of mdtraj.Trajectory
+        The chunks to write.
+    output_path: str
+        The path to the file to create.
+    file_format: TrajectoryFileFormat
+        The format of the file to create.
+    precision: int, optional
+        The number of decimal places (in nm) to round the coordinates to
+        before they are written. Reducing the precision allows compressed
+        formats to store the coordinates more compactly. If `None`, the
+        coordinates are not rounded.
+
+    Returns
+    -------
+    int
+        The number of frames which were written.
+    """
+    from mdtraj.utils import in_units_of
+
+    file_format = TrajectoryFileFormat(file_format)
+
+    if file_format == TrajectoryFileFormat.XTC and precision is not None and precision > 3:
+
+        logging.warning(f'XTC files can only store coordinates to 3 decimal places, and so the '
+                        f'requested precision ({precision} decimal places) will not be met.')
+
+    number_of_atoms = None
+    number_of_frames = 0
+
+    with _open_trajectory_file(output_path, file_format) as trajectory_file:
+
+        for chunk in trajectory_chunks:
+
+            if number_of_atoms is None:
+                number_of_atoms = chunk.n_atoms
+
+                if file_format == TrajectoryFileFormat.HDF5:
+                    trajectory_file.topology = chunk.topology
+
+            elif chunk.n_atoms != number_of_atoms:
+                raise ValueError('All of the trajectory chunks must contain the same number of atoms.')
+
+            coordinates = chunk.xyz
+
+            if precision is not None:
+                coordinates = np.round(coordinates, precision)
+
+            if file_format == TrajectoryFileFormat.DCD:
+
+                cell_lengths = None
+
+                if chunk.unitcell_lengths is not None:
+                    cell_lengths = in_units_of(chunk.unitcell_lengths, 'nanometers', trajectory_file.distance_unit)
+
+                trajectory_file.write(in_units_of(coordinates, 'nanometers', trajectory_file.distance_unit),
+                                      cell_lengths=cell_lengths,
+                                      cell_angles=chunk.unitcell_angles)
+
+            elif file_format == TrajectoryFileFormat.XTC:
+
+                trajectory_file.write(coordinates, time=chunk.time, box=chunk.unitcell_vectors)
+
+            else:
+
+                trajectory_file.write(coordinates,
+                                      time=chunk.time,
+                                      cell_lengths=chunk.unitcell_lengths,
+                                      cell_angles=chunk.unitcell_angles)
+
+            number_of_frames += chunk.n_frames
+
+    return number_of_frames
+
+
+class TrajectorySegment:
+    """A contiguous range of the frames stored in a trajectory file."""
+
+    @property
+    def trajectory_path(self):
+        """str: The path to the trajectory file."""
+        return self._trajectory_path
+
+    @property
+    def coordinate_path(self):
+        """str: The path to a coordinate file which contains the
+        topology of the trajectory."""
+        return self._coordinate_path
+
+    @property
+    def start_frame(self):
+        """int: The index of the first frame in the segment."""
+        return self._start_frame
+
+    @property
+    def end_frame(self):
+        """int: The index of the frame after the last frame in the segment."""
+        return self._end_frame
+
+    @property
+    def number_of_frames(self):
+        """int: The number of frames in the segment."""
+        return self._end_frame - self._start_frame
+
+    def __init__(self, trajectory_path=None, coordinate_path=None, start_frame=0, end_frame=None):
+        """Constructs a new TrajectorySegment object.
+
+        Parameters
+        ----------
+        trajectory_path: str
+            The path to the trajectory file.
+        coordinate_path: str
+            The path to a coordinate file which contains the
+            topology of the trajectory.
+        start_frame: int
+            The index of the first frame in the segment.
+        end_frame: int, optional
+            The index of the frame after the last frame in the segment. If
+            `None`, the segment will extend to the end of the trajectory.
+        """
+
+        self._trajectory_path = trajectory_path
+        self._coordinate_path = coordinate_path
+
+        if trajectory_path is not None and end_frame is None:
+            end_frame = get_number_of_frames(trajectory_path)
+
+        self._start_frame = start_frame
+        self._end_frame = end_frame
+
+    def iterate_chunks(self, chunk_size=None):
+        """Iterates over the frames of the segment a chunk at a time.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            The number of frames to read from disk at a time.
+
+        Returns
+        -------
+        generator of mdtraj.Trajectory
+            The chunks of the segment.
+        """
+
+        frame_indices = np.arange(self._start_frame, self._end_frame)
+        return iterate_trajectory(self._trajectory_path, self._coordinate_path, frame_indices, chunk_size)
+
+    def __getstate__(self):
+
+        return {
+            'trajectory_path': self._trajectory_path,
+            'coordinate_path': self._coordinate_path,
+            'start_frame': self._start_frame,
+            'end_frame': self._end_frame
+        }
+
+    def __setstate__(self, state):
+
+        self._trajectory_path = state['trajectory_path']
+        self._coordinate_path = state['coordinate_path']
+        self._start_frame = state['start_frame']
+        self._end_frame = state['end_frame']
+
+
+class VirtualTrajectory:
+    """A trajectory which is formed by concatenating segments of existing
+    trajectory files. The frames of the segments are streamed directly from
+    their original files, so that a concatenated copy of the trajectories
+    never needs to be written to disk.
+    """
+
+    @property
+    def segments(self):
+        """list of TrajectorySegment: The segments which make up the trajectory."""
+        return self._segments
+
+    @property
+    def coordinate_path(self):
+        """str: The path to a coordinate file which contains the topology
+        of the trajectory, taken from its first segment."""
+        return None if len(self._segments) == 0 else self._segments[0].coordinate_path
+
+    def __init__(self, segments=None):
+        """Constructs a new VirtualTrajectory object.
+
+        Parameters
+        ----------
+        segments: list of TrajectorySegment, optional
+            The segments which make up the trajectory.
+        """
+        self._segments = [] if segments is None else list(segments)
+
+    def __len__(self):
+        """Get the number of frames in the trajectory.
+
+        Returns
+        -------
+        int
+            The number of frames in the trajectory.
+        """
+        return sum(segment.number_of_frames for segment in self._segments)
+
+    @classmethod
+    def from_file(cls, trajectory_path, coordinate_path):
+        """Creates a new `VirtualTrajectory` which contains all of
+        the frames of a single trajectory file.
+
+        Parameters
+        ----------
+        trajectory_path: str
+            The path to the trajectory file.
+        coordinate_path: str
+            The path to a coordinate file which contains the
+            topology of the trajectory.
+
+        Returns
+        -------
+        VirtualTrajectory
+            The created trajectory.
+        """
+        return cls([TrajectorySegment(trajectory_path, coordinate_path)])
+
+    def iterate_chunks(self, chunk_size=None):
+        """Iterates over the frames of each of the segments in
+        turn, a chunk at a time.
+
+        Parameters
+        ----------
+        chunk_size: int, optional
+            The number of frames to read from disk at a time.
+
+        Returns
+        -------
+        generator of mdtraj.Trajectory
+            The chunks of the trajectory.
+        """
+
+        for segment in self._segments:
+            yield from segment.iterate_chunks(chunk_size)
+
+    def save_dcd(self, file_path):
+        """Writes the frames of the trajectory to a single DCD file. This
+        should only be used when a physical copy of the trajectory is needed.
+
+        Parameters
+        ----------
+        file_path: str
+            The path to the DCD file to create.
+        """
+        write_trajectory_chunks(self.iterate_chunks(), file_path)
+
+    def __getstate__(self):
+        return {'segments': self._segments}
+
+    def __setstate__(self, state):
+        self._segments = state['segments']
@@ -2,13 +2,22 @@
 A collection of general utilities.
 """
 import abc
-import copy
+import hashlib
 import logging
 import os
 import sys
+import threading
+import uuid
+from collections import OrderedDict
 
+from propertyestimator.utils.metrics import default_registry
 from propertyestimator.utils.string import extract_variable_index_and_name
 
+# The environment variable which points to a directory in which molecules
+# created from smiles patterns are cached on disk, so that they can be
+# shared between all of the workers (and processes) which can access it.
+MOLECULE_CACHE_DIRECTORY_VARIABLE = 'PROPERTYESTIMATOR_MOLECULE_CACHE'
+
 
 def find_types_with_decorator(class_type, decorator_type):
     """ A method to collect all attributes marked by a specified
@@ -68,13 +77,123 @@ def get_data_filename(relative_path):
     return fn
 
 
-_cached_molecules = {}
+# The maximum number of molecules to hold in memory in each worker.
+_maximum_cached_molecules = 256
+
+_cached_molecules = OrderedDict()
+_cached_molecules_lock = threading.Lock()
+
+# The directory in which to cache molecules on disk when neither a directory
+# nor the `PROPERTYESTIMATOR_MOLECULE_CACHE` variable is given.
+_default_molecule_cache_directory = None
 
 
-def create_molecule_from_smiles(smiles, number_of_conformers=1):
+def set_default_molecule_cache_directory(cache_directory):
+    """Sets the directory in which molecules created by this process are cached
+    on disk when no other directory is requested (see `create_molecule_from_smiles`).
+
+    Parameters
+    ----------
+    cache_directory: str, optional
+        The directory to cache the molecules in. If `None`,
+        molecules will only be cached in-process.
+    """
+    global _default_molecule_cache_directory
+    _default_molecule_cache_directory = cache_directory
+
+
+def _get_molecule_cache_path(cache_directory, smiles, number_of_conformers):
+    """Returns the path to the on-disk cache file of a molecule. The key includes
+    the version of the toolkits used, as these affect the generated conformers.
+
+    Parameters
+    ----------
+    cache_directory: str
+        The directory which contains the cached molecules.
+    smiles : str
+        The smiles pattern of the molecule.
+    number_of_conformers: int
+        The number of conformers of the molecule.
+
+    Returns
+    -------
+    str
+        The path to the cache file.
+    """
+    from openeye import oechem, oeomega
+
+    cache_key = '{}_{}_oechem-{}_oeomega-{}'.format(smiles, number_of_conformers,
+                                                    oechem.OEChemGetRelease(),
+                                                    oeomega.OEOmegaGetRelease())
+
+    return os.path.join(cache_directory, hashlib.sha256(cache_key.encode('utf-8')).hexdigest() + '.oeb')
+
+
+def _load_cached_molecule(file_path):
+    """Loads a molecule from the on-disk molecule cache.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the cache file.
+
+    Returns
+    -------
+    OEMol, optional
+        The cached molecule, or `None` if it could not be loaded.
+    """
+    from openeye import oechem
+
+    if not os.path.isfile(file_path):
+        return None
+
+    molecule = oechem.OEMol()
+    input_stream = oechem.oemolistream(file_path)
+
+    if not oechem.OEReadMolecule(input_stream, molecule):
+
+        logging.warning('Could not read the cached molecule at ' + file_path)
+        molecule = None
+
+    input_stream.close()
+    return molecule
+
+
+def _save_cached_molecule(file_path, molecule):
+    """Saves a molecule to the on-disk molecule cache. The molecule is
+    first written to a uniquely named file which is then moved into place,
+    so that other processes never see a partially written file.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the cache file.
+    molecule: OEMol
+        The molecule to save.
+    """
+    from openeye import oechem
+
+    cache_directory = os.path.dirname(file_path)
+
+    if not os.path.isdir(cache_directory):
+        os.makedirs(cache_directory, exist_ok=True)
+
+    temporary_path = '{}.{}.oeb'.format(os.path.splitext(file_path)[0], uuid.uuid4().hex)
+
+    output_stream = oechem.oemolostream(temporary_path)
+    oechem.OEWriteMolecule(output_stream, molecule)
+    output_stream.close()
+
+    os.replace(temporary_path, file_path)
+
+
+def create_molecule_from_smiles(smiles, number_of_conformers=1, cache_directory=None):
     """
     Create an ``OEMol`` molecule from a smiles pattern.
 
+    Molecules are cached in-process, and, if a cache directory is available,
+    on disk so that they can be shared between workers.
+
     .. todo:: Replace with the toolkit function when finished.
 
     Parameters
@@ -83,55 +202,106 @@ def create_molecule_from_smiles(smiles, number_of_conformers=1):
         The smiles pattern to create the molecule from.
     number_of_conformers: int
         The number of conformers to generate for the molecule using Omega.
+    cache_directory: str, optional
+        The directory in which to cache the created molecules on disk. If `None`,
+        the directory given by the `PROPERTYESTIMATOR_MOLECULE_CACHE` environment
+        variable is used, followed by the directory set by
+        `set_default_molecule_cache_directory` (which, for workers, defaults to a
+        directory in the working directory of the server). If none of these are
+        set, molecules are only cached in-process.
 
     Returns
     -------
     molecule : OEMol
         OEMol with no charges, and a number of conformers as specified
-        by `number_of_conformers`
+        by `number_of_conformers`. This is a copy which the caller is
+        free to modify.
      """
 
     from openeye import oechem, oeomega
 
-    # Check cache
-    if smiles in _cached_molecules:
-        return copy.deepcopy(_cached_molecules[smiles])
+    cache_key = (smiles, number_of_conformers)
 
-    # Create molecule from smiles.
-    molecule = oechem.OEMol()
-    parse_smiles_options = oechem.OEParseSmilesOptions(quiet=True)
+    lookups_counter = default_registry.counter('propertyestimator_molecule_cache_lookups_total',
+                                               'The number of molecule cache lookups.',
+                                               ('tier', 'result'))
 
-    if not oechem.OEParseSmiles(molecule, smiles, parse_smiles_options):
+    # Check the in-process cache
+    with _cached_molecules_lock:
 
-        logging.warning('Could not parse SMILES: ' + smiles)
-        return None
+        molecule = _cached_molecules.get(cache_key)
+
+        if molecule is not None:
 
-    # Normalize molecule
-    oechem.OEAssignAromaticFlags(molecule, oechem.OEAroModelOpenEye)
-    oechem.OEAddExplicitHydrogens(molecule)
+            _cached_molecules.move_to_end(cache_key)
+            lookups_counter.increment(tier='memory', result='hit')
 
-    # Create configuration
-    if number_of_conformers > 0:
+            return oechem.OEMol(molecule)
 
-        omega = oeomega.OEOmega()
+    lookups_counter.increment(tier='memory', result='miss')
 
-        omega.SetMaxConfs(number_of_conformers)
-        omega.SetIncludeInput(False)
-        omega.SetCanonOrder(False)
-        omega.SetSampleHydrogens(True)
-        omega.SetStrictStereo(True)
-        omega.SetStrictAtomTypes(False)
+    if cache_directory is None:
+        cache_directory = os.environ.get(MOLECULE_CACHE_DIRECTORY_VARIABLE, _default_molecule_cache_directory)
 
-        status = omega(molecule)
+    cache_path = None
 
-        if not status:
+    if cache_directory is not None:
 
-            logging.warning('Could not generate a conformer for ' + smiles)
+        cache_path = _get_molecule_cache_path(cache_directory, smiles, number_of_conformers)
+        molecule = _load_cached_molecule(cache_path)
+
+        lookups_counter.increment(tier='disk', result='miss' if molecule is None else 'hit')
+
+    if molecule is None:
+
+        # Create molecule from smiles.
+        molecule = oechem.OEMol()
+        parse_smiles_options = oechem.OEParseSmilesOptions(quiet=True)
+
+        if not oechem.OEParseSmiles(molecule, smiles, parse_smiles_options):
+
+            logging.warning('Could not parse SMILES: ' + smiles)
             return None
 
-    _cached_molecules[smiles] = molecule
+        # Normalize molecule
+        oechem.OEAssignAromaticFlags(molecule, oechem.OEAroModelOpenEye)
+        oechem.OEAddExplicitHydrogens(molecule)
 
-    return molecule
+        # Create configuration
+        if number_of_conformers > 0:
+
+            omega = oeomega.OEOmega()
+
+            omega.SetMaxConfs(number_of_conformers)
+            omega.SetIncludeInput(False)
+            omega.SetCanonOrder(False)
+            omega.SetSampleHydrogens(True)
+            omega.SetStrictStereo(True)
+            omega.SetStrictAtomTypes(False)
+
+            status = omega(molecule)
+
+            if not status:
+
+                logging.warning('Could not generate a conformer for ' + smiles)
+                return None
+
+        if cache_path is not None:
+
+            try:
+                _save_cached_molecule(cache_path, molecule)
+            except OSError as e:
+                logging.warning('Could not cache the molecule created from {}: {}'.format(smiles, e))
+
+    with _cached_molecules_lock:
+
+        _cached_molecules[cache_key] = molecule
+        _cached_molecules.move_to_end(cache_key)
+
+        while len(_cached_molecules) > _maximum_cached_molecules:
+            _cached_molecules.popitem(last=False)
+
+    return oechem.OEMol(molecule)
 
 
 def setup_timestamp_logging():
@@ -90,6 +90,21 @@ class BaseProtocol:
 
         return return_dependencies
 
+    @property
+    def lightweight(self):
+        """bool: Whether this protocol is cheap enough to execute (e.g. it only
+        performs simple arithmetic on its inputs) that it may be fused together
+        with other lightweight protocols into a single task when submitted to a
+        calculation backend."""
+        return self._lightweight
+
+    @property
+    def resource_requirements(self):
+        """TaskResourceRequirements, optional: The compute resources which this protocol
+        is able to make use of when executing. If `None`, the protocol will be allotted
+        all of the resources available to a calculation backend worker."""
+        return self._resource_requirements
+
     @protocol_input(value_type=bool)
     def allow_merging(self):
         """bool: If true, this protocol is allowed to merge with other identical protocols."""
@@ -103,6 +118,14 @@ class BaseProtocol:
         # Defines whether a protocol is allowed to try and merge with other identical ones.
         self._allow_merging = True
 
+        # Defines whether this protocol is cheap enough to be fused with other
+        # lightweight protocols into a single backend task.
+        self._lightweight = False
+
+        # The resources which this protocol can make use of. By default a protocol
+        # will occupy a whole calculation backend worker.
+        self._resource_requirements = None
+
         # Find the required inputs and outputs.
         self.provided_outputs = []
         self.required_inputs = []
@@ -0,0 +1,371 @@
+"""
+A collection of classes for recording how long protocols take to execute,
+and for predicting how long new protocols will take to execute based on
+these historical runtimes.
+"""
+import logging
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import closing
+from os import path, makedirs
+from statistics import median
+
+from propertyestimator.utils import graph
+from propertyestimator.workflow.plugins import available_protocols
+from propertyestimator.workflow.schemas import ProtocolGroupSchema
+
+ProtocolRuntimeRecord = namedtuple('ProtocolRuntimeRecord', 'protocol_type '
+                                                            'protocol_id '
+                                                            'runtime '
+                                                            'number_of_threads '
+                                                            'number_of_gpus '
+                                                            'number_of_atoms '
+                                                            'number_of_steps '
+                                                            'succeeded '
+                                                            'timestamp')
+
+
+def count_pdb_atoms(file_path):
+    """Counts the number of atoms in a PDB file without
+    fully parsing it.
+
+    Parameters
+    ----------
+    file_path: str
+        The path to the PDB file.
+
+    Returns
+    -------
+    int
+        The number of atoms in the file.
+    """
+
+    number_of_atoms = 0
+
+    with open(file_path, 'r') as file:
+
+        for line in file:
+
+            if line.startswith('ATOM') or line.startswith('HETATM'):
+                number_of_atoms += 1
+
+            elif line.startswith('ENDMDL'):
+                # Only count the atoms of the first model.
+                break
+
+    return number_of_atoms
+
+
+class ProtocolRuntimeDatabase:
+    """A simple, local SQLite backed store of how long protocols took to
+    execute, and with which resources.
+
+    The database may safely be written to by multiple workers at once
+    so long as they share a file system which supports file locking.
+    """
+
+    _table_name = 'protocol_runtimes'
+
+    @property
+    def database_path(self):
+        """str: The path to the underlying SQLite database."""
+        return self._database_path
+
+    def __init__(self, database_path):
+        """Constructs a new ProtocolRuntimeDatabase object.
+
+        Parameters
+        ----------
+        database_path: str
+            The path to the database file. This will be created if
+            it does not already exist.
+        """
+
+        self._database_path = database_path
+
+        database_directory = path.dirname(database_path)
+
+        if len(database_directory) > 0 and not path.isdir(database_directory):
+            makedirs(database_directory, exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {self._table_name} ('
+                               f'protocol_type TEXT NOT NULL, '
+                               f'protocol_id TEXT NOT NULL, '
+                               f'runtime REAL NOT NULL, '
+                               f'number_of_threads INTEGER, '
+                               f'number_of_gpus INTEGER, '
+                               f'number_of_atoms INTEGER, '
+                               f'number_of_steps INTEGER, '
+                               f'succeeded INTEGER NOT NULL, '
+                               f'timestamp REAL NOT NULL)')
+
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {self._table_name}_type_index '
+                               f'ON {self._table_name} (protocol_type)')
+
+    def _connect(self):
+        """Opens a new connection to the database.
+
+        Returns
+        -------
+        sqlite3.Connection
+            The opened connection.
+        """
+        # A generous timeout is used as many workers may be trying
+        # to write to the database at once.
+        return sqlite3.connect(self._database_path, timeout=60.0)
+
+    def record(self, protocol_type, protocol_id, runtime, compute_resources=None,
+               number_of_atoms=None, number_of_steps=None, succeeded=True):
+        """Records how long a protocol took to execute.
+
+        Parameters
+        ----------
+        protocol_type: str
+            The type of the protocol which was executed.
+        protocol_id: str
+            The id of the protocol which was executed.
+        runtime: float
+            The time in seconds that the protocol took to execute.
+        compute_resources: ComputeResources, optional
+            The resources which the protocol was executed with.
+        number_of_atoms: int, optional
+            The number of atoms in the system the protocol acted upon.
+        number_of_steps: int, optional
+            The number of steps (e.g. of a simulation) the protocol performed.
+        succeeded: bool
+            Whether the protocol executed successfully.
+        """
+
+        number_of_threads = None
+        number_of_gpus = None
+
+        if compute_resources is not None:
+
+            number_of_threads = compute_resources.number_of_threads
+            number_of_gpus = compute_resources.number_of_gpus
+
+        with closing(self._connect()) as connection, connection:
+
+            connection.execute(f'INSERT INTO {self._table_name} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               (protocol_type, protocol_id, runtime, number_of_threads, number_of_gpus,
+                                number_of_atoms, number_of_steps, int(succeeded), time.time()))
+
+    def query(self, protocol_type=None, succeeded=None, since=None):
+        """Retrieves the recorded runtimes, optionally filtered by
+        protocol type and outcome.
+
+        Parameters
+        ----------
+        protocol_type: str, optional
+            If set, only runtimes of this type of protocol will be returned.
+        succeeded: bool, optional
+            If set, only runtimes of protocols with this outcome will be returned.
+        since: float, optional
+            If set, only runtimes recorded after this time (as returned by
+            `time.time()`) will be returned.
+
+        Returns
+        -------
+        list of ProtocolRuntimeRecord
+            The matching records, ordered from oldest to newest.
+        """
+
+        conditions = []
+        parameters = []
+
+        if protocol_type is not None:
+
+            conditions.append('protocol_type = ?')
+            parameters.append(protocol_type)
+
+        if succeeded is not None:
+
+            conditions.append('succeeded = ?')
+            parameters.append(int(succeeded))
+
+        if since is not None:
+
+            conditions.append('timestamp > ?')
+            parameters.append(since)
+
+        query_string = f'SELECT * FROM {self._table_name}'
+
+        if len(conditions) > 0:
+            query_string += ' WHERE ' + ' AND '.join(conditions)
+
+        query_string += ' ORDER BY timestamp'
+
+        with closing(self._connect()) as connection, connection:
+            rows = connection.execute(query_string, parameters).fetchall()
+
+        return [ProtocolRuntimeRecord(row[0], row[1], row[2], row[3], row[4],
+                                      row[5], row[6], bool(row[7]), row[8]) for row in rows]
+
+
+class ProtocolCostModel:
+    """A simple model which predicts how long a protocol will take to
+    execute from the historical runtimes of the same type of protocol.
+
+    Runtimes are predicted as the median historical runtime per step and
+    per atom where this information is available, falling back to the
+    median historical runtime per step, and then to the median historical
+    runtime of the protocol type.
+    """
+
+    def __init__(self, runtime_database, default_runtime=1.0):
+        """Constructs a new ProtocolCostModel object.
+
+        Parameters
+        ----------
+        runtime_database: ProtocolRuntimeDatabase
+            The database of historical runtimes.
+        default_runtime: float
+            The runtime in seconds to assume for protocols which
+            have no runtime history.
+        """
+
+        self._runtime_database = runtime_database
+        self._default_runtime = default_runtime
+
+        self._records_by_type = None
+
+    def refresh(self):
+        """Reloads the historical runtimes from the database."""
+
+        self._records_by_type = {}
+
+        for record in self._runtime_database.query(succeeded=True):
+
+            if record.protocol_type not in self._records_by_type:
+                self._records_by_type[record.protocol_type] = []
+
+            self._records_by_type[record.protocol_type].append(record)
+
+    @staticmethod
+    def _get_number_of_steps(protocol_schema):
+        """Returns the number of steps defined by a protocol schema, if any.
+
+        Parameters
+        ----------
+        protocol_schema: ProtocolSchema
+            The schema to inspect.
+
+        Returns
+        -------
+        int, optional
+            The number of steps, or `None` if not defined.
+        """
+
+        number_of_steps = protocol_schema.inputs.get('.steps')
+
+        if not isinstance(number_of_steps, int):
+            return None
+
+        return number_of_steps
+
+    def predict(self, protocol_schema, number_of_atoms=None):
+        """Predicts how long a protocol will take to execute.
+
+        Parameters
+        ----------
+        protocol_schema: ProtocolSchema
+            The schema of the protocol to predict the runtime of.
+        number_of_atoms: int, optional
+            The number of atoms in the system the protocol will act upon,
+            if known.
+
+        Returns
+        -------
+        float
+            The predicted runtime in seconds.
+        """
+
+        if self._records_by_type is None:
+            self.refresh()
+
+        records = self._records_by_type.get(protocol_schema.type, [])
+
+        if len(records) == 0:
+
+            if (isinstance(protocol_schema, ProtocolGroupSchema) and
+                len(protocol_schema.grouped_protocol_schemas) > 0):
+
+                return sum(self.predict(child_schema, number_of_atoms) for
+                           child_schema in protocol_schema.grouped_protocol_schemas)
+
+            return self._default_runtime
+
+        number_of_steps = self._get_number_of_steps(protocol_schema)
+
+        if number_of_steps is not None:
+
+            step_records = [record for record in records if record.number_of_steps]
+
+            atom_step_records = [record for record in step_records if record.number_of_atoms]
+
+            if number_of_atoms is not None and len(atom_step_records) > 0:
+
+                runtime_per_atom_step = median(record.runtime / (record.number_of_steps * record.number_of_atoms)
+                                               for record in atom_step_records)
+
+                return runtime_per_atom_step * number_of_steps * number_of_atoms
+
+            if len(step_records) > 0:
+
+                runtime_per_step = median(record.runtime / record.number_of_steps for record in step_records)
+                return runtime_per_step * number_of_steps
+
+        return median(record.runtime for record in records)
+
+    def predict_workflow(self, workflow_schema):
+        """Predicts how long it will take to execute all of the protocols in a
+        workflow schema, assuming that independent protocols are executed in
+        parallel (i.e. the runtime of the critical path through the workflow).
+
+        Parameters
+        ----------
+        workflow_schema: WorkflowSchema
+            The schema of the workflow.
+
+        Returns
+        -------
+        float
+            The predicted runtime in seconds.
+        """
+
+        protocols = {}
+
+        for protocol_schema in workflow_schema.protocols.values():
+
+            protocol = available_protocols[protocol_schema.type](protocol_schema.id)
+            protocol.schema = protocol_schema
+
+            protocols[protocol.id] = protocol
+
+        dependants_graph = {protocol_id: [] for protocol_id in protocols}
+
+        for protocol in protocols.values():
+
+            for dependency in protocol.dependencies:
+
+                if dependency.is_global or dependency.start_protocol not in dependants_graph:
+                    continue
+
+                if protocol.id in dependants_graph[dependency.start_protocol]:
+                    continue
+
+                dependants_graph[dependency.start_protocol].append(protocol.id)
+
+        runtimes = {protocol_id: self.predict(protocol.schema) for protocol_id, protocol in protocols.items()}
+
+        critical_path_lengths = graph.calculate_critical_path_lengths(dependants_graph, runtimes)
+
+        if len(critical_path_lengths) == 0:
+
+            logging.warning(f'The runtime of the {workflow_schema.id} workflow could not be predicted.')
+            return 0.0
+
+        return max(critical_path_lengths.values())
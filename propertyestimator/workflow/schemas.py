@@ -5,6 +5,7 @@ import re
 
 from propertyestimator.utils.quantities import EstimatedQuantity
 from propertyestimator.utils.serialization import TypedBaseModel
+from propertyestimator.utils.trajectories import TrajectoryFileFormat
 from propertyestimator.workflow.plugins import available_protocols
 from propertyestimator.workflow.utils import ProtocolPath, ReplicatorValue
 
@@ -152,6 +153,15 @@ class WorkflowOutputToStore:
 
         self.statistical_inefficiency = None
 
+        # The number of molecules of each component in the
+        # stored coordinates, if known.
+        self.number_of_molecules = None
+
+        # The format and precision (in decimal places) with which
+        # the trajectory should be stored.
+        self.trajectory_storage_format = TrajectoryFileFormat.DCD
+        self.trajectory_storage_precision = None
+
     def __getstate__(self):
 
         return_value = {
@@ -160,6 +170,9 @@ class WorkflowOutputToStore:
             'coordinate_file_path': self.coordinate_file_path,
             'statistics_file_path': self.statistics_file_path,
             'statistical_inefficiency': self.statistical_inefficiency,
+            'number_of_molecules': self.number_of_molecules,
+            'trajectory_storage_format': self.trajectory_storage_format,
+            'trajectory_storage_precision': self.trajectory_storage_precision,
         }
         return return_value
 
@@ -170,6 +183,9 @@ class WorkflowOutputToStore:
         self.coordinate_file_path = state['coordinate_file_path']
         self.statistics_file_path = state['statistics_file_path']
         self.statistical_inefficiency = state['statistical_inefficiency']
+        self.number_of_molecules = state.get('number_of_molecules', None)
+        self.trajectory_storage_format = state['trajectory_storage_format']
+        self.trajectory_storage_precision = state['trajectory_storage_precision']
 
 
 class WorkflowSchema(TypedBaseModel):
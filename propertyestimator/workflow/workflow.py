@@ -15,13 +15,20 @@ from os import path, makedirs
 
 from simtk import unit
 
+from propertyestimator.backends import TaskResourceRequirements
 from propertyestimator.storage import StoredSimulationData
 from propertyestimator.utils import graph
 from propertyestimator.utils.exceptions import PropertyEstimatorException
+from propertyestimator.utils.files import calculate_file_checksum, capture_file
 from propertyestimator.utils.serialization import TypedBaseModel, TypedJSONEncoder, TypedJSONDecoder
-from propertyestimator.utils.utils import SubhookedABCMeta, get_nested_attribute
+from propertyestimator.utils.statistics import StatisticsFileReader
+from propertyestimator.utils.tracing import TraceRecorder
+from propertyestimator.utils.trajectories import TrajectoryFileFormat, iterate_trajectory, trajectory_file_extensions, \
+    write_trajectory_chunks
+from propertyestimator.utils.utils import SubhookedABCMeta, get_nested_attribute, set_default_molecule_cache_directory
 from propertyestimator.workflow.plugins import available_protocols
 from propertyestimator.workflow.protocols import BaseProtocol
+from propertyestimator.workflow.runtimes import ProtocolRuntimeDatabase, ProtocolCostModel, count_pdb_atoms
 from propertyestimator.workflow.schemas import WorkflowSchema, ProtocolReplicator
 from propertyestimator.workflow.utils import ProtocolPath, ReplicatorValue
 
@@ -51,7 +58,13 @@ class WorkflowOptions:
 
     def __init__(self,
                  convergence_mode=ConvergenceMode.RelativeUncertainty,
-                 relative_uncertainty_fraction=1.0, absolute_uncertainty=None):
+                 relative_uncertainty_fraction=1.0, absolute_uncertainty=None,
+                 adaptive_sampling=False, trajectory_storage_format=TrajectoryFileFormat.DCD,
+                 trajectory_storage_precision=None, reweighting_temperature_window=None,
+                 reweighting_pressure_window=None, reweighting_minimum_effective_samples=None,
+                 charge_cache_path=None, use_stored_coordinates=False,
+                 stored_coordinates_temperature_window=None, stored_coordinates_pressure_window=None,
+                 number_of_packmol_attempts=1):
         """Constructs a new WorkflowOptions object.
 
         Parameters
@@ -69,6 +82,50 @@ class WorkflowOptions:
             If the convergence mode is set to `AbsoluteUncertainty`, then workflows
             will by default run simulations until the estimated uncertainty is less
             than the `absolute_uncertainty`
+        adaptive_sampling: bool
+            If true, rather than extending simulations by a fixed number of steps
+            until the target uncertainty is reached, workflows will predict the number
+            of extra steps required to reach the target uncertainty from the
+            uncertainty observed so far (see `ConditionalGroup.adaptive_sampling`).
+        trajectory_storage_format: TrajectoryFileFormat
+            The file format in which to store the (uncorrelated) trajectories
+            generated by workflows. Compressed formats (such as XTC or HDF5)
+            can greatly reduce the size of the stored data.
+        trajectory_storage_precision: int, optional
+            The number of decimal places (in nm) to round the coordinates of
+            stored trajectories to. If `None`, no rounding is performed.
+        reweighting_temperature_window: simtk.unit.Quantity, optional
+            When estimating a property by reweighting, only stored data whose
+            temperature is within this window of the temperature of the property
+            will be used. If `None`, data at any temperature will be used.
+        reweighting_pressure_window: simtk.unit.Quantity, optional
+            When estimating a property by reweighting, only stored data whose
+            pressure is within this window of the pressure of the property
+            will be used. If `None`, data at any pressure will be used.
+        reweighting_minimum_effective_samples: float, optional
+            When estimating a property by reweighting, only stored data which
+            contains at least this many effective samples will be used. If
+            `None`, data with any number of samples will be used.
+        charge_cache_path: str, optional
+            The path to a `PartialChargeCache` (shared by all workers) in which to
+            cache the partial charges generated when assigning force field parameters.
+            If `None`, partial charges will be regenerated for every system.
+        use_stored_coordinates: bool
+            If true, simulation workflows will start from the equilibrated coordinates
+            of a previous simulation of the same substance (with the same number of
+            molecules) at the closest available state, rather than packing a new box.
+        stored_coordinates_temperature_window: simtk.unit.Quantity, optional
+            When `use_stored_coordinates` is true, only coordinates whose temperature
+            is within this window of the temperature of the property will be used.
+            If `None`, coordinates at any temperature will be used.
+        stored_coordinates_pressure_window: simtk.unit.Quantity, optional
+            When `use_stored_coordinates` is true, only coordinates whose pressure
+            is within this window of the pressure of the property will be used.
+            If `None`, coordinates at any pressure will be used.
+        number_of_packmol_attempts: int
+            The number of attempts (each with a different random seed) to make when
+            packing the coordinates of a simulation box. The attempts are run
+            concurrently, and the first to succeed is used.
         """
 
         self.convergence_mode = convergence_mode
@@ -76,6 +133,23 @@ class WorkflowOptions:
         self.absolute_uncertainty = absolute_uncertainty
         self.relative_uncertainty_fraction = relative_uncertainty_fraction
 
+        self.adaptive_sampling = adaptive_sampling
+
+        self.trajectory_storage_format = trajectory_storage_format
+        self.trajectory_storage_precision = trajectory_storage_precision
+
+        self.reweighting_temperature_window = reweighting_temperature_window
+        self.reweighting_pressure_window = reweighting_pressure_window
+        self.reweighting_minimum_effective_samples = reweighting_minimum_effective_samples
+
+        self.charge_cache_path = charge_cache_path
+
+        self.use_stored_coordinates = use_stored_coordinates
+        self.stored_coordinates_temperature_window = stored_coordinates_temperature_window
+        self.stored_coordinates_pressure_window = stored_coordinates_pressure_window
+
+        self.number_of_packmol_attempts = number_of_packmol_attempts
+
         if (self.convergence_mode is self.ConvergenceMode.RelativeUncertainty and
             self.relative_uncertainty_fraction is None):
 
@@ -94,7 +168,24 @@ class WorkflowOptions:
             'convergence_mode': self.convergence_mode,
 
             'absolute_uncertainty': self.absolute_uncertainty,
-            'relative_uncertainty_fraction': self.relative_uncertainty_fraction
+            'relative_uncertainty_fraction': self.relative_uncertainty_fraction,
+
+            'adaptive_sampling': self.adaptive_sampling,
+
+            'trajectory_storage_format': self.trajectory_storage_format,
+            'trajectory_storage_precision': self.trajectory_storage_precision,
+
+            'reweighting_temperature_window': self.reweighting_temperature_window,
+            'reweighting_pressure_window': self.reweighting_pressure_window,
+            'reweighting_minimum_effective_samples': self.reweighting_minimum_effective_samples,
+
+            'charge_cache_path': self.charge_cache_path,
+
+            'use_stored_coordinates': self.use_stored_coordinates,
+            'stored_coordinates_temperature_window': self.stored_coordinates_temperature_window,
+            'stored_coordinates_pressure_window': self.stored_coordinates_pressure_window,
+
+            'number_of_packmol_attempts': self.number_of_packmol_attempts
         }
 
     def __setstate__(self, state):
@@ -104,6 +195,25 @@ class WorkflowOptions:
         self.absolute_uncertainty = state['absolute_uncertainty']
         self.relative_uncertainty_fraction = state['relative_uncertainty_fraction']
 
+        # Options which were added after the initial release are optional, so
+        # that options serialized by older versions can still be loaded.
+        self.adaptive_sampling = state.get('adaptive_sampling', False)
+
+        self.trajectory_storage_format = state.get('trajectory_storage_format', TrajectoryFileFormat.DCD)
+        self.trajectory_storage_precision = state.get('trajectory_storage_precision', None)
+
+        self.reweighting_temperature_window = state.get('reweighting_temperature_window', None)
+        self.reweighting_pressure_window = state.get('reweighting_pressure_window', None)
+        self.reweighting_minimum_effective_samples = state.get('reweighting_minimum_effective_samples', None)
+
+        self.charge_cache_path = state.get('charge_cache_path', None)
+
+        self.use_stored_coordinates = state.get('use_stored_coordinates', False)
+        self.stored_coordinates_temperature_window = state.get('stored_coordinates_temperature_window', None)
+        self.stored_coordinates_pressure_window = state.get('stored_coordinates_pressure_window', None)
+
+        self.number_of_packmol_attempts = state.get('number_of_packmol_attempts', 1)
+
 
 class Workflow:
     """Encapsulates and prepares a workflow which is able to estimate
@@ -780,6 +890,9 @@ class Workflow:
                                                                components in the system + 1
             - force_field_path: str - A path to the force field parameters with which the
                                       property should be evaluated with.
+            - stored_coordinates: list of tuple(str, dict of str and int) - The paths to (and
+                                  compositions of) any stored, equilibrated coordinates which
+                                  may be used as a starting point, closest state first.
         """
         from propertyestimator.substances import Substance
 
@@ -821,7 +934,8 @@ class Workflow:
             "components": components,
             "target_uncertainty": target_uncertainty,
             "per_component_uncertainty": per_component_uncertainty,
-            "force_field_path": force_field_path
+            "force_field_path": force_field_path,
+            "stored_coordinates": []
         }
 
         # Include the properties metadata
@@ -835,7 +949,8 @@ class WorkflowGraph:
     which will estimate a set of physical properties..
     """
 
-    def __init__(self, root_directory=''):
+    def __init__(self, root_directory='', runtime_database_path=None,
+                 trace_directory=None, profiled_protocol_types=None, molecule_cache_directory=None):
         """Constructs a new WorkflowGraph
 
         Parameters
@@ -843,9 +958,29 @@ class WorkflowGraph:
         root_directory: str
             The root directory in which to store all outputs from
             this graph.
+        runtime_database_path: str, optional
+            The path to a `ProtocolRuntimeDatabase` in which to record how long
+            each protocol takes to execute. If set, the historical runtimes in this
+            database will also be used to prioritise the protocols in the graph.
+        trace_directory: str, optional
+            The directory in which to save traces of where time is spent while
+            executing each protocol. If `None`, no traces will be saved.
+        profiled_protocol_types: list of str, optional
+            The types of protocol which should be executed under `cProfile`. The
+            profiles will be saved in the `trace_directory`.
+        molecule_cache_directory: str, optional
+            The directory, shared between all workers, in which to cache the
+            molecules created by the protocols (see `create_molecule_from_smiles`).
         """
         self._protocols_by_id = {}
 
+        self._runtime_database_path = runtime_database_path
+
+        self._trace_directory = trace_directory
+        self._profiled_protocol_types = profiled_protocol_types
+
+        self._molecule_cache_directory = molecule_cache_directory
+
         self._root_protocol_ids = []
         self._root_directory = root_directory
 
@@ -971,7 +1106,8 @@ class WorkflowGraph:
 
                 parent_protocol_ids[dependant].append(inserted_id)
 
-    def submit(self, backend, include_uncertainty_check=True):
+    def submit(self, backend, include_uncertainty_check=True, fuse_lightweight_protocols=True,
+               estimated_runtimes=None):
         """Submits the protocol graph to the backend of choice.
 
         Parameters
@@ -983,6 +1119,16 @@ class WorkflowGraph:
             ensure it is below the target threshold set in the workflow metadata.
             If an uncertainty is not included in the workflow metadata, then this
             parameter will be ignored.
+        fuse_lightweight_protocols: bool
+            If true, linear chains of lightweight protocols will be fused together
+            and submitted to the backend as a single task.
+        estimated_runtimes: dict of str and float, optional
+            The estimated (e.g. historical average) runtime in seconds of each type
+            of protocol, which is used to prioritise the protocols which lie on the
+            longest (critical) paths through the graph. Protocol types not in this
+            dictionary are assumed to take one second to run. If not set, and this
+            graph has a runtime database, the runtimes will be predicted from the
+            historical runtimes in the database.
 
         Returns
         -------
@@ -1000,8 +1146,76 @@ class WorkflowGraph:
         # futures can be passed in the correct place.
         dependencies = graph.dependants_to_dependencies(self._dependants_graph)
 
+        # Prioritise the protocols which sit at the start of the longest chains
+        # of work, so that these start as early as possible.
+        critical_path_lengths = self._calculate_critical_path_lengths(estimated_runtimes)
+
+        # The options which control how each protocol is executed on the backend.
+        execution_kwargs = {
+            'runtime_database_path': self._runtime_database_path,
+            'trace_directory': self._trace_directory,
+            'profiled_protocol_types': self._profiled_protocol_types,
+            'molecule_cache_directory': self._molecule_cache_directory,
+            'submission_time': time.time()
+        }
+
+        # Find any chains of lightweight protocols which can be executed
+        # as a single task.
+        fused_chains_by_tail = {}
+        fused_node_ids = set()
+
+        if fuse_lightweight_protocols:
+
+            for chain in self._find_fusable_chains():
+
+                fused_chains_by_tail[chain[-1]] = chain
+                fused_node_ids.update(chain)
+
         for node_id in submission_order:
 
+            if node_id in fused_node_ids and node_id not in fused_chains_by_tail:
+                # Fused protocols are submitted along with the last protocol
+                # in their chain.
+                continue
+
+            if node_id in fused_chains_by_tail:
+
+                chain = fused_chains_by_tail[node_id]
+
+                # Collect the dependencies of the chain which are not part of
+                # the chain itself.
+                external_dependency_ids = []
+
+                for chain_node_id in chain:
+
+                    external_dependency_ids.extend(dependency for dependency in dependencies[chain_node_id] if
+                                                   dependency not in chain and
+                                                   dependency not in external_dependency_ids)
+
+                dependency_futures = [submitted_futures[dependency] for dependency in external_dependency_ids]
+
+                resource_requirements = self._protocols_by_id[chain[0]].resource_requirements
+
+                for chain_node_id in chain[1:]:
+
+                    if resource_requirements is None:
+                        break
+
+                    chain_node = self._protocols_by_id[chain_node_id]
+                    resource_requirements = resource_requirements.combine(chain_node.resource_requirements)
+
+                submitted_futures[node_id] = backend.submit_task(WorkflowGraph._execute_protocol_chain,
+                                                                 [self._protocols_by_id[x].directory for x in chain],
+                                                                 [self._protocols_by_id[x].schema for x in chain],
+                                                                 [dependencies[x] for x in chain],
+                                                                 *dependency_futures,
+                                                                 key=f'execute_{chain[0]}_to_{node_id}',
+                                                                 resource_requirements=resource_requirements,
+                                                                 priority=critical_path_lengths[chain[0]],
+                                                                 **execution_kwargs)
+
+                continue
+
             node = self._protocols_by_id[node_id]
             dependency_futures = []
 
@@ -1012,7 +1226,10 @@ class WorkflowGraph:
                                                              node.directory,
                                                              node.schema,
                                                              *dependency_futures,
-                                                             key=f'execute_{node_id}')
+                                                             key=f'execute_{node_id}',
+                                                             resource_requirements=node.resource_requirements,
+                                                             priority=critical_path_lengths[node_id],
+                                                             **execution_kwargs)
 
         for workflow_id in self._workflows_to_execute:
 
@@ -1060,10 +1277,106 @@ class WorkflowGraph:
                                                      workflow.outputs_to_store,
                                                      target_uncertainty,
                                                      *final_futures,
-                                                     key=f'gather_{workflow.physical_property.id}'))
+                                                     key=f'gather_{workflow.physical_property.id}',
+                                                     resource_requirements=TaskResourceRequirements(1)))
 
         return value_futures
 
+    @staticmethod
+    def _estimate_protocol_runtime(protocol, estimated_runtimes):
+        """Estimates how long a protocol will take to execute.
+
+        Parameters
+        ----------
+        protocol: BaseProtocol
+            The protocol to estimate the runtime of.
+        estimated_runtimes: dict of str and float, optional
+            The estimated runtime in seconds of each type of protocol.
+
+        Returns
+        -------
+        float
+            The estimated runtime in seconds.
+        """
+        from propertyestimator.protocols.groups import ProtocolGroup
+
+        protocol_type = type(protocol).__name__
+
+        if estimated_runtimes is not None and protocol_type in estimated_runtimes:
+            return estimated_runtimes[protocol_type]
+
+        if isinstance(protocol, ProtocolGroup) and len(protocol.protocols) > 0:
+
+            return sum(WorkflowGraph._estimate_protocol_runtime(child_protocol, estimated_runtimes)
+                       for child_protocol in protocol.protocols.values())
+
+        return 1.0
+
+    def _calculate_critical_path_lengths(self, estimated_runtimes=None):
+        """Calculates the estimated runtime of the critical path which
+        starts at each of the protocols in this graph.
+
+        Parameters
+        ----------
+        estimated_runtimes: dict of str and float, optional
+            The estimated runtime in seconds of each type of protocol.
+
+        Returns
+        -------
+        dict of str and float
+            The length of the critical path starting at each protocol.
+        """
+
+        if estimated_runtimes is None and self._runtime_database_path is not None:
+
+            runtime_database = ProtocolRuntimeDatabase(self._runtime_database_path)
+            cost_model = ProtocolCostModel(runtime_database)
+
+            protocol_runtimes = {protocol_id: cost_model.predict(protocol.schema)
+                                 for protocol_id, protocol in self._protocols_by_id.items()}
+
+        else:
+
+            protocol_runtimes = {protocol_id: self._estimate_protocol_runtime(protocol, estimated_runtimes)
+                                 for protocol_id, protocol in self._protocols_by_id.items()}
+
+        return graph.calculate_critical_path_lengths(self._dependants_graph, protocol_runtimes)
+
+    def _find_fusable_chains(self):
+        """Finds the linear chains of lightweight protocols in this graph
+        which can be fused together and executed as a single task.
+
+        Returns
+        -------
+        list of list of str
+            The ids of the protocols in each chain, ordered such that
+            each protocol depends on the one before it.
+        """
+
+        lightweight_ids = [protocol_id for protocol_id, protocol in self._protocols_by_id.items()
+                           if protocol.lightweight]
+
+        # Protocols whose outputs are gathered at the end of a workflow
+        # need their own future, and so can only terminate a chain.
+        terminal_ids = []
+
+        for workflow in self._workflows_to_execute.values():
+
+            terminal_ids.append(workflow.final_value_source.start_protocol)
+
+            for output_to_store in workflow.outputs_to_store.values():
+
+                for attribute_key in output_to_store.__getstate__():
+
+                    attribute_value = getattr(output_to_store, attribute_key)
+
+                    if not isinstance(attribute_value, ProtocolPath):
+                        continue
+
+                    terminal_ids.append(attribute_value.start_protocol)
+
+        return graph.find_linear_chains(self._dependants_graph, lightweight_ids, terminal_ids)
+
     @staticmethod
     def _save_protocol_output(file_path, output_dictionary):
         """Saves the results of executing a protocol (whether these be the true
@@ -1082,7 +1395,60 @@ class WorkflowGraph:
             json.dump(output_dictionary, file, cls=TypedJSONEncoder)
 
     @staticmethod
-    def _execute_protocol(directory, protocol_schema, *previous_output_paths, available_resources, **kwargs):
+    def _record_protocol_runtime(runtime_database_path, protocol, runtime, available_resources, succeeded):
+        """Records how long a protocol took to execute in a runtime database.
+        Any errors raised while recording the runtime are logged rather than
+        raised, so as to not affect the execution of the protocol.
+
+        Parameters
+        ----------
+        runtime_database_path: str
+            The path to the `ProtocolRuntimeDatabase`.
+        protocol: BaseProtocol
+            The protocol which was executed.
+        runtime: float
+            How long the protocol took to execute in seconds.
+        available_resources: ComputeResources
+            The resources the protocol was executed with.
+        succeeded: bool
+            Whether the protocol executed successfully.
+        """
+
+        try:
+
+            number_of_atoms = None
+
+            for input_name in ['input_coordinate_file', 'coordinate_file_path']:
+
+                coordinate_file_path = getattr(protocol, input_name, None)
+
+                if (not isinstance(coordinate_file_path, str) or
+                    not coordinate_file_path.endswith('.pdb') or
+                    not path.isfile(coordinate_file_path)):
+
+                    continue
+
+                number_of_atoms = count_pdb_atoms(coordinate_file_path)
+                break
+
+            number_of_steps = getattr(protocol, 'steps', None)
+
+            if not isinstance(number_of_steps, int):
+                number_of_steps = None
+
+            runtime_database = ProtocolRuntimeDatabase(runtime_database_path)
+            runtime_database.record(type(protocol).__name__, protocol.id, runtime, available_resources,
+                                    number_of_atoms, number_of_steps, succeeded)
+
+        except Exception as e:
+
+            formatted_exception = traceback.format_exception(None, e, e.__traceback__)
+            logging.warning(f'Could not record the runtime of {protocol.id}: {formatted_exception}')
+
+    @staticmethod
+    def _execute_protocol(directory, protocol_schema, *previous_output_paths, available_resources,
+                          runtime_database_path=None, trace_directory=None, profiled_protocol_types=None,
+                          molecule_cache_directory=None, submission_time=None, **kwargs):
         """Executes a protocol whose state is defined by the ``protocol_schema``.
 
         Parameters
@@ -1091,6 +1457,19 @@ class WorkflowGraph:
             The schema defining the protocol to execute.
         previous_output_paths: tuple of str
             Paths to the results of previous protocol executions.
+        runtime_database_path: str, optional
+            The path to a `ProtocolRuntimeDatabase` in which to record
+            how long the protocol took to execute.
+        trace_directory: str, optional
+            The directory in which to save a trace of where time was spent
+            while executing the protocol.
+        profiled_protocol_types: list of str, optional
+            The types of protocol which should be executed under `cProfile`.
+        molecule_cache_directory: str, optional
+            The directory in which to cache any molecules created by the protocol.
+        submission_time: float, optional
+            The time at which the protocol was submitted to the backend, used
+            to trace how long the protocol was queued for.
 
         Returns
         -------
@@ -1103,6 +1482,8 @@ class WorkflowGraph:
         # The path where the output of this protocol will be stored.
         output_dictionary_path = path.join(directory, '{}_output.json'.format(protocol_schema.id))
 
+        trace_recorder = TraceRecorder(trace_directory)
+
         # We need to make sure ALL exceptions are handled within this method,
         # or any function which will be executed on a calculation backend to
         # avoid accidentally killing the backend.
@@ -1113,6 +1494,15 @@ class WorkflowGraph:
             if path.isfile(output_dictionary_path):
                 return protocol_schema.id, output_dictionary_path
 
+            load_start_time = time.time()
+
+            if submission_time is not None:
+
+                # This includes the time spent waiting for any dependencies
+                # to finish, as well as for resources to become available.
+                trace_recorder.add_span('queued', 'scheduling', submission_time, load_start_time,
+                                        protocol_id=protocol_schema.id)
+
             # Store the results of the relevant previous protocols in a handy dictionary.
             # If one of the results is a failure, propagate it up the chain.
             previous_outputs_by_path = {}
@@ -1152,6 +1542,9 @@ class WorkflowGraph:
                     final_path = ProtocolPath(property_name, *protocol_ids)
                     previous_outputs_by_path[final_path] = output_value
 
+            if molecule_cache_directory is not None:
+                set_default_molecule_cache_directory(molecule_cache_directory)
+
             # Recreate the protocol on the backend to bypass the need for static methods
             # and awkward args and kwargs syntax.
             protocol = available_protocols[protocol_schema.type](protocol_schema.id)
@@ -1175,17 +1568,42 @@ class WorkflowGraph:
 
                     protocol.set_value(source_path, previous_outputs_by_path[target_path])
 
+            trace_recorder.add_span('load_inputs', 'protocol', load_start_time, time.time(),
+                                    protocol_id=protocol.id)
+
             logging.info('Executing protocol: {}'.format(protocol.id))
 
+            protocol_type = type(protocol).__name__
+
             start_time = time.perf_counter()
-            output_dictionary = protocol.execute(directory, available_resources)
+
+            with trace_recorder.activate(), trace_recorder.span('execute', 'protocol',
+                                                                protocol_id=protocol.id,
+                                                                protocol_type=protocol_type):
+
+                if profiled_protocol_types is not None and protocol_type in profiled_protocol_types:
+
+                    output_dictionary = trace_recorder.profile(protocol.id.replace('/', '_'), protocol.execute,
+                                                               directory, available_resources)
+
+                else:
+                    output_dictionary = protocol.execute(directory, available_resources)
+
             end_time = time.perf_counter()
 
             logging.info('Protocol finished executing ({} ms): {}'.format((end_time-start_time)*1000, protocol.id))
 
+            if runtime_database_path is not None:
+
+                succeeded = not isinstance(output_dictionary, PropertyEstimatorException)
+
+                WorkflowGraph._record_protocol_runtime(runtime_database_path, protocol, end_time - start_time,
+                                                       available_resources, succeeded)
+
             try:
 
-                WorkflowGraph._save_protocol_output(output_dictionary_path, output_dictionary)
+                with trace_recorder.span('save_output', 'protocol', protocol_id=protocol.id):
+                    WorkflowGraph._save_protocol_output(output_dictionary_path, output_dictionary)
 
             except TypeError as e:
 
@@ -1213,6 +1631,62 @@ class WorkflowGraph:
             WorkflowGraph._save_protocol_output(output_dictionary_path, exception)
             return protocol_schema.id, output_dictionary_path
 
+        finally:
+
+            try:
+                trace_recorder.save(protocol_schema.id.replace('/', '_'))
+            except Exception as e:
+                logging.warning(f'Could not save the trace of {protocol_schema.id}: {e}')
+
+    @staticmethod
+    def _execute_protocol_chain(directories, protocol_schemas, dependency_ids, *previous_output_paths,
+                                available_resources, **kwargs):
+        """Executes a linear chain of protocols, one after another, as a
+        single task. Each protocol is executed by `_execute_protocol`, and
+        so still stores its own output (checkpoint) file in its own directory.
+
+        Parameters
+        ----------
+        directories: list of str
+            The directories in which to execute each of the protocols.
+        protocol_schemas: list of protocols.ProtocolSchema
+            The schemas defining the protocols to execute, in the order
+            in which they should be executed.
+        dependency_ids: list of list of str
+            The ids of the protocols which each protocol in the chain takes
+            input from.
+        previous_output_paths: tuple of str
+            Paths to the results of any protocols outside of the chain
+            which the chain takes input from.
+
+        Returns
+        -------
+        str
+            The id of the final protocol in the chain.
+        str
+            The path to the outputs of the final protocol in the chain.
+        """
+
+        output_paths_by_id = {protocol_id: output_path for protocol_id, output_path in previous_output_paths}
+        chain_result = None
+
+        for directory, protocol_schema, protocol_dependency_ids in zip(directories,
+                                                                       protocol_schemas,
+                                                                       dependency_ids):
+
+            protocol_output_paths = [(protocol_id, output_paths_by_id[protocol_id])
+                                     for protocol_id in protocol_dependency_ids]
+
+            chain_result = WorkflowGraph._execute_protocol(directory,
+                                                           protocol_schema,
+                                                           *protocol_output_paths,
+                                                           available_resources=available_resources,
+                                                           **kwargs)
+
+            output_paths_by_id[protocol_schema.id] = chain_result[1]
+
+        return chain_result
+
     @staticmethod
     def _gather_results(directory, property_to_return, value_reference, outputs_to_store,
                         target_uncertainty, *protocol_result_paths, **kwargs):
@@ -1344,8 +1818,6 @@ class WorkflowGraph:
             The results of the protocols which formed the property
             estimation workflow.
         """
-        from shutil import copy as file_copy
-
         if not path.isdir(storage_directory):
             makedirs(storage_directory)
 
@@ -1362,16 +1834,40 @@ class WorkflowGraph:
         stored_object.provenance = physical_property.source
         stored_object.source_calculation_id = physical_property.id
 
-        # Copy the files into the directory to store.
-        _, coordinate_file_name = path.split(results_by_id[output_to_store.coordinate_file_path])
-        _, trajectory_file_name = path.split(results_by_id[output_to_store.trajectory_file_path])
+        # Capture the files in the directory to store. Where possible the files are
+        # reflinked rather than copied, so that large trajectories are not duplicated.
+        # They are never hardlinked, as the protocols which produced them may rewrite
+        # them in place if they are re-run in the same directory (e.g. as part of a
+        # conditional group), which would silently modify the stored data.
+        coordinate_file_path = results_by_id[output_to_store.coordinate_file_path]
+        trajectory_file_path = results_by_id[output_to_store.trajectory_file_path]
+
+        _, coordinate_file_name = path.split(coordinate_file_path)
+        _, trajectory_file_name = path.split(trajectory_file_path)
 
         _, statistics_file_name = path.split(results_by_id[output_to_store.statistics_file_path])
 
-        file_copy(results_by_id[output_to_store.coordinate_file_path], storage_directory)
-        file_copy(results_by_id[output_to_store.trajectory_file_path], storage_directory)
+        capture_file(coordinate_file_path, storage_directory, allow_hardlink=False)
+
+        trajectory_format = TrajectoryFileFormat(output_to_store.trajectory_storage_format)
+        trajectory_precision = output_to_store.trajectory_storage_precision
 
-        file_copy(results_by_id[output_to_store.statistics_file_path], storage_directory)
+        if trajectory_format == TrajectoryFileFormat.DCD and trajectory_precision is None:
+            capture_file(trajectory_file_path, storage_directory, allow_hardlink=False)
+
+        else:
+
+            # Re-encode the trajectory in the requested format, streaming
+            # it a chunk at a time rather than loading it into memory.
+            trajectory_file_name = (path.splitext(trajectory_file_name)[0] +
+                                    trajectory_file_extensions[trajectory_format])
+
+            write_trajectory_chunks(iterate_trajectory(trajectory_file_path, coordinate_file_path),
+                                    path.join(storage_directory, trajectory_file_name),
+                                    trajectory_format,
+                                    trajectory_precision)
+
+        capture_file(results_by_id[output_to_store.statistics_file_path], storage_directory, allow_hardlink=False)
 
         stored_object.coordinate_file_name = coordinate_file_name
         stored_object.trajectory_file_name = trajectory_file_name
@@ -1380,5 +1876,21 @@ class WorkflowGraph:
 
         stored_object.statistical_inefficiency = results_by_id[output_to_store.statistical_inefficiency]
 
+        if isinstance(output_to_store.number_of_molecules, ProtocolPath):
+            stored_object.number_of_molecules = results_by_id[output_to_store.number_of_molecules]
+        else:
+            stored_object.number_of_molecules = output_to_store.number_of_molecules
+
+        # The stored statistics have already been decorrelated, so each row is an effective sample.
+        stored_object.effective_samples = len(StatisticsFileReader(path.join(storage_directory,
+                                                                             statistics_file_name)))
+
+        # Record the checksums of the captured files so that the storage
+        # backend can verify that they have not been corrupted in transit.
+        for file_name in [coordinate_file_name, trajectory_file_name, statistics_file_name]:
+
+            stored_object.file_checksums[file_name] = calculate_file_checksum(path.join(storage_directory,
+                                                                                        file_name))
+
         with open(path.join(storage_directory, 'data.json'), 'w') as file:
             json.dump(stored_object, file, cls=TypedJSONEncoder)